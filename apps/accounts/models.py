@@ -2,10 +2,13 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models, transaction
 from steam_center.storages import MediaStorage
 from django.conf import settings
+from apps.common.models import FieldTrackerMixin
 
 GENDER_CHOICES = [("M", "Male"), ("F", "Female"), ("O", "Other")]
 
-class User(AbstractUser):
+class User(FieldTrackerMixin, AbstractUser):
+    tracked_fields = ("avatar",)
+
     user_code = models.CharField(max_length=10, unique=True, db_index=True, blank=True, null=True)
     role = models.CharField(max_length=20, default="STUDENT")
 
@@ -82,6 +85,16 @@ class UserCodeCounter(models.Model):
             counter.save(update_fields=["last_number"])
             return f"{prefix}{counter.last_number:04d}"
 
+    @classmethod
+    def reserve(cls, prefix: str, count: int) -> int:
+        """Giữ ``count`` số liên tiếp cho ``prefix`` (tạo user hàng loạt); trả về số đầu tiên."""
+        with transaction.atomic():
+            counter, _ = cls.objects.select_for_update().get_or_create(prefix=prefix)
+            first = counter.last_number + 1
+            counter.last_number += count
+            counter.save(update_fields=["last_number"])
+            return first
+
     def __str__(self):
         return f"{self.prefix}-{self.last_number:04d}"
 
@@ -1,12 +1,13 @@
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.encoding import force_bytes
 from django.utils.html import strip_tags
 from django.utils.http import urlsafe_base64_encode
 
+from apps.notifications.outbox import queue_email
+
 
 def build_password_reset_link(user, request) -> str:
     uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
@@ -36,12 +37,6 @@ def send_password_reset_email(user, request) -> bool:
     html_body = render_to_string("emails/password_reset_body.html", context)
     text_body = strip_tags(html_body)
 
-    message = EmailMultiAlternatives(
-        subject=subject,
-        body=text_body,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to=[recipient],
-    )
-    message.attach_alternative(html_body, "text/html")
-    message.send(fail_silently=False)
+    # Ghi vào outbox, worker gửi sau khi commit để SMTP chậm không giữ request
+    queue_email(subject, text_body, [recipient], html_body=html_body, from_email=settings.DEFAULT_FROM_EMAIL)
     return True
@@ -7,6 +7,9 @@ from django.urls import reverse
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
+from apps.notifications.models import OutboxEmail
+from apps.notifications.outbox import send_queued_emails
+
 
 @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
 class PasswordResetFlowTests(TestCase):
@@ -27,6 +30,10 @@ class PasswordResetFlowTests(TestCase):
 			follow=False,
 		)
 		self.assertRedirects(response, reverse("accounts:password_reset_done"))
+		# Request chỉ ghi vào outbox, worker mới thực sự gửi
+		self.assertEqual(len(mail.outbox), 0)
+		self.assertEqual(OutboxEmail.objects.count(), 1)
+		send_queued_emails()
 		self.assertEqual(len(mail.outbox), 1)
 		email = mail.outbox[0]
 		self.assertIn("Hướng dẫn đặt lại mật khẩu", email.subject)
@@ -39,6 +46,7 @@ class PasswordResetFlowTests(TestCase):
 			follow=False,
 		)
 		self.assertRedirects(response, reverse("accounts:password_reset_done"))
+		self.assertFalse(OutboxEmail.objects.exists())
 		self.assertEqual(len(mail.outbox), 0)
 
 	def test_password_reset_confirm_updates_password(self):
@@ -28,16 +28,10 @@ from django.utils.http import url_has_allowed_host_and_scheme, urlsafe_base64_de
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_POST
 
-from tablib import Dataset
-from tablib.exceptions import TablibException
-
-try:
-    from openpyxl.utils.exceptions import InvalidFileException  
-except ImportError:  
-    InvalidFileException = Exception  
-
 from apps.centers.models import Center
 from apps.classes.models import Class
+from apps.common.db_routing import replica_reads
+from apps.common.fragments import bump_table_versions
 from apps.common.utils.forms import form_errors_as_text
 from apps.common.utils.http import is_htmx_request
 from apps.filters.models import SavedFilter
@@ -76,8 +70,13 @@ def _is_password_reset_rate_limited(request) -> bool:
 # Tăng số lần yêu cầu đặt lại mật khẩu
 def _increment_password_reset_rate(request):
     key = _password_reset_rate_key(request)
-    attempts = cache.get(key, 0) + 1
-    cache.set(key, attempts, PASSWORD_RESET_RATE_WINDOW)
+    # add + incr thay vì get + set để các worker cùng đếm đúng trên cache dùng chung
+    if not cache.add(key, 1, PASSWORD_RESET_RATE_WINDOW):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Khóa vừa hết hạn giữa add và incr
+            cache.set(key, 1, PASSWORD_RESET_RATE_WINDOW)
 
 # Phản hồi khi bị giới hạn tần suất
 def _rate_limit_response(request):
@@ -498,6 +497,7 @@ def user_delete_view(request):
 
             # users_to_delete_qs.delete()
             users_to_delete_qs.update(is_active=False)
+            bump_table_versions(User)
             count_deleted = count_to_delete # Gán số lượng đúng để hiển thị
 
         # Logic thông báo
@@ -647,6 +647,7 @@ def user_edit_view(request, user_id):
 # Xuất danh sách người dùng
 @login_required
 @permission_required("accounts.view_user", raise_exception=True)
+@replica_reads()
 def export_users_view(request):
     user_resource = UserResource()
     # Sử dụng hàm lọc đã được tái cấu trúc
@@ -749,6 +750,14 @@ def export_users_initiate_view(request):
 @login_required
 @permission_required("accounts.add_user", raise_exception=True)
 def import_users_view(request):
+    from tablib import Dataset
+    from tablib.exceptions import TablibException
+
+    try:
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        InvalidFileException = Exception
+
     if request.method == 'POST':
         user_resource = UserResource()
         dataset = Dataset()
@@ -857,6 +866,8 @@ def import_users_view(request):
 @login_required
 @permission_required("accounts.view_user", raise_exception=True)
 def export_import_template_view(request):
+    from tablib import Dataset
+
     user_resource = UserResource()
     dataset = Dataset(headers=user_resource.get_export_headers())
     # Sử dụng phương thức export() để đảm bảo định dạng được xử lý đúng cách
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.api.sync import API_SYNC_RETENTION_DAYS, purge_sync_history
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones and idempotency records older than the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=API_SYNC_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        tombstones, operations = purge_sync_history(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {tombstones} tombstones and {operations} sync operations."))
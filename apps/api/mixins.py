@@ -0,0 +1,170 @@
+"""
+Nền chung cho các viewset chỉ đọc của API.
+
+- ``?fields=a,b``: chỉ trả về (và chỉ đọc từ DB) các field được yêu cầu. Mỗi serializer khai
+  báo ``Meta.columns`` là các cột cần cho từng field; ``plan_queryset`` suy ra ``only()`` và
+  ``select_related`` từ đó.
+- ETag/Last-Modified: với model có ``updated_at`` phiên bản được tính bằng một truy vấn
+  ``MAX(updated_at)``/``COUNT`` trước khi đọc trang dữ liệu, nên request 304 không phải đọc hay
+  serialize gì thêm; model khác dùng hash của dữ liệu trả về. Field lấy qua quan hệ (tên lớp,
+  giáo viên, phòng...) không đổi ``updated_at`` của bảng chính, nên ETag gồm cả version của các
+  bảng được join (``apps.common.fragments.table_versions``).
+"""
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+from rest_framework import viewsets
+from rest_framework.response import Response
+
+from apps.common.fragments import table_versions
+
+from .pagination import KeysetPagination
+
+FIELDS_PARAMETER = OpenApiParameter(
+    "fields",
+    OpenApiTypes.STR,
+    description="Danh sách field cần trả về, cách nhau bởi dấu phẩy. Bỏ trống để lấy tất cả.",
+)
+
+
+def requested_fields(request, available):
+    raw = request.query_params.get("fields", "") if request is not None else ""
+    selected = [name for name in (part.strip() for part in raw.split(",")) if name in available]
+    return selected or list(available)
+
+
+def plan_queryset(queryset, columns):
+    """``only()`` đúng các cột cần; quan hệ đi qua (``a__b``) được ``select_related``."""
+    only = set()
+    related = set()
+    for column in columns:
+        parts = column.split("__")
+        for i in range(1, len(parts)):
+            only.add("__".join(parts[:i]))
+        if len(parts) > 1:
+            related.add("__".join(parts[:-1]))
+        only.add(column)
+    related = {r for r in related if not any(other.startswith(r + "__") for other in related)}
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(only)) if only else queryset
+
+
+def joined_models(model, columns) -> list:
+    """Các model được join để lấy ``columns`` (``klass__main_teacher__first_name`` -> Class, User)."""
+    found = []
+    for column in columns:
+        current = model
+        for part in column.split("__")[:-1]:
+            current = current._meta.get_field(part).related_model
+            if current not in found:
+                found.append(current)
+    return found
+
+
+def queryset_stamp(queryset):
+    """(số dòng, updated_at lớn nhất) hoặc None nếu model không có ``updated_at``."""
+    if not any(field.name == "updated_at" for field in queryset.model._meta.concrete_fields):
+        return None
+    values = queryset.order_by().aggregate(count=Count("pk"), last=Max("updated_at"))
+    return values["count"], values["last"]
+
+
+class SparseFieldsSerializerMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None:
+            return
+        keep = set(requested_fields(request, self.fields.keys()))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=[FIELDS_PARAMETER]),
+    retrieve=extend_schema(parameters=[FIELDS_PARAMETER]),
+)
+class ReadOnlyApiViewSet(viewsets.ReadOnlyModelViewSet):
+    pagination_class = KeysetPagination
+    # Thứ tự cho phân trang cursor, phải kết thúc bằng cột duy nhất
+    ordering = ("id",)
+
+    def scope(self, queryset):
+        """Giới hạn dữ liệu theo vai trò người dùng."""
+        return queryset
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, "swagger_fake_view", False):
+            # drf-spectacular dựng view giả để sinh schema
+            return queryset.none()
+        queryset = self.scope(queryset)
+        return plan_queryset(queryset, self.requested_columns())
+
+    def requested_columns(self):
+        columns = self.get_serializer_class().Meta.columns
+        return [column for name in requested_fields(self.request, columns) for column in columns[name]]
+
+    def _etag(self, *parts):
+        joined = joined_models(self.get_serializer_class().Meta.model, self.requested_columns())
+        raw = "|".join(
+            str(part)
+            for part in (self.request.user.pk, self.request.get_full_path(), *table_versions(joined), *parts)
+        )
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def _not_modified(self, etag, last_modified=None):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            response["ETag"] = etag
+        return response
+
+    def _finalize(self, response, etag=None, last_modified=None):
+        if etag is None:
+            payload = json.dumps(response.data, sort_keys=True, cls=DjangoJSONEncoder)
+            etag = self._etag(hashlib.md5(payload.encode()).hexdigest())
+            not_modified = self._not_modified(etag)
+            if not_modified is not None:
+                return not_modified
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ("Cookie", "Authorization"))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = last_modified = None
+        stamp = queryset_stamp(queryset)
+        if stamp is not None:
+            etag = self._etag(*stamp)
+            last_modified = stamp[1]
+            # Danh sách chỉ so ETag: Last-Modified không phản ánh bản ghi bị xóa
+            not_modified = self._not_modified(etag)
+            if not_modified is not None:
+                return not_modified
+        page = self.paginate_queryset(queryset)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return self._finalize(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = getattr(instance, "updated_at", None)
+        etag = None
+        if last_modified is not None:
+            etag = self._etag(last_modified.isoformat())
+            not_modified = self._not_modified(etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+        response = Response(self.get_serializer(instance).data)
+        return self._finalize(response, etag, last_modified)
@@ -0,0 +1,39 @@
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """Dấu vết bản ghi đã xóa để client đồng bộ offline xóa theo."""
+
+    kind = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    # Lớp chứa bản ghi, để chỉ trả tombstone trong phạm vi người dùng; NULL là dữ liệu dùng chung
+    klass_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+
+    class Meta:
+        indexes = [models.Index(fields=["klass_id", "deleted_at"], name="tombstone_klass_deleted_idx")]
+
+
+    def __str__(self):
+        return f"{self.kind}#{self.object_id}"
+
+
+class SyncOperation(models.Model):
+    """Thao tác ghi offline đã xử lý, khóa theo idempotency key của client."""
+
+    user = models.ForeignKey(
+        "accounts.User", on_delete=models.CASCADE, related_name="sync_operations"
+    )
+    key = models.CharField(max_length=64)
+    kind = models.CharField(max_length=30)
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "key"], name="sync_operation_user_key_uniq")]
+
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
@@ -0,0 +1,77 @@
+from django.conf import settings
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from apps.common.pagination import CursorPaginator
+
+API_PAGE_SIZE = getattr(settings, "API_PAGE_SIZE", 50)
+API_MAX_PAGE_SIZE = getattr(settings, "API_MAX_PAGE_SIZE", 500)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Phân trang cursor dùng ``apps.common.pagination.CursorPaginator`` (hỗ trợ sắp xếp nhiều cột,
+    có NULL). Thứ tự lấy từ ``view.ordering`` và phải kết thúc bằng cột duy nhất.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, API_PAGE_SIZE))
+        except (TypeError, ValueError):
+            size = API_PAGE_SIZE
+        return max(1, min(size, API_MAX_PAGE_SIZE))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = CursorPaginator(queryset, self.get_page_size(request), view.ordering).page(
+            request.query_params.get(self.cursor_query_param)
+        )
+        return list(self.page)
+
+    def _link(self, token):
+        if token is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self._link(self.page.next_cursor),
+                "previous": self._link(self.page.previous_cursor),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor lấy từ next/previous của trang trước.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Số bản ghi mỗi trang (tối đa {API_MAX_PAGE_SIZE}).",
+                "schema": {"type": "integer"},
+            },
+        ]
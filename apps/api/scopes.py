@@ -0,0 +1,85 @@
+"""
+Phạm vi dữ liệu theo vai trò cho API.
+
+- Quản trị: toàn bộ.
+- Quản lý trung tâm: các lớp của trung tâm mình.
+- Giáo viên/trợ giảng: lớp mình dạy chính, trợ giảng hoặc dạy thay.
+- Học sinh/phụ huynh: chỉ dữ liệu của bản thân/con.
+"""
+
+from django.db.models import Q
+
+from apps.accounts.models import ParentStudentRelation
+from apps.classes.models import Class
+
+
+def _normalize(value):
+    return (value or "").strip().upper().replace(" ", "_")
+
+
+def role_flags(user):
+    # Cache trên instance để các viewset trong cùng request không truy vấn lại groups
+    cached = getattr(user, "_api_role_flags", None)
+    if cached is not None:
+        return cached
+    role = _normalize(getattr(user, "role", ""))
+    groups = {_normalize(name) for name in user.groups.values_list("name", flat=True)}
+    roles = groups | {role}
+    flags = {
+        "is_admin": bool(user.is_superuser or "ADMIN" in roles),
+        "is_center_manager": "CENTER_MANAGER" in roles,
+        "is_teacher": "TEACHER" in roles,
+        "is_assistant": "ASSISTANT" in roles,
+        "is_parent": "PARENT" in roles,
+        "is_student": "STUDENT" in roles,
+    }
+    user._api_role_flags = flags
+    return flags
+
+
+def staff_class_ids(user):
+    """Subquery id các lớp người dùng quản lý/giảng dạy; None nghĩa là tất cả."""
+    flags = role_flags(user)
+    if flags["is_admin"]:
+        return None
+    condition = Q(pk__in=[])
+    if flags["is_center_manager"] and user.center_id:
+        condition |= Q(center_id=user.center_id)
+    if flags["is_teacher"] or flags["is_assistant"]:
+        condition |= (
+            Q(main_teacher=user)
+            | Q(assistants=user)
+            | Q(sessions__teacher_override=user)
+            | Q(sessions__assistants=user)
+        )
+    return Class.objects.filter(condition).values("id")
+
+
+def learner_ids(user):
+    """Id học sinh mà người dùng được xem với tư cách học sinh (bản thân) hoặc phụ huynh (con)."""
+    flags = role_flags(user)
+    ids = []
+    if flags["is_student"]:
+        ids.append(user.pk)
+    if flags["is_parent"]:
+        ids.extend(ParentStudentRelation.objects.filter(parent=user).values_list("student_id", flat=True))
+    return ids
+
+
+def scope_by_class(queryset, user, class_field, student_field=None):
+    """
+    Lọc queryset theo lớp mà người dùng là nhân sự; nếu có ``student_field`` thì thêm
+    các dòng của chính học sinh/con của phụ huynh.
+    """
+    class_ids = staff_class_ids(user)
+    if class_ids is None:
+        return queryset
+    condition = Q(**{f"{class_field}__in": class_ids})
+    learners = learner_ids(user)
+    if learners:
+        if student_field:
+            condition |= Q(**{f"{student_field}__in": learners})
+        else:
+            # Lịch học: xem các lớp mà học sinh/con đang ghi danh
+            condition |= Q(**{f"{class_field}__in": Class.objects.filter(enrollments__student_id__in=learners).values("id")})
+    return queryset.filter(condition)
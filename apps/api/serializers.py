@@ -0,0 +1,256 @@
+"""
+Serializer chỉ đọc của API v1.
+
+Field lồng nhau được làm phẳng (``klass_name`` thay vì ``klass.name``) để ``?fields=`` chọn được
+từng cột. ``Meta.columns`` liệt kê các cột DB cần cho mỗi field (xem ``mixins.plan_queryset``).
+"""
+
+from rest_framework import serializers
+
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.class_sessions.models import ClassSession
+from apps.classes.models import Class
+from apps.curriculum.models import Lesson
+from apps.enrollments.models import Enrollment
+from apps.rewards.models import PointAccount
+
+from .mixins import SparseFieldsSerializerMixin
+
+USER_NAME_COLUMNS = ("first_name", "last_name", "username")
+
+
+def _user_columns(prefix):
+    return tuple(f"{prefix}__{column}" for column in USER_NAME_COLUMNS)
+
+
+def _user_name(user):
+    return user.preferred_full_name() if user else None
+
+
+class ClassSessionSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    klass_code = serializers.CharField(source="klass.code", read_only=True)
+    klass_name = serializers.CharField(source="klass.name", read_only=True)
+    lesson_title = serializers.CharField(source="lesson.title", read_only=True, default=None)
+    teacher_id = serializers.SerializerMethodField()
+    teacher_name = serializers.SerializerMethodField()
+    room_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ClassSession
+        fields = [
+            "id",
+            "klass_id",
+            "klass_code",
+            "klass_name",
+            "index",
+            "date",
+            "start_time",
+            "end_time",
+            "status",
+            "lesson_id",
+            "lesson_title",
+            "teacher_id",
+            "teacher_name",
+            "room_name",
+            "updated_at",
+        ]
+        columns = {
+            "id": ("id",),
+            "klass_id": ("klass",),
+            "klass_code": ("klass__code",),
+            "klass_name": ("klass__name",),
+            "index": ("index",),
+            "date": ("date",),
+            "start_time": ("start_time",),
+            "end_time": ("end_time",),
+            "status": ("status",),
+            "lesson_id": ("lesson",),
+            "lesson_title": ("lesson__title",),
+            "teacher_id": ("teacher_override", "klass__main_teacher"),
+            "teacher_name": _user_columns("teacher_override") + _user_columns("klass__main_teacher"),
+            "room_name": ("room_override__name", "klass__room__name"),
+            "updated_at": ("updated_at",),
+        }
+
+    def get_teacher_id(self, obj) -> int | None:
+        return obj.teacher_override_id or obj.klass.main_teacher_id
+
+    def get_teacher_name(self, obj) -> str | None:
+        return _user_name(obj.teacher_override or obj.klass.main_teacher)
+
+    def get_room_name(self, obj) -> str | None:
+        room = obj.room_override or obj.klass.room
+        return room.name if room else None
+
+
+class ClassSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    center_name = serializers.CharField(source="center.name", read_only=True)
+    subject_name = serializers.CharField(source="subject.name", read_only=True, default=None)
+    main_teacher_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Class
+        fields = [
+            "id",
+            "code",
+            "name",
+            "status",
+            "center_id",
+            "center_name",
+            "subject_id",
+            "subject_name",
+            "main_teacher_id",
+            "main_teacher_name",
+            "start_date",
+            "end_date",
+        ]
+        columns = {
+            "id": ("id",),
+            "code": ("code",),
+            "name": ("name",),
+            "status": ("status",),
+            "center_id": ("center",),
+            "center_name": ("center__name",),
+            "subject_id": ("subject",),
+            "subject_name": ("subject__name",),
+            "main_teacher_id": ("main_teacher",),
+            "main_teacher_name": _user_columns("main_teacher"),
+            "start_date": ("start_date",),
+            "end_date": ("end_date",),
+        }
+
+    def get_main_teacher_name(self, obj) -> str | None:
+        return _user_name(obj.main_teacher)
+
+
+class EnrollmentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    klass_name = serializers.CharField(source="klass.name", read_only=True)
+    student_code = serializers.CharField(source="student.user_code", read_only=True, default=None)
+    student_name = serializers.SerializerMethodField()
+    paid_sessions = serializers.IntegerField(read_only=True)
+    remaining_sessions = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Enrollment
+        fields = [
+            "id",
+            "klass_id",
+            "klass_name",
+            "student_id",
+            "student_code",
+            "student_name",
+            "status",
+            "fee_per_session",
+            "paid_sessions",
+            "sessions_consumed",
+            "remaining_sessions",
+            "start_date",
+            "end_date",
+            "updated_at",
+        ]
+        columns = {
+            "id": ("id",),
+            "klass_id": ("klass",),
+            "klass_name": ("klass__name",),
+            "student_id": ("student",),
+            "student_code": ("student__user_code",),
+            "student_name": _user_columns("student"),
+            "status": ("status",),
+            "fee_per_session": ("fee_per_session",),
+            # Annotation của annotate_session_balance, tính trong SQL nên không cần nạp cột nào
+            "paid_sessions": (),
+            "sessions_consumed": ("sessions_consumed",),
+            "remaining_sessions": (),
+            "start_date": ("start_date",),
+            "end_date": ("end_date",),
+            "updated_at": ("updated_at",),
+        }
+
+    def get_student_name(self, obj) -> str:
+        return _user_name(obj.student)
+
+
+class RosterEntrySerializer(EnrollmentSerializer):
+    class Meta(EnrollmentSerializer.Meta):
+        fields = ["id", "student_id", "student_code", "student_name", "status", "remaining_sessions"]
+        columns = {name: EnrollmentSerializer.Meta.columns[name] for name in fields}
+
+
+class AttendanceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    session_date = serializers.DateField(source="session.date", read_only=True)
+    klass_id = serializers.IntegerField(source="session.klass_id", read_only=True)
+    student_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Attendance
+        fields = ["id", "session_id", "session_date", "klass_id", "student_id", "student_name", "status", "note", "updated_at"]
+        columns = {
+            "id": ("id",),
+            "session_id": ("session",),
+            "session_date": ("session__date",),
+            "klass_id": ("session__klass",),
+            "student_id": ("student",),
+            "student_name": _user_columns("student"),
+            "status": ("status",),
+            "note": ("note",),
+            "updated_at": ("updated_at",),
+        }
+
+    def get_student_name(self, obj) -> str:
+        return _user_name(obj.student)
+
+
+class AssessmentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    session_date = serializers.DateField(source="session.date", read_only=True)
+    klass_id = serializers.IntegerField(source="session.klass_id", read_only=True)
+    student_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Assessment
+        fields = ["id", "session_id", "session_date", "klass_id", "student_id", "student_name", "score", "remark", "updated_at"]
+        columns = {
+            "id": ("id",),
+            "session_id": ("session",),
+            "session_date": ("session__date",),
+            "klass_id": ("session__klass",),
+            "student_id": ("student",),
+            "student_name": _user_columns("student"),
+            "score": ("score",),
+            "remark": ("remark",),
+            "updated_at": ("updated_at",),
+        }
+
+    def get_student_name(self, obj) -> str:
+        return _user_name(obj.student)
+
+
+class LessonSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = ["id", "module_id", "order", "title", "objectives", "updated_at"]
+        columns = {
+            "id": ("id",),
+            "module_id": ("module",),
+            "order": ("order",),
+            "title": ("title",),
+            "objectives": ("objectives",),
+            "updated_at": ("updated_at",),
+        }
+
+
+class PointBalanceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    student_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PointAccount
+        fields = ["id", "student_id", "student_name", "balance"]
+        columns = {
+            "id": ("id",),
+            "student_id": ("student",),
+            "student_name": _user_columns("student"),
+            "balance": ("balance",),
+        }
+
+    def get_student_name(self, obj) -> str:
+        return _user_name(obj.student)
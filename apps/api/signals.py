@@ -0,0 +1,56 @@
+"""Ghi tombstone khi xóa dữ liệu mà client offline đang giữ bản sao."""
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.billing.models import BillingEntry
+from apps.class_sessions.models import ClassSession
+from apps.common.fragments import bump_table_versions
+from apps.curriculum.models import Lesson
+from apps.enrollments.models import Enrollment
+
+from .models import Tombstone
+
+
+def _deleted_directly(instance, origin):
+    # Xóa dây chuyền từ buổi học/lớp/học sinh đã có tombstone của bản ghi cha
+    if isinstance(origin, QuerySet):
+        return origin.model is type(instance)
+    return origin is instance
+
+
+@receiver(post_delete, sender=ClassSession)
+def _session_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(kind="sessions", object_id=instance.pk, klass_id=instance.klass_id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def _enrollment_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(kind="roster", object_id=instance.pk, klass_id=instance.klass_id)
+
+
+@receiver(post_delete, sender=Lesson)
+def _lesson_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(kind="lessons", object_id=instance.pk)
+
+
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=Assessment)
+def _session_record_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleted_directly(instance, origin):
+        return
+    klass_id = ClassSession.objects.filter(pk=instance.session_id).values_list("klass_id", flat=True).first()
+    kind = "attendance" if sender is Attendance else "assessments"
+    Tombstone.objects.create(kind=kind, object_id=instance.pk, klass_id=klass_id)
+
+
+@receiver(post_save, sender=BillingEntry)
+@receiver(post_delete, sender=BillingEntry)
+def _touch_enrollment(sender, instance, **kwargs):
+    # Số buổi còn lại phụ thuộc bút toán: đánh dấu ghi danh đã đổi để lần đồng bộ sau gửi lại
+    Enrollment.objects.filter(pk=instance.enrollment_id).update(updated_at=timezone.now())
+    bump_table_versions(Enrollment)
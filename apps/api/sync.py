@@ -0,0 +1,189 @@
+"""
+Đồng bộ delta cho client offline của giáo viên.
+
+- Đọc: client gửi ``watermark`` của lần đồng bộ trước, server trả các buổi học, ghi danh, điểm
+  danh, đánh giá, bài học có ``updated_at`` từ mốc đó (lùi thêm ``API_SYNC_OVERLAP_SECONDS`` để
+  không sót transaction commit muộn; client upsert theo id nên nhận trùng không sao) cùng các
+  tombstone của bản ghi đã xóa. Mốc quá cũ (tombstone đã bị dọn) thì trả ``reset`` để client
+  tải lại toàn bộ.
+- Ghi: client gửi lô thao tác, mỗi thao tác có idempotency ``key``. Key đã xử lý thì trả lại
+  kết quả cũ, nên tải lên lại sau khi mất mạng không trừ buổi học hai lần.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.assessments.forms import AssessmentForm
+from apps.assessments.models import Assessment
+from apps.attendance.forms import AttendanceForm
+from apps.attendance.models import Attendance
+from apps.class_sessions.models import ClassSession
+from apps.curriculum.models import Lesson
+from apps.enrollments.models import Enrollment
+from apps.enrollments.services import annotate_session_balance
+
+from .mixins import plan_queryset
+from .models import SyncOperation, Tombstone
+from .scopes import staff_class_ids
+from .serializers import (
+    AssessmentSerializer,
+    AttendanceSerializer,
+    ClassSessionSerializer,
+    EnrollmentSerializer,
+    LessonSerializer,
+)
+
+API_SYNC_OVERLAP_SECONDS = getattr(settings, "API_SYNC_OVERLAP_SECONDS", 60)
+# Tombstone và kết quả thao tác được giữ bấy nhiêu ngày (xem lệnh purge_sync_history)
+API_SYNC_RETENTION_DAYS = getattr(settings, "API_SYNC_RETENTION_DAYS", 30)
+API_SYNC_MAX_OPERATIONS = getattr(settings, "API_SYNC_MAX_OPERATIONS", 500)
+
+
+class SyncRejected(Exception):
+    pass
+
+
+def parse_watermark(raw):
+    """None nếu không có mốc; ValueError nếu mốc không hợp lệ."""
+    if not raw:
+        return None
+    value = parse_datetime(raw)
+    if value is None:
+        raise ValueError("watermark không hợp lệ")
+    return value if timezone.is_aware(value) else timezone.make_aware(value)
+
+
+def _serialize(serializer_class, queryset):
+    columns = [column for names in serializer_class.Meta.columns.values() for column in names]
+    return serializer_class(plan_queryset(queryset, columns).order_by("pk"), many=True).data
+
+
+def changes_since(user, since, klass_id=None) -> dict:
+    """Các bản ghi thay đổi từ ``since`` trong phạm vi lớp của ``user``."""
+    now = timezone.now()
+    reset = since is None or since < now - timedelta(days=API_SYNC_RETENTION_DAYS)
+    lower = None if reset else since - timedelta(seconds=API_SYNC_OVERLAP_SECONDS)
+    class_ids = staff_class_ids(user)
+
+    def scoped(queryset, class_field):
+        if class_ids is not None:
+            queryset = queryset.filter(**{f"{class_field}__in": class_ids})
+        if klass_id:
+            queryset = queryset.filter(**{class_field: klass_id})
+        return queryset
+
+    def changed(queryset, class_field):
+        queryset = scoped(queryset, class_field)
+        return queryset if lower is None else queryset.filter(updated_at__gte=lower)
+
+    sessions = changed(ClassSession.objects.all(), "klass_id")
+    lessons = Lesson.objects.filter(pk__in=scoped(ClassSession.objects.all(), "klass_id").values("lesson_id"))
+    if lower is not None:
+        # Bài học của buổi mới/đổi bài cũng được gửi dù bản thân bài học không đổi
+        lessons = lessons.filter(Q(updated_at__gte=lower) | Q(pk__in=sessions.values("lesson_id")))
+
+    deleted = {}
+    if lower is not None:
+        tombstones = Tombstone.objects.filter(deleted_at__gte=lower)
+        if class_ids is not None:
+            tombstones = tombstones.filter(Q(klass_id__in=class_ids) | Q(klass_id__isnull=True))
+        if klass_id:
+            tombstones = tombstones.filter(Q(klass_id=klass_id) | Q(klass_id__isnull=True))
+        for kind, object_id in tombstones.order_by("pk").values_list("kind", "object_id"):
+            deleted.setdefault(kind, []).append(object_id)
+
+    return {
+        "watermark": now.isoformat(),
+        "reset": reset,
+        "sessions": _serialize(ClassSessionSerializer, sessions),
+        "roster": _serialize(EnrollmentSerializer, annotate_session_balance(changed(Enrollment.objects.all(), "klass_id"))),
+        "attendance": _serialize(AttendanceSerializer, changed(Attendance.objects.all(), "session__klass_id")),
+        "assessments": _serialize(AssessmentSerializer, changed(Assessment.objects.all(), "session__klass_id")),
+        "lessons": _serialize(LessonSerializer, lessons),
+        "deleted": deleted,
+    }
+
+
+def _target(user, operation, class_ids, model, permission):
+    if not user.has_perm(permission):
+        raise SyncRejected("Không có quyền ghi dữ liệu này.")
+    try:
+        session_id, student_id = int(operation.get("session")), int(operation.get("student"))
+        base = parse_watermark(operation.get("base_updated_at"))
+    except (TypeError, ValueError):
+        raise SyncRejected("session, student hoặc base_updated_at không hợp lệ.")
+    sessions = ClassSession.objects.filter(pk=session_id)
+    if class_ids is not None:
+        sessions = sessions.filter(klass_id__in=class_ids)
+    session = sessions.select_related("klass").first()
+    if session is None:
+        raise SyncRejected("Buổi học không tồn tại hoặc ngoài phạm vi.")
+    if not Enrollment.objects.filter(klass_id=session.klass_id, student_id=student_id).exists():
+        raise SyncRejected("Học sinh không thuộc lớp của buổi học.")
+    instance = model.objects.filter(session=session, student_id=student_id).first()
+    if instance is None:
+        instance = model(session=session, student_id=student_id)
+    if instance.pk and base is not None and instance.updated_at > base:
+        # Bản trên server mới hơn bản client đã sửa: không ghi đè, trả bản hiện tại cho client
+        return instance, True
+    return instance, False
+
+
+def _apply_record(user, operation, class_ids, model, form_class, serializer_class, permission):
+    instance, conflict = _target(user, operation, class_ids, model, permission)
+    if conflict:
+        return {"status": "conflict", "current": serializer_class(instance).data}
+    form = form_class(
+        {name: "" if operation.get(name) is None else operation.get(name) for name in form_class._meta.fields},
+        instance=instance,
+    )
+    if not form.is_valid():
+        raise SyncRejected("; ".join(f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()))
+    return {"status": "applied", "current": serializer_class(form.save()).data}
+
+
+OPERATIONS = {
+    "attendance": (Attendance, AttendanceForm, AttendanceSerializer, "attendance.change_attendance"),
+    "assessments": (Assessment, AssessmentForm, AssessmentSerializer, "assessments.change_assessment"),
+}
+
+
+def apply_operation(user, operation, class_ids) -> dict:
+    key = str(operation.get("key") or "")[:64]
+    kind = operation.get("kind")
+    if not key:
+        return {"key": key, "status": "rejected", "error": "Thiếu idempotency key."}
+    if kind not in OPERATIONS:
+        return {"key": key, "status": "rejected", "error": f"Loại thao tác không hỗ trợ: {kind}"}
+    try:
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = SyncOperation.objects.create(user=user, key=key, kind=kind)
+            except IntegrityError:
+                # Đã xử lý (hoặc đang xử lý ở request song song, khi đó chờ nó commit)
+                return {**SyncOperation.objects.get(user=user, key=key).result, "replayed": True}
+            result = {"key": key, **_apply_record(user, operation, class_ids, *OPERATIONS[kind])}
+            record.result = result
+            record.save(update_fields=["result"])
+            return result
+    except SyncRejected as exc:
+        # Không lưu key: client sửa dữ liệu rồi gửi lại cùng key vẫn được xử lý
+        return {"key": key, "status": "rejected", "error": str(exc)}
+
+
+def apply_operations(user, operations) -> list[dict]:
+    class_ids = staff_class_ids(user)
+    return [apply_operation(user, operation, class_ids) for operation in operations]
+
+
+def purge_sync_history(days: int = API_SYNC_RETENTION_DAYS) -> tuple[int, int]:
+    cutoff = timezone.now() - timedelta(days=days)
+    tombstones, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    operations, _ = SyncOperation.objects.filter(created_at__lt=cutoff).delete()
+    return tombstones, operations
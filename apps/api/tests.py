@@ -0,0 +1,212 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import ParentStudentRelation
+from apps.attendance.models import Attendance
+from apps.billing.models import BillingEntry
+from apps.common.factories import ClassSessionFactory, KlassFactory, UserFactory
+from apps.enrollments.models import Enrollment, EnrollmentStatus
+from apps.rewards.models import PointAccount
+
+from .models import SyncOperation, Tombstone
+
+
+class ApiTests(TestCase):
+	def setUp(self):
+		self.klass = KlassFactory()
+		self.other_klass = KlassFactory()
+		self.teacher = self.klass.main_teacher
+		self.student = UserFactory()
+		self.other_student = UserFactory()
+		self.parent = UserFactory(role="PARENT")
+		ParentStudentRelation.objects.create(parent=self.parent, student=self.student)
+		self.enrollment = Enrollment.objects.create(
+			klass=self.klass, student=self.student, status=EnrollmentStatus.ACTIVE, sessions_purchased=10
+		)
+		Enrollment.objects.create(
+			klass=self.other_klass, student=self.other_student, status=EnrollmentStatus.ACTIVE, sessions_purchased=5
+		)
+		self.sessions = [
+			ClassSessionFactory(klass=self.klass, date=datetime.date(2024, 5, day)) for day in range(1, 6)
+		]
+		self.other_session = ClassSessionFactory(klass=self.other_klass, date=datetime.date(2024, 5, 1))
+		Attendance.objects.create(session=self.sessions[0], student=self.student, status="P")
+		Attendance.objects.create(session=self.other_session, student=self.other_student, status="P")
+		PointAccount.objects.update_or_create(student=self.student, defaults={"balance": 30})
+		PointAccount.objects.update_or_create(student=self.other_student, defaults={"balance": 50})
+
+	def test_requires_authentication(self):
+		self.assertEqual(self.client.get("/api/v1/sessions/").status_code, 403)
+
+	def test_teacher_sees_only_own_class_sessions(self):
+		self.client.force_login(self.teacher)
+		response = self.client.get("/api/v1/sessions/")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual({row["klass_id"] for row in response.json()["results"]}, {self.klass.id})
+		self.assertEqual(len(response.json()["results"]), 5)
+
+	def test_parent_sees_child_attendance_and_balance(self):
+		self.client.force_login(self.parent)
+		rows = self.client.get("/api/v1/attendance/").json()["results"]
+		self.assertEqual([row["student_id"] for row in rows], [self.student.id])
+		rows = self.client.get("/api/v1/point-balances/").json()["results"]
+		self.assertEqual([(row["student_id"], row["balance"]) for row in rows], [(self.student.id, 30)])
+
+	def test_student_cannot_read_other_rows_or_roster(self):
+		self.client.force_login(self.student)
+		rows = self.client.get("/api/v1/enrollments/").json()["results"]
+		self.assertEqual([row["student_id"] for row in rows], [self.student.id])
+		# Cùng kết quả với cách tính từng ghi danh của enrollments.services
+		self.assertEqual(rows[0]["remaining_sessions"], Enrollment.objects.get(pk=self.enrollment.pk).sessions_remaining)
+		self.assertEqual(self.client.get(f"/api/v1/classes/{self.klass.id}/roster/").status_code, 404)
+
+	def test_roster_for_teacher(self):
+		self.client.force_login(self.teacher)
+		response = self.client.get(f"/api/v1/classes/{self.klass.id}/roster/")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(
+			[(row["student_id"], row["remaining_sessions"]) for row in response.json()["results"]],
+			[(self.student.id, Enrollment.objects.get(pk=self.enrollment.pk).sessions_remaining)],
+		)
+
+	def test_sparse_fields_narrow_payload_and_columns(self):
+		self.client.force_login(self.teacher)
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.client.get("/api/v1/sessions/?fields=id,date")
+		self.assertEqual(set(response.json()["results"][0]), {"id", "date"})
+		page_sql = [q["sql"] for q in ctx.captured_queries if 'FROM "class_sessions_classsession"' in q["sql"]][-1]
+		self.assertNotIn("start_time", page_sql.split("FROM")[0])
+
+	def test_cursor_pagination(self):
+		self.client.force_login(self.teacher)
+		first = self.client.get("/api/v1/sessions/?page_size=2").json()
+		self.assertEqual([row["date"] for row in first["results"]], ["2024-05-01", "2024-05-02"])
+		second = self.client.get(first["next"]).json()
+		self.assertEqual([row["date"] for row in second["results"]], ["2024-05-03", "2024-05-04"])
+
+	def test_etag_short_circuits_page_query(self):
+		self.client.force_login(self.teacher)
+		response = self.client.get("/api/v1/sessions/")
+		etag = response["ETag"]
+		self.assertTrue(response.has_header("Last-Modified"))
+		with CaptureQueriesContext(connection) as ctx:
+			cached = self.client.get("/api/v1/sessions/", HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(cached.status_code, 304)
+		self.assertFalse(any("ORDER BY" in q["sql"] for q in ctx.captured_queries))
+
+		self.sessions[0].status = "COMPLETED"
+		self.sessions[0].save()
+		self.assertEqual(self.client.get("/api/v1/sessions/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+	def test_etag_changes_when_joined_table_changes(self):
+		self.client.force_login(self.teacher)
+		etag = self.client.get("/api/v1/sessions/")["ETag"]
+		self.assertEqual(self.client.get("/api/v1/sessions/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+		# Đổi tên lớp không chạm updated_at của buổi học nhưng đổi klass_name trong kết quả
+		with self.captureOnCommitCallbacks(execute=True):
+			self.klass.name = "Lớp đổi tên"
+			self.klass.save()
+		response = self.client.get("/api/v1/sessions/", HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual({row["klass_name"] for row in response.json()["results"]}, {"Lớp đổi tên"})
+
+	def test_content_etag_for_models_without_updated_at(self):
+		self.client.force_login(self.parent)
+		etag = self.client.get("/api/v1/point-balances/")["ETag"]
+		self.assertEqual(self.client.get("/api/v1/point-balances/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+	def test_schema(self):
+		self.client.force_login(self.teacher)
+		response = self.client.get("/api/schema/")
+		self.assertEqual(response.status_code, 200)
+		self.assertIn(b"/api/v1/sessions/", response.content)
+
+
+@mock.patch("apps.api.sync.API_SYNC_OVERLAP_SECONDS", 0)
+class SyncTests(TestCase):
+	def setUp(self):
+		self.klass = KlassFactory()
+		self.teacher = self.klass.main_teacher
+		self.teacher.user_permissions.add(Permission.objects.get(codename="change_attendance"))
+		self.student = UserFactory()
+		self.enrollment = Enrollment.objects.create(
+			klass=self.klass, student=self.student, status=EnrollmentStatus.ACTIVE, sessions_purchased=10
+		)
+		self.sessions = [ClassSessionFactory(klass=self.klass, date=datetime.date(2024, 5, day)) for day in (1, 2)]
+		self.other_session = ClassSessionFactory(date=datetime.date(2024, 5, 1))
+		self.client.force_login(self.teacher)
+
+	def _upload(self, *operations):
+		response = self.client.post("/api/v1/sync/", {"operations": list(operations)}, content_type="application/json")
+		self.assertEqual(response.status_code, 200)
+		return response.json()["results"]
+
+	def _attendance(self, key, status, session=None, **extra):
+		session = session or self.sessions[0]
+		return {"key": key, "kind": "attendance", "session": session.id, "student": self.student.id, "status": status, **extra}
+
+	def test_only_staff_can_sync(self):
+		self.client.force_login(self.student)
+		self.assertEqual(self.client.get("/api/v1/sync/").status_code, 403)
+
+	def test_full_then_delta_with_tombstones(self):
+		full = self.client.get("/api/v1/sync/").json()
+		self.assertTrue(full["reset"])
+		self.assertEqual({row["id"] for row in full["sessions"]}, {s.id for s in self.sessions})
+		self.assertEqual([row["student_id"] for row in full["roster"]], [self.student.id])
+
+		attendance = Attendance.objects.create(session=self.sessions[1], student=self.student, status="P")
+		deleted_id = self.sessions[0].id
+		self.sessions[0].delete()
+		delta = self.client.get("/api/v1/sync/", {"watermark": full["watermark"]}).json()
+		self.assertFalse(delta["reset"])
+		self.assertEqual(delta["sessions"], [])
+		self.assertEqual([row["id"] for row in delta["attendance"]], [attendance.id])
+		# Điểm danh trừ buổi học nên số buổi còn lại của ghi danh cũng được gửi lại
+		self.assertEqual([row["id"] for row in delta["roster"]], [self.enrollment.id])
+		self.assertEqual(delta["deleted"], {"sessions": [deleted_id]})
+
+		again = self.client.get("/api/v1/sync/", {"watermark": delta["watermark"]}).json()
+		self.assertEqual((again["attendance"], again["roster"], again["deleted"]), ([], [], {}))
+
+	def test_other_class_tombstones_are_hidden(self):
+		watermark = self.client.get("/api/v1/sync/").json()["watermark"]
+		deleted_id = self.other_session.id
+		self.other_session.delete()
+		self.assertTrue(Tombstone.objects.filter(kind="sessions", object_id=deleted_id).exists())
+		self.assertEqual(self.client.get("/api/v1/sync/", {"watermark": watermark}).json()["deleted"], {})
+
+	def test_retried_upload_does_not_double_consume(self):
+		first = self._upload(self._attendance("k1", "P"))
+		self.assertEqual(first[0]["status"], "applied")
+		consumed = BillingEntry.objects.filter(enrollment=self.enrollment, entry_type=BillingEntry.EntryType.CONSUME)
+		self.assertEqual(consumed.count(), 1)
+
+		# Giáo viên sửa thành vắng, sau đó lô đầu tiên được gửi lại do mất mạng
+		self._upload(self._attendance("k2", "A"))
+		replay = self._upload(self._attendance("k1", "P"))
+		self.assertEqual(replay[0], {**first[0], "replayed": True})
+		self.assertEqual(Attendance.objects.get(session=self.sessions[0], student=self.student).status, "A")
+		self.assertEqual(consumed.count(), 1)
+
+	def test_rejections_are_not_remembered(self):
+		results = self._upload(
+			self._attendance("k1", "P", session=self.other_session),
+			self._attendance("k2", "X"),
+			{"kind": "attendance"},
+		)
+		self.assertEqual([r["status"] for r in results], ["rejected"] * 3)
+		self.assertFalse(SyncOperation.objects.exists())
+		self.assertEqual(self._upload(self._attendance("k2", "P"))[0]["status"], "applied")
+
+	def test_stale_edit_returns_conflict(self):
+		applied = self._upload(self._attendance("k1", "P"))[0]
+		stale = (datetime.datetime.fromisoformat(applied["current"]["updated_at"]) - datetime.timedelta(minutes=5)).isoformat()
+		result = self._upload(self._attendance("k2", "A", base_updated_at=stale))[0]
+		self.assertEqual((result["status"], result["current"]["status"]), ("conflict", "P"))
@@ -0,0 +1,17 @@
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+router = DefaultRouter()
+router.register("sessions", views.ClassSessionViewSet, basename="session")
+router.register("classes", views.ClassViewSet, basename="class")
+router.register("attendance", views.AttendanceViewSet, basename="attendance")
+router.register("assessments", views.AssessmentViewSet, basename="assessment")
+router.register("enrollments", views.EnrollmentViewSet, basename="enrollment")
+router.register("point-balances", views.PointBalanceViewSet, basename="point-balance")
+
+urlpatterns = [
+    path("sync/", views.SyncView.as_view(), name="sync"),
+    *router.urls,
+]
@@ -0,0 +1,192 @@
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django_filters import rest_framework as filters
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import permissions, serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.class_sessions.models import ClassSession
+from apps.classes.models import Class
+from apps.enrollments.models import Enrollment
+from apps.enrollments.services import annotate_session_balance
+from apps.rewards.models import PointAccount
+
+from .mixins import FIELDS_PARAMETER, ReadOnlyApiViewSet, plan_queryset, requested_fields
+from .scopes import learner_ids, role_flags, scope_by_class, staff_class_ids
+from .serializers import (
+    AssessmentSerializer,
+    AttendanceSerializer,
+    ClassSerializer,
+    ClassSessionSerializer,
+    EnrollmentSerializer,
+    PointBalanceSerializer,
+    RosterEntrySerializer,
+)
+from .sync import API_SYNC_MAX_OPERATIONS, apply_operations, changes_since, parse_watermark
+
+
+class ClassSessionFilter(filters.FilterSet):
+    date_from = filters.DateFilter(field_name="date", lookup_expr="gte")
+    date_to = filters.DateFilter(field_name="date", lookup_expr="lte")
+
+    class Meta:
+        model = ClassSession
+        fields = ["klass", "status", "date_from", "date_to"]
+
+
+class ClassSessionViewSet(ReadOnlyApiViewSet):
+    """Lịch học theo buổi."""
+
+    queryset = ClassSession.objects.all()
+    serializer_class = ClassSessionSerializer
+    filterset_class = ClassSessionFilter
+    ordering = ("date", "start_time", "id")
+
+    def scope(self, queryset):
+        return scope_by_class(queryset, self.request.user, "klass_id")
+
+
+class ClassViewSet(ReadOnlyApiViewSet):
+    queryset = Class.objects.all()
+    serializer_class = ClassSerializer
+    filterset_fields = ["center", "subject", "status"]
+
+    def scope(self, queryset):
+        return scope_by_class(queryset, self.request.user, "id")
+
+    @extend_schema(responses=RosterEntrySerializer(many=True), parameters=[FIELDS_PARAMETER])
+    @action(detail=True, serializer_class=RosterEntrySerializer)
+    def roster(self, request, pk=None, version=None):
+        """Danh sách học sinh của lớp kèm số buổi còn lại; chỉ nhân sự của lớp được xem."""
+        class_ids = staff_class_ids(request.user)
+        classes = Class.objects.only("id")
+        if class_ids is not None:
+            classes = classes.filter(pk__in=class_ids)
+        klass = get_object_or_404(classes, pk=pk)
+        columns = RosterEntrySerializer.Meta.columns
+        fields = requested_fields(request, columns)
+        queryset = plan_queryset(
+            annotate_session_balance(Enrollment.objects.filter(klass=klass)),
+            [column for name in fields for column in columns[name]],
+        )
+        page = self.paginate_queryset(queryset)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return self._finalize(response)
+
+
+class AttendanceViewSet(ReadOnlyApiViewSet):
+    queryset = Attendance.objects.all()
+    serializer_class = AttendanceSerializer
+    filterset_fields = ["session", "session__klass", "student", "status"]
+
+    def scope(self, queryset):
+        return scope_by_class(queryset, self.request.user, "session__klass_id", "student_id")
+
+
+class AssessmentViewSet(ReadOnlyApiViewSet):
+    queryset = Assessment.objects.all()
+    serializer_class = AssessmentSerializer
+    filterset_fields = ["session", "session__klass", "student"]
+
+    def scope(self, queryset):
+        return scope_by_class(queryset, self.request.user, "session__klass_id", "student_id")
+
+
+class EnrollmentViewSet(ReadOnlyApiViewSet):
+    """Ghi danh kèm số buổi đã trả và còn lại."""
+
+    queryset = Enrollment.objects.all()
+    serializer_class = EnrollmentSerializer
+    filterset_fields = ["klass", "student", "status"]
+
+    def scope(self, queryset):
+        return annotate_session_balance(scope_by_class(queryset, self.request.user, "klass_id", "student_id"))
+
+
+class PointBalanceViewSet(ReadOnlyApiViewSet):
+    """Số dư điểm thưởng."""
+
+    queryset = PointAccount.objects.all()
+    serializer_class = PointBalanceSerializer
+    filterset_fields = ["student"]
+
+    def scope(self, queryset):
+        user = self.request.user
+        class_ids = staff_class_ids(user)
+        if class_ids is None:
+            return queryset
+        condition = Q(student_id__in=Enrollment.objects.filter(klass_id__in=class_ids).values("student_id"))
+        learners = learner_ids(user)
+        if learners:
+            condition |= Q(student_id__in=learners)
+        return queryset.filter(condition)
+
+
+class IsCenterStaff(permissions.BasePermission):
+    """Quản trị, quản lý trung tâm, giáo viên hoặc trợ giảng."""
+
+    def has_permission(self, request, view):
+        flags = role_flags(request.user)
+        return any(flags[name] for name in ("is_admin", "is_center_manager", "is_teacher", "is_assistant"))
+
+
+class SyncOperationSerializer(serializers.Serializer):
+    # Chỉ mô tả schema; từng thao tác được kiểm tra trong sync.apply_operation để lỗi của một
+    # thao tác không làm hỏng cả lô
+    key = serializers.CharField(max_length=64, help_text="Idempotency key do client sinh (ví dụ UUID).")
+    kind = serializers.ChoiceField(choices=["attendance", "assessments"])
+    session = serializers.IntegerField()
+    student = serializers.IntegerField()
+    base_updated_at = serializers.DateTimeField(
+        required=False, help_text="updated_at của bản client đã sửa; server mới hơn thì trả conflict."
+    )
+    status = serializers.CharField(required=False)
+    note = serializers.CharField(required=False, allow_blank=True)
+    score = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
+    remark = serializers.CharField(required=False, allow_blank=True)
+
+
+class SyncUploadSerializer(serializers.Serializer):
+    operations = SyncOperationSerializer(many=True)
+
+
+class SyncView(APIView):
+    """
+    GET: thay đổi kể từ ``watermark`` (bỏ trống để tải toàn bộ).
+    POST: ghi lô thao tác offline; mỗi thao tác xử lý riêng và trả kết quả theo ``key``.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsCenterStaff]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("watermark", OpenApiTypes.DATETIME, description="watermark của lần đồng bộ trước."),
+            OpenApiParameter("klass", OpenApiTypes.INT, description="Chỉ đồng bộ một lớp."),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    def get(self, request, version=None):
+        try:
+            since = parse_watermark(request.query_params.get("watermark"))
+            klass_id = int(request.query_params.get("klass") or 0)
+        except ValueError:
+            return Response({"detail": "watermark hoặc klass không hợp lệ."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(changes_since(request.user, since, klass_id or None))
+
+    @extend_schema(request=SyncUploadSerializer, responses=OpenApiTypes.OBJECT)
+    def post(self, request, version=None):
+        operations = request.data.get("operations") if isinstance(request.data, dict) else None
+        if not isinstance(operations, list):
+            return Response({"detail": "Cần danh sách operations."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > API_SYNC_MAX_OPERATIONS:
+            return Response(
+                {"detail": f"Tối đa {API_SYNC_MAX_OPERATIONS} thao tác mỗi lần."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        operations = [operation if isinstance(operation, dict) else {} for operation in operations]
+        return Response({"results": apply_operations(request.user, operations)})
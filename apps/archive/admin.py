@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import ClassArchive
+
+
+@admin.register(ClassArchive)
+class ClassArchiveAdmin(admin.ModelAdmin):
+    list_display = ("klass", "archived_at", "size_bytes")
+    raw_id_fields = ("klass",)
+    readonly_fields = ("archived_at", "row_counts", "size_bytes", "session_attendance")
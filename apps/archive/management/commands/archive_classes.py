@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from apps.archive.services import ARCHIVE_AFTER_MONTHS, ARCHIVE_BATCH_SIZE, archivable_classes, archive_class
+
+
+class Command(BaseCommand):
+    help = (
+        "Move attendance, assessments, billing entries and reward points of COMPLETED/CANCELLED classes "
+        "that ended more than --months ago into compressed per-class archives (one transaction per class)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS)
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Số dòng mỗi lô nén")
+        parser.add_argument("--limit", type=int, default=0, help="Số lớp tối đa trong lần chạy này")
+        parser.add_argument("--dry-run", action="store_true", help="Chỉ liệt kê các lớp sẽ được lưu trữ")
+
+    def handle(self, *args, **options):
+        classes = archivable_classes(months=options["months"])
+        if options["limit"]:
+            classes = classes[: options["limit"]]
+        if options["dry_run"]:
+            for klass in classes:
+                self.stdout.write(f"{klass.code} (kết thúc {klass.finished:%d/%m/%Y})")
+            self.stdout.write(f"{len(classes)} lớp sẽ được lưu trữ.")
+            return
+        archived = rows = size = 0
+        for klass in classes:
+            archive = archive_class(klass, batch_size=options["batch_size"])
+            count = sum(archive.row_counts.values())
+            archived += 1
+            rows += count
+            size += archive.size_bytes
+            self.stdout.write(f"{klass.code}: {count} dòng, {archive.size_bytes / 1024:.1f} KB")
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} classes, {rows} rows into {size / 1024 / 1024:.2f} MB."))
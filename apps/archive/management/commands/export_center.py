@@ -0,0 +1,44 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.archive.snapshot import SNAPSHOT_BATCH_SIZE, export_center
+from apps.centers.models import Center
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream one center's classes, sessions, enrollments, attendance, assessments, billing, rewards "
+        "and media references (archived classes included) to a zip of gzip'd NDJSON files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("center", help="Mã trung tâm hoặc id")
+        parser.add_argument("--output", default="", help="File zip (mặc định <mã>-<ngày>.zip)")
+        parser.add_argument("--batch-size", type=int, default=SNAPSHOT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        value = options["center"]
+        center = Center.objects.filter(code=value).first()
+        if center is None and value.isdigit():
+            center = Center.objects.filter(pk=int(value)).first()
+        if center is None:
+            raise CommandError(f"Không tìm thấy trung tâm {value}")
+        path = options["output"] or f"{center.code}-{timezone.localdate():%Y%m%d}.zip"
+
+        manifest = export_center(center, path, batch_size=options["batch_size"])
+        for entry in manifest["files"]:
+            self.stdout.write(
+                f"  {entry['model']:40} {entry['rows']:>9} dòng {entry['bytes'] / 1024:>10.1f} KB {entry['seconds']:>8.2f}s"
+            )
+        rows = sum(entry["rows"] for entry in manifest["files"])
+        size = os.path.getsize(path)
+        seconds = manifest["seconds"] or 1e-9
+        self.stdout.write(f"  {manifest['media']} tham chiếu media")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {path}: {rows} rows, {size / 1024 / 1024:.2f} MB in {seconds:.2f}s "
+                f"({rows / seconds:.0f} rows/s, {size / 1024 / 1024 / seconds:.2f} MB/s)"
+            )
+        )
@@ -0,0 +1,48 @@
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from apps.archive.snapshot import SNAPSHOT_BATCH_SIZE, import_center
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load a center snapshot written by export_center in dependency order, assigning new ids. "
+        "Users, curriculum, discounts and reward items that already exist are reused."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File zip của export_center")
+        parser.add_argument("--code-suffix", default="", help="Hậu tố thêm vào mã trung tâm và mã lớp (tạo bản sao)")
+        parser.add_argument("--batch-size", type=int, default=SNAPSHOT_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Nạp rồi rollback, chỉ để kiểm tra và đo tốc độ")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["path"]):
+            raise CommandError(f"Không tìm thấy {options['path']}")
+        try:
+            with transaction.atomic():
+                result = import_center(options["path"], code_suffix=options["code_suffix"], batch_size=options["batch_size"])
+                transaction.set_rollback(options["dry_run"])
+        except ValidationError as exc:
+            raise CommandError(exc.messages[0]) from exc
+        except IntegrityError as exc:
+            raise CommandError(f"Trùng dữ liệu có sẵn (thử --code-suffix): {exc}") from exc
+
+        for entry in result["files"]:
+            self.stdout.write(
+                f"  {entry['model']:40} {entry.get('created', 0):>9} mới {entry.get('matched', 0):>7} có sẵn "
+                f"{entry.get('skipped', 0):>5} bỏ qua {entry['seconds']:>8.2f}s"
+            )
+        rows = sum(entry.get("rows", 0) for entry in result["files"])
+        size = os.path.getsize(options["path"])
+        seconds = result["seconds"] or 1e-9
+        verb = "Checked" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {result['center'].code}: {rows} rows in {seconds:.2f}s "
+                f"({rows / seconds:.0f} rows/s, {size / 1024 / 1024 / seconds:.2f} MB/s)"
+            )
+        )
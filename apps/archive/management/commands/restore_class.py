@@ -0,0 +1,26 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.archive.services import restore_class
+from apps.classes.models import Class
+
+
+class Command(BaseCommand):
+    help = "Move an archived class's rows back into the live tables and drop its archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("classes", nargs="+", help="Mã lớp hoặc id")
+
+    def handle(self, *args, **options):
+        for value in options["classes"]:
+            klass = Class.objects.filter(code=value).first()
+            if klass is None and value.isdigit():
+                klass = Class.objects.filter(pk=int(value)).first()
+            if klass is None:
+                raise CommandError(f"Không tìm thấy lớp {value}")
+            try:
+                restored = restore_class(klass)
+            except ValidationError as exc:
+                raise CommandError(exc.messages[0]) from exc
+            summary = ", ".join(f"{label} {count}" for label, count in restored.items()) or "không có dòng nào"
+            self.stdout.write(self.style.SUCCESS(f"{klass.code}: {summary}"))
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('classes', '0003_classschedule'),
+        ('enrollments', '0009_enrollment_student_klass_active_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('row_counts', models.JSONField(default=dict)),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('session_attendance', models.JSONField(default=dict)),
+                ('klass', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='classes.class')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedEnrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('assessments', models.PositiveIntegerField(default=0)),
+                ('average_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('points', models.IntegerField(default=0)),
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archived_summary', to='enrollments.enrollment')),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='archive.classarchive')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedRows',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('batch', models.PositiveIntegerField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('payload', models.BinaryField()),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='archive.classarchive')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('archive', 'model', 'batch'), name='archived_rows_batch_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBillingDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('entry_type', models.CharField(choices=[('PURCHASE', 'Purchase'), ('CONSUME', 'Consume'), ('ADJUST', 'Adjust')], max_length=20)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('sessions', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_billing', to='enrollments.enrollment')),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='billing_days', to='archive.classarchive')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['enrollment', 'date'], name='archive_arc_enrollm_e2ed33_idx'), models.Index(fields=['date'], name='archive_arc_date_433593_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.db import models
+
+from apps.billing.models import BillingEntry
+
+
+class ClassArchive(models.Model):
+    """Lớp đã kết thúc có điểm danh, đánh giá, bút toán và điểm thưởng đã chuyển khỏi bảng nóng."""
+
+    klass = models.OneToOneField("classes.Class", on_delete=models.CASCADE, related_name="archive")
+    archived_at = models.DateTimeField(auto_now_add=True)
+    # Nhãn model -> số dòng đã lưu trữ
+    row_counts = models.JSONField(default=dict)
+    size_bytes = models.PositiveIntegerField(default=0)
+    # {session_id: {"P": n, "A": n, "L": n}} cho báo cáo hoạt động lớp
+    session_attendance = models.JSONField(default=dict)
+
+
+    def __str__(self):
+        return f"Lưu trữ lớp {self.klass_id}"
+
+
+class ArchivedRows(models.Model):
+    """Một lô dòng của một bảng: JSON ``{"columns": [...], "rows": [[...]]}`` nén zlib."""
+
+    archive = models.ForeignKey(ClassArchive, on_delete=models.CASCADE, related_name="chunks")
+    model = models.CharField(max_length=100)
+    batch = models.PositiveIntegerField()
+    row_count = models.PositiveIntegerField()
+    payload = models.BinaryField()
+
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["archive", "model", "batch"], name="archived_rows_batch_uniq"),
+        ]
+
+
+    def __str__(self):
+        return f"{self.model} #{self.batch} ({self.row_count})"
+
+
+class ArchivedEnrollment(models.Model):
+    """Tổng hợp của một ghi danh thuộc lớp đã lưu trữ."""
+
+    archive = models.ForeignKey(ClassArchive, on_delete=models.CASCADE, related_name="enrollments")
+    enrollment = models.OneToOneField(
+        "enrollments.Enrollment", on_delete=models.CASCADE, related_name="archived_summary"
+    )
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    # Số đánh giá có điểm, để gộp điểm trung bình với dữ liệu chưa lưu trữ
+    assessments = models.PositiveIntegerField(default=0)
+    average_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    points = models.IntegerField(default=0)
+
+
+    def __str__(self):
+        return f"Tổng hợp ghi danh {self.enrollment_id}"
+
+
+class ArchivedBillingDay(models.Model):
+    """Bút toán đã lưu trữ cộng theo (ghi danh, ngày, loại) cho báo cáo doanh thu và số buổi còn lại."""
+
+    archive = models.ForeignKey(ClassArchive, on_delete=models.CASCADE, related_name="billing_days")
+    enrollment = models.ForeignKey(
+        "enrollments.Enrollment", on_delete=models.CASCADE, related_name="archived_billing"
+    )
+    date = models.DateField()
+    entry_type = models.CharField(max_length=20, choices=BillingEntry.EntryType.choices)
+    entries = models.PositiveIntegerField(default=0)
+    sessions = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+
+    class Meta:
+        indexes = [models.Index(fields=["enrollment", "date"]), models.Index(fields=["date"])]
+
+
+    def __str__(self):
+        return f"{self.enrollment_id} {self.date} {self.entry_type}: {self.amount}"
@@ -0,0 +1,345 @@
+"""
+Lưu trữ dữ liệu chi tiết của lớp đã kết thúc để các bảng nóng không phình mãi.
+
+Lớp COMPLETED/CANCELLED kết thúc trước ``ARCHIVE_AFTER_MONTHS`` tháng được chuyển từng lớp một,
+mỗi lớp một transaction: các dòng Attendance, Assessment, BillingEntry, RewardTransaction và
+SessionPointEvent của lớp được ghi thành các lô ``ArchivedRows`` (JSON nén zlib, tối đa
+``ARCHIVE_BATCH_SIZE`` dòng/lô) rồi xóa khỏi bảng gốc. Báo cáo đọc phần tổng hợp:
+``ArchivedEnrollment`` (điểm danh, đánh giá, điểm thưởng), ``ArchivedBillingDay`` (bút toán
+theo ngày) và số điểm danh theo buổi trên ``ClassArchive``; lịch sử chi tiết đọc khi cần bằng
+``archived_records``/``session_record``.
+
+Xóa và khôi phục không phát signal: không trừ điểm, không sinh bút toán hay tombstone.
+``restore_class`` đưa lại nguyên id và thời điểm tạo/cập nhật.
+"""
+
+import json
+import zlib
+from collections import Counter, defaultdict
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.db.models import Avg, Count, Max, Sum
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.billing.models import BillingEntry
+from apps.classes.models import Class
+from apps.common.fragments import bump_table_versions
+from apps.enrollments.models import Enrollment
+from apps.rewards.models import RewardTransaction, SessionPointEvent
+
+from .models import ArchivedBillingDay, ArchivedEnrollment, ArchivedRows, ClassArchive
+
+ARCHIVE_AFTER_MONTHS = getattr(settings, "ARCHIVE_AFTER_MONTHS", 12)
+ARCHIVE_BATCH_SIZE = getattr(settings, "ARCHIVE_BATCH_SIZE", 5000)
+ARCHIVE_CLASS_STATUSES = ("COMPLETED", "CANCELLED")
+
+# Model -> đường tới lớp. Thứ tự xóa: bảng tham chiếu bảng khác đứng trước
+# (SessionPointEvent.transaction -> RewardTransaction); khôi phục theo thứ tự ngược lại.
+ARCHIVED_MODELS = {
+    SessionPointEvent: "session__klass",
+    RewardTransaction: "session__klass",
+    Attendance: "session__klass",
+    Assessment: "session__klass",
+    BillingEntry: "enrollment__klass",
+}
+
+
+def archivable_classes(months=ARCHIVE_AFTER_MONTHS, today=None):
+    """Lớp đã kết thúc (theo ``end_date``, không có thì buổi cuối) trước ``months`` tháng, chưa lưu trữ."""
+    cutoff = (today or timezone.localdate()) - timedelta(days=round(months * 30.44))
+    return (
+        Class.objects.filter(status__in=ARCHIVE_CLASS_STATUSES, archive__isnull=True)
+        .annotate(finished=Coalesce("end_date", Max("sessions__date")))
+        .filter(finished__lt=cutoff)
+        .order_by("finished", "pk")
+    )
+
+
+def _json_value(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Không lưu trữ được giá trị kiểu {type(value).__name__}")
+
+
+def _encode(columns, rows) -> bytes:
+    data = json.dumps({"columns": columns, "rows": rows}, default=_json_value, separators=(",", ":"))
+    return zlib.compress(data.encode())
+
+
+def _decode(payload) -> tuple[list, list]:
+    data = json.loads(zlib.decompress(bytes(payload)))
+    return data["columns"], data["rows"]
+
+
+def _move_rows(archive, model, queryset, batch_size) -> tuple[int, int]:
+    """Ghi các dòng của ``queryset`` thành lô nén rồi xóa; trả về (số dòng, số byte nén)."""
+    columns = [field.attname for field in model._meta.concrete_fields]
+    pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+    count = size = 0
+    for batch, start in enumerate(range(0, len(pks), batch_size)):
+        chunk = pks[start : start + batch_size]
+        rows = list(model.objects.filter(pk__in=chunk).order_by("pk").values_list(*columns))
+        payload = _encode(columns, rows)
+        ArchivedRows.objects.create(
+            archive=archive, model=model._meta.label, batch=batch, row_count=len(rows), payload=payload
+        )
+        if model is RewardTransaction:
+            # Sự kiện điểm của lớp khác (hiếm) trỏ tới giao dịch này: như on_delete=SET_NULL
+            SessionPointEvent.objects.filter(transaction_id__in=chunk).update(transaction=None)
+        # Raw delete: không phát signal post_delete (tombstone, cộng trừ điểm) và không cascade qua Python
+        model.objects.filter(pk__in=chunk)._raw_delete(model.objects.db)
+        count += len(rows)
+        size += len(payload)
+    return count, size
+
+
+def _session_attendance(session_ids) -> dict:
+    counts = defaultdict(dict)
+    rows = (
+        Attendance.objects.filter(session_id__in=session_ids)
+        .values("session_id", "status")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for row in rows:
+        counts[str(row["session_id"])][row["status"]] = row["total"]
+    return dict(counts)
+
+
+def _enrollment_summaries(archive, klass, session_ids) -> list[ArchivedEnrollment]:
+    attendance = defaultdict(Counter)
+    rows = (
+        Attendance.objects.filter(session_id__in=session_ids)
+        .values("student_id", "status")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for row in rows:
+        attendance[row["student_id"]][row["status"]] = row["total"]
+    scores = {
+        row["student_id"]: row
+        for row in Assessment.objects.filter(session_id__in=session_ids)
+        .values("student_id")
+        .annotate(total=Count("score"), average=Avg("score"))
+        .order_by()
+    }
+    points = dict(
+        RewardTransaction.objects.filter(session_id__in=session_ids)
+        .values("student_id")
+        .annotate(total=Sum("delta"))
+        .order_by()
+        .values_list("student_id", "total")
+    )
+
+    summaries = []
+    seen = set()
+    # Số liệu theo học sinh gắn vào ghi danh mới nhất của học sinh trong lớp, như signal điểm danh
+    for enrollment in Enrollment.objects.filter(klass=klass).order_by("-id"):
+        student_id = enrollment.student_id
+        latest = student_id not in seen
+        seen.add(student_id)
+        counts = attendance[student_id] if latest else Counter()
+        score = scores.get(student_id) if latest else None
+        average = score["average"] if score else None
+        summaries.append(
+            ArchivedEnrollment(
+                archive=archive,
+                enrollment=enrollment,
+                present=counts["P"],
+                absent=counts["A"],
+                late=counts["L"],
+                assessments=score["total"] if score else 0,
+                average_score=round(average, 2) if average is not None else None,
+                points=(points.get(student_id) or 0) if latest else 0,
+            )
+        )
+    return summaries
+
+
+def _billing_days(archive, klass) -> list[ArchivedBillingDay]:
+    rows = (
+        BillingEntry.objects.filter(enrollment__klass=klass)
+        .annotate(day=TruncDate("created_at"))
+        .values("enrollment_id", "day", "entry_type")
+        .annotate(entries=Count("id"), sessions=Sum("sessions"), amount=Sum("amount"))
+        .order_by()
+    )
+    return [
+        ArchivedBillingDay(
+            archive=archive,
+            enrollment_id=row["enrollment_id"],
+            date=row["day"],
+            entry_type=row["entry_type"],
+            entries=row["entries"],
+            sessions=row["sessions"] or 0,
+            amount=row["amount"] or 0,
+        )
+        for row in rows
+    ]
+
+
+def archive_class(klass: Class, batch_size=ARCHIVE_BATCH_SIZE) -> ClassArchive:
+    with transaction.atomic():
+        klass = Class.objects.select_for_update().get(pk=klass.pk)
+        if ClassArchive.objects.filter(klass=klass).exists():
+            raise ValidationError(f"Lớp {klass.code} đã được lưu trữ.")
+        if klass.status not in ARCHIVE_CLASS_STATUSES:
+            raise ValidationError(f"Lớp {klass.code} chưa kết thúc.")
+        session_ids = list(klass.sessions.values_list("pk", flat=True))
+        archive = ClassArchive.objects.create(klass=klass, session_attendance=_session_attendance(session_ids))
+        ArchivedEnrollment.objects.bulk_create(_enrollment_summaries(archive, klass, session_ids))
+        ArchivedBillingDay.objects.bulk_create(_billing_days(archive, klass))
+        for model, path in ARCHIVED_MODELS.items():
+            count, size = _move_rows(archive, model, model.objects.filter(**{path: klass}), batch_size)
+            if count:
+                archive.row_counts[model._meta.label] = count
+                archive.size_bytes += size
+        archive.save(update_fields=["row_counts", "size_bytes"])
+        bump_table_versions(*ARCHIVED_MODELS, Enrollment)
+    return archive
+
+
+def _instances(model, columns, rows) -> list:
+    fields = [model._meta.get_field(column) for column in columns]
+    return [
+        model(**{field.attname: field.to_python(value) for field, value in zip(fields, row)})
+        for row in rows
+    ]
+
+
+def _drop_dangling(model, objs) -> list:
+    """Bỏ tham chiếu tới bản ghi đã bị xóa trong lúc lưu trữ, theo on_delete của khóa ngoại."""
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+        ids = {getattr(obj, field.attname) for obj in objs} - {None}
+        if not ids:
+            continue
+        existing = set(field.related_model._base_manager.filter(pk__in=ids).values_list("pk", flat=True))
+        if existing == ids:
+            continue
+        if field.null:
+            for obj in objs:
+                if getattr(obj, field.attname) not in existing:
+                    setattr(obj, field.attname, None)
+        else:
+            objs = [obj for obj in objs if getattr(obj, field.attname) in existing]
+    return objs
+
+
+def bulk_insert(model, objs, batch_size=ARCHIVE_BATCH_SIZE, ignore_conflicts=False) -> list:
+    """
+    INSERT nhiều dòng như ``bulk_create`` nhưng ở chế độ raw như ``loaddata``: giữ nguyên giá trị
+    auto_now/auto_now_add có sẵn trên ``objs`` và không phát signal. Dòng chưa có pk được gán pk mới.
+    """
+    connection = connections[model._base_manager.db]
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    for has_pk in (True, False):
+        group = [obj for obj in objs if (obj.pk is not None) == has_pk]
+        fields = [field for field in model._meta.concrete_fields if has_pk or not field.primary_key]
+        returning = None if has_pk or ignore_conflicts else [model._meta.pk]
+        size = min(batch_size, connection.ops.bulk_batch_size(fields, group) or batch_size)
+        for start in range(0, len(group), size):
+            batch = group[start : start + size]
+            rows = model._base_manager._insert(
+                batch, fields=fields, returning_fields=returning, raw=True, on_conflict=on_conflict
+            )
+            for obj, row in zip(batch, rows or ()):
+                obj.pk = row[0]
+            for obj in batch:
+                obj._state.adding = False
+                obj._state.db = connection.alias
+    return objs
+
+
+def restore_class(klass: Class, batch_size=ARCHIVE_BATCH_SIZE) -> dict:
+    """Đưa dữ liệu đã lưu trữ của lớp về bảng gốc và xóa bản lưu trữ; trả về số dòng theo model."""
+    restored = {}
+    with transaction.atomic():
+        archive = ClassArchive.objects.select_for_update().filter(klass_id=klass.pk).first()
+        if archive is None:
+            raise ValidationError(f"Lớp {klass.code} chưa được lưu trữ.")
+        for model in reversed(ARCHIVED_MODELS):
+            objs = []
+            for payload in archive.chunks.filter(model=model._meta.label).order_by("batch").values_list("payload", flat=True):
+                objs.extend(_instances(model, *_decode(payload)))
+            objs = _drop_dangling(model, objs)
+            if not objs:
+                continue
+            # Bản ghi mới tạo sau khi lưu trữ (trùng unique) được giữ nguyên
+            bulk_insert(model, objs, batch_size=batch_size, ignore_conflicts=True)
+            restored[model._meta.label] = len(objs)
+        archive.delete()
+        bump_table_versions(*ARCHIVED_MODELS, Enrollment)
+    return restored
+
+
+def archived_class_ids(class_ids) -> set:
+    return set(ClassArchive.objects.filter(klass_id__in=class_ids).values_list("klass_id", flat=True))
+
+
+def archived_records(model, klass_id, **filters) -> list:
+    """
+    Bản ghi đã lưu trữ của lớp, lọc theo ``field=id`` hoặc ``field__in=ids`` trên khóa ngoại/số
+    nguyên. Là instance chưa lưu, chỉ để đọc.
+    """
+    tests = []
+    for key, value in filters.items():
+        name, _, lookup = key.partition("__")
+        tests.append((model._meta.get_field(name).attname, set(value) if lookup == "in" else {value}))
+    records = []
+    chunks = ArchivedRows.objects.filter(archive__klass_id=klass_id, model=model._meta.label).order_by("batch")
+    for payload in chunks.values_list("payload", flat=True):
+        columns, rows = _decode(payload)
+        positions = [(columns.index(attname), values) for attname, values in tests]
+        rows = [row for row in rows if all(row[position] in values for position, values in positions)]
+        records.extend(_instances(model, columns, rows))
+    return records
+
+
+def archived_session_history(enrollment, sessions) -> tuple[list, list]:
+    """(điểm danh, đánh giá) đã lưu trữ của học sinh trong các buổi ``sessions`` (đã gắn buổi học)."""
+    sessions_by_id = {session.pk: session for session in sessions}
+    history = []
+    for model in (Attendance, Assessment):
+        records = archived_records(
+            model, enrollment.klass_id, student=enrollment.student_id, session__in=sessions_by_id
+        )
+        for record in records:
+            record.session = sessions_by_id[record.session_id]
+        history.append(records)
+    return history[0], history[1]
+
+
+def session_record(model, student, session):
+    """Điểm danh/đánh giá của học sinh trong buổi; lớp đã lưu trữ thì đọc từ bản lưu trữ."""
+    record = model.objects.filter(student=student, session=session).first()
+    if record is None and ClassArchive.objects.filter(klass_id=session.klass_id).exists():
+        record = next(iter(archived_records(model, session.klass_id, student=student.pk, session=session.pk)), None)
+        if record is not None:
+            record.session = session
+    return record
+
+
+def archived_attendance_counts(session_ids_by_class) -> dict:
+    """Số điểm danh P/A/L theo lớp đã lưu trữ, chỉ tính các buổi trong ``session_ids_by_class``."""
+    counts = {}
+    archives = ClassArchive.objects.filter(klass_id__in=session_ids_by_class).values_list("klass_id", "session_attendance")
+    for klass_id, by_session in archives:
+        wanted = {str(session_id) for session_id in session_ids_by_class[klass_id]}
+        totals = counts.setdefault(klass_id, {"P": 0, "A": 0, "L": 0})
+        for session_id, statuses in by_session.items():
+            if session_id in wanted:
+                for status, total in statuses.items():
+                    totals[status] = totals.get(status, 0) + total
+    return counts
@@ -0,0 +1,444 @@
+"""
+Snapshot toàn bộ dữ liệu của một trung tâm để chuyển giữa các môi trường hoặc sao lưu riêng.
+
+File zip gồm ``manifest.json`` và mỗi model một file NDJSON nén gzip (mỗi dòng là mảng giá trị
+theo ``columns`` của manifest), ghi theo thứ tự phụ thuộc: bảng được tham chiếu đứng trước.
+Xuất đọc bằng server-side cursor theo lô ``SNAPSHOT_BATCH_SIZE`` nên bộ nhớ không phụ thuộc số
+dòng; dữ liệu của lớp đã lưu trữ (``ArchivedRows``) được giải nén và xuất như dòng thường.
+File media chỉ được tham chiếu theo đường dẫn trong storage (``media.ndjson.gz``), không chép.
+
+Dữ liệu gắn với học sinh mà không nhất thiết gắn với buổi học (giao dịch điểm, yêu cầu đổi quà,
+bài nộp) được chọn theo người dùng của snapshot, kể cả dòng đã lưu trữ ở lớp của trung tâm khác,
+để số dư điểm khớp sau khi nhập.
+
+Nhập đọc từng lô, cấp id mới và đổi khóa ngoại theo bảng id cũ -> mới (chỉ giữ cho các model
+được model khác tham chiếu). Bảng dùng chung (người dùng, nhóm quyền, chương trình học, mã giảm
+giá, quà) được khớp với bản ghi có sẵn theo ``NATURAL_KEYS`` thay vì tạo trùng. Học sinh khớp
+với người dùng có sẵn đã có lịch sử điểm ở môi trường đích: chỉ nhập các dòng gắn với buổi học
+mới tạo và không cộng lại số dư. Mọi thứ chạy trong một transaction và không phát signal; số dư
+điểm của học sinh mới tạo được cộng theo giao dịch đã nhập.
+"""
+
+import gzip
+import json
+import time
+import zipfile
+from collections import Counter
+from io import StringIO
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Case, F, FileField, JSONField, Q, Value, When
+from django.utils import timezone
+
+from apps.accounts.models import ParentStudentRelation, User
+from apps.billing.models import Discount
+from apps.centers.models import Center, Room
+from apps.class_sessions.models import ClassSession, ClassSessionPhoto
+from apps.classes.models import Class, ClassAssistant, ClassSchedule
+from apps.common.fragments import bump_table_versions
+from apps.curriculum.models import Exercise, Lecture, Lesson, Module, Subject
+from apps.enrollments.models import Enrollment, EnrollmentProgress, EnrollmentStatusLog
+from apps.enrollments.progress import class_batches, refresh_progress
+from apps.rewards.models import PointAccount, RedemptionRequest, RewardItem, RewardTransaction, SessionPointEvent
+from apps.students.models import StudentExerciseSubmission, StudentProduct
+
+from .models import ArchivedRows
+from .services import ARCHIVED_MODELS, _decode, _json_value, bulk_insert
+
+SNAPSHOT_BATCH_SIZE = getattr(settings, "SNAPSHOT_BATCH_SIZE", 2000)
+SNAPSHOT_VERSION = 1
+MANIFEST = "manifest.json"
+MEDIA_FILE = "media.ndjson.gz"
+# Mức nén của gzip CLI: nhỏ hơn mức 9 của GzipFile không đáng kể nhưng nhanh hơn nhiều
+GZIP_LEVEL = 6
+
+# Bảng dùng chung giữa các trung tâm: dùng lại bản ghi có sẵn ở môi trường đích
+NATURAL_KEYS = {
+    ContentType: ("app_label", "model"),
+    Permission: ("content_type", "codename"),
+    Group: ("name",),
+    Group.permissions.through: ("group", "permission"),
+    User: ("username",),
+    ParentStudentRelation: ("parent", "student"),
+    User.groups.through: ("user", "group"),
+    User.user_permissions.through: ("user", "permission"),
+    Subject: ("code",),
+    Module: ("subject", "order"),
+    Lesson: ("module", "order"),
+    Lecture: ("lesson",),
+    Exercise: ("lesson",),
+    Discount: ("code",),
+    RewardItem: ("name",),
+}
+# Dòng đã lưu trữ được chọn theo học sinh (mọi trung tâm) thay vì theo lớp của trung tâm
+STUDENT_SCOPED = (RewardTransaction,)
+# Lịch sử của học sinh: với học sinh dùng lại bản ghi có sẵn chỉ nhập dòng gắn với buổi học mới
+STUDENT_HISTORY = (RedemptionRequest, RewardTransaction, StudentExerciseSubmission)
+# Cột unique của bản ghi tạo mới: trùng với dữ liệu đích thì bỏ trống
+CLEAR_ON_CONFLICT = {User: ("user_code", "national_id")}
+# Cột được thêm hậu tố ``code_suffix`` khi nhập (sao chép trung tâm trong cùng môi trường)
+SUFFIXED = {Center: "code", Class: "code"}
+
+
+def _center_user_ids(center) -> set:
+    """Người dùng của trung tâm và mọi người dùng được dữ liệu lớp học tham chiếu (kèm phụ huynh)."""
+    classes = Class.objects.filter(center=center)
+    sessions = ClassSession.objects.filter(klass__center=center)
+    session_assistants = ClassSession.assistants.through
+    user_ids = set(User.objects.filter(center=center).values_list("pk", flat=True))
+    for queryset, column in (
+        (Enrollment.objects.filter(klass__center=center), "student"),
+        (classes, "main_teacher"),
+        (ClassAssistant.objects.filter(klass__center=center), "assistant"),
+        (sessions, "teacher_override"),
+        (session_assistants.objects.filter(classsession__klass__center=center), "user"),
+        (ClassSessionPhoto.objects.filter(session__klass__center=center), "uploaded_by"),
+    ):
+        user_ids.update(queryset.exclude(**{column: None}).order_by().values_list(column, flat=True).distinct())
+    user_ids.update(ParentStudentRelation.objects.filter(student__in=user_ids).values_list("parent", flat=True))
+    return user_ids
+
+
+def _center_querysets(center, user_ids) -> list:
+    """(model, queryset) của đồ thị dữ liệu trung tâm, theo thứ tự phụ thuộc."""
+    classes = Class.objects.filter(center=center)
+    sessions = ClassSession.objects.filter(klass__center=center)
+    session_assistants = ClassSession.assistants.through
+    subjects = Subject.objects.filter(pk__in=classes.values("subject"))
+
+    user_groups = User.groups.through.objects.filter(user__in=user_ids)
+    user_permissions = User.user_permissions.through.objects.filter(user__in=user_ids)
+    groups = Group.objects.filter(pk__in=user_groups.values("group"))
+    group_permissions = Group.permissions.through.objects.filter(group__in=groups)
+    permissions = Permission.objects.filter(
+        Q(pk__in=group_permissions.values("permission")) | Q(pk__in=user_permissions.values("permission"))
+    )
+
+    return [
+        (Center, Center.objects.filter(pk=center.pk)),
+        (Room, Room.objects.filter(center=center)),
+        (ContentType, ContentType.objects.filter(pk__in=permissions.values("content_type"))),
+        (Permission, permissions),
+        (Group, groups),
+        (Group.permissions.through, group_permissions),
+        (User, User.objects.filter(pk__in=user_ids)),
+        (User.groups.through, user_groups),
+        (User.user_permissions.through, user_permissions),
+        (ParentStudentRelation, ParentStudentRelation.objects.filter(student__in=user_ids, parent__in=user_ids)),
+        (Subject, subjects),
+        (Module, Module.objects.filter(subject__in=subjects)),
+        (Lesson, Lesson.objects.filter(module__subject__in=subjects)),
+        (Lecture, Lecture.objects.filter(lesson__module__subject__in=subjects)),
+        (Exercise, Exercise.objects.filter(lesson__module__subject__in=subjects)),
+        (Discount, Discount.objects.all()),
+        (RewardItem, RewardItem.objects.all()),
+        (Class, classes),
+        (ClassSchedule, ClassSchedule.objects.filter(klass__center=center)),
+        (ClassAssistant, ClassAssistant.objects.filter(klass__center=center)),
+        (ClassSession, sessions),
+        (session_assistants, session_assistants.objects.filter(classsession__klass__center=center)),
+        (ClassSessionPhoto, ClassSessionPhoto.objects.filter(session__klass__center=center)),
+        (Enrollment, Enrollment.objects.filter(klass__center=center)),
+        (EnrollmentStatusLog, EnrollmentStatusLog.objects.filter(enrollment__klass__center=center)),
+        # BillingEntry, Assessment, Attendance theo lớp của trung tâm
+        *[
+            (model, model.objects.filter(**{f"{path}__center": center}))
+            for model, path in reversed(ARCHIVED_MODELS.items())
+            if model not in (RewardTransaction, SessionPointEvent)
+        ],
+        # Giao dịch điểm không có buổi học (thưởng tay, đổi quà) vẫn thuộc số dư của học sinh
+        (RedemptionRequest, RedemptionRequest.objects.filter(student__in=user_ids)),
+        (RewardTransaction, RewardTransaction.objects.filter(student__in=user_ids)),
+        (SessionPointEvent, SessionPointEvent.objects.filter(session__klass__center=center)),
+        (StudentProduct, StudentProduct.objects.filter(session__klass__center=center)),
+        (StudentExerciseSubmission, StudentExerciseSubmission.objects.filter(student__in=user_ids)),
+    ]
+
+
+def _file_name(model) -> str:
+    return f"{model._meta.label_lower}.ndjson.gz"
+
+
+def _rows(model, queryset, columns, center, user_ids, batch_size):
+    yield from queryset.order_by("pk").values_list(*columns).iterator(chunk_size=batch_size)
+    if model not in ARCHIVED_MODELS:
+        return
+    chunks = ArchivedRows.objects.filter(model=model._meta.label).order_by("archive", "batch")
+    if model not in STUDENT_SCOPED:
+        chunks = chunks.filter(archive__klass__center=center)
+    for payload in chunks.values_list("payload", flat=True).iterator(chunk_size=1):
+        archived_columns, rows = _decode(payload)
+        positions = [archived_columns.index(column) if column in archived_columns else None for column in columns]
+        student = archived_columns.index("student_id") if model in STUDENT_SCOPED else None
+        for row in rows:
+            if student is not None and row[student] not in user_ids:
+                continue
+            yield [row[position] if position is not None else None for position in positions]
+
+
+def _write(bundle, name, rows, batch_size) -> tuple[int, int]:
+    """Ghi ``rows`` thành NDJSON nén vào ``bundle``; trả về (số dòng, số byte trong zip)."""
+    count = 0
+    with bundle.open(name, "w", force_zip64=True) as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL) as stream:
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(row, default=_json_value, separators=(",", ":"), ensure_ascii=False))
+            if len(lines) >= batch_size:
+                stream.write(("\n".join(lines) + "\n").encode())
+                count += len(lines)
+                lines = []
+        if lines:
+            stream.write(("\n".join(lines) + "\n").encode())
+            count += len(lines)
+    return count, bundle.getinfo(name).compress_size
+
+
+def _media(querysets):
+    for model, queryset in querysets:
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField):
+                names = queryset.exclude(**{field.name: ""}).exclude(**{field.name: None}).order_by("pk")
+                for pk, name in names.values_list("pk", field.name).iterator():
+                    yield [model._meta.label, field.name, pk, name]
+
+
+def export_center(center, path, batch_size=SNAPSHOT_BATCH_SIZE, using=DEFAULT_DB_ALIAS) -> dict:
+    """Ghi snapshot của trung tâm ra file zip ``path``; trả về manifest kèm số dòng, byte và thời gian từng file."""
+    started = time.perf_counter()
+    manifest = {"version": SNAPSHOT_VERSION, "center": center.code, "exported_at": timezone.now().isoformat(), "files": []}
+    connection = connections[using]
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=using), zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as bundle:
+        if outermost and connection.vendor == "postgresql":
+            # Mọi file đọc cùng một thời điểm dữ liệu dù có ghi đồng thời
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        user_ids = _center_user_ids(center)
+        querysets = _center_querysets(center, user_ids)
+        for model, queryset in querysets:
+            file_started = time.perf_counter()
+            columns = [field.attname for field in model._meta.concrete_fields]
+            rows = _rows(model, queryset, columns, center, user_ids, batch_size)
+            rows, size = _write(bundle, _file_name(model), rows, batch_size)
+            manifest["files"].append(
+                {
+                    "model": model._meta.label,
+                    "file": _file_name(model),
+                    "columns": columns,
+                    "rows": rows,
+                    "bytes": size,
+                    "seconds": round(time.perf_counter() - file_started, 3),
+                }
+            )
+        manifest["media"], _size = _write(bundle, MEDIA_FILE, _media(querysets), batch_size)
+        manifest["seconds"] = round(time.perf_counter() - started, 3)
+        bundle.writestr(MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+
+def read_manifest(path) -> dict:
+    with zipfile.ZipFile(path) as bundle:
+        return json.loads(bundle.read(MANIFEST))
+
+
+def _batches(bundle, name, batch_size):
+    with bundle.open(name) as raw, gzip.open(raw, "rt", encoding="utf-8") as stream:
+        batch = []
+        for line in stream:
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _existing(model, key_fields, keys) -> dict:
+    """Khóa tự nhiên -> pk của các bản ghi đã có ở môi trường đích."""
+    attnames = [model._meta.get_field(name).attname for name in key_fields]
+    # Lọc theo cột đầu của khóa, phần còn lại so trong Python (tránh OR hàng nghìn điều kiện)
+    queryset = model._base_manager.filter(**{f"{attnames[0]}__in": {key[0] for key in keys}})
+    return {tuple(row[:-1]): row[-1] for row in queryset.values_list(*attnames, "pk")}
+
+
+def _copy_text(field, value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(field, JSONField):
+        value = json.dumps(value, ensure_ascii=False)
+    elif isinstance(value, bool):
+        value = "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _insert(model, fields, records) -> list:
+    """
+    Ghi ``records`` (giá trị theo ``fields``, chưa có pk) và trả về pk mới theo thứ tự. Trên
+    PostgreSQL dùng ``COPY ... FROM STDIN`` như ``bulk_seed``, pk lấy trước từ sequence của bảng.
+    """
+    if connection.vendor != "postgresql":
+        objs = [model(**{field.attname: field.to_python(value) for field, value in zip(fields, record)}) for record in records]
+        bulk_insert(model, objs, batch_size=len(objs) or 1)
+        return [obj.pk for obj in objs]
+    table = model._meta.db_table
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [quote(table), model._meta.pk.column, len(records)],
+        )
+        pks = [row[0] for row in cursor.fetchall()]
+        buffer = StringIO()
+        buffer.writelines(
+            "\t".join([str(pk), *map(_copy_text, fields, record)]) + "\n" for pk, record in zip(pks, records)
+        )
+        buffer.seek(0)
+        columns = ", ".join(quote(field.column) for field in [model._meta.pk, *fields])
+        cursor.copy_expert(f"COPY {quote(table)} ({columns}) FROM STDIN", buffer)
+    return pks
+
+
+def _load_batch(model, columns, rows, ids, reused_users, code_suffix, points) -> tuple[int, int, int]:
+    """
+    Tạo các dòng của một lô; trả về (tạo mới, dùng lại bản ghi có sẵn, bỏ qua). ``reused_users``
+    nhận pk của người dùng được khớp với bản ghi có sẵn.
+    """
+    fields_by_column = {field.attname: field for field in model._meta.concrete_fields}
+    pk_position = columns.index(model._meta.pk.attname)
+    positions = [
+        (position, fields_by_column[column])
+        for position, column in enumerate(columns)
+        if column in fields_by_column and position != pk_position
+    ]
+    fields = [field for _, field in positions]
+    # Cột mới thêm sau khi xuất snapshot nhận giá trị mặc định
+    missing = [field for field in model._meta.concrete_fields if field.attname not in columns and not field.primary_key]
+    defaults = [field.get_default() for field in missing]
+    index = {field.attname: position for position, field in enumerate(fields)}
+
+    tracked = ids.get(model._meta.label)
+    records, old_pks = [], []
+    skipped = 0
+    for row in rows:
+        record = []
+        dangling = False
+        for position, field in positions:
+            value = row[position]
+            if field.is_relation and value is not None:
+                value = ids.get(field.related_model._meta.label, {}).get(value)
+                # Khóa ngoại bắt buộc trỏ tới bản ghi không có trong snapshot
+                dangling = dangling or (value is None and not field.null)
+            record.append(value)
+        if model in STUDENT_HISTORY and record[index["student_id"]] in reused_users:
+            # Lịch sử cũ của học sinh đã có ở đích; chỉ giữ dòng của buổi học vừa tạo
+            session_id = record[index["session_id"]] if "session_id" in index else None
+            dangling = dangling or session_id is None
+        if dangling:
+            skipped += 1
+            continue
+        if model in SUFFIXED:
+            record[index[SUFFIXED[model]]] += code_suffix
+        records.append(record + defaults)
+        old_pks.append(row[pk_position])
+    fields += missing
+
+    matched = 0
+    if model in NATURAL_KEYS and records:
+        key_positions = [index[model._meta.get_field(name).attname] for name in NATURAL_KEYS[model]]
+        existing = _existing(model, NATURAL_KEYS[model], [[record[p] for p in key_positions] for record in records])
+        remaining = []
+        for record, old_pk in zip(records, old_pks):
+            pk = existing.get(tuple(record[p] for p in key_positions))
+            if pk is None:
+                remaining.append((record, old_pk))
+                continue
+            matched += 1
+            if model is User:
+                reused_users.add(pk)
+            if tracked is not None:
+                tracked[old_pk] = pk
+        records, old_pks = [record for record, _ in remaining], [old_pk for _, old_pk in remaining]
+    for name in CLEAR_ON_CONFLICT.get(model, ()) if records else ():
+        position = index[name]
+        values = {record[position] for record in records} - {None}
+        taken = set(model._base_manager.filter(**{f"{name}__in": values}).values_list(name, flat=True))
+        for record in records:
+            if record[position] in taken:
+                record[position] = None
+
+    pks = _insert(model, fields, records) if records else []
+    if tracked is not None:
+        tracked.update(zip(old_pks, pks))
+    if model is RewardTransaction:
+        for record in records:
+            # Số dư của học sinh có sẵn đã tính mọi giao dịch của họ ở đích
+            if record[index["student_id"]] not in reused_users:
+                points[record[index["student_id"]]] += record[index["delta"]]
+    return len(records), matched, skipped
+
+
+def _credit_points(points, batch_size):
+    """Cộng điểm của các giao dịch đã nhập vào số dư của học sinh."""
+    PointAccount.objects.bulk_create([PointAccount(student_id=student_id) for student_id in points], ignore_conflicts=True)
+    student_ids = list(points)
+    for start in range(0, len(student_ids), batch_size):
+        chunk = student_ids[start : start + batch_size]
+        delta = Case(*[When(student_id=student_id, then=Value(points[student_id])) for student_id in chunk])
+        PointAccount.objects.filter(student_id__in=chunk).update(balance=F("balance") + delta)
+
+
+def import_center(path, code_suffix="", batch_size=SNAPSHOT_BATCH_SIZE) -> dict:
+    """
+    Nạp snapshot ``path`` vào database hiện tại trong một transaction. Trả về trung tâm mới và
+    thống kê từng file (tạo mới, dùng lại, bỏ qua, thời gian).
+    """
+    started = time.perf_counter()
+    models = {model._meta.label: model for model in apps.get_models(include_auto_created=True)}
+    with zipfile.ZipFile(path) as bundle:
+        manifest = json.loads(bundle.read(MANIFEST))
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValidationError(f"Snapshot phiên bản {manifest.get('version')} không được hỗ trợ.")
+        code = manifest["center"] + code_suffix
+        if Center.objects.filter(code=code).exists():
+            raise ValidationError(f"Trung tâm {code} đã tồn tại, dùng hậu tố mã để nhập thành bản sao.")
+        missing = [entry["model"] for entry in manifest["files"] if entry["model"] not in models]
+        if missing:
+            raise ValidationError(f"Không có model {', '.join(missing)} trong môi trường này.")
+
+        # Chỉ giữ bảng id cũ -> mới cho model được model khác trong snapshot tham chiếu
+        ids = {
+            field.related_model._meta.label: {}
+            for entry in manifest["files"]
+            for field in models[entry["model"]]._meta.concrete_fields
+            if field.is_relation
+        }
+        reused_users = set()
+        points = Counter()
+        stats = []
+        with transaction.atomic():
+            for entry in manifest["files"]:
+                model = models[entry["model"]]
+                file_started = time.perf_counter()
+                totals = Counter()
+                for rows in _batches(bundle, entry["file"], batch_size):
+                    created, matched, skipped = _load_batch(
+                        model, entry["columns"], rows, ids, reused_users, code_suffix, points
+                    )
+                    totals.update(rows=len(rows), created=created, matched=matched, skipped=skipped)
+                stats.append(
+                    {"model": entry["model"], **totals, "seconds": round(time.perf_counter() - file_started, 3)}
+                )
+            _credit_points(points, batch_size)
+            center = Center.objects.get(code=code)
+            # Tiến độ là dữ liệu dẫn xuất: không có trong snapshot, tính lại sau khi nạp
+            for enrollments in class_batches(Enrollment.objects.filter(klass__center=center)):
+                refresh_progress(enrollments)
+            bump_table_versions(
+                *(models[entry["model"]] for entry in manifest["files"]), PointAccount, EnrollmentProgress
+            )
+    return {"center": center, "files": stats, "seconds": round(time.perf_counter() - started, 3), "manifest": manifest}
@@ -0,0 +1,293 @@
+import datetime
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import Group, Permission
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.accounts.models import ParentStudentRelation, User
+from apps.api.models import Tombstone
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.billing.models import BillingEntry
+from apps.centers.models import Center
+from apps.classes.models import Class
+from apps.curriculum.models import Exercise, Lesson, Module
+from apps.common.factories import CenterFactory, ClassSessionFactory, KlassFactory, StudentProductFactory, UserFactory
+from apps.enrollments.models import Enrollment, EnrollmentStatus
+from apps.enrollments.services import annotate_session_balance, sessions_remaining
+from apps.reports.views import _student_report_rows
+from apps.rewards.models import PointAccount, RedemptionStatus, RewardItem, RewardTransaction, SessionPointEvent
+from apps.rewards.services import approve_redemption_request, award_points, submit_redemption_request
+from apps.students.models import StudentExerciseSubmission
+
+from .models import ArchivedEnrollment, ClassArchive
+from .snapshot import export_center, import_center, read_manifest
+from .services import archivable_classes, archive_class, archived_records, restore_class, session_record
+
+
+class ClassArchiveTests(TestCase):
+	def setUp(self):
+		self.klass = KlassFactory(status="COMPLETED", end_date=datetime.date(2023, 6, 30))
+		self.live_klass = KlassFactory(status="ONGOING", end_date=None)
+		self.student = UserFactory(role="STUDENT")
+		self.parent = UserFactory(role="PARENT")
+		ParentStudentRelation.objects.create(parent=self.parent, student=self.student)
+		self.enrollment = Enrollment.objects.create(
+			klass=self.klass, student=self.student, status=EnrollmentStatus.COMPLETED, sessions_purchased=10
+		)
+		Enrollment.objects.create(klass=self.live_klass, student=self.student, status=EnrollmentStatus.ACTIVE)
+		self.sessions = [
+			ClassSessionFactory(klass=self.klass, index=index, date=datetime.date(2023, 6, index), status="DONE")
+			for index in range(1, 4)
+		]
+		live_session = ClassSessionFactory(klass=self.live_klass, index=1)
+		# Signal điểm danh tạo bút toán CONSUME và cộng điểm thưởng
+		Attendance.objects.create(session=self.sessions[0], student=self.student, status="P")
+		Attendance.objects.create(session=self.sessions[1], student=self.student, status="L")
+		Attendance.objects.create(session=self.sessions[2], student=self.student, status="A")
+		Attendance.objects.create(session=live_session, student=self.student, status="P")
+		Assessment.objects.create(session=self.sessions[0], student=self.student, score=8, remark="Tốt")
+		Assessment.objects.create(session=self.sessions[1], student=self.student, score=6)
+		BillingEntry.objects.create(
+			enrollment=self.enrollment, entry_type=BillingEntry.EntryType.PURCHASE, amount=1_500_000, sessions=2
+		)
+		self.enrollment.refresh_from_db()
+
+	def _class_rows(self):
+		return {
+			"attendance": Attendance.objects.filter(session__klass=self.klass).count(),
+			"assessments": Assessment.objects.filter(session__klass=self.klass).count(),
+			"billing": BillingEntry.objects.filter(enrollment__klass=self.klass).count(),
+			"transactions": RewardTransaction.objects.filter(session__klass=self.klass).count(),
+			"events": SessionPointEvent.objects.filter(session__klass=self.klass).count(),
+		}
+
+	def test_archive_moves_rows_and_keeps_balances(self):
+		before = self._class_rows()
+		self.assertTrue(all(before.values()))
+		balance = PointAccount.objects.get(student=self.student).balance
+		remaining = sessions_remaining(self.enrollment)
+		annotated = annotate_session_balance(Enrollment.objects.filter(pk=self.enrollment.pk)).get()
+		self.assertEqual(list(archivable_classes(today=datetime.date(2025, 1, 1))), [self.klass])
+
+		archive = archive_class(self.klass, batch_size=2)
+
+		self.assertEqual(set(self._class_rows().values()), {0})
+		self.assertEqual(archive.row_counts["attendance.Attendance"], 3)
+		self.assertEqual(archive.chunks.filter(model="attendance.Attendance").count(), 2)
+		self.assertEqual(archive.session_attendance[str(self.sessions[0].pk)], {"P": 1})
+		self.assertEqual(Attendance.objects.filter(session__klass=self.live_klass).count(), 1)
+		self.assertFalse(Tombstone.objects.exists())
+		self.assertEqual(PointAccount.objects.get(student=self.student).balance, balance)
+		summary = ArchivedEnrollment.objects.get(enrollment=self.enrollment)
+		self.assertEqual((summary.present, summary.late, summary.absent, summary.assessments), (1, 1, 1, 2))
+		self.assertEqual(summary.average_score, 7)
+		self.assertEqual(summary.points, before["transactions"])
+
+		# Số buổi đã dùng và còn lại tính cả phần đã lưu trữ
+		self.enrollment.refresh_from_db()
+		self.assertEqual(sessions_remaining(self.enrollment), remaining)
+		self.assertEqual(self.enrollment.sessions_consumed, 2)
+		after = annotate_session_balance(Enrollment.objects.filter(pk=self.enrollment.pk)).get()
+		self.assertEqual(after.remaining_sessions, annotated.remaining_sessions)
+		self.assertFalse(archivable_classes(today=datetime.date(2025, 1, 1)).exists())
+		with self.assertRaises(ValidationError):
+			archive_class(self.klass)
+
+	def test_reports_and_parent_views_read_archived_history(self):
+		archive_class(self.klass)
+
+		row = _student_report_rows([self.enrollment])[0]
+		self.assertEqual(row["attendance"], {"P": 1, "A": 1, "L": 1})
+		self.assertEqual([detail["attendance"] for detail in row["sessions_detail"]], ["P", "L", "A"])
+		self.assertEqual([assessment.score for assessment in row["assessments"]], [6, 8])
+		record = session_record(Assessment, self.student, self.sessions[0])
+		self.assertEqual((record.remark, record.session), ("Tốt", self.sessions[0]))
+		self.assertEqual(len(archived_records(Attendance, self.klass.pk, student=self.student.pk)), 3)
+
+		self.client.force_login(self.parent)
+		response = self.client.get(
+			reverse("parents:children_session_detail", args=[self.enrollment.pk, self.sessions[0].pk])
+		)
+		self.assertEqual(response.context["attendance"].status, "P")
+		self.assertEqual(response.context["assessment"].remark, "Tốt")
+		snapshot = self.client.get(reverse("parents:children_overview")).context["children_data"][0]
+		self.assertEqual(snapshot["attendance_summary"]["total"], 4)
+		self.assertEqual(snapshot["attendance_summary"]["absent"], 1)
+
+		self.client.force_login(UserFactory(role="ADMIN", is_superuser=True, is_staff=True))
+		totals = self.client.get(reverse("reports:revenue_report")).context["totals"]
+		self.assertEqual(totals["total_amount"], sum(BillingEntry.objects.values_list("amount", flat=True)) + sum(
+			self.klass.archive.billing_days.values_list("amount", flat=True)
+		))
+		self.assertGreater(self.klass.archive.billing_days.count(), 0)
+
+	def test_restore_puts_rows_back_unchanged(self):
+		attendance = list(Attendance.objects.filter(session__klass=self.klass).order_by("pk").values())
+		billing = list(BillingEntry.objects.filter(enrollment__klass=self.klass).order_by("pk").values())
+		events = list(SessionPointEvent.objects.filter(session__klass=self.klass).order_by("pk").values())
+		archive_class(self.klass)
+
+		output = StringIO()
+		call_command("restore_class", self.klass.code, stdout=output)
+		self.assertIn("attendance.Attendance 3", output.getvalue())
+
+		self.assertEqual(list(Attendance.objects.filter(session__klass=self.klass).order_by("pk").values()), attendance)
+		self.assertEqual(list(BillingEntry.objects.filter(enrollment__klass=self.klass).order_by("pk").values()), billing)
+		self.assertEqual(list(SessionPointEvent.objects.filter(session__klass=self.klass).order_by("pk").values()), events)
+		self.assertFalse(ClassArchive.objects.exists())
+		self.assertFalse(ArchivedEnrollment.objects.exists())
+		with self.assertRaises(ValidationError):
+			restore_class(self.klass)
+
+	def test_archive_command(self):
+		output = StringIO()
+		call_command("archive_classes", "--dry-run", stdout=output)
+		self.assertIn(self.klass.code, output.getvalue())
+		self.assertFalse(ClassArchive.objects.exists())
+		call_command("archive_classes", stdout=StringIO())
+		self.assertEqual(list(ClassArchive.objects.values_list("klass_id", flat=True)), [self.klass.pk])
+
+
+class CenterSnapshotTests(TestCase):
+	def setUp(self):
+		self.center = CenterFactory()
+		self.teacher = UserFactory(role="TEACHER", center=self.center)
+		self.student = UserFactory(role="STUDENT", center=self.center, user_code="HS0001")
+		self.parent = UserFactory(role="PARENT", center=self.center)
+		ParentStudentRelation.objects.create(parent=self.parent, student=self.student)
+		self.old_klass = KlassFactory(
+			center=self.center, main_teacher=self.teacher, status="COMPLETED", end_date=datetime.date(2023, 6, 30)
+		)
+		self.klass = KlassFactory(center=self.center, main_teacher=self.teacher, status="ONGOING")
+		for klass in (self.old_klass, self.klass):
+			enrollment = Enrollment.objects.create(klass=klass, student=self.student, status=EnrollmentStatus.ACTIVE)
+			BillingEntry.objects.create(enrollment=enrollment, entry_type=BillingEntry.EntryType.PURCHASE, amount=600_000, sessions=2)
+			for index in (1, 2):
+				session = ClassSessionFactory(klass=klass, index=index, date=datetime.date(2023, 6, index), status="DONE")
+				Attendance.objects.create(session=session, student=self.student, status="P")
+				Assessment.objects.create(session=session, student=self.student, score=9, remark="Giỏi\tlắm\nem")
+		StudentProductFactory(session=session, student=self.student, image="student_products/images/robot.png")
+		# Lớp của trung tâm khác không nằm trong snapshot
+		Attendance.objects.create(session=ClassSessionFactory(index=1), student=self.student, status="P")
+		archive_class(self.old_klass)
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name, "center.zip")
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_export_then_import_as_copy(self):
+		original = list(Attendance.objects.filter(session__klass=self.klass).order_by("session__index").values("status", "created_at"))
+		manifest = export_center(self.center, self.path)
+		rows = {entry["model"]: entry["rows"] for entry in manifest["files"]}
+		# Dữ liệu của lớp đã lưu trữ được xuất như dòng thường
+		self.assertEqual(rows["attendance.Attendance"], 4)
+		self.assertEqual(rows["classes.Class"], 2)
+		self.assertEqual(rows["accounts.User"], 3)
+		self.assertEqual(manifest["media"], 1)
+		self.assertEqual(read_manifest(self.path)["center"], self.center.code)
+
+		# Học sinh đổi username ở môi trường đích: tạo mới, mã trùng thì bỏ trống
+		User.objects.filter(pk=self.student.pk).update(username="renamed")
+		result = import_center(self.path, code_suffix="-COPY")
+
+		center = result["center"]
+		self.assertEqual(center.code, f"{self.center.code}-COPY")
+		self.assertEqual(
+			set(Class.objects.filter(center=center).values_list("code", flat=True)),
+			{f"{self.old_klass.code}-COPY", f"{self.klass.code}-COPY"},
+		)
+		student = User.objects.get(username=self.student.username)
+		self.assertNotEqual(student.pk, self.student.pk)
+		self.assertEqual((student.center, student.user_code, student.password), (center, None, self.student.password))
+		self.assertTrue(User.objects.filter(pk=self.teacher.pk, main_classes__center=center).exists())
+		self.assertTrue(ParentStudentRelation.objects.filter(parent=self.parent, student=student).exists())
+
+		klass = Class.objects.get(code=f"{self.klass.code}-COPY")
+		copied = list(Attendance.objects.filter(session__klass=klass).order_by("session__index").values("status", "created_at"))
+		self.assertEqual(copied, original)
+		self.assertEqual(Attendance.objects.filter(session__klass__center=center).count(), 4)
+		self.assertEqual(Attendance.objects.filter(student=student).count(), 4)
+		self.assertEqual(Assessment.objects.filter(student=student).first().remark, "Giỏi\tlắm\nem")
+		self.assertEqual(BillingEntry.objects.filter(enrollment__student=student).count(), 2 + 4)
+		enrollment = Enrollment.objects.get(klass=klass)
+		self.assertEqual((enrollment.student, sessions_remaining(enrollment)), (student, 0))
+		self.assertEqual(
+			PointAccount.objects.get(student=student).balance,
+			sum(RewardTransaction.objects.filter(student=student).values_list("delta", flat=True)),
+		)
+		stats = {entry["model"]: entry for entry in result["files"]}
+		self.assertEqual(stats["accounts.User"]["matched"], 2)
+		self.assertEqual(stats["accounts.User"]["created"], 1)
+
+		with self.assertRaises(ValidationError):
+			import_center(self.path, code_suffix="-COPY")
+
+	def test_round_trip_keeps_points_groups_and_rows_without_session(self):
+		group = Group.objects.create(name="Lớp trưởng")
+		group.permissions.add(Permission.objects.get(codename="view_rewarditem"))
+		self.student.groups.add(group)
+		self.teacher.user_permissions.add(Permission.objects.get(codename="add_rewarditem"))
+		item = RewardItem.objects.create(name="Bút chì màu", cost=3, stock=5)
+		award_points(student=self.student, delta=10, reason="Thưởng tay")
+		request = submit_redemption_request(student=self.student, item=item, quantity=2)
+		approve_redemption_request(req=request, approver=self.teacher)
+		module = Module.objects.create(subject=self.klass.subject, order=1, title="Robot")
+		exercise = Exercise.objects.create(lesson=Lesson.objects.create(module=module, order=1, title="Bánh xe"))
+		StudentExerciseSubmission.objects.create(exercise=exercise, student=self.student, title="Bài nộp tại nhà")
+		balance = PointAccount.objects.get(student=self.student).balance
+
+		export_center(self.center, self.path)
+		# Môi trường đích chưa có người dùng, nhóm và trung tâm này
+		User.objects.filter(pk__in=[self.student.pk, self.teacher.pk, self.parent.pk]).delete()
+		Class.objects.filter(center=self.center).delete()
+		self.center.delete()
+		group.delete()
+		import_center(self.path)
+
+		student = User.objects.get(username=self.student.username)
+		self.assertEqual(PointAccount.objects.get(student=student).balance, balance)
+		self.assertEqual(list(student.groups.values_list("name", flat=True)), ["Lớp trưởng"])
+		self.assertTrue(student.has_perm("rewards.view_rewarditem"))
+		self.assertTrue(User.objects.get(username=self.teacher.username).has_perm("rewards.add_rewarditem"))
+		spent = RewardTransaction.objects.get(student=student, delta=-6)
+		self.assertEqual((spent.redemption.status, spent.redemption.student), (RedemptionStatus.APPROVED, student))
+		self.assertTrue(StudentExerciseSubmission.objects.filter(student=student, exercise=exercise, session=None).exists())
+
+	def test_copy_with_matched_student_keeps_existing_history_and_balance(self):
+		item = RewardItem.objects.create(name="Bút chì màu", cost=3, stock=5)
+		award_points(student=self.student, delta=10, reason="Thưởng tay")
+		approve_redemption_request(
+			req=submit_redemption_request(student=self.student, item=item, quantity=1), approver=self.teacher
+		)
+		session = ClassSessionFactory(klass=self.klass, index=3, date=datetime.date(2023, 6, 3), status="DONE")
+		award_points(student=self.student, delta=4, reason="Tích cực", session=session)
+		balance = PointAccount.objects.get(student=self.student).balance
+		sessionless = RewardTransaction.objects.filter(student=self.student, session=None).count()
+
+		export_center(self.center, self.path)
+		result = import_center(self.path, code_suffix="-COPY")
+
+		# Học sinh khớp theo username: số dư và lịch sử không gắn buổi học không bị nhân đôi
+		self.assertEqual(PointAccount.objects.get(student=self.student).balance, balance)
+		self.assertEqual(RewardTransaction.objects.filter(student=self.student, session=None).count(), sessionless)
+		self.assertEqual(self.student.redemption_requests.count(), 1)
+		copied = RewardTransaction.objects.get(student=self.student, session__klass__center=result["center"], reason="Tích cực")
+		self.assertEqual(copied.delta, 4)
+		stats = {entry["model"]: entry for entry in result["files"]}
+		self.assertEqual(stats["rewards.RedemptionRequest"]["skipped"], 1)
+
+	def test_commands(self):
+		output = StringIO()
+		call_command("export_center", self.center.code, "--output", self.path, stdout=output)
+		self.assertIn("rows/s", output.getvalue())
+		output = StringIO()
+		call_command("import_center", self.path, "--code-suffix=-X", "--dry-run", stdout=output)
+		self.assertIn("Checked", output.getvalue())
+		self.assertFalse(Center.objects.filter(code=f"{self.center.code}-X").exists())
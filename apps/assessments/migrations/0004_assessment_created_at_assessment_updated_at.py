@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0003_alter_assessment_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessment',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='assessment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
 from apps.class_sessions.models import ClassSession
+from apps.common.models import TimeStampedModel
 
 
-class Assessment(models.Model):
+class Assessment(TimeStampedModel):
     session = models.ForeignKey(
             ClassSession, 
             on_delete=models.CASCADE, 
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.enrollments.progress import assessments_changed
+
+from .models import Assessment
+
+
+@receiver(post_save, sender=Assessment)
+@receiver(post_delete, sender=Assessment)
+def assessment_update_progress(sender, instance: Assessment, **kwargs):
+    assessments_changed(instance.session.klass_id, instance.student_id)
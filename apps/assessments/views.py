@@ -9,6 +9,7 @@ from django.views.decorators.http import require_POST
 
 from apps.accounts.models import User
 from apps.class_sessions.models import ClassSession
+from apps.common.db_routing import replica_reads
 from apps.common.utils.http import is_htmx_request
 from apps.filters.models import SavedFilter
 from apps.filters.utils import build_filter_badges, determine_active_filter_name
@@ -257,6 +258,7 @@ def student_results(request):
 # Tổng hợp đánh giá
 @login_required
 @permission_required("assessments.view_assessment", raise_exception=True)
+@replica_reads()
 def assessment_summary(request):
     base_queryset = Assessment.objects.select_related(
         "session__klass__center",
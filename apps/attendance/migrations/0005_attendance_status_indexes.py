@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendance_created_at_attendance_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='attendance',
+            options={},
+        ),
+        migrations.RemoveIndex(
+            model_name='attendance',
+            name='attendance__session_ad8f43_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='attendance',
+            name='attendance__student_018d17_idx',
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'status'], name='attendance__student_cb2706_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['session', 'status'], name='attendance__session_fe9ae9_idx'),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
 from apps.class_sessions.models import ClassSession
+from apps.common.models import FieldTrackerMixin, TimeStampedModel
 
 ATTEND_CHOICES = [("P", "Có mặt"), ("A", "Vắng mặt"), ("L", "Đi muộn")]
 
 
-class Attendance(models.Model):
+class Attendance(FieldTrackerMixin, TimeStampedModel):
+    tracked_fields = ("status",)
+
     session = models.ForeignKey(
             ClassSession,
             on_delete=models.CASCADE, 
@@ -19,8 +22,8 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = (("session", "student"),)
-        indexes = [models.Index(fields=["session"]), models.Index(fields=["student"])]
-        ordering = ["-session__date", "student__username"]
+        # Không đặt ordering mặc định: sắp theo ngày buổi học phải JOIN class_sessions ở mọi truy vấn
+        indexes = [models.Index(fields=["student", "status"]), models.Index(fields=["session", "status"])]
 
 
     def __str__(self):
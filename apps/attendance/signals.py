@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 from apps.attendance.models import Attendance
@@ -9,17 +9,25 @@ from apps.enrollments.services import (
     auto_update_status,
     recalc_sessions_consumed,
 )
+from apps.enrollments.progress import attendance_changed
 
 
 @receiver(pre_save, sender=Attendance)
 def _store_old_status(sender, instance: Attendance, **kwargs):
-    if instance.pk:
-        try:
-            instance._old_status = Attendance.objects.get(pk=instance.pk).status
-        except Attendance.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
+    # Giá trị cũ lấy từ snapshot lúc load, không truy vấn lại
+    instance._old_status = instance.previous("status") if instance.pk else None
+
+
+@receiver(post_save, sender=Attendance)
+def _update_progress_after_attendance(sender, instance: Attendance, created, **kwargs):
+    old_status = None if created else getattr(instance, "_old_status", instance.status)
+    if old_status != instance.status:
+        attendance_changed(instance.session.klass_id, instance.student_id, old_status, instance.status)
+
+
+@receiver(post_delete, sender=Attendance)
+def _update_progress_after_attendance_delete(sender, instance: Attendance, **kwargs):
+    attendance_changed(instance.session.klass_id, instance.student_id, old_status=instance.status)
 
 
 @receiver(post_save, sender=Attendance)
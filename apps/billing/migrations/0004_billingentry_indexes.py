@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_alter_billingentry_amount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='billingentry',
+            index=models.Index(fields=['enrollment', 'entry_type'], name='billing_bil_enrollm_02864d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billingentry',
+            index=models.Index(fields=['created_at'], name='billing_bil_created_80dda1_idx'),
+        ),
+    ]
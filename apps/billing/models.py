@@ -74,6 +74,7 @@ class BillingEntry(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["enrollment", "entry_type"]), models.Index(fields=["created_at"])]
 
     def __str__(self):
         return f"{self.entry_type} {self.sessions} sessions for {self.enrollment_id}"
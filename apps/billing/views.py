@@ -1,7 +1,6 @@
 import json
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import EmptyPage, Paginator
 from django.db.models import Q
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
@@ -18,6 +17,7 @@ from apps.filters.utils import (
     build_filter_badges,
     determine_active_filter_name,
 )
+from apps.common.pagination import cursor_paginate
 from apps.common.utils.forms import form_errors_as_text
 from apps.common.utils.http import is_htmx_request
 
@@ -26,10 +26,9 @@ from apps.common.utils.http import is_htmx_request
 def billing_home(request):
     base_qs = Enrollment.objects.select_related(
         "student", "klass", "klass__center"
-    ).order_by("-joined_at")
+    )
     enrollment_filter = BillingEnrollmentFilter(request.GET, queryset=base_qs)
     qs = enrollment_filter.qs
-    total = qs.count()
 
     active_filter_badges = build_filter_badges(enrollment_filter)
 
@@ -38,34 +37,14 @@ def billing_home(request):
     )
     active_filter_name = determine_active_filter_name(request, saved_filters)
 
-    try:
-        per_page = int(request.GET.get("per_page", 10))
-    except (TypeError, ValueError):
-        per_page = 10
-    if per_page <= 0:
-        per_page = 10
-
-    paginator = Paginator(qs, per_page)
-    try:
-        page = int(request.GET.get("page", 1))
-    except (TypeError, ValueError):
-        page = 1
-    try:
-        page_obj = paginator.page(page)
-    except EmptyPage:
-        page_obj = paginator.page(1)
-
-    query_params_no_page = request.GET.copy()
-    query_params_no_page._mutable = True
-    query_params_no_page.pop("page", None)
+    # Phân trang cursor thay cho COUNT(*) + OFFSET; tổng số là ước lượng của planner
+    page_obj, per_page, current_query_params = cursor_paginate(request, qs, ("-joined_at", "-id"))
 
     context = {
         "page_obj": page_obj,
-        "paginator": paginator,
         "filter": enrollment_filter,
-        "total": total,
         "per_page": per_page,
-        "current_query_params": query_params_no_page.urlencode(),
+        "current_query_params": current_query_params,
         "active_filter_name": active_filter_name,
         "active_filter_badges": active_filter_badges,
         "model_name": "BillingEnrollment",
@@ -1,9 +1,11 @@
 from django.db import models
-from apps.common.models import NamedModel
+from apps.common.models import FieldTrackerMixin, NamedModel
 from steam_center.storages import MediaStorage
 
 
-class Center(NamedModel):
+class Center(FieldTrackerMixin, NamedModel):
+    tracked_fields = ("avatar",)
+
     address = models.CharField(max_length=255, blank=True)
     phone = models.CharField(max_length=20, blank=True)
     email = models.EmailField(max_length=254, blank=True)
@@ -14,6 +14,7 @@ from apps.filters.utils import (
 from .models import Center, Room
 from .forms import CenterForm, RoomForm
 from .filters import CenterFilter
+from apps.common.fragments import bump_table_versions
 from apps.common.utils.forms import form_errors_as_text
 from apps.common.utils.http import is_htmx_request
 
@@ -437,6 +438,7 @@ def center_delete_view(request):
 
             if deleted_count > 0:
                 centers_to_delete_qs.update(is_active=False)
+                bump_table_versions(Center)
 
             if deleted_count > 0:
                 if deleted_count == 1:
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ClassSessionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.class_sessions"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class_sessions', '0002_classsessionphoto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['date', 'klass'], name='class_sessi_date_9e10d3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['klass', 'status', 'date'], name='class_sessi_klass_i_3d1a4c_idx'),
+        ),
+    ]
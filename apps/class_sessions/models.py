@@ -1,6 +1,6 @@
 from django.db import models
 from django.conf import settings
-from apps.common.models import TimeStampedModel
+from apps.common.models import FieldTrackerMixin, TimeStampedModel
 from apps.centers.models import Room
 from apps.curriculum.models import Lesson
 from steam_center.storages import MediaStorage
@@ -13,7 +13,10 @@ SESSION_STATUS = [
 ]
 
 
-class ClassSession(TimeStampedModel):
+class ClassSession(FieldTrackerMixin, TimeStampedModel):
+    # Đổi các field này thì tính lại tiến độ của lớp (apps.enrollments.progress)
+    tracked_fields = ("index", "date", "status")
+
     # Quan hệ với app 'classes'
     klass = models.ForeignKey(
         "classes.Class", 
@@ -57,12 +60,19 @@ class ClassSession(TimeStampedModel):
     class Meta:
         unique_together = (("klass", "index"),)
         ordering = ["klass", "index"]
+        indexes = [
+            # Lịch theo ngày (dashboard, lịch dạy) và buổi theo lớp/trạng thái (báo cáo)
+            models.Index(fields=["date", "klass"]),
+            models.Index(fields=["klass", "status", "date"]),
+        ]
 
     def __str__(self):
         return f"{self.klass.name} - Buổi {self.index}"
 
 
-class ClassSessionPhoto(TimeStampedModel):
+class ClassSessionPhoto(FieldTrackerMixin, TimeStampedModel):
+    tracked_fields = ("image",)
+
     session = models.ForeignKey(
         "class_sessions.ClassSession",
         on_delete=models.CASCADE,
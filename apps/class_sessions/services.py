@@ -0,0 +1,110 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import File
+from django.db import transaction
+
+from apps.common.images import generate_derivatives, normalize_upload
+from apps.common.services import queue_file_deletion
+
+from .models import ClassSessionPhoto
+
+SESSION_PHOTO_MAX_SIZE = getattr(settings, "SESSION_PHOTO_MAX_SIZE", 15 * 1024 * 1024)
+SESSION_PHOTO_MAX_FILES = getattr(settings, "SESSION_PHOTO_MAX_FILES", 50)
+SESSION_PHOTO_UPLOAD_WORKERS = getattr(settings, "SESSION_PHOTO_UPLOAD_WORKERS", 6)
+SESSION_PHOTO_ALLOWED_FORMATS = {"JPEG", "MPO", "PNG", "WEBP", "GIF"}
+
+
+def validate_session_photo(upload) -> str | None:
+    """Kiểm tra dung lượng và định dạng ảnh; trả về thông báo lỗi hoặc None."""
+    from PIL import Image, UnidentifiedImageError
+
+    if upload.size > SESSION_PHOTO_MAX_SIZE:
+        return f"vượt quá {SESSION_PHOTO_MAX_SIZE // (1024 * 1024)}MB"
+    content_type = getattr(upload, "content_type", "") or ""
+    if content_type and not content_type.startswith("image/"):
+        return "không phải file ảnh"
+    try:
+        upload.seek(0)
+        with Image.open(upload) as img:
+            fmt = img.format
+    except (UnidentifiedImageError, OSError):
+        return "không đọc được ảnh"
+    finally:
+        upload.seek(0)
+    if fmt not in SESSION_PHOTO_ALLOWED_FORMATS:
+        return f"định dạng {fmt} không được hỗ trợ"
+    return None
+
+
+def _store_photo(field, instance, upload) -> str:
+    content = normalize_upload(upload) or File(upload, name=upload.name)
+    name = field.generate_filename(instance, content.name)
+    return field.storage.save(name, content, max_length=field.max_length)
+
+
+def upload_session_photos(session, files, *, uploaded_by=None, workers: int = SESSION_PHOTO_UPLOAD_WORKERS):
+    """
+    Tải nhiều ảnh buổi học lên storage song song rồi tạo bản ghi bằng một bulk_create.
+
+    Trả về (photos, errors) với errors là danh sách (tên file, lý do) cho từng file lỗi;
+    file hợp lệ vẫn được lưu khi có file khác lỗi.
+    """
+    errors = []
+    if len(files) > SESSION_PHOTO_MAX_FILES:
+        errors.extend((f.name, "vượt quá số ảnh cho phép mỗi lần") for f in files[SESSION_PHOTO_MAX_FILES:])
+        files = files[:SESSION_PHOTO_MAX_FILES]
+
+    valid = []
+    for upload in files:
+        error = validate_session_photo(upload)
+        if error:
+            errors.append((upload.name, error))
+        else:
+            valid.append(upload)
+    if not valid:
+        return [], errors
+
+    field = ClassSessionPhoto._meta.get_field("image")
+    template = ClassSessionPhoto(session=session, uploaded_by=uploaded_by)
+    stored = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(valid)))) as pool:
+        futures = [(upload, pool.submit(_store_photo, field, template, upload)) for upload in valid]
+        for upload, future in futures:
+            try:
+                stored.append(future.result())
+            except Exception as exc:
+                errors.append((upload.name, f"lỗi tải lên ({exc})"))
+
+    if not stored:
+        return [], errors
+
+    photos = [ClassSessionPhoto(session=session, uploaded_by=uploaded_by, image=name) for name in stored]
+    try:
+        photos = ClassSessionPhoto.objects.bulk_create(photos)
+    except Exception:
+        # Không tạo được bản ghi thì dọn các file vừa tải lên
+        for name in stored:
+            queue_file_deletion(template, "image", name)
+        raise
+
+    # Sinh thumbnail ở thread nền để không giữ request
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=generate_thumbnails, args=(field.storage, stored, workers), daemon=True
+        ).start()
+    )
+    return photos, errors
+
+
+def generate_thumbnails(storage, names, workers: int = SESSION_PHOTO_UPLOAD_WORKERS):
+    def run(name):
+        try:
+            generate_derivatives(storage, name, check_existing=False)
+        except Exception:
+            # Thumbnail sẽ được sinh lười khi hiển thị
+            pass
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names)))) as pool:
+        list(pool.map(run, names))
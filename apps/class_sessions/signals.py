@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.common.services import queue_file_deletion
+from apps.enrollments.progress import refresh_class
+
+from .models import ClassSession, ClassSessionPhoto
+
+
+@receiver(pre_save, sender=ClassSession)
+def session_store_progress_change(sender, instance: ClassSession, **kwargs):
+    instance._progress_changed = not instance.pk or any(
+        instance.has_changed(field) for field in ClassSession.tracked_fields
+    )
+
+
+@receiver(post_save, sender=ClassSession)
+def session_refresh_progress(sender, instance: ClassSession, created, **kwargs):
+    if created or getattr(instance, "_progress_changed", True):
+        refresh_class(instance.klass_id)
+
+
+@receiver(post_delete, sender=ClassSession)
+def session_refresh_progress_on_delete(sender, instance: ClassSession, **kwargs):
+    refresh_class(instance.klass_id)
+
+
+@receiver(post_delete, sender=ClassSessionPhoto)
+def session_photo_delete_on_model_delete(sender, instance: ClassSessionPhoto, **kwargs):
+    queue_file_deletion(instance, "image")
@@ -1,3 +1,101 @@
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from PIL import Image
+
+from apps.common.factories import ClassSessionFactory, UserFactory
+
+from .models import ClassSessionPhoto
+from .services import upload_session_photos
+
+
+class SlowFileSystemStorage(FileSystemStorage):
+	"""Storage cục bộ giả lập độ trễ mạng của GCS, ghi nhận số lượt ghi chạy đồng thời cao nhất."""
+
+	latency = 0.15
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self._lock = threading.Lock()
+		self.in_flight = 0
+		self.peak = 0
+
+	def _save(self, name, content):
+		with self._lock:
+			self.in_flight += 1
+			self.peak = max(self.peak, self.in_flight)
+		try:
+			time.sleep(self.latency)
+			return super()._save(name, content)
+		finally:
+			with self._lock:
+				self.in_flight -= 1
+
+
+def _photo(name="photo.jpg"):
+	buffer = BytesIO()
+	Image.new("RGB", (64, 48), (10, 120, 200)).save(buffer, format="JPEG")
+	return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+class SessionPhotoUploadTests(TestCase):
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		self.storage = SlowFileSystemStorage(location=self.media_root, base_url="/media/")
+		patcher = mock.patch.object(ClassSessionPhoto._meta.get_field("image"), "storage", self.storage)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.session = ClassSessionFactory()
+		self.teacher = UserFactory(role="TEACHER")
+
+	def test_uploads_run_concurrently_and_rows_use_one_insert(self):
+		files = [_photo(f"p{i}.jpg") for i in range(8)]
+		with self.assertNumQueries(1):
+			photos, errors = upload_session_photos(self.session, files, uploaded_by=self.teacher, workers=8)
+
+		self.assertEqual(errors, [])
+		self.assertEqual(len(photos), 8)
+		self.assertEqual(ClassSessionPhoto.objects.filter(session=self.session).count(), 8)
+		for photo in ClassSessionPhoto.objects.all():
+			self.assertTrue(self.storage.exists(photo.image.name))
+		# Các lượt tải chồng lên nhau, không vượt số worker
+		self.assertGreater(self.storage.peak, 1)
+		self.assertLessEqual(self.storage.peak, 8)
+
+	def test_single_worker_uploads_one_at_a_time(self):
+		files = [_photo(f"s{i}.jpg") for i in range(4)]
+		upload_session_photos(self.session, files, workers=1)
+		self.assertEqual(self.storage.peak, 1)
+
+	def test_invalid_files_are_reported_per_file(self):
+		files = [
+			_photo("ok.jpg"),
+			SimpleUploadedFile("notes.txt", b"hello", content_type="text/plain"),
+			SimpleUploadedFile("broken.jpg", b"not an image", content_type="image/jpeg"),
+		]
+		photos, errors = upload_session_photos(self.session, files, uploaded_by=self.teacher)
+		self.assertEqual(len(photos), 1)
+		self.assertEqual([name for name, _ in errors], ["notes.txt", "broken.jpg"])
+
+	def test_failed_upload_does_not_create_row(self):
+		files = [_photo("a.jpg"), _photo("b.jpg")]
+		original_save = self.storage._save
+
+		def flaky_save(name, content):
+			if "b" in name.rsplit("/", 1)[-1]:
+				raise OSError("timeout")
+			return original_save(name, content)
 
-# Create your tests here.
+		with mock.patch.object(self.storage, "_save", side_effect=flaky_save):
+			photos, errors = upload_session_photos(self.session, files)
+		self.assertEqual(len(photos), 1)
+		self.assertEqual(errors[0][0], "b.jpg")
+		self.assertEqual(ClassSessionPhoto.objects.count(), 1)
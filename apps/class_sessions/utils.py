@@ -1,4 +1,8 @@
+from django.utils import timezone
+
 from apps.class_sessions.models import ClassSession 
+from apps.common.fragments import bump_table_versions
+from apps.enrollments.progress import refresh_class
 
 def recalculate_session_indices(klass_pk):
     """
@@ -10,14 +14,20 @@ def recalculate_session_indices(klass_pk):
     all_sessions_of_class = ClassSession.objects.filter(klass__pk=klass_pk).order_by('date', 'start_time')
     updated_indices = []
     
+    now = timezone.now()
     for i, session in enumerate(all_sessions_of_class, 1):
         # Chỉ thêm vào danh sách cập nhật nếu index cần thay đổi
         if session.index != i:
             session.index = i
+            # bulk_update không tự cập nhật auto_now
+            session.updated_at = now
             updated_indices.append(session)
 
     # Thực hiện cập nhật hàng loạt (bulk update)
     if updated_indices:
-        ClassSession.objects.bulk_update(updated_indices, ['index'])
+        ClassSession.objects.bulk_update(updated_indices, ['index', 'updated_at'])
+        bump_table_versions(ClassSession)
+    # bulk_create/bulk_update không gửi signal nên tiến độ của lớp được tính lại ở đây
+    refresh_class(klass_pk)
     
     return len(updated_indices)
\ No newline at end of file
@@ -4,7 +4,6 @@ from datetime import date, datetime, timedelta
 
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.exceptions import PermissionDenied
-from django.core.paginator import EmptyPage, Paginator
 from django.db.models import Q
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
@@ -18,16 +17,34 @@ from apps.assessments.models import Assessment
 from apps.attendance.forms import AttendanceForm
 from apps.attendance.models import Attendance
 from apps.centers.models import Center
+from apps.common.fragments import conditional_fragment
+from apps.common.pagination import cursor_paginate
 from apps.common.utils.forms import form_errors_as_text
 from apps.common.utils.http import is_htmx_request
 from apps.curriculum.models import Lesson, Subject
+from apps.curriculum.tree import get_curriculum_tree
 from apps.enrollments.models import Enrollment
 from apps.filters.models import SavedFilter
 from apps.filters.utils import build_filter_badges, determine_active_filter_name
+from apps.notifications.services import notify_session_photos
 
 from .filters import ClassSessionFilter, TeachingScheduleFilter
 from .forms import ClassSessionForm
 from .models import ClassSession, ClassSessionPhoto
+from .services import upload_session_photos
+
+# Bảng mà các fragment danh sách/lịch buổi học phụ thuộc (ETag, xem apps.common.fragments)
+SESSION_FRAGMENT_TABLES = (
+    "class_sessions.ClassSession",
+    "classes.Class",
+    "centers.Center",
+    "centers.Room",
+    "curriculum.Subject",
+    "curriculum.Lesson",
+    "accounts.User",
+    "filters.SavedFilter",
+)
+SCHEDULE_FRAGMENT_TABLES = SESSION_FRAGMENT_TABLES + ("enrollments.Enrollment", "accounts.ParentStudentRelation")
 
 # Hàm phụ để lấy tên hiển thị của người dùng
 def _user_display_name(user):
@@ -100,6 +117,7 @@ def _user_is_session_staff(session, user):
 # Quản lý Buổi học
 @login_required
 @permission_required("class_sessions.view_classsession", raise_exception=True)
+@conditional_fragment(*SESSION_FRAGMENT_TABLES)
 def manage_class_sessions(request):
     
     # 1. Lọc
@@ -112,64 +130,46 @@ def manage_class_sessions(request):
     group_by = getattr(session_filter.form, "cleaned_data", {}).get("group_by", "") or ""
     qs = session_filter.qs
     
-    # 2. Sắp xếp
+    # 2. Sắp xếp (luôn kết thúc bằng id để phân trang cursor ổn định)
     if group_by == "subject":
-        qs = qs.order_by("klass__subject__name", "klass__name", "index")
+        ordering = ("klass__subject__name", "klass__name", "index", "id")
     elif group_by == "center":
-        qs = qs.order_by("klass__center__name", "klass__name", "index")
+        ordering = ("klass__center__name", "klass__name", "index", "id")
     elif group_by == "teacher":
-        qs = qs.order_by(
+        ordering = (
             "teacher_override__last_name",
             "teacher_override__first_name",
             "klass__main_teacher__last_name",
             "klass__main_teacher__first_name",
             "klass__name",
             "index",
+            "id",
         )
     elif group_by == "status":
-        qs = qs.order_by("status", "klass__name", "index")
+        ordering = ("status", "klass__name", "index", "id")
     elif group_by == "timeslot":
-        qs = qs.order_by("start_time", "end_time", "klass__name", "index")
+        ordering = ("start_time", "end_time", "klass__name", "index", "id")
     elif group_by == "date":
-        qs = qs.order_by("date", "start_time", "klass__name", "index")
+        ordering = ("date", "start_time", "klass__name", "index", "id")
     else:
-        qs = qs.order_by("-date", "-start_time", "klass__name")
+        ordering = ("-date", "-start_time", "klass__name", "id")
 
     active_filter_badges = build_filter_badges(session_filter, exclude={"group_by"})
 
-    # 3. Phân trang
-    try:
-        per_page = int(request.GET.get("per_page", 10))
-    except (TypeError, ValueError):
-        per_page = 10
-    try:
-        page_number = int(request.GET.get("page", 1))
-    except (TypeError, ValueError):
-        page_number = 1
-    
-    paginator = Paginator(qs, per_page)
-    try:
-        page_obj = paginator.page(page_number)
-    except EmptyPage:
-        page_obj = paginator.page(1)
+    # 3. Phân trang cursor
+    page_obj, per_page, current_query_params = cursor_paginate(request, qs, ordering)
 
     for session in page_obj.object_list:
         session.group_label = _session_group_label(session, group_by)
 
-    # Tạo query params cho phân trang, loại bỏ 'page' để tránh lặp lại
-    query_params_for_pagination = request.GET.copy()
-    query_params_for_pagination._mutable = True
-    query_params_for_pagination.pop("page", None)
-
     # 4. Xây dựng Context
     model_name = "ClassSession"
     context = {
         "page_obj": page_obj,
-        "paginator": paginator,
         "per_page": per_page,
         "filter": session_filter, 
         "model_name": model_name,
-        "current_query_params": query_params_for_pagination.urlencode(),
+        "current_query_params": current_query_params,
         "active_filter_badges": active_filter_badges,
         "group_by": group_by,
     }
@@ -266,11 +266,16 @@ def session_edit_view(request, pk):
 def session_detail_view(request, pk):
     session = get_object_or_404(
         ClassSession.objects.select_related(
-            "klass", "klass__center", "lesson", "lesson__lecture", "lesson__exercise",
-            "teacher_override", "room_override", "klass__main_teacher"
+            "klass", "klass__center", "teacher_override", "room_override", "klass__main_teacher"
         ).prefetch_related("assistants"),
         pk=pk
     )
+    # Bài giảng/bài tập lấy từ cây chương trình đã cache thay vì join thêm 3 bảng
+    if session.lesson_id:
+        tree = get_curriculum_tree(session.klass.subject_id)
+        lesson = tree.lesson(session.lesson_id) if tree else None
+        if lesson is not None:
+            session.lesson = lesson
     viewer = request.user
     is_my_session = _user_is_session_staff(session, viewer)
     if not (viewer.has_perm("class_sessions.view_classsession") or is_my_session):
@@ -348,8 +353,22 @@ def session_photos_upload(request, pk):
     if not files:
         return HttpResponseBadRequest("Vui lòng chọn ảnh.")
 
-    for f in files:
-        ClassSessionPhoto.objects.create(session=session, image=f, uploaded_by=viewer)
+    photos, errors = upload_session_photos(session, files, uploaded_by=viewer)
+    error_text = "\n".join(f"{name}: {reason}" for name, reason in errors)
+    if not photos:
+        if is_htmx_request(request):
+            resp = HttpResponse(status=204)
+            resp["HX-Trigger"] = json.dumps({
+                "show-sweet-alert": {
+                    "icon": "error",
+                    "title": "Không thể tải ảnh buổi học",
+                    "text": error_text,
+                }
+            })
+            return resp
+        return HttpResponseBadRequest(error_text)
+
+    notify_session_photos(session, len(photos))
 
     redirect_url = reverse("class_sessions:session_detail", args=[pk])
     if request.GET:
@@ -358,12 +377,14 @@ def session_photos_upload(request, pk):
     if is_htmx_request(request):
         resp = HttpResponse(status=204)
         resp["HX-Redirect"] = redirect_url
-        resp["HX-Trigger"] = json.dumps({
-            "show-sweet-alert": {
-                "icon": "success",
-                "title": "Đã tải ảnh buổi học"
+        alert = {"icon": "success", "title": "Đã tải ảnh buổi học"}
+        if errors:
+            alert = {
+                "icon": "warning",
+                "title": f"Đã tải {len(photos)}/{len(photos) + len(errors)} ảnh",
+                "text": error_text,
             }
-        })
+        resp["HX-Trigger"] = json.dumps({"show-sweet-alert": alert})
         return resp
     return redirect(redirect_url)
 
@@ -378,12 +399,8 @@ def session_photo_delete(request, session_pk, photo_pk):
     if not (viewer.has_perm("class_sessions.change_classsession") or is_my_session):
         raise PermissionDenied
 
-    try:
-        # Xóa file trên storage trước khi xóa record
-        if photo.image:
-            photo.image.delete(save=False)
-    finally:
-        photo.delete()
+    # File trên storage được đưa vào hàng đợi xóa qua signal post_delete
+    photo.delete()
     redirect_url = reverse("class_sessions:session_detail", args=[session_pk])
     if request.GET:
         redirect_url = f"{redirect_url}?{request.GET.urlencode()}"
@@ -533,6 +550,7 @@ def update_student_session_status(request, session_id, student_id):
 
 # Xem Lịch của tôi
 @login_required
+@conditional_fragment(*SCHEDULE_FRAGMENT_TABLES)
 def my_schedule_view(request):
     today = date.today()
     try:
@@ -690,6 +708,7 @@ def _build_teaching_schedule_context(request, *, force_self=False):
 
 # Lịch dạy của giáo viên
 @login_required
+@conditional_fragment(*SCHEDULE_FRAGMENT_TABLES)
 def teaching_schedule_view(request):
     context = _build_teaching_schedule_context(request)
     if is_htmx_request(request):
@@ -699,6 +718,7 @@ def teaching_schedule_view(request):
 
 # Lịch dạy của tôi
 @login_required
+@conditional_fragment(*SCHEDULE_FRAGMENT_TABLES)
 def teaching_schedule_my_view(request):
     """View dành riêng cho giáo viên/trợ giảng: chỉ thấy lịch của chính mình."""
 
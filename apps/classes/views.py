@@ -16,9 +16,11 @@ from apps.accounts.models import User
 from apps.centers.models import Center
 from apps.class_sessions.models import ClassSession
 from apps.class_sessions.utils import recalculate_session_indices
+from apps.common.fragments import bump_table_versions
 from apps.common.utils.forms import form_errors_as_text
 from apps.common.utils.http import is_htmx_request
-from apps.curriculum.models import Lesson, Subject
+from apps.curriculum.models import Subject
+from apps.curriculum.tree import get_curriculum_tree
 from apps.filters.models import SavedFilter
 from apps.filters.utils import build_filter_badges, determine_active_filter_name
 
@@ -331,14 +333,9 @@ def generate_sessions(request, pk):
             return _hx_error("Lớp chưa có lịch học hàng tuần, không thể tạo buổi học.")
         # 1. Truy vấn và lập danh sách bài học
         # Lấy tất cả bài học của môn, sắp xếp theo thứ tự học phần (module) và bài học
-        all_lessons = []
-        if klass.subject:
-             all_lessons = list(
-                Lesson.objects
-                    .filter(module__subject=klass.subject)
-                    .select_related('module')
-                    .order_by('module__order', 'order') # Sắp xếp theo Học phần (module) rồi đến Bài học (order)
-            )
+        # Cây chương trình đã cache sẵn thứ tự học phần (module) rồi đến bài học (order)
+        tree = get_curriculum_tree(klass.subject_id)
+        all_lessons = tree.lessons if tree else []
         lessons_count = len(all_lessons)
 
         # 2. Thiết lập ngày bắt đầu và lấy sessions hiện có
@@ -414,7 +411,14 @@ def generate_sessions(request, pk):
         
         if sessions_to_update:
             # Cập nhật toàn bộ trường có thể thay đổi (ngày, thời gian, bài học)
-            ClassSession.objects.bulk_update(sessions_to_update, ['date', 'start_time', 'end_time', 'lesson'])
+            # bulk_update không tự cập nhật auto_now; updated_at dùng cho đồng bộ offline
+            now = timezone.now()
+            for session in sessions_to_update:
+                session.updated_at = now
+            ClassSession.objects.bulk_update(sessions_to_update, ['date', 'start_time', 'end_time', 'lesson', 'updated_at'])
+
+        if sessions_to_create or sessions_to_update:
+            bump_table_versions(ClassSession)
 
         # 5. Đánh số lại index cho toàn bộ các buổi học (sửa chữa index tạm thời)
         updated_count = recalculate_session_indices(klass.pk) 
@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import PendingFileDeletion
 
-# Register your models here.
+
+@admin.register(PendingFileDeletion)
+class PendingFileDeletionAdmin(admin.ModelAdmin):
+    list_display = ("name", "field_label", "attempts", "next_attempt_at", "last_error")
+    list_filter = ("field_label",)
+    search_fields = ("name", "last_error")
+    ordering = ("next_attempt_at",)
@@ -0,0 +1,194 @@
+"""
+Đo hiệu năng các view nóng: thời gian (phân vị) và số truy vấn mỗi request.
+
+Mỗi ``Scenario`` là một request của một vai trò với ngân sách truy vấn (``budget``). Test trong
+``apps.common.tests`` chạy các kịch bản trên dữ liệu dựng bằng factory và fail khi vượt ngân
+sách; lệnh ``benchmark`` chạy trên dữ liệu ``seed_db --seed`` (lặp lại được) rồi ghi báo cáo
+JSON để so giữa các commit.
+"""
+
+import json
+import subprocess
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import ParentStudentRelation, User
+from apps.classes.models import Class
+from apps.common.instrumentation import QueryRecorder
+from apps.enrollments.models import Enrollment
+
+BENCHMARK_REPEAT = getattr(settings, "BENCHMARK_REPEAT", 5)
+
+
+class Scenario:
+    def __init__(self, name, url_name, role, budget, method="get", htmx=False, url_kwargs=None, writes=False):
+        self.name = name
+        self.url_name = url_name
+        self.role = role
+        self.budget = budget
+        self.method = method
+        self.htmx = htmx
+        # Hàm nhận fixtures, trả kwargs cho reverse (ví dụ pk của lớp)
+        self.url_kwargs = url_kwargs
+        # Request có ghi dữ liệu: mỗi lần chạy trong savepoint rồi rollback để các lần đo như nhau
+        self.writes = writes
+
+    def url(self, fixtures):
+        return reverse(self.url_name, kwargs=self.url_kwargs(fixtures) if self.url_kwargs else None)
+
+
+def _class_pk(fixtures):
+    return {"pk": fixtures["class"].pk}
+
+
+SCENARIOS = [
+    Scenario("dashboard:admin", "common:dashboard", "ADMIN", 28),
+    Scenario("dashboard:center_manager", "common:dashboard", "CENTER_MANAGER", 32),
+    Scenario("dashboard:teacher", "common:dashboard", "TEACHER", 33),
+    Scenario("dashboard:assistant", "common:dashboard", "ASSISTANT", 32),
+    Scenario("dashboard:parent", "common:dashboard", "PARENT", 40),
+    Scenario("dashboard:student", "common:dashboard", "STUDENT", 34),
+    Scenario("manage_class_sessions", "class_sessions:manage_class_sessions", "ADMIN", 15),
+    Scenario("manage_class_sessions:htmx", "class_sessions:manage_class_sessions", "ADMIN", 8, htmx=True),
+    # Đếm điểm danh theo từng dòng của trang (tối đa per_page dòng)
+    Scenario("enrollment_list", "enrollments:list", "ADMIN", 52),
+    Scenario("billing_home", "billing:home", "ADMIN", 16),
+    # Tiến độ của cả trang đọc từ EnrollmentProgress trong một truy vấn
+    Scenario("student_report", "reports:student_report", "ADMIN", 12),
+    Scenario("revenue_report", "reports:revenue_report", "ADMIN", 21),
+    Scenario("teaching_hours_report", "reports:teaching_hours_report", "ADMIN", 22),
+    Scenario("class_activity_report", "reports:class_activity_report", "ADMIN", 34),
+    Scenario("children_overview", "parents:children_overview", "PARENT", 27),
+    Scenario("portal_home", "students:portal_home", "STUDENT", 28),
+    # Gồm cả tính lại tiến độ của lớp sau khi đánh số lại buổi học
+    Scenario(
+        "generate_sessions", "classes:generate_sessions", "ADMIN", 18,
+        method="post", htmx=True, url_kwargs=_class_pk, writes=True,
+    ),
+]
+
+
+def pick_fixtures() -> dict:
+    """
+    Chọn người dùng đại diện cho từng vai trò và một lớp có lịch tuần từ dữ liệu hiện có, ưu tiên
+    đối tượng có dữ liệu liên quan (giáo viên có lớp, phụ huynh có con, học sinh có ghi danh).
+    """
+    users = User.objects.filter(is_active=True).order_by("pk")
+    klass = (
+        Class.objects.filter(weekly_schedules__isnull=False, start_date__isnull=False, end_date__isnull=False)
+        .order_by("pk")
+        .first()
+    )
+    relation = ParentStudentRelation.objects.order_by("pk").select_related("parent").first()
+    enrollment = Enrollment.objects.order_by("pk").select_related("student").first()
+    return {
+        "ADMIN": users.filter(role="ADMIN", is_superuser=True).first() or users.filter(is_superuser=True).first(),
+        "CENTER_MANAGER": users.filter(role="CENTER_MANAGER").first(),
+        "TEACHER": users.filter(role="TEACHER", pk=getattr(klass, "main_teacher_id", None)).first()
+        or users.filter(role="TEACHER").first(),
+        "ASSISTANT": users.filter(role="ASSISTANT", assist_classes__isnull=False).first()
+        or users.filter(role="ASSISTANT").first(),
+        "PARENT": relation.parent if relation else users.filter(role="PARENT").first(),
+        "STUDENT": enrollment.student if enrollment else users.filter(role="STUDENT").first(),
+        "class": klass,
+    }
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(scenario, fixtures, repeat=BENCHMARK_REPEAT, raise_request_exception=True) -> dict:
+    """Một request làm nóng cache rồi ``repeat`` request đo; số truy vấn lấy lần đo lớn nhất."""
+    user = fixtures.get(scenario.role)
+    if user is None or (scenario.url_kwargs and fixtures.get("class") is None):
+        return {"skipped": "Không có dữ liệu cho kịch bản này."}
+    client = Client(raise_request_exception=raise_request_exception)
+    client.force_login(user)
+    url = scenario.url(fixtures)
+    headers = {"HTTP_HX_REQUEST": "true"} if scenario.htmx else {}
+    timings, queries, status = [], 0, None
+    for attempt in range(repeat + 1):
+        # Đếm bằng execute_wrapper: CaptureQueriesContext bị reset_queries xóa ở đầu mỗi request
+        recorder = QueryRecorder()
+        with transaction.atomic():
+            with connection.execute_wrapper(recorder):
+                started = time.perf_counter()
+                response = getattr(client, scenario.method)(url, **headers)
+                elapsed = time.perf_counter() - started
+            if scenario.writes:
+                transaction.set_rollback(True)
+        if attempt == 0:
+            continue
+        timings.append(elapsed * 1000)
+        queries = max(queries, recorder.count)
+        status = response.status_code
+    return {
+        "url": url,
+        "role": scenario.role,
+        "status": status,
+        "queries": queries,
+        "budget": scenario.budget,
+        "over_budget": queries > scenario.budget,
+        "p50_ms": round(_percentile(timings, 50), 2),
+        "p95_ms": round(_percentile(timings, 95), 2),
+        "max_ms": round(max(timings), 2),
+        "mean_ms": round(sum(timings) / len(timings), 2),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_benchmarks(scenarios=None, repeat=BENCHMARK_REPEAT, fixtures=None) -> dict:
+    fixtures = fixtures or pick_fixtures()
+    results = {}
+    # Client dùng host "testserver"
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        for scenario in scenarios or SCENARIOS:
+            results[scenario.name] = run_scenario(scenario, fixtures, repeat, raise_request_exception=False)
+    return {
+        "generated_at": timezone.now().isoformat(),
+        "revision": _git_revision(),
+        "repeat": repeat,
+        "scenarios": results,
+    }
+
+
+def compare_reports(baseline: dict, current: dict) -> list[dict]:
+    """Chênh lệch p50 và số truy vấn giữa hai báo cáo, theo kịch bản có trong cả hai."""
+    rows = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or "skipped" in before or "skipped" in result:
+            continue
+        rows.append(
+            {
+                "scenario": name,
+                "queries": (before["queries"], result["queries"]),
+                "p50_ms": (before["p50_ms"], result["p50_ms"]),
+                "p50_change": round((result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100, 1)
+                if before["p50_ms"]
+                else None,
+            }
+        )
+    return rows
+
+
+def write_report(report, path):
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, ensure_ascii=False, indent=2)
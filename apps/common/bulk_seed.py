@@ -0,0 +1,545 @@
+"""
+Chế độ ``seed_db --bulk``: dữ liệu cỡ production cho kiểm thử tải.
+
+Seed thường đi qua factory, ``get_or_create`` và ``save()`` từng dòng trong một transaction lớn,
+kéo theo mọi signal (điểm danh → billing → điểm thưởng). Ở đây:
+
+- Dòng được sinh trong bộ nhớ bằng ``random.Random(seed)`` (cùng seed cho cùng dữ liệu, ngày vẫn
+  tính theo hôm nay) rồi ghi theo lô ``--chunk_size``; mỗi lô tự commit. Bảng lớn (điểm danh,
+  đánh giá, bút toán, điểm thưởng...) dùng ``COPY`` của PostgreSQL, bảng cần pk dùng ``bulk_create``.
+- Không có signal nào được phát. Dữ liệu dẫn xuất được tính lại sau cùng theo tập hợp:
+  ``Enrollment.sessions_consumed``, một bút toán CONSUME cho mỗi ghi danh, giao dịch và sự kiện
+  điểm thưởng cho buổi có mặt và sản phẩm, số dư ``PointAccount``.
+"""
+
+import random
+import time
+from io import StringIO
+from collections import defaultdict
+from datetime import date, time as clock, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from faker import Faker
+
+from apps.accounts.models import ParentStudentRelation, User, UserCodeCounter
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.billing.models import BillingEntry
+from apps.centers.models import Room
+from apps.class_sessions.models import ClassSession
+from apps.classes.models import Class, ClassAssistant, ClassSchedule
+from apps.common.factories import CenterFactory, SubjectFactory
+from apps.common.fragments import bump_table_versions
+from apps.curriculum.models import Exercise, Lecture, Lesson, Module
+from apps.enrollments.models import Enrollment, EnrollmentStatus
+from apps.enrollments.services import ATTENDED_STATUSES
+from apps.notifications.services import notify_many
+from apps.rewards.models import PointAccount, RewardTransaction, SessionPointEvent, SessionPointEventType
+from apps.students.embeds import embed_version
+from apps.students.models import StudentProduct
+
+ATTENDANCE_CHOICES = ("P", "P", "P", "P", "L", "A")
+FEES = (250000, 300000, 350000)
+# Số lớp sinh buổi học, ghi danh và điểm danh mỗi lượt
+CLASS_BATCH = 200
+# Kích thước pool tên/địa chỉ lấy từ Faker; ghép ngẫu nhiên thay vì gọi Faker cho từng user
+NAME_POOL = 500
+
+
+class Progress:
+    """Đếm số dòng đã ghi, in tiến độ và tốc độ tối đa mỗi ``every`` giây."""
+
+    def __init__(self, stdout, label, every=2.0):
+        self.stdout = stdout
+        self.label = label
+        self.every = every
+        self.rows = 0
+        self.started = self.reported = time.perf_counter()
+
+    def add(self, rows):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.reported >= self.every:
+            self.reported = now
+            self.stdout.write(f"  {self.label}: {self.rows:,} rows ({self.rate(now):,.0f}/s)")
+
+    def rate(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.started
+        return self.rows / elapsed if elapsed else 0.0
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f"{self.label}: {self.rows:,} rows in {elapsed:.1f}s ({self.rate():,.0f}/s)")
+        return self.rows
+
+
+class _Writer:
+    """Gom đối tượng của một model, ``bulk_create`` mỗi khi đủ một lô."""
+
+    def __init__(self, seeder, model, label=None, ignore_conflicts=False):
+        self.model = model
+        self.ignore_conflicts = ignore_conflicts
+        self.chunk_size = seeder.chunk_size
+        self.progress = Progress(seeder.stdout, label or str(model._meta.verbose_name_plural))
+        self.pending = []
+        seeder.writers.append(self)
+
+    def add(self, obj):
+        self.pending.append(obj)
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.model.objects.bulk_create(self.pending, ignore_conflicts=self.ignore_conflicts)
+            self.progress.add(len(self.pending))
+            self.pending = []
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class _CopyWriter(_Writer):
+    """
+    Ghi tuple theo ``columns`` bằng ``COPY ... FROM STDIN`` của PostgreSQL: nhanh hơn nhiều so
+    với INSERT do ORM dựng cho bảng hàng triệu dòng. Backend khác dùng ``bulk_create``. Không
+    trả về pk và không tự điền ``auto_now``, nên ``created_at``/``updated_at`` được điền ở đây.
+    """
+
+    def __init__(self, seeder, model, columns, label=None):
+        super().__init__(seeder, model, label)
+        names = {field.attname for field in model._meta.concrete_fields}
+        self.timestamps = [name for name in ("created_at", "updated_at") if name in names and name not in columns]
+        self.columns = [*columns, *self.timestamps]
+
+    def add(self, *values):
+        super().add(values)
+
+    def flush(self):
+        if not self.pending:
+            return
+        now = timezone.now()
+        rows = [(*values, *[now] * len(self.timestamps)) for values in self.pending]
+        if connection.vendor == "postgresql":
+            buffer = StringIO()
+            buffer.writelines("\t".join(_copy_value(value) for value in row) + "\n" for row in rows)
+            buffer.seek(0)
+            quote = connection.ops.quote_name
+            columns = ", ".join(quote(name) for name in self.columns)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {quote(self.model._meta.db_table)} ({columns}) FROM STDIN", buffer)
+        else:
+            self.model.objects.bulk_create([self.model(**dict(zip(self.columns, row))) for row in rows])
+        self.progress.add(len(rows))
+        self.pending = []
+
+
+class BulkSeeder:
+    def __init__(self, command, options, groups_by_name, role_counts):
+        self.stdout = command.stdout
+        self.style = command.style
+        self.role_code_prefix = command.ROLE_CODE_PREFIX
+        self.options = options
+        self.groups_by_name = groups_by_name
+        self.role_counts = role_counts
+        self.seed = options["seed"] or 0
+        self.rng = random.Random(self.seed)
+        self.chunk_size = max(1, options["chunk_size"])
+        self.today = date.today()
+        self.writers = []
+        self.totals = {}
+
+        fake = Faker("vi_VN")
+        fake.seed_instance(self.seed)
+        self.first_names = [fake.first_name() for _ in range(NAME_POOL)]
+        self.last_names = [fake.last_name() for _ in range(NAME_POOL)]
+        self.addresses = [fake.address().replace("\n", ", ")[:255] for _ in range(NAME_POOL)]
+        self.sentences = [fake.sentence(nb_words=6) for _ in range(NAME_POOL)]
+
+    def run(self):
+        started = time.perf_counter()
+        centers, rooms_by_center = self._centers()
+        lessons_by_subject = self._curriculum()
+        users = self._users(centers)
+        self._parents(users)
+        class_range = self._classes(centers, rooms_by_center, lessons_by_subject, users)
+        user_range = users["range"]
+        self._derive(class_range, user_range)
+
+        admins = users["ids"]["ADMIN"] + users["ids"]["CENTER_MANAGER"]
+        notify_many(
+            (uid, "Chào mừng bạn đến với hệ thống EDS", "Tài khoản của bạn đã sẵn sàng.", "") for uid in admins
+        )
+        # Không có signal nên cache fragment/API không tự biết dữ liệu đã đổi
+        bump_table_versions(
+            User, ParentStudentRelation, Class, ClassSchedule, ClassAssistant, ClassSession, Enrollment,
+            Attendance, Assessment, StudentProduct, BillingEntry, RewardTransaction, SessionPointEvent, PointAccount,
+            Module, Lesson,
+        )
+
+        elapsed = time.perf_counter() - started
+        rows = sum(self.totals.values())
+        self.stdout.write(self.style.SUCCESS(f"\n✅ BULK SEEDING COMPLETED in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)"))
+        for label, count in self.totals.items():
+            self.stdout.write(f"- {label}: {count:,}")
+
+    # --- Hỗ trợ ---
+
+    def _insert(self, model, objects, label=None):
+        """``bulk_create`` theo lô, trả về đối tượng đã có pk."""
+        progress = Progress(self.stdout, label or str(model._meta.verbose_name_plural))
+        created = []
+        for start in range(0, len(objects), self.chunk_size):
+            chunk = model.objects.bulk_create(objects[start:start + self.chunk_size])
+            created.extend(chunk)
+            progress.add(len(chunk))
+        self._record(progress)
+        return created
+
+    def _close_writers(self):
+        for writer in self.writers:
+            writer.flush()
+            self._record(writer.progress)
+        self.writers = []
+
+    def _record(self, progress):
+        self.totals[progress.label] = self.totals.get(progress.label, 0) + progress.finish()
+
+    def _update(self, label, queryset, **values):
+        started = time.perf_counter()
+        rows = queryset.update(**values)
+        self.stdout.write(f"{label}: {rows:,} rows updated in {time.perf_counter() - started:.1f}s")
+
+    # --- Dữ liệu gốc ---
+
+    def _centers(self):
+        # Ít dòng, dùng factory như seed thường (cùng mã trung tâm thì dùng lại)
+        centers = [CenterFactory() for _ in range(self.options["centers"])]
+        existing = set(Room.objects.filter(center__in=centers).values_list("center_id", "name"))
+        rooms = [
+            Room(center=center, name=f"Phòng {i + 1} ({center.code})")
+            for center in centers
+            for i in range(self.options["rooms_per_center"])
+            if (center.pk, f"Phòng {i + 1} ({center.code})") not in existing
+        ]
+        self._insert(Room, rooms)
+        rooms_by_center = defaultdict(list)
+        for room in Room.objects.filter(center__in=centers).order_by("pk"):
+            rooms_by_center[room.center_id].append(room.pk)
+        return centers, rooms_by_center
+
+    def _curriculum(self):
+        subjects = [SubjectFactory() for _ in range(self.options["subjects"])]
+        seeded = set(Module.objects.filter(subject__in=subjects).values_list("subject_id", flat=True))
+        modules = [
+            Module(subject=subject, order=i + 1, title=f"{subject.name} - Module {i + 1}", description=self.rng.choice(self.sentences))
+            for subject in subjects
+            if subject.pk not in seeded
+            for i in range(self.options["modules_per_subject"])
+        ]
+        lessons = [
+            Lesson(module=module, order=j + 1, title=f"Bài {j + 1}: {self.rng.choice(self.sentences)}"[:255])
+            for module in self._insert(Module, modules)
+            for j in range(self.options["lessons_per_module"])
+        ]
+        lessons = self._insert(Lesson, lessons)
+        self._insert(Lecture, [Lecture(lesson=lesson, content=self.rng.choice(self.sentences)) for lesson in lessons if self.rng.random() < 0.7])
+        self._insert(Exercise, [Exercise(lesson=lesson, description=self.rng.choice(self.sentences)) for lesson in lessons if self.rng.random() < 0.5])
+
+        lessons_by_subject = defaultdict(list)
+        ordered = Lesson.objects.filter(module__subject__in=subjects).order_by("module__subject_id", "module__order", "order")
+        for subject_id, lesson_id in ordered.values_list("module__subject_id", "pk"):
+            lessons_by_subject[subject_id].append(lesson_id)
+        return {subject.pk: lessons_by_subject[subject.pk] for subject in subjects}
+
+    def _users(self, centers):
+        # Hash một lần cho mọi user (PBKDF2 cho từng user mất hàng giờ ở quy mô lớn)
+        password = make_password("password123")
+        ids = defaultdict(list)
+        by_center = defaultdict(lambda: defaultdict(list))
+        first_pk = last_pk = None
+        memberships = _CopyWriter(self, User.groups.through, ("user_id", "group_id"), "user groups")
+        for role_code, count in self.role_counts.items():
+            prefix = self.role_code_prefix[role_code]
+            first = UserCodeCounter.reserve(prefix, count)
+            users = []
+            for n in range(first, first + count):
+                code = f"{prefix}{n:04d}"
+                center = None if role_code == "ADMIN" else centers[(n - first) % len(centers)]
+                users.append(
+                    User(
+                        username=code.lower(),
+                        user_code=code,
+                        password=password,
+                        role=role_code,
+                        is_superuser=role_code == "ADMIN",
+                        is_staff=role_code == "ADMIN",
+                        first_name=self.rng.choice(self.first_names),
+                        last_name=self.rng.choice(self.last_names),
+                        email=f"{code.lower()}@seed.local",
+                        phone=f"09{self.rng.randint(10000000, 99999999)}",
+                        address=self.rng.choice(self.addresses),
+                        national_id=f"NID{code}",
+                        dob=self.today - timedelta(days=self.rng.randint(7 * 365, 55 * 365)),
+                        gender=self.rng.choice("MFO"),
+                        center=center,
+                    )
+                )
+            group_id = self.groups_by_name[role_code].pk
+            for user in self._insert(User, users, f"users ({role_code})"):
+                ids[role_code].append(user.pk)
+                by_center[role_code][user.center_id].append(user.pk)
+                memberships.add(user.pk, group_id)
+                first_pk = user.pk if first_pk is None else min(first_pk, user.pk)
+                last_pk = user.pk if last_pk is None else max(last_pk, user.pk)
+        self._close_writers()
+        return {"ids": ids, "by_center": by_center, "range": (first_pk, last_pk)}
+
+    def _parents(self, users):
+        relations = _CopyWriter(self, ParentStudentRelation, ("parent_id", "student_id", "note"), "parent-student relations")
+        for center_id, students in users["by_center"]["STUDENT"].items():
+            parents = users["by_center"]["PARENT"].get(center_id) or users["ids"]["PARENT"]
+            if not parents:
+                continue
+            for student_id in students:
+                for parent_id in self.rng.sample(parents, self.rng.randint(1, min(2, len(parents)))):
+                    relations.add(parent_id, student_id, "Auto-generated")
+        self._close_writers()
+
+    # --- Lớp học và hoạt động ---
+
+    def _schedule(self, start_date):
+        """Lịch tuần 1-2 buổi và ngày của ``--sessions_per_class`` buổi học đầu tiên."""
+        slots = {}
+        for day in self.rng.sample(range(7), self.rng.randint(1, 2)):
+            start = self.rng.randint(8, 18) * 60 + self.rng.choice((0, 30))
+            slots[day] = (divmod(start, 60), divmod(start + 90, 60))
+        dates = []
+        current = start_date
+        while len(dates) < self.options["sessions_per_class"]:
+            if current.weekday() in slots:
+                dates.append(current)
+            current += timedelta(days=1)
+        return slots, dates
+
+    def _classes(self, centers, rooms_by_center, lessons_by_subject, users):
+        total = self.options["classes"]
+        prefix = f"B{self.seed}-"
+        offset = Class.objects.filter(code__startswith=prefix).count()
+        subject_ids = list(lessons_by_subject)
+        teachers = users["by_center"]["TEACHER"]
+        assistants = users["by_center"]["ASSISTANT"]
+        students = users["by_center"]["STUDENT"]
+        version = embed_version()
+        first_pk = last_pk = None
+
+        schedules = _Writer(self, ClassSchedule, "weekly schedules")
+        class_assistants = _Writer(self, ClassAssistant, "class assistants")
+        enrollments = _Writer(self, Enrollment)
+        attendances = _CopyWriter(self, Attendance, ("session_id", "student_id", "status", "note"))
+        assessments = _CopyWriter(self, Assessment, ("session_id", "student_id", "score", "remark"))
+        products = _Writer(self, StudentProduct, "student products")
+        class_progress = Progress(self.stdout, "classes")
+        session_progress = Progress(self.stdout, "class sessions")
+
+        for batch_start in range(0, total, CLASS_BATCH):
+            plans = []
+            for n in range(batch_start, min(total, batch_start + CLASS_BATCH)):
+                center = self.rng.choice(centers)
+                start_date = self.today - timedelta(days=self.rng.randint(15, 45))
+                slots, dates = self._schedule(start_date)
+                center_teachers = teachers.get(center.pk) or users["ids"]["TEACHER"]
+                rooms = rooms_by_center.get(center.pk)
+                klass = Class(
+                    code=f"{prefix}{offset + n + 1:06d}",
+                    name=f"Lớp {offset + n + 1}",
+                    center=center,
+                    subject_id=self.rng.choice(subject_ids),
+                    status="ONGOING" if dates[-1] >= self.today else "COMPLETED",
+                    main_teacher_id=self.rng.choice(center_teachers) if center_teachers else None,
+                    room_id=self.rng.choice(rooms) if rooms else None,
+                    start_date=start_date,
+                    end_date=dates[-1],
+                )
+                plans.append((klass, slots, dates))
+            Class.objects.bulk_create([klass for klass, _, _ in plans])
+            class_progress.add(len(plans))
+
+            sessions = []
+            for klass, slots, dates in plans:
+                first_pk = klass.pk if first_pk is None else min(first_pk, klass.pk)
+                last_pk = klass.pk if last_pk is None else max(last_pk, klass.pk)
+                for day, (start, end) in slots.items():
+                    schedules.add(ClassSchedule(klass=klass, day_of_week=day, start_time=clock(*start), end_time=clock(*end)))
+                center_assistants = assistants.get(klass.center_id) or []
+                for assistant_id in self.rng.sample(center_assistants, self.rng.randint(0, min(2, len(center_assistants)))):
+                    class_assistants.add(ClassAssistant(klass=klass, assistant_id=assistant_id))
+                lessons = lessons_by_subject[klass.subject_id]
+                for index, day in enumerate(dates):
+                    start, end = slots[day.weekday()]
+                    sessions.append(
+                        ClassSession(
+                            klass=klass,
+                            index=index + 1,
+                            date=day,
+                            start_time=clock(*start),
+                            end_time=clock(*end),
+                            lesson_id=lessons[index] if index < len(lessons) else None,
+                            status="DONE" if day < self.today else "PLANNED",
+                        )
+                    )
+            ClassSession.objects.bulk_create(sessions, batch_size=self.chunk_size)
+            session_progress.add(len(sessions))
+
+            sessions_by_class = defaultdict(list)
+            for session in sessions:
+                sessions_by_class[session.klass_id].append(session)
+            for klass, _, dates in plans:
+                pool = students.get(klass.center_id) or users["ids"]["STUDENT"]
+                enrolled = self.rng.sample(pool, min(self.options["students_per_class"], len(pool)))
+                past = [session for session in sessions_by_class[klass.pk] if session.date < self.today]
+                future = len(dates) - len(past)
+                for student_id in enrolled:
+                    fee = self.rng.choice(FEES)
+                    purchased = max(8, len(past) + (self.rng.randint(1, future) if future else 0))
+                    enrollments.add(
+                        Enrollment(
+                            klass=klass,
+                            student_id=student_id,
+                            status=EnrollmentStatus.ACTIVE if future else EnrollmentStatus.COMPLETED,
+                            fee_per_session=fee,
+                            sessions_purchased=purchased,
+                            amount_paid=purchased * fee,
+                            start_date=klass.start_date,
+                            end_date=klass.end_date,
+                        )
+                    )
+                for session in past:
+                    present = []
+                    for student_id in enrolled:
+                        status = self.rng.choice(ATTENDANCE_CHOICES)
+                        attendances.add(session.pk, student_id, status, "")
+                        if status in ATTENDED_STATUSES:
+                            present.append(student_id)
+                            if self.rng.random() < 0.25:
+                                assessments.add(
+                                    session.pk,
+                                    student_id,
+                                    round(self.rng.uniform(5.0, 10.0), 1),
+                                    self.rng.choice(self.sentences)[:255],
+                                )
+                    if present and self.rng.random() < 0.3:
+                        products.add(
+                            StudentProduct(
+                                session=session,
+                                student_id=self.rng.choice(present),
+                                title=f"Sản phẩm buổi {session.index}",
+                                description=self.rng.choice(self.sentences),
+                                embed_version=version,
+                            )
+                        )
+
+        self._record(class_progress)
+        self._record(session_progress)
+        self._close_writers()
+        return first_pk, last_pk
+
+    # --- Dữ liệu dẫn xuất ---
+
+    def _derive(self, class_range, user_range):
+        if class_range[0] is not None:
+            enrollments = Enrollment.objects.filter(klass__pk__range=class_range)
+            attended = (
+                Attendance.objects.filter(
+                    session__klass=OuterRef("klass"), student=OuterRef("student"), status__in=ATTENDED_STATUSES
+                )
+                .values("student")
+                .annotate(total=Count("pk"))
+                .values("total")
+            )
+            self._update("enrollment sessions_consumed", enrollments, sessions_consumed=Coalesce(Subquery(attended), 0))
+
+            # Một bút toán CONSUME gộp cho mỗi ghi danh (signal tạo một bút toán cho mỗi buổi)
+            entries = _CopyWriter(
+                self,
+                BillingEntry,
+                ("enrollment_id", "entry_type", "sessions", "unit_price", "amount", "discount_amount", "note"),
+                "billing entries",
+            )
+            consumed = enrollments.filter(sessions_consumed__gt=0).values_list("pk", "sessions_consumed", "fee_per_session")
+            for enrollment_id, sessions, fee in consumed.iterator(chunk_size=self.chunk_size):
+                entries.add(
+                    enrollment_id,
+                    BillingEntry.EntryType.CONSUME,
+                    -sessions,
+                    int(fee or 0),
+                    sessions * int(fee or 0),
+                    0,
+                    "Consume by attendance (bulk seed)",
+                )
+            self._close_writers()
+
+            present = Attendance.objects.filter(session__klass__pk__range=class_range, status="P")
+            self._award(
+                class_range,
+                present.values_list("student_id", "session_id", "session__index"),
+                SessionPointEventType.ATTENDANCE,
+                "Đi học đúng giờ - Buổi ",
+            )
+            made = StudentProduct.objects.filter(session__klass__pk__range=class_range)
+            self._award(
+                class_range,
+                made.values_list("student_id", "session_id", "session__index"),
+                SessionPointEventType.PRODUCT,
+                "Sản phẩm buổi ",
+            )
+
+        if user_range[0] is None:
+            return
+        students = User.objects.filter(pk__range=user_range, role="STUDENT")
+        bonuses = _CopyWriter(self, RewardTransaction, ("student_id", "delta", "reason"), "reward transactions (bonus)")
+        for student_id in students.values_list("pk", flat=True).iterator(chunk_size=self.chunk_size):
+            for _ in range(self.rng.randint(0, 2)):
+                bonuses.add(student_id, self.rng.choice((10, 15, 20, 30)), "Thưởng thành tích học tập")
+        # Tài khoản đã có (tạo ở nơi khác) được giữ nguyên
+        accounts = _Writer(self, PointAccount, "point accounts", ignore_conflicts=True)
+        for student_id in students.values_list("pk", flat=True).iterator(chunk_size=self.chunk_size):
+            accounts.add(PointAccount(student_id=student_id, balance=0))
+        self._close_writers()
+
+        total = RewardTransaction.objects.filter(student=OuterRef("student")).values("student").annotate(total=Sum("delta")).values("total")
+        self._update(
+            "point balances",
+            PointAccount.objects.filter(student__pk__range=user_range, student__role="STUDENT"),
+            balance=Coalesce(Subquery(total), 0),
+        )
+
+    def _award(self, class_range, rows, event_type, reason):
+        """
+        Giao dịch +1 điểm ``reason + số buổi`` cho mỗi dòng (student_id, session_id, session_index),
+        rồi sự kiện trỏ tới giao dịch đó. COPY không trả pk nên giao dịch được đọc lại theo buổi
+        của các lớp vừa tạo và tiền tố ``reason``.
+        """
+        transactions = _CopyWriter(
+            self, RewardTransaction, ("student_id", "delta", "reason", "session_id"), f"reward transactions ({event_type})"
+        )
+        for student_id, session_id, index in rows.iterator(chunk_size=self.chunk_size):
+            transactions.add(student_id, 1, f"{reason}{index}", session_id)
+        self._close_writers()
+
+        events = _CopyWriter(
+            self, SessionPointEvent, ("student_id", "session_id", "event_type", "transaction_id", "note"), f"session point events ({event_type})"
+        )
+        created = RewardTransaction.objects.filter(
+            session__klass__pk__range=class_range, delta=1, reason__startswith=reason
+        ).values_list("student_id", "session_id", "pk", "reason")
+        for student_id, session_id, transaction_id, note in created.iterator(chunk_size=self.chunk_size):
+            events.add(student_id, session_id, event_type, transaction_id, note)
+        self._close_writers()
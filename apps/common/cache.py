@@ -0,0 +1,132 @@
+"""
+Cache hai tầng cho dữ liệu dựng tốn kém (fragment template, danh sách dùng chung).
+
+Tầng 1 là LRU trong bộ nhớ từng process, tầng 2 là cache dùng chung ``CACHES["default"]``
+(file hoặc DB mặc định, Redis khi có ``REDIS_URL``). Khóa được đánh version theo tag: mỗi tag
+là một model (hoặc một chuỗi tùy ý) có version stamp trong ``apps.common.fragments``, đổi bởi
+signal sau khi transaction commit. Ghi vào model làm mọi khóa gắn tag đó đổi theo, nên không
+cần xóa khóa cũ; giá trị dưới một khóa đã đánh version không bao giờ đổi nên tầng process giữ
+được mà không lệch giữa các worker. Mỗi lần đọc tốn một ``get_many`` version ở cache dùng chung.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.common.fragments import bump_table_versions, table_versions
+
+CACHE_LOCAL_MAX_ENTRIES = getattr(settings, "CACHE_LOCAL_MAX_ENTRIES", 1000)
+# Giá trị trong tầng process không đổi theo khóa; giới hạn thời gian chỉ để giải phóng bộ nhớ
+CACHE_LOCAL_TIMEOUT = getattr(settings, "CACHE_LOCAL_TIMEOUT", 300)
+CACHE_DEFAULT_TIMEOUT = getattr(settings, "CACHE_DEFAULT_TIMEOUT", 60 * 60)
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """LRU có hạn dùng, an toàn giữa các thread của một process."""
+
+    def __init__(self, max_entries=CACHE_LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=CACHE_LOCAL_TIMEOUT):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalLRU()
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(result):
+    with _stats_lock:
+        _stats[result] += 1
+
+
+def cache_stats() -> dict:
+    """Số lần trúng tầng process/dùng chung và trượt của process hiện tại."""
+    with _stats_lock:
+        stats = {name: _stats[name] for name in ("local_hits", "shared_hits", "misses")}
+    lookups = sum(stats.values())
+    stats["hit_ratio"] = round((stats["local_hits"] + stats["shared_hits"]) / lookups, 3) if lookups else None
+    stats["local_entries"] = len(local_cache)
+    return stats
+
+
+def cache_prometheus() -> str:
+    stats = cache_stats()
+    lines = [
+        "# HELP steam_cache_lookups_total Two-tier cache lookups by result.",
+        "# TYPE steam_cache_lookups_total counter",
+        *(f'steam_cache_lookups_total{{result="{name}"}} {stats[name]}' for name in ("local_hits", "shared_hits", "misses")),
+        "# HELP steam_cache_local_entries Entries in the per-process LRU.",
+        "# TYPE steam_cache_local_entries gauge",
+        f"steam_cache_local_entries {stats['local_entries']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def versioned_key(namespace, tags, *parts) -> str:
+    """Khóa gồm version hiện tại của các tag; ghi vào bất kỳ tag nào sẽ đổi khóa."""
+    raw = "|".join(str(part) for part in (*table_versions(tags), *parts))
+    return f"tiered:{namespace}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def get_or_set(namespace, tags, producer, *parts, timeout=CACHE_DEFAULT_TIMEOUT):
+    """
+    Giá trị của ``producer()`` theo ``namespace``, ``tags`` (model hoặc chuỗi) và ``parts``:
+    đọc tầng process, rồi cache dùng chung, cuối cùng mới gọi ``producer``.
+    """
+    key = versioned_key(namespace, tags, *parts)
+    value = local_cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count("local_hits")
+        return value
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count("shared_hits")
+    else:
+        _count("misses")
+        value = producer()
+        cache.set(key, value, timeout)
+    local_cache.set(key, value, min(timeout, CACHE_LOCAL_TIMEOUT) if timeout else CACHE_LOCAL_TIMEOUT)
+    return value
+
+
+def invalidate_tags(*tags):
+    """Làm mới mọi khóa gắn các tag (sau khi transaction commit); dùng cho tag không phải model."""
+    bump_table_versions(*tags)
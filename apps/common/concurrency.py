@@ -0,0 +1,159 @@
+"""
+Chạy song song các khối truy vấn độc lập của một trang (dashboard) trên thread pool.
+
+Django giữ kết nối DB theo thread nên mỗi thread của pool có kết nối riêng: các aggregate độc
+lập chạy đồng thời và độ trễ trang gần bằng khối chậm nhất thay vì tổng các khối. Dùng được cả
+dưới WSGI lẫn ASGI (view đồng bộ). Mỗi khối có timeout; khối lỗi DB hoặc quá hạn trả giá trị
+dự phòng, được ghi vào ``degraded`` (và vào ``registry`` của số liệu request) để trang vẫn hiển
+thị phần còn lại. Lỗi khác (lỗi lập trình) vẫn được ném ra như khi chạy tuần tự.
+
+``Future.cancel()`` không dừng được khối đang chạy, nên trên PostgreSQL mỗi kết nối của khối
+được đặt ``statement_timeout`` bằng thời gian còn lại của khối, và truy vấn bắt đầu sau hạn bị
+chặn ngay: khối quá hạn trả thread và kết nối về pool thay vì chạy nốt.
+
+Khi kết nối ``default`` đang trong transaction (test, benchmark, ``ATOMIC_REQUESTS``) các khối
+chạy tuần tự trên kết nối hiện tại, vì kết nối khác không thấy dữ liệu chưa commit.
+
+Kết nối của thread trong pool theo ``CONN_MAX_AGE`` như kết nối của request: sau mỗi khối,
+kết nối hết hạn hoặc lỗi được đóng (``CONN_MAX_AGE=0`` thì mỗi khối mở kết nối mới; nên đặt
+``CONN_MAX_AGE`` > 0 khi chạy thật để thread giữ kết nối giữa các request).
+"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError, connections
+
+from apps.common.instrumentation import current_recorders, registry
+
+DASHBOARD_CONCURRENCY_ENABLED = getattr(settings, "DASHBOARD_CONCURRENCY_ENABLED", True)
+DASHBOARD_CONCURRENCY_WORKERS = getattr(settings, "DASHBOARD_CONCURRENCY_WORKERS", 8)
+# Giây chờ mỗi khối (tính từ lúc gửi) trước khi dùng giá trị dự phòng
+DASHBOARD_BLOCK_TIMEOUT = getattr(settings, "DASHBOARD_BLOCK_TIMEOUT", 3.0)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DASHBOARD_CONCURRENCY_WORKERS, thread_name_prefix="blocks")
+    return _executor
+
+
+class Block:
+    def __init__(self, func, *args, fallback=None, timeout=None):
+        self.func = func
+        self.args = args
+        self.fallback = fallback
+        self.timeout = timeout
+
+
+class BlockResults(dict):
+    """Kết quả theo tên khối; ``degraded`` là tên các khối đã dùng giá trị dự phòng."""
+
+    def __init__(self):
+        super().__init__()
+        self.degraded = []
+        self.concurrent = False
+
+
+class _Deadline:
+    """``execute_wrapper`` giới hạn truy vấn của một khối theo hạn chung của khối."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.limited = []
+
+    def __call__(self, execute, sql, params, many, context):
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise OperationalError("khối đã quá hạn, bỏ truy vấn")
+        connection = context["connection"]
+        if connection.vendor == "postgresql" and connection not in self.limited:
+            # Cursor gốc: không đi qua wrapper và không tính vào số liệu request
+            context["cursor"].cursor.execute(f"SET statement_timeout = {max(int(remaining * 1000), 1)}")
+            self.limited.append(connection)
+        return execute(sql, params, many, context)
+
+    def reset(self):
+        for connection in self.limited:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.cursor.execute("RESET statement_timeout")
+            except DatabaseError:
+                # Kết nối hỏng sẽ bị đóng ở _run_in_worker
+                pass
+
+
+def _run_block(block, deadline):
+    guard = _Deadline(deadline)
+    # Truy vấn của thread phụ được tính vào số liệu (và profile) của request
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(guard))
+        for recorder in current_recorders.get():
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+        try:
+            return block.func(*block.args)
+        finally:
+            guard.reset()
+
+
+def _run_in_worker(context, block, deadline):
+    try:
+        # Cùng contextvars với request (trạng thái đọc replica, recorder truy vấn)
+        return context.run(_run_block, block, deadline)
+    finally:
+        # Như close_old_connections() ở đầu/cuối mỗi request
+        for connection in connections.all(initialized_only=True):
+            connection.close_if_unusable_or_obsolete()
+
+
+def _degrade(results, name, block, error):
+    registry.record_block_error(name, error)
+    results[name] = block.fallback() if callable(block.fallback) else block.fallback
+    results.degraded.append(name)
+
+
+def run_blocks(blocks: dict, timeout=DASHBOARD_BLOCK_TIMEOUT) -> BlockResults:
+    """Chạy các ``Block`` độc lập, trả về ``BlockResults`` theo cùng tên."""
+    results = BlockResults()
+    in_transaction = connections[DEFAULT_DB_ALIAS].in_atomic_block
+    if not DASHBOARD_CONCURRENCY_ENABLED or in_transaction or len(blocks) < 2:
+        for name, block in blocks.items():
+            try:
+                results[name] = block.func(*block.args)
+            except DatabaseError as exc:
+                # Transaction đã hỏng, không thể chạy tiếp các khối khác
+                if in_transaction:
+                    raise
+                _degrade(results, name, block, exc)
+        return results
+
+    results.concurrent = True
+    executor = _get_executor()
+    started = time.monotonic()
+    futures = {
+        name: executor.submit(
+            _run_in_worker, contextvars.copy_context(), block, started + (block.timeout or timeout)
+        )
+        for name, block in blocks.items()
+    }
+    for name, future in futures.items():
+        block = blocks[name]
+        remaining = (block.timeout or timeout) - (time.monotonic() - started)
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeout as exc:
+            # Khối chưa bắt đầu thì bỏ khỏi hàng đợi; khối đang chạy dừng nhờ statement_timeout
+            future.cancel()
+            _degrade(results, name, block, exc)
+        except DatabaseError as exc:
+            _degrade(results, name, block, exc)
+    return results
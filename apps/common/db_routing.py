@@ -0,0 +1,177 @@
+"""
+Đọc từ replica cho báo cáo và dashboard.
+
+Chỉ view/khối code được đánh dấu bằng ``replica_reads`` mới đọc từ ``READ_REPLICA_ALIAS``; mọi
+truy vấn khác (và mọi thao tác ghi) vẫn dùng ``default``. Đọc quay về primary khi:
+
+- request (hoặc request trước đó của cùng trình duyệt trong ``READ_REPLICA_PIN_SECONDS``) đã ghi,
+  để người dùng luôn thấy dữ liệu mình vừa ghi;
+- đang ở trong transaction của ``default``;
+- replica trễ hơn ``READ_REPLICA_MAX_LAG`` giây hoặc không kết nối được (kiểm tra tối đa mỗi
+  ``READ_REPLICA_LAG_CHECK_INTERVAL`` giây trong mỗi process).
+"""
+
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+READ_REPLICA_ENABLED = getattr(settings, "READ_REPLICA_ENABLED", False)
+READ_REPLICA_ALIAS = getattr(settings, "READ_REPLICA_ALIAS", "replica")
+READ_REPLICA_MAX_LAG = getattr(settings, "READ_REPLICA_MAX_LAG", 10)
+READ_REPLICA_LAG_CHECK_INTERVAL = getattr(settings, "READ_REPLICA_LAG_CHECK_INTERVAL", 5)
+READ_REPLICA_PIN_SECONDS = getattr(settings, "READ_REPLICA_PIN_SECONDS", 15)
+READ_REPLICA_PIN_COOKIE = "pin_primary"
+
+LAG_SQL = (
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+)
+
+
+class _RoutingState:
+    def __init__(self, pinned=False):
+        self.replica = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+class _LagMonitor:
+    """Độ trễ replica, đo lại tối đa mỗi ``READ_REPLICA_LAG_CHECK_INTERVAL`` giây."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._healthy = False
+
+    def healthy(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < READ_REPLICA_LAG_CHECK_INTERVAL:
+                return self._healthy
+            self._checked_at = now
+        lag = replica_lag()
+        healthy = lag is not None and lag <= READ_REPLICA_MAX_LAG
+        with self._lock:
+            self._healthy = healthy
+        return healthy
+
+    def reset(self):
+        with self._lock:
+            self._checked_at = None
+
+
+lag_monitor = _LagMonitor()
+
+
+def replica_lag(alias=READ_REPLICA_ALIAS) -> float | None:
+    """Số giây replica trễ so với primary (0 nếu alias không phải standby); None khi lỗi kết nối."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        return None
+
+
+def _replica_available() -> bool:
+    return READ_REPLICA_ENABLED and READ_REPLICA_ALIAS in connections and READ_REPLICA_ALIAS != DEFAULT_DB_ALIAS
+
+
+class replica_reads(ContextDecorator):
+    """
+    Decorator/context manager cho code chỉ đọc (báo cáo, dashboard, xuất file)::
+
+        @login_required
+        @replica_reads()
+        def revenue_report(request): ...
+
+        with replica_reads():
+            rows = list(queryset)
+    """
+
+    def _recreate_cm(self):
+        # Mỗi lần gọi view đã decorate dùng một instance riêng (an toàn giữa các thread)
+        return type(self)()
+
+    def __enter__(self):
+        state = _state.get()
+        # Ngoài request (shell, management command) trạng thái chỉ sống trong khối with
+        self._token = _state.set(_RoutingState()) if state is None else None
+        state = _state.get()
+        self._previous = state.replica
+        state.replica = True
+        return self
+
+    def __exit__(self, *exc):
+        if self._token is not None:
+            _state.reset(self._token)
+        else:
+            _state.get().replica = self._previous
+        return False
+
+
+def pin_to_primary():
+    """Các lần đọc sau trong request (và vài giây sau đó) đọc từ primary."""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+        state.wrote = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica or state.pinned or not _replica_available():
+            return None
+        # Trong transaction phải đọc cùng kết nối với thao tác ghi
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if not lag_monitor.healthy():
+            return None
+        return READ_REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica là bản sao của primary nên quan hệ giữa hai alias vẫn hợp lệ
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replica nhận schema qua replication
+        return False if db == READ_REPLICA_ALIAS else None
+
+
+class ReplicaPinMiddleware:
+    """
+    Mỗi request có trạng thái định tuyến riêng. Request đã ghi (hoặc dùng method không an toàn)
+    đặt cookie ngắn hạn để các request ngay sau đó của trình duyệt vẫn đọc từ primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = bool(request.COOKIES.get(READ_REPLICA_PIN_COOKIE)) or request.method not in ("GET", "HEAD", "OPTIONS")
+        state = _RoutingState(pinned=pinned)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if READ_REPLICA_ENABLED and (state.wrote or request.method not in ("GET", "HEAD", "OPTIONS")):
+            response.set_cookie(
+                READ_REPLICA_PIN_COOKIE, "1", max_age=READ_REPLICA_PIN_SECONDS, httponly=True, samesite="Lax"
+            )
+        return response
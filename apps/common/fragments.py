@@ -0,0 +1,130 @@
+"""
+ETag cho các fragment HTMX (danh sách lọc, lịch, báo cáo).
+
+Mỗi bảng có một version stamp trong cache, đổi sau khi transaction ghi vào bảng đó commit
+(signal trong ``apps.common.signals``; thao tác hàng loạt không phát signal thì gọi
+``bump_table_versions``). ETag của fragment là hash của các version bảng mà view khai báo
+cùng đường dẫn, query đã chuẩn hóa, người dùng và ngày hiện tại, nên ``If-None-Match`` được
+trả 304 chỉ bằng một lần đọc cache, trước khi view dựng queryset hay render template.
+"""
+
+import hashlib
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.middleware.gzip import GZipMiddleware
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers, quote_etag
+
+from apps.common.utils.http import is_htmx_request
+
+FRAGMENT_ETAGS_ENABLED = getattr(settings, "FRAGMENT_ETAGS_ENABLED", True)
+# Fragment nhỏ hơn mức này không đáng nén
+FRAGMENT_GZIP_MIN_BYTES = getattr(settings, "FRAGMENT_GZIP_MIN_BYTES", 2048)
+# Tham số không ảnh hưởng nội dung (chống cache của client)
+IGNORED_QUERY_PARAMS = {"_"}
+
+
+def _label(table):
+    return table if isinstance(table, str) else table._meta.label
+
+
+def _version_key(label):
+    return f"table-version:{label}"
+
+
+def table_versions(tables) -> list[str]:
+    keys = [_version_key(_label(table)) for table in tables]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(key, version, None):
+                version = cache.get(key) or version
+        versions.append(version)
+    return versions
+
+
+def bump_table_versions(*tables):
+    """Đánh dấu các bảng đã đổi; chạy sau khi transaction commit."""
+    labels = {_label(table) for table in tables}
+    if not labels:
+        return
+    transaction.on_commit(lambda: cache.set_many({_version_key(label): uuid.uuid4().hex for label in labels}, None))
+
+
+def normalized_query(request) -> str:
+    items = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        if key not in IGNORED_QUERY_PARAMS
+        for value in values
+        if value != ""
+    )
+    return urlencode(items)
+
+
+def fragment_etag(request, tables, *extra) -> str:
+    user = request.user
+    parts = [
+        request.path,
+        normalized_query(request),
+        user.pk,
+        getattr(user, "role", ""),
+        request.headers.get("HX-Target", ""),
+        # Nhiều view mặc định theo tuần/ngày hiện tại
+        timezone.localdate().isoformat(),
+        *table_versions(tables),
+        *extra,
+    ]
+    return quote_etag(hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest())
+
+
+class _FragmentGZip(GZipMiddleware):
+    def process_response(self, request, response):
+        if response.streaming or len(response.content) < FRAGMENT_GZIP_MIN_BYTES:
+            return response
+        return super().process_response(request, response)
+
+
+_gzip = _FragmentGZip(lambda request: None)
+
+
+def _patch_headers(response):
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Cookie", "HX-Request", "HX-Target"))
+    return response
+
+
+def conditional_fragment(*tables):
+    """
+    Decorator cho view trả fragment HTMX: trả 304 khi ETag khớp, ngược lại gắn ETag và nén
+    gzip fragment lớn. Request không phải HTMX (trang đầy đủ) được chuyển thẳng cho view.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not FRAGMENT_ETAGS_ENABLED or request.method not in ("GET", "HEAD") or not is_htmx_request(request):
+                return view(request, *args, **kwargs)
+            etag = fragment_etag(request, tables, args, sorted(kwargs.items()))
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified["ETag"] = etag
+                return _patch_headers(not_modified)
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            if not response.has_header("ETag"):
+                response["ETag"] = etag
+            return _gzip.process_response(request, _patch_headers(response))
+
+        return wrapped
+
+    return decorator
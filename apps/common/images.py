@@ -0,0 +1,181 @@
+"""
+Sinh ảnh phái sinh (thumbnail) cho các ImageField đăng ký trong ``DERIVATIVE_FIELDS``.
+
+Khi upload: ảnh gốc được xoay đúng chiều theo EXIF và bỏ metadata EXIF; sau khi
+transaction commit, các bản WebP/JPEG theo ``IMAGE_DERIVATIVE_SIZES`` được ghi
+cạnh file gốc trên cùng storage, ví dụ ``avatars/abc.jpg`` -> ``avatars/abc__md.webp``.
+
+Module được load lúc khởi động (signals, template tag) nên Pillow chỉ import khi xử lý ảnh.
+"""
+
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+# Các field ảnh có sinh thumbnail: "app_label.Model.field"
+DERIVATIVE_FIELDS = (
+    "accounts.User.avatar",
+    "class_sessions.ClassSessionPhoto.image",
+    "students.StudentProduct.image",
+    "rewards.RewardItem.image",
+    "curriculum.Subject.avatar",
+    "curriculum.Module.image",
+)
+
+IMAGE_DERIVATIVE_SIZES = getattr(settings, "IMAGE_DERIVATIVE_SIZES", {"sm": 320, "md": 800, "lg": 1600})
+IMAGE_DERIVATIVE_FORMATS = getattr(settings, "IMAGE_DERIVATIVE_FORMATS", ("webp", "jpeg"))
+IMAGE_DERIVATIVE_QUALITY = getattr(settings, "IMAGE_DERIVATIVE_QUALITY", 82)
+IMAGE_DERIVATIVE_CACHE_TIMEOUT = 60 * 60 * 24
+# Số thread nền sinh thumbnail còn thiếu khi hiển thị (ảnh cũ chưa chạy generate_image_derivatives)
+IMAGE_DERIVATIVE_WORKERS = getattr(settings, "IMAGE_DERIVATIVE_WORKERS", 2)
+
+FORMAT_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+# Định dạng ảnh gốc được ghi lại sau khi xoay chiều và bỏ EXIF
+NORMALIZED_FORMATS = {"JPEG": "JPEG", "MPO": "JPEG", "PNG": "PNG", "WEBP": "WEBP"}
+
+
+def derivative_name(name: str, size: str, fmt: str = "webp") -> str:
+    root, _ = posixpath.splitext(name)
+    return f"{root}__{size}.{FORMAT_EXTENSIONS[fmt]}"
+
+
+def derivative_names(name: str) -> list[str]:
+    return [
+        derivative_name(name, size, fmt)
+        for size in IMAGE_DERIVATIVE_SIZES
+        for fmt in IMAGE_DERIVATIVE_FORMATS
+    ]
+
+
+def resolve_field(label: str):
+    app_label, model_name, field_name = label.split(".")
+    return apps.get_model(app_label, model_name)._meta.get_field(field_name)
+
+
+def normalize_upload(uploaded) -> ContentFile | None:
+    """
+    Xoay ảnh theo EXIF Orientation và ghi lại không kèm EXIF.
+    Trả về None nếu không phải ảnh hoặc định dạng không cần xử lý (GIF, ...).
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        uploaded.seek(0)
+        with Image.open(uploaded) as img:
+            fmt = NORMALIZED_FORMATS.get(img.format)
+            if not fmt:
+                return None
+            img = ImageOps.exif_transpose(img)
+            buffer = BytesIO()
+            options = {"optimize": True}
+            if fmt == "JPEG":
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                options.update(quality=90, progressive=True)
+            img.save(buffer, format=fmt, **options)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+    finally:
+        uploaded.seek(0)
+    return ContentFile(buffer.getvalue(), name=posixpath.basename(uploaded.name))
+
+
+def _render_variant(img, max_side: int, fmt: str) -> bytes:
+    from PIL import Image
+
+    variant = img.copy()
+    variant.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    if fmt == "jpeg" and variant.mode not in ("RGB", "L"):
+        background = Image.new("RGB", variant.size, (255, 255, 255))
+        if variant.mode in ("RGBA", "LA", "P"):
+            variant = variant.convert("RGBA")
+            background.paste(variant, mask=variant.split()[-1])
+        else:
+            background.paste(variant.convert("RGB"))
+        variant = background
+    buffer = BytesIO()
+    variant.save(buffer, format=fmt.upper(), quality=IMAGE_DERIVATIVE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_derivatives(storage, name: str, *, force: bool = False, check_existing: bool = True) -> list[str]:
+    """
+    Đọc ảnh gốc ``name`` một lần và ghi toàn bộ bản phái sinh lên ``storage``.
+    ``check_existing=False`` dùng cho file vừa upload (tên mới nên chưa có bản nào).
+    Trả về danh sách tên file đã ghi.
+    """
+    targets = []
+    for size, max_side in IMAGE_DERIVATIVE_SIZES.items():
+        for fmt in IMAGE_DERIVATIVE_FORMATS:
+            target = derivative_name(name, size, fmt)
+            if check_existing and storage.exists(target):
+                if not force:
+                    cache.set(_url_cache_key(target), storage.url(target), IMAGE_DERIVATIVE_CACHE_TIMEOUT)
+                    continue
+                storage.delete(target)
+            targets.append((target, max_side, fmt))
+    if not targets:
+        return []
+
+    from PIL import Image, ImageOps
+
+    written = []
+    with storage.open(name, "rb") as source, Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        img.load()
+        for target, max_side, fmt in targets:
+            saved = storage.save(target, ContentFile(_render_variant(img, max_side, fmt)))
+            written.append(saved)
+            cache.set(_url_cache_key(target), storage.url(saved), IMAGE_DERIVATIVE_CACHE_TIMEOUT)
+    return written
+
+
+def _url_cache_key(target: str) -> str:
+    return f"imgd:{target}"
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IMAGE_DERIVATIVE_WORKERS, thread_name_prefix="thumbnails")
+    return _executor
+
+
+def _generate_quietly(storage, name: str, check_existing: bool = True):
+    try:
+        generate_derivatives(storage, name, check_existing=check_existing)
+    except Exception:
+        # Lần hiển thị sau (khi khóa hết hạn) hoặc lệnh generate_image_derivatives sẽ thử lại
+        pass
+
+
+def queue_derivatives(storage, name: str, *, check_existing: bool = True):
+    """Sinh thumbnail của ``name`` ở thread nền; mỗi file chỉ xếp hàng một lần trong 120 giây."""
+    if cache.add(f"imgd-lock:{name}", 1, 120):
+        _get_executor().submit(_generate_quietly, storage, name, check_existing)
+
+
+def derivative_url(file_field, size: str, fmt: str = "webp") -> str:
+    """
+    URL của bản phái sinh đã biết (cache). Chưa có thì trả URL ảnh gốc ngay và sinh thumbnail ở
+    thread nền, không gọi storage trong lúc render. Ảnh cũ nên được sinh trước bằng
+    ``generate_image_derivatives``.
+    """
+    name = getattr(file_field, "name", None)
+    if not name:
+        return ""
+    if size not in IMAGE_DERIVATIVE_SIZES or fmt not in IMAGE_DERIVATIVE_FORMATS:
+        return file_field.url
+    url = cache.get(_url_cache_key(derivative_name(name, size, fmt)))
+    if url:
+        return url
+    queue_derivatives(file_field.storage, name)
+    return file_field.url
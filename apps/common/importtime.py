@@ -0,0 +1,111 @@
+"""
+Đo thời gian khởi động (``django.setup()`` + nạp URLconf) trong một process Python mới.
+
+Với ``python -X importtime`` mỗi module có thời gian self và cumulative theo cây import. Thời
+gian self được tính cho module dự án (``apps.<app>``, ``steam_center``) gần nhất đã kéo module
+đó vào, nên tổng theo app cho biết app nào làm worker và management command khởi động chậm.
+Module dùng chung được tính cho app import nó đầu tiên. Thư viện nặng nên import trong hàm dùng
+đến nó (xem ``apps.curriculum.views``, ``steam_center.storages``).
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# Giây tối đa cho django.setup() + URLconf trong process mới (test và --fail-over-budget)
+STARTUP_IMPORT_BUDGET = getattr(settings, "STARTUP_IMPORT_BUDGET", 2.0)
+
+FRAMEWORK = "(django và thư viện)"
+
+# Django nạp app và URLconf bằng importlib.import_module, vốn không được -X importtime ghi lại;
+# __import__ đi qua đường import của C nên module đó xuất hiện trong cây import
+_STARTUP_SCRIPT = """
+import importlib, importlib.util, json, sys, time
+
+def import_module(name, package=None):
+    if name.startswith("."):
+        name = importlib.util.resolve_name(name, package)
+    __import__(name)
+    return sys.modules[name]
+
+importlib.import_module = import_module
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}))
+"""
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def _owner(name: str) -> str | None:
+    if name.startswith("apps."):
+        return ".".join(name.split(".")[:2])
+    if name == "steam_center" or name.startswith("steam_center."):
+        return "steam_center"
+    return None
+
+
+def parse_importtime(output: str) -> list[dict]:
+    """Cây import (gốc trước) từ stderr của ``-X importtime``; thời gian tính bằng micro giây."""
+    pending = defaultdict(list)
+    roots = []
+    # Module con được in trước module cha, thụt vào thêm 2 dấu cách mỗi cấp
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        node = {
+            "name": name,
+            "self": int(self_us),
+            "cumulative": int(cumulative_us),
+            "children": pending.pop(depth + 1, []),
+        }
+        (roots if depth == 0 else pending[depth]).append(node)
+    return roots
+
+
+def summarize_imports(roots: list[dict], top: int = 15) -> dict:
+    """Tổng thời gian self theo app và các thư viện ngoài nặng nhất kèm app đã import chúng."""
+    by_app = defaultdict(int)
+    heaviest = []
+    stack = [(node, FRAMEWORK, True) for node in roots]
+    while stack:
+        node, owner, parent_is_project = stack.pop()
+        own = _owner(node["name"])
+        if own is None and parent_is_project:
+            heaviest.append((node["name"], node["cumulative"], owner))
+        owner = own or owner
+        by_app[owner] += node["self"]
+        stack.extend((child, owner, own is not None) for child in node["children"])
+    heaviest.sort(key=lambda row: -row[1])
+    return {
+        "by_app": sorted(((app, round(us / 1000, 1)) for app, us in by_app.items()), key=lambda row: -row[1]),
+        "heaviest": [(name, round(us / 1000, 1), owner) for name, us, owner in heaviest[:top]],
+    }
+
+
+def measure_startup(*, importtime: bool = True, top: int = 15) -> dict:
+    """
+    Chạy ``django.setup()`` + URLconf trong process mới; trả về ``seconds``, ``modules`` và
+    (khi ``importtime``) phân bổ theo app của ``summarize_imports``.
+    """
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", _STARTUP_SCRIPT]
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "steam_center.settings")}
+    completed = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        raise RuntimeError(f"Không khởi động được Django: {lines[-1] if lines else completed.returncode}")
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    if importtime:
+        report.update(summarize_imports(parse_importtime(completed.stderr), top=top))
+    return report
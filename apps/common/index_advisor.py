@@ -0,0 +1,254 @@
+"""
+Gợi ý index từ kế hoạch thực thi của các truy vấn thật.
+
+Chạy lại các kịch bản của ``apps.common.benchmarks`` (các view nóng theo vai trò), ghi mỗi
+fingerprint SELECT một lần kèm tham số, rồi chạy ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)``.
+Kế hoạch được đánh dấu khi có:
+
+- ``seq_scan``: quét tuần tự từ ``INDEX_ADVISOR_MIN_ROWS`` dòng trở lên;
+- ``sort``: sắp xếp từ ``INDEX_ADVISOR_MIN_ROWS`` dòng hoặc tràn ra đĩa;
+- ``misestimate``: số dòng thực tế gấp từ 10 lần ước lượng (thống kê cũ, điều kiện tương quan);
+- ``large_rows``: node ước lượng từ ``INDEX_ADVISOR_LARGE_ROWS`` dòng.
+
+Từ điều kiện lọc (cột so sánh bằng trước, cột khoảng sau) và khóa sắp xếp của cùng bảng, lệnh
+đề xuất ``models.Index`` theo tên field và cho biết index hiện có nào đã phủ các cột đó.
+"""
+
+import json
+import re
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.test.utils import override_settings
+
+from apps.common.benchmarks import SCENARIOS, pick_fixtures, run_scenario
+from apps.common.instrumentation import fingerprint
+
+INDEX_ADVISOR_MIN_ROWS = getattr(settings, "INDEX_ADVISOR_MIN_ROWS", 1000)
+INDEX_ADVISOR_LARGE_ROWS = getattr(settings, "INDEX_ADVISOR_LARGE_ROWS", 50_000)
+MISESTIMATE_FACTOR = 10
+MAX_INDEX_COLUMNS = 3
+
+# Cột (kèm alias bảng nếu có); từ khóa SQL (AND, ANY, IS NULL) viết hoa, tên hàm đứng trước "("
+_COLUMN = re.compile(r'(?:"?(\w+)"?\.)?"?\b([a-z_][a-z0-9_]*)\b"?(?!\s*\()')
+# Cột đứng trước phép so sánh bằng (kể cả ``= ANY`` của IN), có thể kèm ép kiểu:
+# ((status)::text = 'done'::text)
+_EQUALITY = re.compile(r'"?(\w+)"?\)?(?:::[\w ]+)?\)?\s*=')
+_LITERAL_OR_CAST = re.compile(r"'[^']*'|::[\w ]+(?:\[\])?")
+
+
+class _QueryCapture:
+    """``execute_wrapper`` giữ lần chạy đầu (kèm tham số) của mỗi fingerprint SELECT."""
+
+    def __init__(self):
+        self.scenario = None
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many and sql.lstrip().upper().startswith("SELECT"):
+                entry = self.queries.setdefault(
+                    fingerprint(sql), {"sql": sql, "params": params, "count": 0, "ms": 0.0, "scenarios": set()}
+                )
+                entry["count"] += 1
+                entry["ms"] += (time.perf_counter() - started) * 1000
+                entry["scenarios"].add(self.scenario)
+
+
+def capture_queries(scenarios=None, fixtures=None, using=DEFAULT_DB_ALIAS) -> dict:
+    """Fingerprint -> truy vấn mẫu của các kịch bản (một request làm nóng và một request đo)."""
+    fixtures = fixtures or pick_fixtures()
+    capture = _QueryCapture()
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        with connections[using].execute_wrapper(capture):
+            for scenario in scenarios or SCENARIOS:
+                capture.scenario = scenario.name
+                run_scenario(scenario, fixtures, repeat=1, raise_request_exception=False)
+    return capture.queries
+
+
+def analyze_tables(using=DEFAULT_DB_ALIAS):
+    """Cập nhật thống kê các bảng của dự án (trong transaction: dữ liệu seed chưa commit cũng được tính)."""
+    connection = connections[using]
+    tables = sorted({model._meta.db_table for model in apps.get_models() if model.__module__.startswith("apps.")})
+    with connection.cursor() as cursor:
+        existing = set(connection.introspection.table_names(cursor))
+        for table in tables:
+            if table not in existing:
+                continue
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+
+
+def explain(sql, params, using=DEFAULT_DB_ALIAS) -> dict | None:
+    """Kế hoạch JSON của ``EXPLAIN ANALYZE`` (truy vấn được chạy thật trong savepoint)."""
+    connection = connections[using]
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def _columns(expression: str, aliases: dict) -> list[tuple[str, str | None, bool]]:
+    """(cột, bảng nếu xác định được, là so sánh bằng) theo thứ tự xuất hiện."""
+    equalities = set(_EQUALITY.findall(expression))
+    found = []
+    for alias, column in _COLUMN.findall(_LITERAL_OR_CAST.sub("", expression)):
+        if (column, alias) not in {(name, table_alias) for name, table_alias, _ in found}:
+            found.append((column, alias or None, column in equalities))
+    return [(column, aliases.get(alias, alias), equality) for column, alias, equality in found]
+
+
+def analyze_plan(plan: dict, min_rows=INDEX_ADVISOR_MIN_ROWS, large_rows=INDEX_ADVISOR_LARGE_ROWS) -> list[dict]:
+    """Các vấn đề của một kế hoạch, mỗi vấn đề kèm bảng và các cột liên quan."""
+    root = plan["Plan"]
+    aliases = {node["Alias"]: node["Relation Name"] for node in _nodes(root) if "Relation Name" in node}
+    findings = []
+    for node in _nodes(root):
+        loops = node.get("Actual Loops", 1) or 1
+        actual = node.get("Actual Rows", 0) * loops
+        estimated = node.get("Plan Rows", 0) * loops
+        node_type = node["Node Type"]
+        if node_type == "Seq Scan":
+            scanned = actual + node.get("Rows Removed by Filter", 0) * loops
+            if scanned >= min_rows:
+                table = node["Relation Name"]
+                columns = [
+                    (column, equality)
+                    for column, owner, equality in _columns(node.get("Filter", ""), aliases)
+                    if owner in (None, table, node.get("Alias"))
+                ]
+                findings.append(
+                    {"kind": "seq_scan", "table": table, "rows": scanned, "columns": columns, "detail": node.get("Filter", "")}
+                )
+        elif node_type in ("Sort", "Incremental Sort"):
+            external = "external" in node.get("Sort Method", "").lower() or "Disk" in node.get("Sort Space Type", "")
+            if actual >= min_rows or external:
+                keys = ", ".join(node.get("Sort Key", []))
+                by_table = defaultdict(list)
+                # DISTINCT trên mọi cột cũng sinh Sort nhưng không index nào thay được
+                indexable = len(node.get("Sort Key", [])) <= MAX_INDEX_COLUMNS
+                for column, table, _equality in _columns(keys, aliases) if indexable else ():
+                    if table:
+                        by_table[table].append((column, False))
+                for table, columns in by_table.items():
+                    findings.append(
+                        {"kind": "sort", "table": table, "rows": actual, "columns": columns, "detail": keys, "external": external}
+                    )
+                if not by_table:
+                    findings.append({"kind": "sort", "table": None, "rows": actual, "columns": [], "detail": keys, "external": external})
+        # Chỉ ước lượng thấp hơn thực tế: ước lượng cao dưới LIMIT là bình thường
+        if "Actual Rows" in node and actual >= min_rows and actual >= max(estimated, 1) * MISESTIMATE_FACTOR:
+            findings.append(
+                {
+                    "kind": "misestimate",
+                    "table": node.get("Relation Name"),
+                    "rows": actual,
+                    "columns": [],
+                    "detail": f"{node_type}: ước lượng {estimated:.0f}, thực tế {actual:.0f}",
+                }
+            )
+        if estimated >= large_rows:
+            findings.append(
+                {"kind": "large_rows", "table": node.get("Relation Name"), "rows": estimated, "columns": [], "detail": node_type}
+            )
+    return findings
+
+
+def _models_by_table():
+    return {model._meta.db_table: model for model in apps.get_models(include_auto_created=True)}
+
+
+def _existing_indexes(table, using=DEFAULT_DB_ALIAS) -> dict[str, list[str]]:
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return {name: info["columns"] for name, info in constraints.items() if info["index"] or info["unique"]}
+
+
+def index_name(model, fields) -> str:
+    # Django giới hạn tên index 30 ký tự
+    return "_".join([model._meta.model_name[:12], *(field[:8] for field in fields)])[:26] + "_idx"
+
+
+def suggest_indexes(queries: dict, min_rows=INDEX_ADVISOR_MIN_ROWS, using=DEFAULT_DB_ALIAS) -> tuple[list, list]:
+    """
+    EXPLAIN từng truy vấn; trả về (chi tiết theo truy vấn, đề xuất index theo model). Đề xuất
+    gồm cột so sánh bằng, rồi cột khoảng, rồi khóa sắp xếp của cùng bảng, tối đa 3 cột.
+    """
+    models_by_table = _models_by_table()
+    existing_cache = {}
+    suggestions = {}
+    details = []
+    for entry in sorted(queries.values(), key=lambda item: item["ms"], reverse=True):
+        plan = explain(entry["sql"], entry["params"], using=using)
+        if plan is None:
+            continue
+        findings = analyze_plan(plan, min_rows=min_rows)
+        if not findings:
+            continue
+        details.append(
+            {
+                "sql": entry["sql"],
+                "scenarios": sorted(entry["scenarios"]),
+                "count": entry["count"],
+                "ms": round(entry["ms"], 2),
+                "execution_ms": plan.get("Execution Time"),
+                "findings": findings,
+            }
+        )
+        by_table = defaultdict(list)
+        for finding in findings:
+            if finding["table"] in models_by_table and finding["columns"]:
+                by_table[finding["table"]].append(finding)
+        for table, table_findings in by_table.items():
+            model = models_by_table[table]
+            columns = [c for f in table_findings if f["kind"] == "seq_scan" for c, equality in f["columns"] if equality]
+            columns += [c for f in table_findings if f["kind"] == "seq_scan" for c, equality in f["columns"] if not equality]
+            columns += [c for f in table_findings if f["kind"] == "sort" for c, _ in f["columns"]]
+            field_by_column = {field.column: field.name for field in model._meta.concrete_fields}
+            fields = list(dict.fromkeys(field_by_column[c] for c in columns if c in field_by_column))[:MAX_INDEX_COLUMNS]
+            if not fields:
+                continue
+            key = (model._meta.label, tuple(fields))
+            suggestion = suggestions.get(key)
+            if suggestion is None:
+                if table not in existing_cache:
+                    existing_cache[table] = _existing_indexes(table, using=using)
+                wanted = [model._meta.get_field(field).column for field in fields]
+                covered_by = next(
+                    (name for name, cols in existing_cache[table].items() if cols[: len(wanted)] == wanted), None
+                )
+                suggestion = suggestions[key] = {
+                    "model": model._meta.label,
+                    "fields": fields,
+                    "index": f'models.Index(fields={fields!r}, name="{index_name(model, fields)}")'.replace("'", '"'),
+                    "covered_by": covered_by,
+                    "queries": 0,
+                    "ms": 0.0,
+                    "scenarios": set(),
+                }
+            suggestion["queries"] += 1
+            suggestion["ms"] += entry["ms"]
+            suggestion["scenarios"].update(entry["scenarios"])
+    rows = sorted(suggestions.values(), key=lambda row: (row["covered_by"] is not None, -row["ms"]))
+    for row in rows:
+        row["ms"] = round(row["ms"], 2)
+        row["scenarios"] = sorted(row["scenarios"])
+    return details, rows
@@ -0,0 +1,297 @@
+"""
+Đo thời gian và số truy vấn của từng request.
+
+``RequestMetricsMiddleware`` bọc mọi kết nối DB bằng ``connection.execute_wrapper`` để đếm
+truy vấn, cộng thời gian DB và gom truy vấn theo fingerprint (SQL đã bỏ tham số, danh sách
+``IN (...)`` thu gọn). Cùng một fingerprint lặp từ ``REQUEST_METRICS_N_PLUS_ONE_THRESHOLD`` lần
+trở lên trong một request được tính là nghi N+1.
+
+Số liệu được gom trong bộ nhớ của từng process theo (view, HTMX): histogram thời gian và số
+truy vấn cho Prometheus, cùng mẫu thời gian gần nhất để tính phân vị cho trang của nhân viên.
+Có thể ghi một phần request (kèm toàn bộ truy vấn) ra file JSON lines để phân tích sau.
+Các khối dashboard phải dùng giá trị dự phòng (``apps.common.concurrency``) được đếm theo tên
+khối và loại lỗi.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from apps.common.utils.http import is_htmx_request
+
+REQUEST_METRICS_ENABLED = getattr(settings, "REQUEST_METRICS_ENABLED", True)
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = getattr(settings, "REQUEST_METRICS_N_PLUS_ONE_THRESHOLD", 5)
+# Tỉ lệ request được ghi toàn bộ truy vấn ra REQUEST_METRICS_SAMPLE_PATH (0 là tắt)
+REQUEST_METRICS_SAMPLE_RATE = getattr(settings, "REQUEST_METRICS_SAMPLE_RATE", 0.0)
+REQUEST_METRICS_SAMPLE_PATH = getattr(settings, "REQUEST_METRICS_SAMPLE_PATH", "")
+REQUEST_METRICS_RECENT_SAMPLES = getattr(settings, "REQUEST_METRICS_RECENT_SAMPLES", 500)
+# Đường dẫn không đo (chính các endpoint số liệu, static)
+REQUEST_METRICS_EXCLUDE_PREFIXES = getattr(
+    settings, "REQUEST_METRICS_EXCLUDE_PREFIXES", ("/metrics/", "/static/", "/media/")
+)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+TOP_FINGERPRINTS = 10
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """SQL không phụ thuộc tham số; Django đã tách tham số ra nên chỉ cần gộp ``IN (...)``."""
+    return _WHITESPACE.sub(" ", _IN_LIST.sub("IN (...)", sql)).strip()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` ghi nhận từng truy vấn của một request (kể cả từ thread phụ)."""
+
+    def __init__(self, keep_queries=False):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+        self.keep_queries = keep_queries
+        self.queries = []
+        self.started = time.perf_counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            key = fingerprint(sql)
+            with self._lock:
+                self.count += 1
+                self.seconds += elapsed
+                self.fingerprints[key] += 1
+                if self.keep_queries:
+                    self.queries.append(
+                        {
+                            "sql": sql,
+                            # Mốc bắt đầu tính từ lúc tạo recorder, để dựng timeline
+                            "at_ms": round((started - self.started) * 1000, 3),
+                            "ms": round(elapsed * 1000, 3),
+                            "alias": context["connection"].alias,
+                        }
+                    )
+
+    def duplicates(self, threshold=REQUEST_METRICS_N_PLUS_ONE_THRESHOLD):
+        return {sql: n for sql, n in self.fingerprints.items() if n >= threshold}
+
+
+class _Series:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.query_buckets = [0] * len(QUERY_BUCKETS)
+        self.n_plus_one = 0
+        self.suspects = Counter()
+        self.recent = deque(maxlen=REQUEST_METRICS_RECENT_SAMPLES)
+
+    def add(self, seconds, recorder, duplicates):
+        self.count += 1
+        self.seconds += seconds
+        self.db_seconds += recorder.seconds
+        self.queries += recorder.count
+        # Bucket không cộng dồn; cộng dồn khi xuất Prometheus
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        if index < len(LATENCY_BUCKETS):
+            self.latency_buckets[index] += 1
+        index = bisect_left(QUERY_BUCKETS, recorder.count)
+        if index < len(QUERY_BUCKETS):
+            self.query_buckets[index] += 1
+        if duplicates:
+            self.n_plus_one += 1
+            self.suspects.update(duplicates)
+            # Giữ số fingerprint trong giới hạn
+            if len(self.suspects) > TOP_FINGERPRINTS * 5:
+                self.suspects = Counter(dict(self.suspects.most_common(TOP_FINGERPRINTS)))
+        self.recent.append((seconds, recorder.count))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._block_errors = Counter()
+        self._last_block_error = {}
+        self.started_at = timezone.now()
+
+    def record_block_error(self, block, error):
+        with self._lock:
+            self._block_errors[(block, type(error).__name__)] += 1
+            self._last_block_error[block] = f"{type(error).__name__}: {error}"[:500]
+
+    def block_errors(self) -> list[dict]:
+        """Số lần mỗi khối dashboard dùng giá trị dự phòng, theo loại lỗi."""
+        with self._lock:
+            return [
+                {"block": block, "error": error, "count": n, "last": self._last_block_error.get(block, "")}
+                for (block, error), n in self._block_errors.most_common()
+            ]
+
+    def record(self, view, htmx, seconds, recorder, duplicates):
+        with self._lock:
+            series = self._series.get((view, htmx))
+            if series is None:
+                series = self._series[(view, htmx)] = _Series()
+            series.add(seconds, recorder, duplicates)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._block_errors.clear()
+            self._last_block_error.clear()
+            self.started_at = timezone.now()
+
+    def snapshot(self) -> list[dict]:
+        """Tóm tắt theo view, chậm nhất (p95) trước."""
+        rows = []
+        with self._lock:
+            items = [(key, series, list(series.recent)) for key, series in self._series.items()]
+        for (view, htmx), series, recent in items:
+            latencies = sorted(seconds for seconds, _ in recent)
+            rows.append(
+                {
+                    "view": view,
+                    "htmx": htmx,
+                    "count": series.count,
+                    "avg_ms": round(series.seconds / series.count * 1000, 1),
+                    "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+                    "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+                    "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+                    "avg_db_ms": round(series.db_seconds / series.count * 1000, 1),
+                    "avg_queries": round(series.queries / series.count, 1),
+                    "max_queries": max((queries for _, queries in recent), default=0),
+                    "n_plus_one_requests": series.n_plus_one,
+                    "n_plus_one_suspects": [
+                        {"sql": sql, "count": n} for sql, n in series.suspects.most_common(TOP_FINGERPRINTS)
+                    ],
+                }
+            )
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows
+
+    def prometheus(self) -> str:
+        lines = []
+
+        def histogram(name, help_text, buckets, attr, sum_attr):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (view, htmx), series in sorted(self._series.items()):
+                labels = f'view="{_escape(view)}",htmx="{str(htmx).lower()}"'
+                cumulative = 0
+                for bound, n in zip(buckets, getattr(series, attr)):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {series.count}')
+                lines.append(f"{name}_sum{{{labels}}} {getattr(series, sum_attr)}")
+                lines.append(f"{name}_count{{{labels}}} {series.count}")
+
+        def counter(name, help_text, attr):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (view, htmx), series in sorted(self._series.items()):
+                labels = f'view="{_escape(view)}",htmx="{str(htmx).lower()}"'
+                lines.append(f"{name}{{{labels}}} {getattr(series, attr)}")
+
+        with self._lock:
+            histogram("steam_request_duration_seconds", "Request wall time.", LATENCY_BUCKETS, "latency_buckets", "seconds")
+            histogram("steam_request_queries", "DB queries per request.", QUERY_BUCKETS, "query_buckets", "queries")
+            counter("steam_request_db_seconds_total", "Time spent in DB queries.", "db_seconds")
+            counter("steam_request_n_plus_one_total", "Requests with repeated query fingerprints.", "n_plus_one")
+            lines.append("# HELP steam_block_degraded_total Dashboard blocks served from their fallback.")
+            lines.append("# TYPE steam_block_degraded_total counter")
+            for (block, error), n in sorted(self._block_errors.items()):
+                lines.append(f'steam_block_degraded_total{{block="{_escape(block)}",error="{_escape(error)}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+# Các recorder của request hiện tại (số liệu, profiler), để thread phụ (apps.common.concurrency)
+# ghi cùng chỗ
+current_recorders = ContextVar("current_query_recorders", default=())
+_sample_lock = threading.Lock()
+
+
+def _write_sample(request, view, seconds, status, recorder, duplicates):
+    line = json.dumps(
+        {
+            "at": timezone.now().isoformat(),
+            "path": request.path,
+            "method": request.method,
+            "view": view,
+            "status": status,
+            "ms": round(seconds * 1000, 1),
+            "db_ms": round(recorder.seconds * 1000, 1),
+            "queries": recorder.queries,
+            "duplicates": duplicates,
+        },
+        ensure_ascii=False,
+    )
+    with _sample_lock, open(REQUEST_METRICS_SAMPLE_PATH, "a", encoding="utf-8") as handle:
+        handle.write(line + "\n")
+
+
+def view_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not REQUEST_METRICS_ENABLED or request.path.startswith(tuple(REQUEST_METRICS_EXCLUDE_PREFIXES)):
+            return self.get_response(request)
+        sampled = bool(REQUEST_METRICS_SAMPLE_PATH) and random.random() < REQUEST_METRICS_SAMPLE_RATE
+        recorder = QueryRecorder(keep_queries=sampled)
+        started = time.perf_counter()
+        token = current_recorders.set((*current_recorders.get(), recorder))
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            current_recorders.reset(token)
+        seconds = time.perf_counter() - started
+        view = view_name(request)
+        duplicates = recorder.duplicates()
+        registry.record(view, is_htmx_request(request), seconds, recorder, duplicates)
+        if sampled:
+            try:
+                _write_sample(request, view, seconds, response.status_code, recorder, duplicates)
+            except OSError:
+                # Không để việc ghi mẫu làm hỏng request
+                pass
+        return response
@@ -0,0 +1,80 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.common.benchmarks import BENCHMARK_REPEAT, SCENARIOS, compare_reports, run_benchmarks, write_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot views (latency percentiles and query counts) on a reproducible seed_db dataset. "
+        "Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=BENCHMARK_REPEAT, help="Số request đo cho mỗi kịch bản")
+        parser.add_argument("--seed", type=int, default=1, help="Seed cho seed_db")
+        parser.add_argument("--users", type=int, default=300)
+        parser.add_argument("--classes", type=int, default=30)
+        parser.add_argument("--no-seed", action="store_true", help="Đo trên dữ liệu hiện có, không chạy seed_db")
+        parser.add_argument("--only", default="", help="Tên kịch bản, phân cách bằng dấu phẩy")
+        parser.add_argument("--output", default="", help="Ghi báo cáo JSON ra file")
+        parser.add_argument("--compare", default="", help="Báo cáo JSON của commit trước để so sánh")
+        parser.add_argument("--fail-over-budget", action="store_true", help="Lỗi nếu kịch bản vượt ngân sách truy vấn")
+
+    def handle(self, *args, **options):
+        names = {name.strip() for name in options["only"].split(",") if name.strip()}
+        scenarios = [scenario for scenario in SCENARIOS if not names or scenario.name in names]
+        if names and not scenarios:
+            raise CommandError(f"Không có kịch bản nào khớp --only={options['only']}")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as handle:
+                baseline = json.load(handle)
+
+        with transaction.atomic():
+            if not options["no_seed"]:
+                self.stdout.write("Seeding dataset...")
+                call_command(
+                    "seed_db", seed=options["seed"], users=options["users"], classes=options["classes"], stdout=StringIO()
+                )
+            report = run_benchmarks(scenarios, options["repeat"])
+            # Dữ liệu seed và thao tác ghi của kịch bản không được giữ lại
+            transaction.set_rollback(True)
+        report["dataset"] = None if options["no_seed"] else {
+            "seed": options["seed"],
+            "users": options["users"],
+            "classes": options["classes"],
+        }
+
+        over_budget = []
+        for name, result in report["scenarios"].items():
+            if "skipped" in result:
+                self.stdout.write(self.style.WARNING(f"{name:32} skipped: {result['skipped']}"))
+                continue
+            line = (
+                f"{name:32} {result['status']} queries={result['queries']}/{result['budget']} "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms"
+            )
+            if result["over_budget"] or result["status"] >= 400:
+                over_budget.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if baseline:
+            self.stdout.write(f"\nSo với {baseline.get('revision') or options['compare']}:")
+            for row in compare_reports(baseline, report):
+                change = "" if row["p50_change"] is None else f" ({row['p50_change']:+}%)"
+                self.stdout.write(
+                    f"{row['scenario']:32} queries {row['queries'][0]} -> {row['queries'][1]}, "
+                    f"p50 {row['p50_ms'][0]} -> {row['p50_ms'][1]}ms{change}"
+                )
+        if options["output"]:
+            write_report(report, options["output"])
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        if over_budget and options["fail_over_budget"]:
+            raise CommandError(f"Vượt ngân sách hoặc lỗi: {', '.join(over_budget)}")
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.common.images import DERIVATIVE_FIELDS, generate_derivatives, resolve_field
+
+
+def _init_worker():
+    # Process con (fork) dùng lại app registry; đảm bảo Django đã setup với spawn
+    django.setup()
+
+
+def _process(label: str, name: str, force: bool):
+    field = resolve_field(label)
+    return len(generate_derivatives(field.storage, name, force=force))
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails for existing images in parallel (process pool)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--field", action="append", dest="fields", help="Limit to 'app_label.Model.field' (repeatable).")
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--force", action="store_true", help="Regenerate thumbnails that already exist.")
+
+    def handle(self, *args, **options):
+        labels = options["fields"] or list(DERIVATIVE_FIELDS)
+        unknown = set(labels) - set(DERIVATIVE_FIELDS)
+        if unknown:
+            raise CommandError(f"Unknown image fields: {', '.join(sorted(unknown))}")
+
+        tasks = []
+        for label in labels:
+            field = resolve_field(label)
+            names = (
+                field.model._default_manager.exclude(**{f"{field.name}__isnull": True})
+                .exclude(**{field.name: ""})
+                .values_list(field.name, flat=True)
+                .distinct()
+            )
+            tasks.extend((label, name) for name in names.iterator())
+        if not tasks:
+            self.stdout.write("No images to process.")
+            return
+
+        # Không mang kết nối DB sang process con
+        connections.close_all()
+        started = time.monotonic()
+        done = written = failed = 0
+        with ProcessPoolExecutor(max_workers=max(options["workers"], 1), initializer=_init_worker) as pool:
+            futures = {pool.submit(_process, label, name, options["force"]): name for label, name in tasks}
+            for future in as_completed(futures):
+                done += 1
+                try:
+                    written += future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {exc}")
+                if done % 100 == 0:
+                    self.stdout.write(f"{done}/{len(tasks)} images processed")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {done} images ({failed} failed), wrote {written} thumbnails "
+                f"in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} images/s)."
+            )
+        )
@@ -0,0 +1,68 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.common.benchmarks import SCENARIOS
+from apps.common.index_advisor import INDEX_ADVISOR_MIN_ROWS, analyze_tables, capture_queries, suggest_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the benchmark scenarios, run EXPLAIN (ANALYZE, BUFFERS) on every captured query fingerprint "
+        "and suggest Meta.indexes for sequential scans and large sorts. Everything runs in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1, help="Seed cho seed_db")
+        parser.add_argument("--users", type=int, default=300)
+        parser.add_argument("--classes", type=int, default=30)
+        parser.add_argument("--no-seed", action="store_true", help="Phân tích trên dữ liệu hiện có, không chạy seed_db")
+        parser.add_argument("--only", default="", help="Tên kịch bản, phân cách bằng dấu phẩy")
+        parser.add_argument("--min-rows", type=int, default=INDEX_ADVISOR_MIN_ROWS, help="Ngưỡng số dòng để đánh dấu")
+        parser.add_argument("--show-sql", action="store_true", help="In từng truy vấn bị đánh dấu")
+        parser.add_argument("--output", default="", help="Ghi báo cáo JSON ra file")
+
+    def handle(self, *args, **options):
+        names = {name.strip() for name in options["only"].split(",") if name.strip()}
+        scenarios = [scenario for scenario in SCENARIOS if not names or scenario.name in names]
+        if names and not scenarios:
+            raise CommandError(f"Không có kịch bản nào khớp --only={options['only']}")
+
+        with transaction.atomic():
+            if not options["no_seed"]:
+                self.stdout.write("Seeding dataset...")
+                call_command(
+                    "seed_db", seed=options["seed"], users=options["users"], classes=options["classes"], stdout=StringIO()
+                )
+            analyze_tables()
+            queries = capture_queries(scenarios)
+            self.stdout.write(f"Captured {len(queries)} query fingerprints, running EXPLAIN ANALYZE...")
+            details, suggestions = suggest_indexes(queries, min_rows=options["min_rows"])
+            transaction.set_rollback(True)
+
+        if options["show_sql"]:
+            for detail in details:
+                self.stdout.write(f"\n[{', '.join(detail['scenarios'])}] {detail['execution_ms']}ms x{detail['count']}")
+                self.stdout.write(f"  {detail['sql'][:300]}")
+                for finding in detail["findings"]:
+                    table = finding["table"] or "-"
+                    self.stdout.write(f"  - {finding['kind']:12} {table:36} rows={finding['rows']:.0f} {finding['detail'][:120]}")
+
+        self.stdout.write(f"\n{len(details)} truy vấn bị đánh dấu. Đề xuất index:")
+        if not suggestions:
+            self.stdout.write("  (không có)")
+        for row in suggestions:
+            line = f"  {row['model']:32} {row['index']}  # {row['queries']} truy vấn, {row['ms']}ms"
+            if row["covered_by"]:
+                self.stdout.write(f"{line} (đã có {row['covered_by']})")
+            else:
+                self.stdout.write(self.style.WARNING(line))
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                json.dump({"queries": details, "suggestions": suggestions}, handle, ensure_ascii=False, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
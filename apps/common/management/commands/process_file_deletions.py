@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.common.models import PendingFileDeletion
+from apps.common.services import (
+    FILE_DELETION_BATCH_SIZE,
+    FILE_DELETION_MAX_ATTEMPTS,
+    process_pending_deletions,
+)
+
+
+class Command(BaseCommand):
+    help = "Drain the pending media deletion queue in batches (run from cron or with --loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=FILE_DELETION_BATCH_SIZE)
+        parser.add_argument("--max-attempts", type=int, default=FILE_DELETION_MAX_ATTEMPTS)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the queue instead of exiting when empty.")
+        parser.add_argument("--interval", type=float, default=10.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        totals = {"batches": 0, "picked": 0, "deleted": 0, "failed": 0, "gave_up": 0, "seconds": 0.0}
+        try:
+            while True:
+                stats = process_pending_deletions(
+                    batch_size=options["batch_size"],
+                    max_attempts=options["max_attempts"],
+                )
+                if stats["picked"]:
+                    totals["batches"] += 1
+                    for key in ("picked", "deleted", "failed", "gave_up", "seconds"):
+                        totals[key] += stats[key]
+                    self.stdout.write(
+                        f"Batch: {stats['deleted']}/{stats['picked']} deleted, "
+                        f"{stats['failed']} failed in {stats['seconds']:.2f}s"
+                    )
+                    continue
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        rate = totals["deleted"] / totals["seconds"] if totals["seconds"] else 0
+        stuck = PendingFileDeletion.objects.filter(attempts__gte=options["max_attempts"]).count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {totals['deleted']} files in {totals['batches']} batches "
+                f"({rate:.1f} files/s), {totals['failed']} failures, {stuck} given up."
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.importtime import STARTUP_IMPORT_BUDGET, measure_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile import time of django.setup() plus URLconf loading in a fresh process "
+        "(python -X importtime), grouped by the app that pulled each module in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Số thư viện nặng nhất cần liệt kê")
+        parser.add_argument("--budget", type=float, default=STARTUP_IMPORT_BUDGET, help="Ngân sách (giây)")
+        parser.add_argument("--fail-over-budget", action="store_true", help="Lỗi nếu vượt ngân sách")
+
+    def handle(self, *args, **options):
+        try:
+            report = measure_startup(top=options["top"])
+        except RuntimeError as exc:
+            raise CommandError(str(exc)) from exc
+
+        line = f"Startup {report['seconds']:.2f}s (budget {options['budget']:.2f}s), {len(report['modules'])} modules"
+        over_budget = report["seconds"] > options["budget"]
+        self.stdout.write(self.style.ERROR(line) if over_budget else line)
+
+        self.stdout.write("\nSelf time theo app đã import:")
+        for app, ms in report["by_app"]:
+            self.stdout.write(f"  {app:32} {ms:8.1f}ms")
+        self.stdout.write("\nThư viện nặng nhất (cumulative):")
+        for name, ms, owner in report["heaviest"]:
+            self.stdout.write(f"  {name:40} {ms:8.1f}ms  <- {owner}")
+
+        if over_budget and options["fail_over_budget"]:
+            raise CommandError(f"Khởi động {report['seconds']:.2f}s vượt ngân sách {options['budget']:.2f}s")
@@ -9,6 +9,8 @@ from django.db import transaction
 from django.db.utils import IntegrityError
 from faker import Faker
 
+from apps.common.bulk_seed import BulkSeeder
+
 # Import các Factory từ app common
 from apps.common.factories import (
     CenterFactory,
@@ -28,7 +30,7 @@ from apps.enrollments.models import Enrollment, EnrollmentStatus
 from apps.attendance.models import Attendance
 from apps.assessments.models import Assessment
 from apps.rewards.models import PointAccount, RewardItem, RewardTransaction
-from apps.notifications.models import Notification
+from apps.notifications.services import notify_many
 from apps.students.models import StudentProduct
 
 # Khởi tạo Faker
@@ -42,6 +44,23 @@ class Command(BaseCommand):
         "enrollments, attendance, assessments, rewards, and notifications."
     )
 
+    ROLE_GROUPS = {
+        "ADMIN": "Admin",
+        "CENTER_MANAGER": "Center Manager",
+        "TEACHER": "Teacher",
+        "ASSISTANT": "Assistant",
+        "PARENT": "Parent",
+        "STUDENT": "Student",
+    }
+    ROLE_CODE_PREFIX = {
+        "ADMIN": "ADM",
+        "CENTER_MANAGER": "CTR",
+        "TEACHER": "TEA",
+        "ASSISTANT": "AST",
+        "PARENT": "PAR",
+        "STUDENT": "STD",
+    }
+
     ROLE_PERMISSION_MAP = {
         "ADMIN": "__all__",
         "CENTER_MANAGER": [
@@ -267,46 +286,89 @@ class Command(BaseCommand):
         parser.add_argument("--assistants_per_center", type=int, default=None, help="Số trợ giảng mỗi trung tâm (tùy chọn)")
         parser.add_argument("--students_per_center", type=int, default=None, help="Số học sinh mỗi trung tâm (tùy chọn)")
         parser.add_argument("--parents_per_center", type=int, default=None, help="Số phụ huynh mỗi trung tâm (tùy chọn)")
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Cố định random/Faker để dữ liệu sinh ra lặp lại được (ngày vẫn tính theo hôm nay).",
+        )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help=(
+                "Sinh dữ liệu lớn cho kiểm thử tải: bulk_create theo lô, không phát signal, dữ liệu dẫn xuất "
+                "(số buổi đã học, billing, điểm thưởng) tính lại bằng truy vấn tập hợp. Luôn thêm dữ liệu mới."
+            ),
+        )
+        parser.add_argument("--students_per_class", type=int, default=15, help="(--bulk) Số học sinh mỗi lớp")
+        parser.add_argument("--sessions_per_class", type=int, default=24, help="(--bulk) Số buổi học mỗi lớp")
+        parser.add_argument("--chunk_size", type=int, default=5000, help="(--bulk) Số dòng mỗi lệnh INSERT")
         parser.add_argument(
             "--sync-permissions",
             action="store_true",
             help="Gán lại quyền mặc định cho tất cả nhóm vai trò (theo ROLE_PERMISSION_MAP).",
         )
 
-    @transaction.atomic
-    def handle(self, *args, **options):
-        self.stdout.write(self.style.SUCCESS("--- Starting Database Seeding ---"))
-        today = date.today()
-
-        # === 1. TẠO NHÓM (GROUP) VAI TRÒ (Cần cho User) ===
-        ROLE_GROUPS = {
-            "ADMIN": "Admin",
-            "CENTER_MANAGER": "Center Manager",
-            "TEACHER": "Teacher",
-            "ASSISTANT": "Assistant",
-            "PARENT": "Parent",
-            "STUDENT": "Student",
-        }
-        ROLE_CODE_PREFIX = {
-            "ADMIN": "ADM",
-            "CENTER_MANAGER": "CTR",
-            "TEACHER": "TEA",
-            "ASSISTANT": "AST",
-            "PARENT": "PAR",
-            "STUDENT": "STD",
-        }
+    def _ensure_groups(self, options):
         groups_by_name = {}
         newly_created_roles = []
-        for role_code, group_name in ROLE_GROUPS.items():
+        for role_code, group_name in self.ROLE_GROUPS.items():
             group, created = Group.objects.get_or_create(name=group_name)
             groups_by_name[role_code] = group
             if created:
                 newly_created_roles.append(role_code)
-        self.stdout.write(self.style.SUCCESS(f"Ensured {len(ROLE_GROUPS)} Groups exist."))
+        self.stdout.write(self.style.SUCCESS(f"Ensured {len(self.ROLE_GROUPS)} Groups exist."))
         if options.get("sync_permissions"):
             self._assign_default_permissions(groups_by_name, force=True)
         elif newly_created_roles:
             self._assign_default_permissions(groups_by_name, target_roles=newly_created_roles, force=False)
+        return groups_by_name
+
+    def _role_counts(self, options):
+        """Số người dùng cần có theo vai trò, từ --users và các tham số theo trung tâm."""
+        total_users = options["users"]
+        centers_count = options["centers"]
+        subjects_count = options["subjects"]
+
+        counts = {
+            "ADMIN": 2,
+            "CENTER_MANAGER": centers_count,  # Mỗi trung tâm 1 quản lý
+            "TEACHER": max(10, subjects_count * 3),
+            "ASSISTANT": max(5, subjects_count * 2),
+            "PARENT": max(15, total_users // 4),
+        }
+        counts["STUDENT"] = max(20, total_users - sum(counts.values()))
+
+        for role_code, option in (
+            ("CENTER_MANAGER", "center_managers_per_center"),
+            ("TEACHER", "teachers_per_center"),
+            ("ASSISTANT", "assistants_per_center"),
+            ("PARENT", "parents_per_center"),
+            ("STUDENT", "students_per_center"),
+        ):
+            if options[option] is not None:
+                counts[role_code] = centers_count * max(0, options[option])
+        return counts
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("--- Starting Database Seeding ---"))
+        if options.get("seed") is not None:
+            random.seed(options["seed"])
+            Faker.seed(options["seed"])
+        if options["bulk"]:
+            # Mỗi lô tự commit; không bọc cả lần seed trong một transaction
+            groups_by_name = self._ensure_groups(options)
+            BulkSeeder(self, options, groups_by_name, self._role_counts(options)).run()
+            return
+        self._seed(options)
+
+    @transaction.atomic
+    def _seed(self, options):
+        today = date.today()
+        ROLE_CODE_PREFIX = self.ROLE_CODE_PREFIX
+
+        # === 1. TẠO NHÓM (GROUP) VAI TRÒ (Cần cho User) ===
+        groups_by_name = self._ensure_groups(options)
 
         # === 2. TẠO TRUNG TÂM & PHÒNG HỌC (Cần cho User, Class) ===
         centers = [CenterFactory() for _ in range(options["centers"])]
@@ -377,28 +439,7 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"Ensured {len(subjects)} Subjects, {len(all_modules)} Modules, {len(all_lessons)} Lessons (Structure: {options['modules_per_subject']}x{lessons_per_module_count})."))
 
         # === 4. TẠO NGƯỜI DÙNG (Cần cho mọi thứ khác) ===
-        total_users = options["users"]
-        centers_count = options["centers"]
-        subjects_count = options["subjects"]
-
-        admins_count = 2
-        center_managers_count = centers_count  # Mỗi trung tâm 1 quản lý
-        teachers_count = max(10, subjects_count * 3)
-        assistants_count = max(5, subjects_count * 2)
-        parents_count = max(15, total_users // 4)
-        assigned = admins_count + center_managers_count + teachers_count + assistants_count + parents_count
-        students_count = max(20, total_users - assigned)
-
-        if options["center_managers_per_center"] is not None:
-            center_managers_count = centers_count * max(0, options["center_managers_per_center"])
-        if options["teachers_per_center"] is not None:
-            teachers_count = centers_count * max(0, options["teachers_per_center"])
-        if options["assistants_per_center"] is not None:
-            assistants_count = centers_count * max(0, options["assistants_per_center"])
-        if options["parents_per_center"] is not None:
-            parents_count = centers_count * max(0, options["parents_per_center"])
-        if options["students_per_center"] is not None:
-            students_count = centers_count * max(0, options["students_per_center"])
+        role_counts = self._role_counts(options)
 
         created_users = []
         users_by_role = defaultdict(list)
@@ -459,7 +500,7 @@ class Command(BaseCommand):
                 user.save()
 
         # Nạp sẵn user đang có theo role để tránh trùng lặp khi seed lại
-        for role_code in ROLE_GROUPS.keys():
+        for role_code in self.ROLE_GROUPS.keys():
             existing = list(User.objects.filter(role=role_code))
             for user in existing:
                 _ensure_group(user, role_code)
@@ -493,12 +534,8 @@ class Command(BaseCommand):
                 created_users.append(user)
                 users_by_role[role_code].append(user)
 
-        _create_and_assign("ADMIN", admins_count, center_pool=None)
-        _create_and_assign("CENTER_MANAGER", center_managers_count, center_pool=centers) 
-        _create_and_assign("TEACHER", teachers_count, center_pool=centers)
-        _create_and_assign("ASSISTANT", assistants_count, center_pool=centers)
-        _create_and_assign("PARENT", parents_count, center_pool=centers)
-        _create_and_assign("STUDENT", students_count, center_pool=centers)
+        for role_code, count in role_counts.items():
+            _create_and_assign(role_code, count, center_pool=None if role_code == "ADMIN" else centers)
 
         for role_code, user_list in users_by_role.items():
             for user in user_list:
@@ -873,14 +910,16 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"Ensured {len(reward_items)} Reward Items, {len(point_accounts)} Point Accounts (new: {new_accounts}), {len(reward_transactions)} Reward Transactions."))
 
         # === 12. THÔNG BÁO (Depends on User) ===
-        notifications = []
         managers_and_admins = users_by_role["ADMIN"] + users_by_role["CENTER_MANAGER"]
-        for user in managers_and_admins:
-            notifications.append(Notification.objects.create(
-                user=user,
-                title="Chào mừng bạn đến với hệ thống EDS",
-                body=f"Xin chào {user.get_full_name()}, tài khoản của bạn đã sẵn sàng."
-            ))
+        notifications = notify_many(
+            (
+                user.id,
+                "Chào mừng bạn đến với hệ thống EDS",
+                f"Xin chào {user.get_full_name()}, tài khoản của bạn đã sẵn sàng.",
+                "",
+            )
+            for user in managers_and_admins
+        )
         self.stdout.write(self.style.SUCCESS(f"Created {len(notifications)} Notifications."))
 
         # === FINAL LOG ===
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view', models.CharField(blank=True, max_length=255)),
+                ('htmx', models.BooleanField(default=False)),
+                ('status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('duration_ms', models.FloatField()),
+                ('db_ms', models.FloatField(default=0)),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.fields.files import FileField
 
 
 class TimeStampedModel(models.Model):
@@ -15,3 +16,130 @@ class NamedModel(TimeStampedModel):
 
     class Meta:
         abstract = True
+
+
+class FieldTrackerMixin:
+    """
+    Ghi nhớ giá trị của các field trong ``tracked_fields`` tại thời điểm load từ DB.
+
+    Signal ``pre_save`` có thể dùng ``has_changed()``/``previous()`` để so sánh
+    giá trị cũ mà không cần truy vấn lại bản ghi. FileField được lưu theo tên file.
+    """
+
+    tracked_fields: tuple[str, ...] = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tracked_snapshot = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _tracked_raw_value(self, field_name):
+        field = self._meta.get_field(field_name)
+        value = self.__dict__[field.attname]
+        if isinstance(field, FileField):
+            return getattr(value, "name", value) or None
+        return value
+
+    def _snapshot_tracked_fields(self, fields=None):
+        for name in fields or self.tracked_fields:
+            if name not in self.tracked_fields:
+                continue
+            attname = self._meta.get_field(name).attname
+            # Field bị defer (only/defer) thì bỏ qua để không phát sinh truy vấn
+            if attname in self.__dict__:
+                self._tracked_snapshot[name] = self._tracked_raw_value(name)
+            else:
+                self._tracked_snapshot.pop(name, None)
+
+    def previous(self, field_name):
+        """Giá trị của field lúc load từ DB (None nếu là bản ghi mới)."""
+        if field_name not in self.tracked_fields:
+            raise ValueError(f"Field '{field_name}' không được theo dõi trên {type(self).__name__}.")
+        if field_name in self._tracked_snapshot:
+            return self._tracked_snapshot[field_name]
+        if self.pk is None:
+            return None
+        # Chỉ xảy ra khi field bị defer hoặc instance không được load từ DB
+        attname = self._meta.get_field(field_name).attname
+        value = (
+            type(self)._base_manager.using(self._state.db or "default")
+            .filter(pk=self.pk)
+            .values_list(attname, flat=True)
+            .first()
+        )
+        if isinstance(self._meta.get_field(field_name), FileField):
+            value = value or None
+        self._tracked_snapshot[field_name] = value
+        return value
+
+    def has_changed(self, field_name) -> bool:
+        field = self._meta.get_field(field_name)
+        if field.attname not in self.__dict__:
+            # Chưa load và chưa gán giá trị mới -> không đổi
+            return False
+        return self._tracked_raw_value(field_name) != self.previous(field_name)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        self._snapshot_tracked_fields(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_tracked_fields(fields)
+
+
+class PendingFileDeletion(models.Model):
+    """
+    Hàng đợi xóa file trên storage. Bản ghi được ghi cùng transaction với thao tác
+    xóa/thay file nên chỉ xuất hiện khi transaction commit; worker
+    ``process_file_deletions`` xóa file theo lô.
+    """
+
+    field_label = models.CharField(
+        max_length=150, help_text="Field chứa file, dạng 'app_label.Model.field'"
+    )
+    name = models.CharField(max_length=500)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=500, blank=True)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["next_attempt_at", "id"]
+
+    def __str__(self):
+        return f"{self.field_label}: {self.name}"
+
+
+class RequestProfile(models.Model):
+    """
+    Profile một request do nhân viên yêu cầu (``apps.common.profiler``): bảng hàm của cProfile,
+    stack dạng collapsed cho flame graph, thời gian render từng template và timeline SQL.
+    """
+
+    user = models.ForeignKey(
+        "accounts.User", null=True, blank=True, on_delete=models.SET_NULL, related_name="request_profiles"
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=255, blank=True)
+    htmx = models.BooleanField(default=False)
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_ms = models.FloatField()
+    db_ms = models.FloatField(default=0)
+    query_count = models.PositiveIntegerField(default=0)
+    size_bytes = models.PositiveIntegerField(default=0)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f}ms)"
@@ -0,0 +1,213 @@
+"""
+Phân trang keyset (cursor) cho các danh sách lớn.
+
+Thay vì ``COUNT(*)`` + ``OFFSET`` như ``Paginator``, trang kế tiếp được lọc theo giá trị
+các cột sắp xếp của dòng cuối trang trước, nên trang sâu nhanh như trang đầu.
+Thứ tự sắp xếp phải kết thúc bằng một cột duy nhất (thường là ``id``).
+
+Cursor là chuỗi đã ký (``django.core.signing``): client không đọc hay sửa được.
+Cột có thể NULL được hỗ trợ theo thứ tự mặc định của PostgreSQL
+(ASC: NULL cuối, DESC: NULL đầu).
+"""
+
+import datetime
+import json
+from decimal import Decimal
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+
+CURSOR_SALT = "common.pagination.cursor"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, datetime.date):
+        return ["d", value.isoformat()]
+    if isinstance(value, datetime.time):
+        return ["t", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["dec", str(value)]
+    return value
+
+
+def _decode_value(value):
+    if not isinstance(value, list):
+        return value
+    tag, raw = value
+    return {
+        "dt": datetime.datetime.fromisoformat,
+        "d": datetime.date.fromisoformat,
+        "t": datetime.time.fromisoformat,
+        "dec": Decimal,
+    }[tag](raw)
+
+
+def _field_value(obj, path):
+    for part in path.split("__"):
+        if obj is None:
+            return None
+        obj = getattr(obj, part)
+    return obj
+
+
+def _reverse(ordering):
+    return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+
+
+def _after(field, value):
+    """Điều kiện 'đứng sau ``value``' cho một cột theo hướng sắp xếp của nó."""
+    desc = field.startswith("-")
+    name = field.lstrip("-")
+    if value is None:
+        # ASC: NULL đứng cuối nên không có gì sau; DESC: NULL đứng đầu, mọi giá trị khác đứng sau
+        return Q(**{f"{name}__isnull": False}) if desc else None
+    if desc:
+        return Q(**{f"{name}__lt": value})
+    return Q(**{f"{name}__gt": value}) | Q(**{f"{name}__isnull": True})
+
+
+def _equal(field, value):
+    name = field.lstrip("-")
+    if value is None:
+        return Q(**{f"{name}__isnull": True})
+    return Q(**{name: value})
+
+
+def keyset_filter(ordering, values) -> Q:
+    """(a, b, c) > (va, vb, vc) theo từng hướng sắp xếp, viết dạng OR của các tiền tố bằng nhau."""
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for field, value in zip(ordering, values):
+        after = _after(field, value)
+        if after is not None:
+            condition |= prefix & after
+        prefix &= _equal(field, value)
+    return condition
+
+
+def estimate_count(queryset) -> int | None:
+    """Số dòng ước lượng theo thống kê của planner (EXPLAIN), không chạy COUNT(*)."""
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        return None
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, *, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def estimated_total(self):
+        return self.paginator.estimated_total
+
+
+class CursorPaginator:
+    """
+    ``CursorPaginator(qs, per_page, ordering=("-date", "-start_time", "id")).page(cursor)``.
+
+    ``cursor`` là token lấy từ ``page.next_cursor``/``page.previous_cursor``; token rỗng
+    hoặc không hợp lệ trả về trang đầu.
+    """
+
+    def __init__(self, queryset, per_page, ordering, *, estimate_total=False):
+        self.ordering = tuple(ordering)
+        self.queryset = queryset
+        self.per_page = max(1, int(per_page))
+        self.estimate_total = estimate_total
+        self._estimated_total = None
+
+    @property
+    def estimated_total(self):
+        if self.estimate_total and self._estimated_total is None:
+            self._estimated_total = estimate_count(self.queryset)
+        return self._estimated_total
+
+    def _make_cursor(self, obj, direction):
+        values = [_encode_value(_field_value(obj, field.lstrip("-"))) for field in self.ordering]
+        return signing.dumps({"v": values, "d": direction}, salt=CURSOR_SALT, compress=True)
+
+    def _read_cursor(self, token):
+        if not token:
+            return None, "n"
+        try:
+            data = signing.loads(token, salt=CURSOR_SALT)
+            values = [_decode_value(v) for v in data["v"]]
+            if len(values) != len(self.ordering) or data["d"] not in ("n", "p"):
+                raise ValueError
+            return values, data["d"]
+        except Exception:
+            return None, "n"
+
+    def page(self, token=None) -> CursorPage:
+        values, direction = self._read_cursor(token)
+        ordering = self.ordering if direction == "n" else _reverse(self.ordering)
+        qs = self.queryset.order_by(*ordering)
+        if values is not None:
+            qs = qs.filter(keyset_filter(ordering, values))
+        rows = list(qs[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if direction == "p":
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=self._make_cursor(rows[-1], "n") if rows and has_next else None,
+            previous_cursor=self._make_cursor(rows[0], "p") if rows and has_previous else None,
+        )
+
+
+def cursor_paginate(request, queryset, ordering, *, default_per_page=10, estimate_total=True):
+    """
+    Phân trang theo ``?cursor=`` và ``?per_page=`` của request.
+    Trả về (page_obj, per_page, current_query_params) — query params đã bỏ cursor/page.
+    """
+    try:
+        per_page = int(request.GET.get("per_page", default_per_page))
+        if per_page <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        per_page = default_per_page
+    per_page = min(per_page, 500)
+
+    paginator = CursorPaginator(queryset, per_page, ordering, estimate_total=estimate_total)
+    page_obj = paginator.page(request.GET.get("cursor"))
+
+    params = request.GET.copy()
+    params._mutable = True
+    params.pop("cursor", None)
+    params.pop("page", None)
+    return page_obj, per_page, params.urlencode()
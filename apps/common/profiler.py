@@ -0,0 +1,283 @@
+"""
+Profile theo yêu cầu cho nhân viên, để đo trang chậm với đúng phạm vi dữ liệu của người báo.
+
+Request của nhân viên có header ``X-Profile: 1`` hoặc tham số ``?_profile=1`` chạy dưới
+``cProfile``. ``?_profile=on`` đặt cookie để các request sau đó, kể cả partial HTMX (không mang
+tham số của trang), cũng được profile cho tới ``?_profile=off`` hoặc khi cookie hết hạn.
+
+Mỗi profile gồm bảng hàm, stack dạng collapsed (flamegraph.pl, speedscope), thời gian render
+từng template và timeline SQL, lưu vào ``RequestProfile``; response có header ``X-Profile-Id``.
+Mỗi profile tối đa ``PROFILER_MAX_BYTES`` (bỏ bớt phần nhỏ nhất), tổng tối đa
+``PROFILER_MAX_PROFILES`` profile và ``PROFILER_MAX_TOTAL_BYTES`` (xóa profile cũ nhất).
+
+Mỗi process chỉ chạy được một cProfile cùng lúc: request trùng thời điểm được phục vụ bình
+thường kèm ``X-Profile-Skipped``. Từ Python 3.12 cProfile ghi mọi thread của process, nên khối
+chạy trên thread pool (dashboard) có trong profile, và cả request khác chạy song song nếu có.
+"""
+
+import cProfile
+import json
+import pstats
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import reverse
+
+from apps.common.instrumentation import REQUEST_METRICS_EXCLUDE_PREFIXES, QueryRecorder, current_recorders, view_name
+from apps.common.models import RequestProfile
+from apps.common.utils.http import is_htmx_request
+
+PROFILER_ENABLED = getattr(settings, "PROFILER_ENABLED", True)
+PROFILER_MAX_PROFILES = getattr(settings, "PROFILER_MAX_PROFILES", 200)
+PROFILER_MAX_BYTES = getattr(settings, "PROFILER_MAX_BYTES", 2 * 1024 * 1024)
+PROFILER_MAX_TOTAL_BYTES = getattr(settings, "PROFILER_MAX_TOTAL_BYTES", 50 * 1024 * 1024)
+PROFILER_COOKIE_SECONDS = getattr(settings, "PROFILER_COOKIE_SECONDS", 30 * 60)
+PROFILER_TOP_FUNCTIONS = getattr(settings, "PROFILER_TOP_FUNCTIONS", 300)
+# Bỏ các stack nhỏ hơn ngưỡng này (ms) khi dựng collapsed stacks
+PROFILER_MIN_STACK_MS = getattr(settings, "PROFILER_MIN_STACK_MS", 0.2)
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "X-Profile"
+PROFILE_COOKIE = "profile_requests"
+
+_MAX_STACK_DEPTH = 200
+_MAX_STACK_NODES = 50_000
+
+_profiler_lock = threading.Lock()
+_profile_state = ContextVar("request_profile_state", default=None)
+
+
+class _ProfileState:
+    def __init__(self, started):
+        self.started = started
+        self.stack = []
+        self.templates = []
+
+
+def _install_template_hook():
+    """Bọc ``Template._render`` một lần; chỉ đo khi request hiện tại đang được profile."""
+    from django.template.base import Template
+
+    if getattr(Template._render, "_request_profiler", False):
+        return
+    original = Template._render
+
+    def _render(self, context):
+        state = _profile_state.get()
+        if state is None:
+            return original(self, context)
+        begin = time.perf_counter()
+        entry = {
+            "name": self.name or getattr(self.origin, "name", None) or "<string>",
+            "depth": len(state.stack),
+            "start_ms": round((begin - state.started) * 1000, 3),
+            "children_ms": 0.0,
+        }
+        state.stack.append(entry)
+        try:
+            return original(self, context)
+        finally:
+            ms = (time.perf_counter() - begin) * 1000
+            state.stack.pop()
+            entry["ms"] = round(ms, 3)
+            entry["self_ms"] = round(ms - entry.pop("children_ms"), 3)
+            if state.stack:
+                state.stack[-1]["children_ms"] += ms
+            state.templates.append(entry)
+
+    _render._request_profiler = True
+    Template._render = _render
+
+
+def _function_label(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name
+    for marker in ("site-packages/", f"{settings.BASE_DIR}/"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    # Dấu ";" phân cách frame trong định dạng collapsed
+    return f"{name} ({filename}:{line})".replace(";", ",")
+
+
+def function_table(stats: dict, limit: int = PROFILER_TOP_FUNCTIONS) -> list[dict]:
+    rows = [
+        {
+            "function": _function_label(func),
+            "calls": nc,
+            "primitive_calls": cc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3),
+        }
+        for func, (cc, nc, tt, ct, _callers) in stats.items()
+    ]
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+def collapsed_stacks(stats: dict, min_ms: float = PROFILER_MIN_STACK_MS) -> list[str]:
+    """
+    Stack dạng ``a;b;c <micro giây>`` cho flame graph. cProfile chỉ lưu cạnh caller -> callee nên
+    thời gian của một hàm được chia cho các đường gọi theo tỉ lệ thời gian qua từng caller.
+    """
+    callees = defaultdict(list)
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+    folded = Counter()
+    visited = 0
+
+    def walk(func, path, share):
+        nonlocal visited
+        visited += 1
+        _cc, _nc, tottime, _cumtime, _callers = stats[func]
+        path = [*path, func]
+        self_us = tottime * share * 1_000_000
+        if self_us >= min_ms * 1000:
+            folded[";".join(_function_label(frame) for frame in path)] += self_us
+        if len(path) >= _MAX_STACK_DEPTH:
+            return
+        for callee, edge_cumtime in callees.get(func, ()):
+            callee_cumtime = stats[callee][3]
+            if callee in path or not callee_cumtime or visited >= _MAX_STACK_NODES:
+                continue
+            callee_share = edge_cumtime * share / callee_cumtime
+            if callee_cumtime * callee_share * 1000 >= min_ms:
+                walk(callee, path, callee_share)
+
+    roots = [func for func, row in stats.items() if not row[4]]
+    for root in sorted(roots, key=lambda func: stats[func][3], reverse=True):
+        walk(root, [], 1.0)
+    return [f"{stack} {round(us)}" for stack, us in folded.most_common()]
+
+
+def _fit(data: dict, max_bytes: int) -> int:
+    """Bỏ dần nửa nhỏ nhất của từng phần cho tới khi vừa ``max_bytes``; trả về kích thước."""
+    size = len(json.dumps(data, ensure_ascii=False).encode())
+    while size > max_bytes:
+        lists = [key for key in ("collapsed", "queries", "functions", "templates") if len(data[key]) > 1]
+        if not lists:
+            break
+        # Phần chiếm nhiều chỗ nhất được cắt trước
+        key = max(lists, key=lambda name: len(json.dumps(data[name], ensure_ascii=False)))
+        if key == "queries":
+            keep = sorted(data["queries"], key=lambda query: query["ms"], reverse=True)[: len(data["queries"]) // 2]
+            data["queries"] = sorted(keep, key=lambda query: query["at_ms"])
+        else:
+            data[key] = data[key][: len(data[key]) // 2]
+        data["truncated"] = True
+        size = len(json.dumps(data, ensure_ascii=False).encode())
+    return size
+
+
+def prune_profiles():
+    """Giữ tối đa ``PROFILER_MAX_PROFILES`` profile mới nhất trong ``PROFILER_MAX_TOTAL_BYTES``."""
+    total = 0
+    stale = []
+    rows = RequestProfile.objects.order_by("-created_at", "-id").values_list("pk", "size_bytes")
+    for index, (pk, size) in enumerate(rows):
+        total += size
+        if index >= PROFILER_MAX_PROFILES or total > PROFILER_MAX_TOTAL_BYTES:
+            stale.append(pk)
+    if stale:
+        RequestProfile.objects.filter(pk__in=stale).delete()
+
+
+def save_profile(request, response, seconds, profiler, recorder, state) -> RequestProfile:
+    stats = pstats.Stats(profiler).stats
+    data = {
+        "functions": function_table(stats),
+        "collapsed": collapsed_stacks(stats),
+        "templates": sorted(state.templates, key=lambda entry: entry["start_ms"]),
+        "queries": recorder.queries,
+        "duplicates": recorder.duplicates(),
+        "truncated": False,
+    }
+    size = _fit(data, PROFILER_MAX_BYTES)
+    profile = RequestProfile.objects.create(
+        user=request.user if request.user.is_authenticated else None,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view=view_name(request)[:255],
+        htmx=is_htmx_request(request),
+        status=getattr(response, "status_code", None),
+        duration_ms=round(seconds * 1000, 3),
+        db_ms=round(recorder.seconds * 1000, 3),
+        query_count=recorder.count,
+        size_bytes=size,
+        data=data,
+    )
+    prune_profiles()
+    return profile
+
+
+class RequestProfilerMiddleware:
+    """Đặt sau ``AuthenticationMiddleware``; request không bật profile chỉ tốn vài phép so sánh."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        flag = request.GET.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER, "")
+        if (
+            not PROFILER_ENABLED
+            or not (flag or request.COOKIES.get(PROFILE_COOKIE))
+            or request.path.startswith(tuple(REQUEST_METRICS_EXCLUDE_PREFIXES))
+            or not request.user.is_staff
+        ):
+            return self.get_response(request)
+        if flag in ("off", "0"):
+            response = self.get_response(request)
+            response.delete_cookie(PROFILE_COOKIE)
+            return response
+        response = self._profile(request)
+        if flag == "on":
+            response.set_cookie(PROFILE_COOKIE, "1", max_age=PROFILER_COOKIE_SECONDS, httponly=True, samesite="Lax")
+        return response
+
+    def _profile(self, request):
+        if not _profiler_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response["X-Profile-Skipped"] = "busy"
+            return response
+        try:
+            _install_template_hook()
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Công cụ profile khác (coverage, debugger) đang chạy
+                response = self.get_response(request)
+                response["X-Profile-Skipped"] = "busy"
+                return response
+            recorder = QueryRecorder(keep_queries=True)
+            state = _ProfileState(recorder.started)
+            state_token = _profile_state.set(state)
+            recorders_token = current_recorders.set((*current_recorders.get(), recorder))
+            try:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(recorder))
+                    response = self.get_response(request)
+            finally:
+                profiler.disable()
+                current_recorders.reset(recorders_token)
+                _profile_state.reset(state_token)
+            seconds = time.perf_counter() - recorder.started
+        finally:
+            _profiler_lock.release()
+
+        try:
+            profile = save_profile(request, response, seconds, profiler, recorder, state)
+        except DatabaseError:
+            response["X-Profile-Skipped"] = "error"
+            return response
+        response["X-Profile-Id"] = str(profile.pk)
+        response["X-Profile-Url"] = reverse("common:request_profile_detail", args=[profile.pk])
+        return response
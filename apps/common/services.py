@@ -0,0 +1,170 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.models import PendingFileDeletion
+
+FILE_DELETION_BATCH_SIZE = getattr(settings, "FILE_DELETION_BATCH_SIZE", 100)
+FILE_DELETION_MAX_ATTEMPTS = getattr(settings, "FILE_DELETION_MAX_ATTEMPTS", 5)
+FILE_DELETION_RETRY_BASE_SECONDS = getattr(settings, "FILE_DELETION_RETRY_BASE_SECONDS", 30)
+
+
+# Field mà nhiều bản ghi có thể trỏ chung một file: nhập chương trình học khử trùng lặp file đính
+# kèm theo SHA-256 (apps.curriculum.importer). File của các field này chỉ được xóa khi không còn
+# bản ghi nào trỏ tới.
+SHARED_FILE_FIELDS = (
+    "curriculum.Subject.avatar",
+    "curriculum.Module.image",
+    "curriculum.Lecture.file",
+    "curriculum.Exercise.file",
+)
+
+
+def field_label(instance, field_name: str) -> str:
+    opts = instance._meta
+    return f"{opts.app_label}.{opts.object_name}.{field_name}"
+
+
+def file_in_use(name: str, exclude=None) -> bool:
+    """Còn bản ghi nào của ``SHARED_FILE_FIELDS`` (ngoài instance ``exclude``) trỏ tới file ``name``."""
+    for label in SHARED_FILE_FIELDS:
+        app_label, model_name, field_name = label.split(".")
+        model = apps.get_model(app_label, model_name)
+        rows = model._default_manager.filter(**{field_name: name})
+        if isinstance(exclude, model) and exclude.pk is not None:
+            rows = rows.exclude(pk=exclude.pk)
+        if rows.exists():
+            return True
+    return False
+
+
+def shared_file_in_use(instance, field_name: str, name: str) -> bool:
+    """File ``name`` của field dùng chung vẫn được bản ghi khác (ngoài ``instance``) dùng."""
+    return field_label(instance, field_name) in SHARED_FILE_FIELDS and file_in_use(name, exclude=instance)
+
+
+def queue_file_deletion(instance, field_name: str, name: str | None = None, check_shared: bool = True) -> None:
+    """
+    Đưa file của ``instance.<field_name>`` (hoặc tên file ``name``) vào hàng đợi xóa.
+
+    Bản ghi được tạo trong transaction hiện tại: nếu transaction rollback thì file
+    không bị xóa. Ngoài atomic block (autocommit) bản ghi commit ngay, nên file bị thay trong
+    ``save()`` phải đi qua ``defer_file_deletion`` để chỉ xếp hàng sau khi lưu thành công.
+    Không gọi storage trên request thread. File của field dùng chung chỉ
+    được xếp hàng khi không còn bản ghi khác trỏ tới (``check_shared=False`` khi người gọi
+    đã kiểm tra, ví dụ với thumbnail của file gốc).
+    """
+    if name is None:
+        file_field = getattr(instance, field_name, None)
+        name = getattr(file_field, "name", None)
+    if not name:
+        return
+    if check_shared and shared_file_in_use(instance, field_name, name):
+        return
+    PendingFileDeletion.objects.create(
+        field_label=field_label(instance, field_name),
+        name=name,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def defer_file_deletion(instance, field_name: str, name: str | None) -> None:
+    """
+    Gọi từ ``pre_save``: ghi nhớ file cũ ``name`` bị thay; ``queue_deferred_file_deletions``
+    (post_save) mới xếp hàng xóa. Save lỗi thì post_save không chạy nên file cũ vẫn còn.
+    """
+    if name:
+        instance.__dict__.setdefault("_deferred_file_deletions", {})[(field_name, name)] = None
+
+
+def queue_deferred_file_deletions(instance) -> None:
+    for field_name, name in instance.__dict__.pop("_deferred_file_deletions", {}):
+        queue_file_deletion(instance, field_name, name)
+
+
+def _storage_for(label: str):
+    try:
+        app_label, model_name, field_name = label.split(".")
+        return apps.get_model(app_label, model_name)._meta.get_field(field_name).storage
+    except (LookupError, ValueError):
+        return default_storage
+
+
+def _delete_names(storage, names: list[str]) -> dict[str, str]:
+    """Xóa một lô file; trả về {name: lỗi} cho các file xóa thất bại."""
+    delete_many = getattr(storage, "delete_many", None)
+    if delete_many is not None:
+        try:
+            return delete_many(names)
+        except Exception as exc:
+            return {name: str(exc) for name in names}
+
+    errors = {}
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as exc:
+            errors[name] = str(exc)
+    return errors
+
+
+def process_pending_deletions(
+    batch_size: int = FILE_DELETION_BATCH_SIZE,
+    max_attempts: int = FILE_DELETION_MAX_ATTEMPTS,
+) -> dict:
+    """
+    Lấy một lô bản ghi đến hạn và xóa file theo từng storage.
+    File xóa lỗi được hẹn lại với backoff lũy thừa cho tới ``max_attempts``.
+    Trả về số liệu của lô: picked, deleted, failed, gave_up, seconds.
+    """
+    started = time.monotonic()
+    stats = {"picked": 0, "deleted": 0, "failed": 0, "gave_up": 0, "seconds": 0.0}
+    now = timezone.now()
+
+    with transaction.atomic():
+        rows = list(
+            PendingFileDeletion.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now, attempts__lt=max_attempts)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        stats["picked"] = len(rows)
+
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[row.field_label].append(row)
+
+        done_ids = []
+        failed_rows = []
+        for label, group in grouped.items():
+            errors = _delete_names(_storage_for(label), [row.name for row in group])
+            for row in group:
+                error = errors.get(row.name)
+                if error is None:
+                    done_ids.append(row.pk)
+                    continue
+                row.attempts += 1
+                row.last_error = error[:500]
+                row.next_attempt_at = now + timedelta(
+                    seconds=FILE_DELETION_RETRY_BASE_SECONDS * 2 ** (row.attempts - 1)
+                )
+                failed_rows.append(row)
+                if row.attempts >= max_attempts:
+                    stats["gave_up"] += 1
+
+        if done_ids:
+            PendingFileDeletion.objects.filter(pk__in=done_ids).delete()
+        if failed_rows:
+            PendingFileDeletion.objects.bulk_update(
+                failed_rows, ["attempts", "last_error", "next_attempt_at"]
+            )
+
+    stats["deleted"] = len(done_ids)
+    stats["failed"] = len(failed_rows)
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    return stats
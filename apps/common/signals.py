@@ -0,0 +1,105 @@
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from apps.common.fragments import bump_table_versions
+from apps.common.images import DERIVATIVE_FIELDS, derivative_names, normalize_upload, queue_derivatives
+from apps.common.services import queue_deferred_file_deletions, queue_file_deletion, shared_file_in_use
+
+
+def _derivative_fields_by_model():
+    fields = defaultdict(list)
+    for label in DERIVATIVE_FIELDS:
+        app_label, model_name, field_name = label.split(".")
+        fields[apps.get_model(app_label, model_name)].append(field_name)
+    return fields
+
+
+def _queue_derivative_deletion(instance, field_name: str, name: str | None):
+    if not name or shared_file_in_use(instance, field_name, name):
+        return
+    for derived in derivative_names(name):
+        queue_file_deletion(instance, field_name, derived, check_shared=False)
+
+
+def _generate_after_commit(storage, name: str):
+    # Sinh ở thread nền sau commit để không giữ request; lỗi thì thumbnail được sinh lười khi hiển thị
+    transaction.on_commit(lambda: queue_derivatives(storage, name, check_existing=False))
+
+
+def image_normalize_on_upload(sender, instance, **kwargs):
+    pending, replaced = [], []
+    for field_name in DERIVATIVE_FIELDS_BY_MODEL.get(sender, ()):
+        file = getattr(instance, field_name)
+        if not file or file._committed:
+            continue
+        normalized = normalize_upload(file.file)
+        if normalized is not None:
+            setattr(instance, field_name, normalized)
+        pending.append(field_name)
+        if instance.pk:
+            # Thumbnail của ảnh cũ chỉ xếp hàng xóa sau khi save thành công
+            replaced.append((field_name, instance.previous(field_name)))
+    instance._pending_derivative_fields = pending
+    instance._replaced_derivative_sources = replaced
+
+
+def image_derivatives_on_save(sender, instance, **kwargs):
+    for field_name, name in getattr(instance, "_replaced_derivative_sources", ()):
+        _queue_derivative_deletion(instance, field_name, name)
+    instance._replaced_derivative_sources = []
+    for field_name in getattr(instance, "_pending_derivative_fields", ()):
+        file = getattr(instance, field_name)
+        if file and file.name:
+            _generate_after_commit(file.storage, file.name)
+    instance._pending_derivative_fields = []
+
+
+def image_derivatives_on_delete(sender, instance, **kwargs):
+    for field_name in DERIVATIVE_FIELDS_BY_MODEL.get(sender, ()):
+        _queue_derivative_deletion(instance, field_name, getattr(getattr(instance, field_name), "name", None))
+
+
+DERIVATIVE_FIELDS_BY_MODEL = _derivative_fields_by_model()
+
+for _model in DERIVATIVE_FIELDS_BY_MODEL:
+    pre_save.connect(image_normalize_on_upload, sender=_model, dispatch_uid=f"image_normalize_{_model._meta.label}")
+    post_save.connect(image_derivatives_on_save, sender=_model, dispatch_uid=f"image_derivatives_{_model._meta.label}")
+    post_delete.connect(image_derivatives_on_delete, sender=_model, dispatch_uid=f"image_cleanup_{_model._meta.label}")
+
+
+def deferred_file_deletions_on_save(sender, instance, **kwargs):
+    queue_deferred_file_deletions(instance)
+
+
+post_save.connect(deferred_file_deletions_on_save, dispatch_uid="deferred_file_deletions_on_save")
+
+
+# Version bảng cho ETag fragment (apps.common.fragments). Session và lần đăng nhập đổi liên tục
+# nhưng không ảnh hưởng nội dung fragment nên bỏ qua.
+UNVERSIONED_TABLES = {"sessions.Session", "admin.LogEntry"}
+
+
+def table_version_on_save(sender, update_fields=None, **kwargs):
+    if sender._meta.label in UNVERSIONED_TABLES:
+        return
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    bump_table_versions(sender)
+
+
+def table_version_on_delete(sender, **kwargs):
+    if sender._meta.label not in UNVERSIONED_TABLES:
+        bump_table_versions(sender)
+
+
+def table_version_on_m2m(sender, instance, action, model, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_table_versions(sender, type(instance), model)
+
+
+post_save.connect(table_version_on_save, dispatch_uid="table_version_on_save")
+post_delete.connect(table_version_on_delete, dispatch_uid="table_version_on_delete")
+m2m_changed.connect(table_version_on_m2m, dispatch_uid="table_version_on_m2m")
@@ -0,0 +1,66 @@
+from django import template
+from django.template.base import token_kwargs
+
+from apps.common.cache import get_or_set
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, tags, vary_on, timeout):
+        self.nodelist = nodelist
+        self.name = name
+        self.tags = tags
+        self.vary_on = vary_on
+        self.timeout = timeout
+
+    def render(self, context):
+        tags = self.tags.resolve(context)
+        if isinstance(tags, str):
+            tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        kwargs = {"timeout": int(self.timeout.resolve(context))} if self.timeout else {}
+        return get_or_set(
+            f"fragment:{self.name.resolve(context)}", tags, lambda: self.nodelist.render(context), *vary_on, **kwargs
+        )
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Cache hai tầng cho một đoạn template, làm mới khi các model trong ``tags`` thay đổi::
+
+        {% cachedfragment "sidebar" "accounts.User,auth.Group" user.pk request.path timeout=600 %}
+            ...
+        {% endcachedfragment %}
+
+    ``tags`` là chuỗi nhãn model cách nhau bởi dấu phẩy hoặc danh sách (xem ``form_models``);
+    các tham số còn lại phân biệt bản cache (người dùng, đường dẫn...).
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' cần ít nhất tên fragment và tags.")
+    nodelist = parser.parse(("endcachedfragment",))
+    parser.delete_first_token()
+    remaining = bits[3:]
+    timeout = None
+    if remaining and remaining[-1].startswith("timeout="):
+        timeout = token_kwargs([remaining.pop()], parser)["timeout"]
+    return CachedFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in remaining],
+        timeout,
+    )
+
+
+@register.filter
+def form_models(form):
+    """Nhãn các model cung cấp lựa chọn cho form (select center, subject...), dùng làm tags."""
+    labels = set()
+    for field in getattr(form, "fields", {}).values():
+        queryset = getattr(field, "queryset", None)
+        if queryset is not None:
+            labels.add(queryset.model._meta.label)
+    return sorted(labels)
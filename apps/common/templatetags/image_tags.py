@@ -0,0 +1,18 @@
+from django import template
+
+from apps.common.images import derivative_url
+
+register = template.Library()
+
+
+@register.filter(name="thumbnail")
+def thumbnail(file_field, spec: str = "md") -> str:
+    """
+    URL thumbnail của một ImageField, ví dụ ``{{ photo.image|thumbnail:"sm" }}``
+    hoặc ``{{ photo.image|thumbnail:"md.jpeg" }}`` (mặc định WebP).
+    Trả về URL ảnh gốc nếu chưa sinh được thumbnail.
+    """
+    if not file_field:
+        return ""
+    size, _, fmt = (spec or "md").partition(".")
+    return derivative_url(file_field, size, fmt or "webp")
@@ -1,3 +1,933 @@
-from django.test import TestCase
+import datetime
+import json
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.db import DatabaseError, IntegrityError, OperationalError, connection, connections
+from PIL import Image
+
+from apps.accounts.models import ParentStudentRelation, User
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.billing.models import BillingEntry
+from apps.centers.models import Center
+from apps.class_sessions.models import ClassSession
+from apps.classes.models import Class, ClassAssistant, ClassSchedule
+from apps.common.concurrency import Block, run_blocks
+from apps.common.cache import cache_stats, get_or_set, local_cache, reset_cache_stats
+from apps.common.db_routing import READ_REPLICA_PIN_COOKIE, ReplicaPinMiddleware, lag_monitor, replica_reads
+from apps.common.benchmarks import SCENARIOS, compare_reports, pick_fixtures, run_scenario
+from apps.common.images import derivative_name, derivative_names, derivative_url, generate_derivatives
+from apps.common.index_advisor import _columns, analyze_plan, suggest_indexes
+from apps.common.importtime import STARTUP_IMPORT_BUDGET, measure_startup, parse_importtime, summarize_imports
+from apps.common.instrumentation import QueryRecorder, RequestMetricsMiddleware, fingerprint, registry
+from apps.common.factories import CenterFactory, ClassSessionFactory, KlassFactory, SubjectFactory, UserFactory
+from apps.common.fragments import bump_table_versions, fragment_etag, table_versions
+from apps.common.models import PendingFileDeletion, RequestProfile
+from apps.curriculum.models import Lesson, Module
+from apps.enrollments.models import Enrollment, EnrollmentStatus
+from apps.common.pagination import CursorPaginator
+from apps.common.profiler import PROFILE_COOKIE, _fit, collapsed_stacks, prune_profiles
+from apps.rewards.models import PointAccount, RewardItem, RewardTransaction, SessionPointEvent, SessionPointEventType
+from apps.common.services import process_pending_deletions
+
+
+class FieldTrackerMixinTests(TestCase):
+	def setUp(self):
+		Center.objects.create(name="Center A", code="CA", avatar="center_avatars/old.png")
+
+	def test_previous_uses_snapshot_without_query(self):
+		center = Center.objects.get(code="CA")
+		center.avatar = "center_avatars/new.png"
+		with self.assertNumQueries(0):
+			self.assertTrue(center.has_changed("avatar"))
+			self.assertEqual(center.previous("avatar"), "center_avatars/old.png")
+
+	def test_save_queues_replaced_file_without_extra_select(self):
+		center = Center.objects.get(code="CA")
+		center.avatar = "center_avatars/new.png"
+		# UPDATE + INSERT vào hàng đợi xóa, không SELECT lại bản ghi
+		with self.assertNumQueries(2):
+			center.save()
+		self.assertEqual(
+			list(PendingFileDeletion.objects.values_list("name", flat=True)),
+			["center_avatars/old.png"],
+		)
+		self.assertFalse(center.has_changed("avatar"))
+		self.assertEqual(center.previous("avatar"), "center_avatars/new.png")
+
+	def test_unchanged_file_is_kept(self):
+		center = Center.objects.get(code="CA")
+		center.name = "Center A1"
+		center.save()
+		self.assertFalse(PendingFileDeletion.objects.exists())
+
+	def test_deferred_field_falls_back_to_single_query(self):
+		center = Center.objects.only("name").get(code="CA")
+		center.avatar = ""
+		with self.assertNumQueries(1):
+			self.assertEqual(center.previous("avatar"), "center_avatars/old.png")
+		self.assertTrue(center.has_changed("avatar"))
+
+
+class ReplacedFileQueueTests(TransactionTestCase):
+	# Autocommit thật như view: không có atomic block bao quanh save()
+
+	def test_failed_save_does_not_queue_replaced_file(self):
+		Center.objects.create(name="Center B", code="CB")
+		center = Center.objects.create(name="Center A", code="CA", avatar="center_avatars/old.png")
+		center.avatar = "center_avatars/new.png"
+		center.code = "CB"
+		with self.assertRaises(IntegrityError):
+			center.save()
+		self.assertFalse(PendingFileDeletion.objects.exists())
+
+		center.code = "CA"
+		center.save()
+		self.assertEqual(list(PendingFileDeletion.objects.values_list("name", flat=True)), ["center_avatars/old.png"])
+
+
+class PendingFileDeletionTests(TestCase):
+	def setUp(self):
+		self.center = Center.objects.create(name="Center A", code="CA", avatar="center_avatars/a.png")
+		self.storage = Center._meta.get_field("avatar").storage
+
+	def test_rolled_back_delete_does_not_queue_file(self):
+		try:
+			with transaction.atomic():
+				self.center.delete()
+				raise RuntimeError
+		except RuntimeError:
+			pass
+		self.assertFalse(PendingFileDeletion.objects.exists())
+
+	def test_worker_deletes_in_batch(self):
+		Center.objects.create(name="Center B", code="CB", avatar="center_avatars/b.png")
+		Center.objects.all().delete()
+		with mock.patch.object(self.storage, "delete_many", create=True, return_value={}) as delete_many:
+			stats = process_pending_deletions(batch_size=10)
+		delete_many.assert_called_once()
+		self.assertCountEqual(delete_many.call_args.args[0], ["center_avatars/a.png", "center_avatars/b.png"])
+		self.assertEqual(stats["deleted"], 2)
+		self.assertFalse(PendingFileDeletion.objects.exists())
+
+	def test_failed_delete_is_retried_later(self):
+		self.center.delete()
+		with mock.patch.object(
+			self.storage, "delete_many", create=True, return_value={"center_avatars/a.png": "HTTP 503"}
+		):
+			stats = process_pending_deletions(max_attempts=3)
+		self.assertEqual(stats["failed"], 1)
+		row = PendingFileDeletion.objects.get()
+		self.assertEqual(row.attempts, 1)
+		self.assertEqual(row.last_error, "HTTP 503")
+		# Chưa tới hạn retry nên lô kế tiếp không lấy lại
+		self.assertEqual(process_pending_deletions()["picked"], 0)
+
+
+def _jpeg_with_orientation(width=400, height=200, orientation=6):
+	buffer = BytesIO()
+	exif = Image.Exif()
+	exif[0x0112] = orientation
+	Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, format="JPEG", exif=exif)
+	return buffer.getvalue()
+
+
+class ImageDerivativeTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		self.storage = FileSystemStorage(location=self.media_root, base_url="/media/")
+		patcher = mock.patch.object(RewardItem._meta.get_field("image"), "storage", self.storage)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def _create_item(self, executor=None):
+		upload = SimpleUploadedFile("gift.jpg", _jpeg_with_orientation(), content_type="image/jpeg")
+		if executor is None:
+			# Chạy job nền ngay trong test
+			executor = mock.Mock(submit=lambda job, *args: job(*args))
+		with mock.patch("apps.common.images._get_executor", return_value=executor):
+			with self.captureOnCommitCallbacks(execute=True):
+				return RewardItem.objects.create(name="Gift", cost=10, image=upload)
+
+	def test_upload_is_auto_oriented_and_stripped(self):
+		item = self._create_item()
+		with self.storage.open(item.image.name) as fh, Image.open(fh) as img:
+			self.assertEqual(img.size, (200, 400))
+			self.assertNotIn(0x0112, img.getexif())
+
+	def test_upload_writes_derivatives_next_to_original(self):
+		executor = mock.Mock()
+		item = self._create_item(executor)
+		# Commit chỉ xếp hàng job, không sinh thumbnail trên thread của request
+		self.assertFalse(any(self.storage.exists(name) for name in derivative_names(item.image.name)))
+		job, *args = executor.submit.call_args.args
+		job(*args)
+		for name in derivative_names(item.image.name):
+			self.assertTrue(self.storage.exists(name), name)
+		with self.storage.open(derivative_name(item.image.name, "sm")) as fh, Image.open(fh) as img:
+			self.assertEqual(img.format, "WEBP")
+			self.assertEqual(max(img.size), 320)
+
+	def test_thumbnail_filter_queues_missing_derivative(self):
+		self.storage.save("reward_items/old.jpg", BytesIO(_jpeg_with_orientation(orientation=1)))
+		RewardItem.objects.bulk_create([RewardItem(name="Old", cost=1, image="reward_items/old.jpg")])
+		item = RewardItem.objects.get(name="Old")
+		template = Template('{% load image_tags %}{{ item.image|thumbnail:"md.jpeg" }}')
+
+		# Lúc render không gọi storage: trả ảnh gốc và sinh thumbnail ở thread nền
+		with mock.patch.object(self.storage, "exists", side_effect=AssertionError("storage call")), mock.patch(
+			"apps.common.images._get_executor"
+		) as executor:
+			rendered = template.render(Context({"item": item}))
+			template.render(Context({"item": item}))
+		self.assertEqual(rendered, "/media/reward_items/old.jpg")
+		executor.return_value.submit.assert_called_once()
+
+		# Job nền ghi thumbnail và cache URL cho lần render sau
+		job, *args = executor.return_value.submit.call_args.args
+		job(*args)
+		self.assertTrue(self.storage.exists("reward_items/old__md.webp"))
+		self.assertEqual(template.render(Context({"item": item})), "/media/reward_items/old__md.jpg")
+
+	def test_existing_derivatives_are_cached_without_regenerating(self):
+		item = self._create_item()
+		cache.clear()
+		self.assertEqual(generate_derivatives(self.storage, item.image.name), [])
+		self.assertEqual(derivative_url(item.image, "sm"), self.storage.url(derivative_name(item.image.name, "sm")))
+
+	def test_delete_queues_original_derivatives(self):
+		item = self._create_item()
+		item.delete()
+		self.assertCountEqual(
+			PendingFileDeletion.objects.values_list("name", flat=True),
+			derivative_names(item.image.name),
+		)
+
+
+class CursorPaginatorTests(TestCase):
+	ordering = ("-date", "start_time", "id")
+
+	@classmethod
+	def setUpTestData(cls):
+		klass = KlassFactory()
+		times = [datetime.time(8), None, datetime.time(10)]
+		for day in range(1, 5):
+			for start in times:
+				ClassSessionFactory(klass=klass, date=datetime.date(2024, 1, day), start_time=start)
+		# Ngày NULL đứng đầu khi sắp xếp giảm dần
+		ClassSessionFactory(klass=klass, date=None, start_time=None)
+		cls.expected = list(ClassSession.objects.order_by(*cls.ordering).values_list("id", flat=True))
+
+	def _walk(self, per_page):
+		paginator = CursorPaginator(ClassSession.objects.all(), per_page, self.ordering)
+		pages = [paginator.page()]
+		while pages[-1].has_next():
+			pages.append(paginator.page(pages[-1].next_cursor))
+		return paginator, pages
+
+	def test_forward_walk_matches_full_ordering(self):
+		for per_page in (1, 4, 5, 13, 50):
+			_, pages = self._walk(per_page)
+			ids = [obj.id for page in pages for obj in page]
+			self.assertEqual(ids, self.expected, per_page)
+			self.assertFalse(pages[0].has_previous())
+
+	def test_backward_walk_returns_same_pages(self):
+		paginator, pages = self._walk(4)
+		page = pages[-1]
+		seen = [[obj.id for obj in page]]
+		while page.has_previous():
+			page = paginator.page(page.previous_cursor)
+			seen.insert(0, [obj.id for obj in page])
+		self.assertEqual(seen, [[obj.id for obj in p] for p in pages])
+
+	def test_page_runs_single_query_without_count(self):
+		paginator, pages = self._walk(4)
+		with self.assertNumQueries(1) as ctx:
+			paginator.page(pages[1].next_cursor)
+		sql = ctx.captured_queries[0]["sql"].upper()
+		self.assertNotIn("COUNT(", sql)
+		self.assertNotIn("OFFSET", sql)
+
+	def test_tampered_cursor_falls_back_to_first_page(self):
+		paginator, pages = self._walk(4)
+		page = paginator.page(pages[1].next_cursor[:-2] + "xx")
+		self.assertEqual([obj.id for obj in page], self.expected[:4])
+
+	def test_estimated_total_uses_planner(self):
+		paginator = CursorPaginator(ClassSession.objects.all(), 4, self.ordering, estimate_total=True)
+		self.assertIsInstance(paginator.page().estimated_total, int)
+
+
+class FragmentETagTests(TestCase):
+	url = reverse_lazy("class_sessions:manage_class_sessions")
+
+	def setUp(self):
+		cache.clear()
+		self.admin = UserFactory(role="ADMIN", is_superuser=True, is_staff=True)
+		klass = KlassFactory()
+		for day in range(1, 6):
+			ClassSessionFactory(klass=klass, date=datetime.date(2024, 1, day))
+		self.client.force_login(self.admin)
+
+	def _get(self, params=None, **headers):
+		return self.client.get(self.url, params or {}, HTTP_HX_REQUEST="true", **headers)
+
+	def test_not_modified_skips_view_work(self):
+		etag = self._get()["ETag"]
+		with CaptureQueriesContext(connection) as ctx:
+			response = self._get(HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 304)
+		self.assertFalse(any("class_sessions_classsession" in q["sql"] for q in ctx.captured_queries))
+
+	def test_write_changes_etag(self):
+		etag = self._get()["ETag"]
+		with self.captureOnCommitCallbacks(execute=True):
+			ClassSessionFactory(date=datetime.date(2024, 2, 1))
+		self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+		# Thao tác hàng loạt không phát signal thì gọi bump_table_versions
+		etag = self._get()["ETag"]
+		with self.captureOnCommitCallbacks(execute=True):
+			ClassSession.objects.update(status="DONE")
+			bump_table_versions(ClassSession)
+		self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+	def test_login_does_not_change_versions(self):
+		before = table_versions(["accounts.User"])
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.login(username=self.admin.username, password="password123")
+		self.assertEqual(table_versions(["accounts.User"]), before)
+
+	def test_query_is_normalized_and_scoped_to_user(self):
+		factory = RequestFactory()
+		first = factory.get(self.url, {"status": "PLANNED", "klass": "", "group_by": "date"})
+		second = factory.get(self.url, {"group_by": "date", "_": "123", "status": "PLANNED"})
+		first.user = second.user = self.admin
+		self.assertEqual(fragment_etag(first, ["class_sessions.ClassSession"]), fragment_etag(second, ["class_sessions.ClassSession"]))
+		second.user = UserFactory()
+		self.assertNotEqual(fragment_etag(first, ["class_sessions.ClassSession"]), fragment_etag(second, ["class_sessions.ClassSession"]))
+
+	def test_full_page_is_untouched_and_large_fragments_are_gzipped(self):
+		self.assertFalse(self.client.get(self.url).has_header("ETag"))
+		response = self._get(HTTP_ACCEPT_ENCODING="gzip")
+		self.assertEqual(response["Content-Encoding"], "gzip")
+		self.assertIn("HX-Request", response["Vary"])
+
+
+class TieredCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		local_cache.clear()
+		reset_cache_stats()
+		self.calls = 0
+
+	def _produce(self):
+		self.calls += 1
+		return f"value-{self.calls}"
+
+	def test_local_then_shared_then_producer(self):
+		self.assertEqual(get_or_set("demo", [Center], self._produce, 1), "value-1")
+		self.assertEqual(get_or_set("demo", [Center], self._produce, 1), "value-1")
+		# Worker khác: tầng process trống, đọc từ cache dùng chung
+		local_cache.clear()
+		self.assertEqual(get_or_set("demo", [Center], self._produce, 1), "value-1")
+		self.assertEqual(get_or_set("demo", [Center], self._produce, 2), "value-2")
+		stats = cache_stats()
+		self.assertEqual((stats["local_hits"], stats["shared_hits"], stats["misses"]), (1, 1, 2))
+
+	def test_write_to_tagged_model_invalidates(self):
+		get_or_set("demo", [Center, "curriculum.Subject"], self._produce)
+		with self.captureOnCommitCallbacks(execute=True):
+			SubjectFactory()
+		self.assertEqual(get_or_set("demo", [Center, "curriculum.Subject"], self._produce), "value-2")
+
+	def test_lru_evicts_oldest(self):
+		local_cache.max_entries = 2
+		self.addCleanup(setattr, local_cache, "max_entries", local_cache.max_entries)
+		for key in ("a", "b", "c"):
+			local_cache.set(key, key)
+		self.assertIsNone(local_cache.get("a"))
+		self.assertEqual(local_cache.get("c"), "c")
+
+	def test_fragment_tag_caches_until_tagged_model_changes(self):
+		template = Template(
+			'{% load cache_tags %}{% cachedfragment "centers" "centers.Center" %}'
+			"{% for center in centers %}{{ center.name }};{% endfor %}{% endcachedfragment %}"
+		)
+		CenterFactory(name="A")
+		context = {"centers": Center.objects.order_by("name")}
+		self.assertEqual(template.render(Context(context)), "A;")
+		with self.assertNumQueries(0):
+			self.assertEqual(template.render(Context({"centers": Center.objects.order_by("name")})), "A;")
+		with self.captureOnCommitCallbacks(execute=True):
+			CenterFactory(name="B")
+		self.assertEqual(template.render(Context({"centers": Center.objects.order_by("name")})), "A;B;")
+
+	def test_sidebar_is_cached_per_user_and_page(self):
+		self.client.force_login(UserFactory(role="ADMIN", is_superuser=True, is_staff=True))
+		url = reverse("common:dashboard")
+		self.client.get(url)
+		self.assertEqual(cache_stats()["misses"], 1)
+		self.client.get(url)
+		self.assertEqual(cache_stats()["local_hits"], 1)
+		self.client.force_login(UserFactory(role="TEACHER"))
+		self.client.get(url)
+		self.assertEqual(cache_stats()["misses"], 2)
+
+	def test_password_reset_rate_limit_counts_in_shared_cache(self):
+		url = reverse("accounts:password_reset")
+		with mock.patch("apps.accounts.views.PASSWORD_RESET_RATE_LIMIT", 2):
+			for _ in range(3):
+				self.client.post(url, {"identifier": "nobody@example.com"})
+		self.assertEqual(cache.get("pwd-reset-rate:127.0.0.1"), 2)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+	# "replica" là mirror của default khi chạy test: hai kết nối tới cùng database test.
+	# TransactionTestCase vì TestCase bọc default trong transaction (router đọc từ primary).
+	databases = {"default", "replica"}
+
+	def setUp(self):
+		patcher = mock.patch("apps.common.db_routing.READ_REPLICA_ENABLED", True)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		lag_monitor.reset()
+		self.addCleanup(lag_monitor.reset)
+		CenterFactory()
+
+	def _aliases(self, func):
+		recorder = QueryRecorder(keep_queries=True)
+		with connections["default"].execute_wrapper(recorder), connections["replica"].execute_wrapper(recorder):
+			func()
+		return {query["alias"] for query in recorder.queries if "centers_center" in query["sql"]}
+
+	def _count(self):
+		return Center.objects.count()
+
+	def test_marked_reads_go_to_replica(self):
+		self.assertEqual(self._aliases(self._count), {"default"})
+		self.assertEqual(self._aliases(replica_reads()(self._count)), {"replica"})
+
+	def test_write_pins_request_to_primary(self):
+		def write_then_read():
+			with replica_reads():
+				self._count()
+				CenterFactory()
+				self._count()
+
+		recorder = QueryRecorder(keep_queries=True)
+		with connections["default"].execute_wrapper(recorder), connections["replica"].execute_wrapper(recorder):
+			write_then_read()
+		aliases = [query["alias"] for query in recorder.queries if query["sql"].startswith("SELECT COUNT")]
+		self.assertEqual(aliases, ["replica", "default"])
+
+	def test_transaction_and_lag_fall_back_to_primary(self):
+		def in_transaction():
+			with transaction.atomic(), replica_reads():
+				self._count()
+
+		self.assertEqual(self._aliases(in_transaction), {"default"})
+		for lag in (60.0, None):
+			lag_monitor.reset()
+			with mock.patch("apps.common.db_routing.replica_lag", return_value=lag):
+				self.assertEqual(self._aliases(replica_reads()(self._count)), {"default"})
+
+	def test_middleware_pins_following_requests_after_write(self):
+		factory = RequestFactory()
+
+		@replica_reads()
+		def view(request):
+			if request.method == "POST":
+				CenterFactory()
+			self._count()
+			return HttpResponse("ok")
+
+		middleware = ReplicaPinMiddleware(view)
+		response = middleware(factory.post("/x/"))
+		self.assertIn(READ_REPLICA_PIN_COOKIE, response.cookies)
+		self.assertEqual(self._aliases(lambda: middleware(factory.get("/x/"))), {"replica"})
+		pinned = factory.get("/x/")
+		pinned.COOKIES[READ_REPLICA_PIN_COOKIE] = "1"
+		self.assertEqual(self._aliases(lambda: middleware(pinned)), {"default"})
+
+
+class ConcurrentBlocksTests(TransactionTestCase):
+	# Khối chạy trên kết nối riêng của thread nên dữ liệu phải được commit thật
+
+	def _slow_count(self, seconds=0.3):
+		time.sleep(seconds)
+		return Center.objects.count()
+
+	def test_independent_blocks_overlap(self):
+		CenterFactory()
+		started = time.monotonic()
+		results = run_blocks({"a": Block(self._slow_count), "b": Block(self._slow_count)})
+		self.assertLess(time.monotonic() - started, 0.55)
+		self.assertTrue(results.concurrent)
+		self.assertEqual((results["a"], results["b"]), (1, 1))
+
+	def test_timeout_and_error_degrade_gracefully(self):
+		registry.reset()
+		self.addCleanup(registry.reset)
+
+		def broken():
+			raise OperationalError("mất kết nối")
+
+		results = run_blocks(
+			{
+				"slow": Block(self._slow_count, 0.5, fallback=-1, timeout=0.1),
+				"broken": Block(broken, fallback=list),
+				"ok": Block(Center.objects.count),
+			}
+		)
+		self.assertEqual((results["slow"], results["broken"], results["ok"]), (-1, [], 0))
+		self.assertEqual(sorted(results.degraded), ["broken", "slow"])
+		errors = {row["block"]: row for row in registry.block_errors()}
+		self.assertEqual((errors["broken"]["error"], errors["broken"]["last"]), ("OperationalError", "OperationalError: mất kết nối"))
+		self.assertEqual(errors["slow"]["error"], "TimeoutError")
+		self.assertIn('steam_block_degraded_total{block="broken",error="OperationalError"} 1', registry.prometheus())
+
+	def test_programming_errors_are_not_hidden(self):
+		def broken():
+			raise ValueError("boom")
+
+		with self.assertRaises(ValueError):
+			run_blocks({"broken": Block(broken), "ok": Block(Center.objects.count)})
+
+	def test_timed_out_query_is_cancelled(self):
+		finished = threading.Event()
+		outcome = {}
+
+		def sleepy():
+			try:
+				with connection.cursor() as cursor:
+					cursor.execute("SELECT pg_sleep(5)")
+			except DatabaseError as exc:
+				outcome["error"] = exc
+				raise
+			finally:
+				finished.set()
+
+		results = run_blocks({"sleepy": Block(sleepy, timeout=0.2), "ok": Block(Center.objects.count)})
+		self.assertEqual(results.degraded, ["sleepy"])
+		# statement_timeout hủy truy vấn ở phía DB thay vì để thread chờ hết 5 giây
+		self.assertTrue(finished.wait(2))
+		self.assertIsInstance(outcome["error"], OperationalError)
+
+	def test_runs_inline_inside_transaction(self):
+		with transaction.atomic():
+			CenterFactory()
+			results = run_blocks({"a": Block(Center.objects.count), "b": Block(Center.objects.count)})
+		self.assertFalse(results.concurrent)
+		self.assertEqual(results["a"], 1)
+
+	def test_parent_dashboard_assembles_blocks(self):
+		today = timezone.localdate()
+		parent = UserFactory(role="PARENT")
+		klass = KlassFactory()
+		for _ in range(2):
+			student = UserFactory(role="STUDENT")
+			ParentStudentRelation.objects.create(parent=parent, student=student)
+			Enrollment.objects.create(klass=klass, student=student, status=EnrollmentStatus.ACTIVE, sessions_purchased=4)
+		session = ClassSessionFactory(klass=klass, date=today)
+		Attendance.objects.create(session=session, student=student, status="P")
+		self.client.force_login(parent)
+		response = self.client.get(reverse("common:dashboard"))
+		self.assertEqual(response.context["dashboard_degraded"], [])
+		rows = response.context["parent_schedule"]
+		self.assertEqual(len(rows), 2)
+		# Chỉ con đã điểm danh có trạng thái "Có mặt"
+		self.assertEqual([row["status_badge"] for row in rows].count("success"), 1)
+
+
+IMPORTTIME_SAMPLE = """import time: self [us] | cumulative | imported package
+import time:      1000 |       1000 |     numpy.core
+import time:      4000 |       5000 |   pandas
+import time:       500 |       5500 | apps.curriculum.views
+import time:       300 |        300 |   django.utils
+import time:       200 |        500 | django
+"""
+
+
+class StartupImportTests(SimpleTestCase):
+	def test_self_time_is_attributed_to_importing_app(self):
+		summary = summarize_imports(parse_importtime(IMPORTTIME_SAMPLE))
+		by_app = dict(summary["by_app"])
+		self.assertEqual(by_app["apps.curriculum"], 5.5)
+		self.assertEqual(by_app["(django và thư viện)"], 0.5)
+		self.assertEqual(summary["heaviest"][0], ("pandas", 5.0, "apps.curriculum"))
+
+	def test_startup_within_budget_without_heavy_dependencies(self):
+		report = measure_startup(importtime=False)
+		self.assertLessEqual(report["seconds"], STARTUP_IMPORT_BUDGET)
+		# Chỉ import khi view/tác vụ cần đến
+		for module in ("pandas", "PIL", "openpyxl", "google.cloud.storage", "google.oauth2", "weasyprint"):
+			self.assertNotIn(module, report["modules"])
+
+
+class RequestMetricsTests(TestCase):
+	def setUp(self):
+		registry.reset()
+		self.addCleanup(registry.reset)
+		self.factory = RequestFactory()
+
+	def _run(self, handler, path="/x/"):
+		request = self.factory.get(path)
+		return RequestMetricsMiddleware(handler)(request)
+
+	def test_fingerprint_collapses_in_lists(self):
+		self.assertEqual(
+			fingerprint('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s)'),
+			fingerprint('SELECT 1 FROM "t"\n WHERE "id" IN (%s)'),
+		)
+
+	def test_repeated_query_is_flagged(self):
+		def loop(request):
+			for pk in range(6):
+				Center.objects.filter(pk=pk).exists()
+			return HttpResponse("ok")
+
+		self._run(loop)
+		self._run(lambda request: HttpResponse("ok"))
+		(row,) = registry.snapshot()
+		self.assertEqual(row["view"], "<unresolved>")
+		self.assertEqual(row["count"], 2)
+		self.assertEqual(row["max_queries"], 6)
+		self.assertEqual(row["n_plus_one_requests"], 1)
+		self.assertIn("centers_center", row["n_plus_one_suspects"][0]["sql"])
+
+	def test_excluded_paths_not_recorded(self):
+		self._run(lambda request: HttpResponse("ok"), path="/static/app.css")
+		self.assertEqual(registry.snapshot(), [])
+
+	def test_prometheus_format(self):
+		self._run(lambda request: HttpResponse("ok"))
+		text = registry.prometheus()
+		self.assertIn("# TYPE steam_request_duration_seconds histogram", text)
+		self.assertIn('steam_request_queries_bucket{view="<unresolved>",htmx="false",le="+Inf"} 1', text)
+		self.assertIn('steam_request_n_plus_one_total{view="<unresolved>",htmx="false"} 0', text)
+
+	def test_endpoints_require_staff_or_token(self):
+		self.client.force_login(UserFactory(role="TEACHER"))
+		self.client.get(reverse("common:dashboard"))
+		self.assertEqual(self.client.get(reverse("common:request_metrics")).status_code, 403)
+		self.assertEqual(self.client.get(reverse("common:prometheus_metrics")).status_code, 403)
+
+		self.client.force_login(UserFactory(role="ADMIN", is_staff=True))
+		response = self.client.get(reverse("common:request_metrics"))
+		self.assertEqual(response.status_code, 200)
+		self.assertIn("common:dashboard", [row["view"] for row in response.json()["views"]])
+
+		self.client.logout()
+		with self.settings(REQUEST_METRICS_TOKEN="secret"):
+			response = self.client.get(reverse("common:prometheus_metrics"), HTTP_AUTHORIZATION="Bearer secret")
+			self.assertEqual(response.status_code, 200)
+			self.assertIn('view="common:dashboard"', response.content.decode())
+			response = self.client.get(reverse("common:prometheus_metrics"), HTTP_AUTHORIZATION="Bearer wrong")
+			self.assertEqual(response.status_code, 403)
+
+	def test_sampled_requests_written_as_json_lines(self):
+		directory = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, directory)
+		path = f"{directory}/requests.jsonl"
+		with mock.patch.multiple(
+			"apps.common.instrumentation", REQUEST_METRICS_SAMPLE_RATE=1, REQUEST_METRICS_SAMPLE_PATH=path
+		):
+			self._run(lambda request: HttpResponse(str(Center.objects.count())))
+		with open(path, encoding="utf-8") as handle:
+			(sample,) = [json.loads(line) for line in handle]
+		self.assertEqual(sample["path"], "/x/")
+		self.assertEqual(len(sample["queries"]), 1)
+
+
+class RequestProfilerTests(TestCase):
+	def setUp(self):
+		self.staff = UserFactory(role="ADMIN", is_staff=True)
+
+	def test_staff_request_is_profiled_with_templates_and_sql(self):
+		self.client.force_login(self.staff)
+		response = self.client.get(reverse("common:dashboard"), {"_profile": "1"})
+		profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+		self.assertEqual(profile.view, "common:dashboard")
+		self.assertEqual(profile.user, self.staff)
+		self.assertGreater(profile.query_count, 0)
+		self.assertIn("dashboard/index.html", [entry["name"] for entry in profile.data["templates"]])
+		self.assertTrue(all("at_ms" in query for query in profile.data["queries"]))
+		self.assertTrue(any("dashboard" in row["function"] for row in profile.data["functions"]))
+
+		self.assertContains(self.client.get(reverse("common:request_profiles")), response["X-Profile-Url"])
+		detail = self.client.get(response["X-Profile-Url"], {"sort": "tottime"})
+		self.assertEqual(detail.status_code, 200)
+		self.assertContains(detail, "dashboard/index.html")
+		folded = self.client.get(reverse("common:request_profile_export", args=[profile.pk]), {"format": "collapsed"})
+		stack, value = folded.content.decode().splitlines()[0].rsplit(" ", 1)
+		self.assertIn(";", stack)
+		self.assertTrue(value.isdigit())
+
+	def test_non_staff_flag_is_ignored(self):
+		self.client.force_login(UserFactory(role="TEACHER"))
+		response = self.client.get(reverse("common:dashboard"), {"_profile": "1"}, HTTP_X_PROFILE="1")
+		self.assertNotIn("X-Profile-Id", response)
+		self.assertFalse(RequestProfile.objects.exists())
+		self.assertEqual(self.client.get(reverse("common:request_profiles")).status_code, 403)
+
+	def test_cookie_profiles_following_htmx_requests(self):
+		self.client.force_login(self.staff)
+		response = self.client.get(reverse("common:dashboard"), {"_profile": "on"})
+		self.assertIn(PROFILE_COOKIE, response.cookies)
+		response = self.client.get(reverse("common:dashboard"), HTTP_HX_REQUEST="true")
+		self.assertTrue(RequestProfile.objects.get(pk=response["X-Profile-Id"]).htmx)
+
+		response = self.client.get(reverse("common:dashboard"), {"_profile": "off"})
+		self.assertNotIn("X-Profile-Id", response)
+		self.assertEqual(response.cookies[PROFILE_COOKIE].value, "")
+		self.assertEqual(RequestProfile.objects.count(), 2)
+
+	def test_size_caps(self):
+		data = {
+			"functions": [{"function": f"f{i}", "cumtime_ms": i} for i in range(500)],
+			"collapsed": [f"a;b{i} {i}" for i in range(500)],
+			"templates": [],
+			"queries": [{"sql": "SELECT 1", "at_ms": i, "ms": i % 7} for i in range(500)],
+		}
+		size = _fit(data, 4000)
+		self.assertLessEqual(size, 4000)
+		self.assertTrue(data["truncated"])
+		self.assertEqual(data["queries"], sorted(data["queries"], key=lambda query: query["at_ms"]))
+
+		for _ in range(3):
+			RequestProfile.objects.create(method="GET", path="/", duration_ms=1, size_bytes=10)
+		with mock.patch("apps.common.profiler.PROFILER_MAX_PROFILES", 2):
+			prune_profiles()
+		self.assertEqual(RequestProfile.objects.count(), 2)
+		with mock.patch("apps.common.profiler.PROFILER_MAX_TOTAL_BYTES", 15):
+			prune_profiles()
+		self.assertEqual(RequestProfile.objects.count(), 1)
+
+	def test_collapsed_stacks_split_time_between_callers(self):
+		root, left, right, leaf = ("m.py", 1, "root"), ("m.py", 2, "left"), ("m.py", 3, "right"), ("m.py", 4, "leaf")
+		stats = {
+			root: (1, 1, 0.001, 0.010, {}),
+			left: (1, 1, 0.001, 0.004, {root: (1, 1, 0.001, 0.004)}),
+			right: (1, 1, 0.001, 0.005, {root: (1, 1, 0.001, 0.005)}),
+			# 6ms trong leaf chia theo cumtime của từng cạnh: 2ms qua left, 4ms qua right
+			leaf: (2, 2, 0.006, 0.006, {left: (1, 1, 0.002, 0.002), right: (1, 1, 0.004, 0.004)}),
+		}
+		folded = dict(line.rsplit(" ", 1) for line in collapsed_stacks(stats, min_ms=0))
+		self.assertEqual(folded["root (m.py:1);left (m.py:2);leaf (m.py:4)"], "2000")
+		self.assertEqual(folded["root (m.py:1);right (m.py:3);leaf (m.py:4)"], "4000")
+
+
+class IndexAdvisorTests(TestCase):
+	PLAN = {
+		"Plan": {
+			"Node Type": "Sort",
+			"Sort Key": ["s.start_time", "c.name"],
+			"Sort Method": "external merge",
+			"Actual Rows": 40,
+			"Plan Rows": 40,
+			"Actual Loops": 1,
+			"Plans": [
+				{
+					"Node Type": "Hash Join",
+					"Actual Rows": 40,
+					"Plan Rows": 2,
+					"Actual Loops": 1,
+					"Plans": [
+						{
+							"Node Type": "Seq Scan",
+							"Relation Name": "class_sessions_classsession",
+							"Alias": "s",
+							"Filter": "((s.date = '2026-10-19'::date) AND (s.start_time >= '08:00:00'::time without time zone))",
+							"Rows Removed by Filter": 150000,
+							"Actual Rows": 40,
+							"Plan Rows": 2,
+							"Actual Loops": 1,
+						},
+						{
+							"Node Type": "Index Scan",
+							"Relation Name": "classes_class",
+							"Alias": "c",
+							"Actual Rows": 20000,
+							"Plan Rows": 1000,
+							"Actual Loops": 1,
+						},
+					],
+				}
+			],
+		}
+	}
+
+	def test_analyze_plan_flags_seq_scan_sort_and_misestimate(self):
+		findings = analyze_plan(self.PLAN, min_rows=1000, large_rows=100_000)
+		seq_scan = next(finding for finding in findings if finding["kind"] == "seq_scan")
+		self.assertEqual(seq_scan["table"], "class_sessions_classsession")
+		self.assertEqual(seq_scan["rows"], 150040)
+		self.assertEqual(seq_scan["columns"], [("date", True), ("start_time", False)])
+		sorts = {finding["table"]: finding for finding in findings if finding["kind"] == "sort"}
+		self.assertEqual(sorts["classes_class"]["columns"], [("name", False)])
+		self.assertTrue(sorts["class_sessions_classsession"]["external"])
+		misestimates = [finding["table"] for finding in findings if finding["kind"] == "misestimate"]
+		self.assertEqual(misestimates, ["classes_class"])
+		self.assertFalse([finding for finding in findings if finding["kind"] == "large_rows"])
+
+	def test_columns_strip_casts_and_treat_any_as_equality(self):
+		columns = _columns(
+			"(((status)::text = ANY ('{P,L}'::text[])) AND (created_at < '2026-01-01'::timestamp with time zone))", {}
+		)
+		self.assertEqual(columns, [("status", None, True), ("created_at", None, False)])
+
+	def test_suggestion_reports_existing_index(self):
+		today = timezone.localdate()
+		klass = KlassFactory()
+		for index in range(1, 4):
+			ClassSessionFactory(klass=klass, index=index, date=today)
+		queryset = ClassSession.objects.filter(date=today).order_by()
+		sql, params = queryset.query.sql_with_params()
+		queries = {"q": {"sql": sql, "params": params, "count": 1, "ms": 1.0, "scenarios": {"dashboard:admin"}}}
+		with connection.cursor() as cursor:
+			cursor.execute("SET LOCAL enable_indexscan = off")
+			cursor.execute("SET LOCAL enable_bitmapscan = off")
+			details, suggestions = suggest_indexes(queries, min_rows=0)
+		self.assertEqual(details[0]["scenarios"], ["dashboard:admin"])
+		suggestion = next(row for row in suggestions if row["model"] == "class_sessions.ClassSession")
+		self.assertEqual(suggestion["fields"], ["date"])
+		# Index (date, klass) của ClassSession đã phủ cột date
+		self.assertIsNotNone(suggestion["covered_by"])
+
+
+class QueryBudgetTests(TestCase):
+	"""Ngân sách truy vấn của các view nóng (apps.common.benchmarks.SCENARIOS)."""
+
+	@classmethod
+	def setUpTestData(cls):
+		today = timezone.localdate()
+		center = CenterFactory()
+		subject = SubjectFactory()
+		module = Module.objects.create(subject=subject, order=1, title="Module 1")
+		for order in range(1, 13):
+			Lesson.objects.create(module=module, order=order, title=f"Bài {order}")
+		UserFactory(role="ADMIN", is_superuser=True, is_staff=True, center=center)
+		UserFactory(role="CENTER_MANAGER", center=center)
+		assistant = UserFactory(role="ASSISTANT", center=center)
+		# Đủ lớp, học sinh và buổi học để truy vấn lặp theo dòng vượt ngân sách
+		for number in range(3):
+			klass = KlassFactory(
+				center=center,
+				subject=subject,
+				start_date=today - datetime.timedelta(days=21),
+				end_date=today + datetime.timedelta(days=42),
+			)
+			ClassAssistant.objects.create(klass=klass, assistant=assistant)
+			ClassSchedule.objects.create(
+				klass=klass, day_of_week=number, start_time=datetime.time(8 + number), end_time=datetime.time(9 + number)
+			)
+			sessions = [
+				ClassSessionFactory(
+					klass=klass,
+					index=week + 1,
+					date=today + datetime.timedelta(days=7 * (week - 3)),
+					start_time=datetime.time(8 + number),
+					end_time=datetime.time(9 + number),
+					status="DONE" if week < 3 else "PLANNED",
+				)
+				for week in range(6)
+			]
+			for _ in range(6):
+				student = UserFactory(role="STUDENT", center=center)
+				ParentStudentRelation.objects.create(parent=UserFactory(role="PARENT", center=center), student=student)
+				enrollment = Enrollment.objects.create(
+					klass=klass,
+					student=student,
+					status=EnrollmentStatus.ACTIVE,
+					sessions_purchased=10,
+					fee_per_session=300000,
+					amount_paid=3000000,
+				)
+				BillingEntry.objects.create(
+					enrollment=enrollment, entry_type=BillingEntry.EntryType.PURCHASE, sessions=10, amount=3000000
+				)
+				for session in sessions[:3]:
+					Attendance.objects.create(session=session, student=student, status="P")
+					Assessment.objects.create(session=session, student=student, score=8)
+		cls.fixtures = pick_fixtures()
+
+	def setUp(self):
+		cache.clear()
+
+	def test_hot_views_within_query_budget(self):
+		for scenario in SCENARIOS:
+			with self.subTest(scenario=scenario.name):
+				result = run_scenario(scenario, self.fixtures, repeat=1)
+				self.assertNotIn("skipped", result)
+				self.assertLess(result["status"], 400)
+				self.assertLessEqual(result["queries"], scenario.budget)
+
+	def test_compare_reports(self):
+		baseline = {"scenarios": {"a": {"queries": 10, "p50_ms": 20.0}, "b": {"skipped": "x"}}}
+		current = {"scenarios": {"a": {"queries": 12, "p50_ms": 25.0}, "b": {"queries": 1, "p50_ms": 1.0}}}
+		self.assertEqual(
+			compare_reports(baseline, current),
+			[{"scenario": "a", "queries": (10, 12), "p50_ms": (20.0, 25.0), "p50_change": 25.0}],
+		)
+
+
+class BulkSeedTests(TestCase):
+	def test_bulk_seed_recomputes_derived_data(self):
+		call_command(
+			"seed_db",
+			bulk=True,
+			seed=3,
+			centers=1,
+			rooms_per_center=1,
+			subjects=1,
+			modules_per_subject=1,
+			lessons_per_module=4,
+			users=40,
+			classes=3,
+			students_per_class=5,
+			sessions_per_class=6,
+			chunk_size=7,
+			stdout=StringIO(),
+		)
+		self.assertEqual(Class.objects.filter(code__startswith="B3-").count(), 3)
+		self.assertEqual(ClassSession.objects.filter(klass__code__startswith="B3-").count(), 18)
+		past = ClassSession.objects.filter(klass__code__startswith="B3-", date__lt=timezone.localdate()).count()
+		self.assertEqual(Attendance.objects.count(), past * 5)
+
+		for enrollment in Enrollment.objects.all():
+			attended = Attendance.objects.filter(
+				session__klass=enrollment.klass_id, student=enrollment.student_id, status__in=["P", "L"]
+			).count()
+			self.assertEqual(enrollment.sessions_consumed, attended)
+			consumed = BillingEntry.objects.filter(enrollment=enrollment, entry_type=BillingEntry.EntryType.CONSUME)
+			self.assertEqual(-sum(consumed.values_list("sessions", flat=True)), attended)
+
+		self.assertEqual(
+			SessionPointEvent.objects.filter(event_type=SessionPointEventType.ATTENDANCE).count(),
+			Attendance.objects.filter(status="P").count(),
+		)
+		for account in PointAccount.objects.all():
+			total = RewardTransaction.objects.filter(student=account.student_id).aggregate(total=Sum("delta"))["total"]
+			self.assertEqual(account.balance, total or 0)
+		self.assertTrue(User.objects.filter(role="STUDENT", groups__name="Student").exists())
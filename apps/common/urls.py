@@ -6,4 +6,9 @@ app_name = "common"
 urlpatterns = [
     path("", views.home, name="home"),
     path("dashboard/", views.dashboard, name="dashboard"),
+    path("metrics/", views.prometheus_metrics, name="prometheus_metrics"),
+    path("metrics/requests/", views.request_metrics, name="request_metrics"),
+    path("metrics/profiles/", views.request_profiles, name="request_profiles"),
+    path("metrics/profiles/<int:pk>/", views.request_profile_detail, name="request_profile_detail"),
+    path("metrics/profiles/<int:pk>/export/", views.request_profile_export, name="request_profile_export"),
 ]
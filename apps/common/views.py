@@ -1,11 +1,23 @@
 from collections import defaultdict
+from hmac import compare_digest
 
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
+from django.db.models import Count, F, Q
 from django.urls import reverse
 from django.utils import timezone
 
+from apps.accounts.models import ParentStudentRelation
+from apps.common.cache import cache_prometheus, cache_stats
+from apps.common.concurrency import Block, run_blocks
+from apps.common.db_routing import replica_reads
+from apps.common.instrumentation import registry
+from apps.common.models import RequestProfile
+from apps.common.pagination import cursor_paginate
+from apps.common.utils.http import is_htmx_request
+
 # Import các mô hình cần thiết, sử dụng try-except để tránh lỗi khi mô hình không tồn tại
 try:
     from apps.class_sessions.models import ClassSession
@@ -89,7 +101,8 @@ def _ratio_text(current_value, total_value):
 
 # Hàm phụ để tổng hợp điểm danh theo buổi học
 def _attendance_totals_by_session(session_ids):
-    if not Attendance or not session_ids:
+    # session_ids có thể là subquery (khối chạy song song với truy vấn buổi học)
+    if not Attendance:
         return {}
     summary = defaultdict(lambda: {"present": 0, "absent": 0, "late": 0, "total": 0})
     rows = (
@@ -111,7 +124,7 @@ def _attendance_totals_by_session(session_ids):
 
 # Hàm phụ để lấy bản đồ điểm danh cho học sinh trong ngày
 def _attendance_map_for_students(student_ids, date_value):
-    if not Attendance or not student_ids:
+    if not Attendance:
         return {}
     result = {}
     qs = Attendance.objects.filter(session__date=date_value, student_id__in=student_ids).select_related("session")
@@ -119,41 +132,50 @@ def _attendance_map_for_students(student_ids, date_value):
         result[(attendance.session_id, attendance.student_id)] = attendance
     return result
 
+# Hàm phụ: buổi học hôm nay của các con, mỗi buổi gắn ``child_id``
+def _children_sessions_today(student_ids, date_value):
+    return list(
+        ClassSession.objects.filter(
+            date=date_value,
+            klass__enrollments__student__in=student_ids,
+            klass__enrollments__active=True,
+        )
+        .annotate(child_id=F("klass__enrollments__student"))
+        .select_related("klass", "klass__center", "klass__room", "room_override")
+        .order_by("start_time", "klass__name")
+        .distinct()
+    )
+
 # Trang chủ chung của ứng dụng
 def home(request):
     home_products = []
     home_page_obj = None
-    home_paginator = None
+    current_query_params = ""
     if StudentProduct:
         products_qs = StudentProduct.objects.select_related(
             "student",
             "session",
             "session__klass",
             "session__klass__subject",
-        ).order_by("-created_at")
-        from django.core.paginator import Paginator, EmptyPage
-
-        paginator = Paginator(products_qs, 3)
-        page_number = request.GET.get("products_page", 1)
-        try:
-            home_page_obj = paginator.page(page_number)
-        except EmptyPage:
-            home_page_obj = paginator.page(1)
-        home_paginator = paginator
+        )
+        home_page_obj, _, current_query_params = cursor_paginate(
+            request, products_qs, ("-created_at", "-id"), default_per_page=3, estimate_total=False
+        )
         home_products = home_page_obj.object_list
 
-    return render(
-        request,
-        "home.html",
-        {
-            "home_products": home_products,
-            "home_page_obj": home_page_obj,
-            "home_paginator": home_paginator,
-        },
-    )
+    context = {
+        "home_products": home_products,
+        "home_page_obj": home_page_obj,
+        "current_query_params": current_query_params,
+    }
+    # Nút "Xem thêm" chỉ cần các thẻ sản phẩm kế tiếp
+    if is_htmx_request(request) and request.GET.get("cursor"):
+        return render(request, "_home_products.html", context)
+    return render(request, "home.html", context)
 
 # Trang dashboard tùy theo vai trò người dùng
 @login_required
+@replica_reads()
 def dashboard(request):
     user = request.user
     role = getattr(user, "role", "").upper()
@@ -276,9 +298,19 @@ def dashboard(request):
                 )
                 .order_by("start_time", "klass__name")
             )
-            sessions_today = list(sessions_today)
-            session_ids = [session.id for session in sessions_today]
-            attendance_summary = _attendance_totals_by_session(session_ids)
+            # Buổi học và điểm danh là hai truy vấn độc lập, chạy song song
+            blocks = run_blocks(
+                {
+                    "sessions": Block(list, sessions_today, fallback=list),
+                    "attendance": Block(
+                        _attendance_totals_by_session,
+                        ClassSession.objects.filter(date=today, klass__center=center).values("id"),
+                        fallback=dict,
+                    ),
+                }
+            )
+            sessions_today = blocks["sessions"]
+            attendance_summary = blocks["attendance"]
             students_present = sum(item.get("present", 0) for item in attendance_summary.values())
             sessions_without_attendance = sum(
                 1
@@ -338,6 +370,7 @@ def dashboard(request):
                     "cm_center": center,
                     "cm_cards": cm_cards,
                     "cm_schedule": schedule_rows,
+                    "dashboard_degraded": blocks.degraded,
                 }
             )
         else:
@@ -373,9 +406,19 @@ def dashboard(request):
             .order_by("start_time", "klass__name")
             .distinct()
         )
-        sessions_today = list(sessions_queryset)
+        blocks = run_blocks(
+            {
+                "sessions": Block(list, sessions_queryset, fallback=list),
+                "attendance": Block(
+                    _attendance_totals_by_session,
+                    ClassSession.objects.filter(date=today).filter(teaching_filter).values("id"),
+                    fallback=dict,
+                ),
+            }
+        )
+        sessions_today = blocks["sessions"]
+        attendance_summary = blocks["attendance"]
         session_ids = [session.id for session in sessions_today]
-        attendance_summary = _attendance_totals_by_session(session_ids)
         total_sessions = len(session_ids)
         attended_sessions = sum(
             1 for session_id in session_ids if attendance_summary.get(session_id, {}).get("total")
@@ -434,22 +477,33 @@ def dashboard(request):
                 "dashboard_role": "teacher_assistant",
                 "teacher_cards": teacher_cards,
                 "teacher_schedule": schedule_rows,
+                "dashboard_degraded": blocks.degraded,
             }
         )
 
     elif is_parent and build_parent_children_snapshot and ClassSession:
-        snapshot = build_parent_children_snapshot(user)
+        children = ParentStudentRelation.objects.filter(parent=user).values("student_id")
+        # Tổng quan, lịch hôm nay và điểm danh của các con chạy song song
+        blocks = run_blocks(
+            {
+                "snapshot": Block(build_parent_children_snapshot, user, fallback=dict),
+                "sessions": Block(_children_sessions_today, children, today, fallback=list),
+                "attendance": Block(_attendance_map_for_students, children, today, fallback=dict),
+            }
+        )
+        snapshot = blocks["snapshot"]
+        attendance_map = blocks["attendance"]
+        sessions_by_child = defaultdict(list)
+        for session in blocks["sessions"]:
+            sessions_by_child[session.child_id].append(session)
+
         children_entries = []
-        child_ids = []
         for child in snapshot.get("children_data", []):
             student = child.get("student")
             if not student:
                 continue
             label = child.get("student_label") or _user_display(student)
             children_entries.append({"student": student, "label": label})
-            child_ids.append(student.id)
-
-        attendance_map = _attendance_map_for_students(child_ids, today) if child_ids else {}
 
         total_sessions = 0
         children_with_schedule = 0
@@ -457,17 +511,7 @@ def dashboard(request):
 
         for entry in children_entries:
             student = entry["student"]
-            sessions = (
-                ClassSession.objects.filter(
-                    date=today,
-                    klass__enrollments__student=student,
-                    klass__enrollments__active=True,
-                )
-                .select_related("klass", "klass__center", "klass__room", "room_override")
-                .order_by("start_time", "klass__name")
-                .distinct()
-            )
-            sessions = list(sessions)
+            sessions = sessions_by_child.get(student.id, [])
             if sessions:
                 children_with_schedule += 1
             total_sessions += len(sessions)
@@ -513,6 +557,7 @@ def dashboard(request):
                 "dashboard_role": "parent",
                 "parent_cards": parent_cards,
                 "parent_schedule": parent_schedule_rows,
+                "dashboard_degraded": blocks.degraded,
             }
         )
 
@@ -585,3 +630,111 @@ def dashboard(request):
         )
 
     return render(request, "dashboard/index.html", context)
+
+
+@login_required
+def request_metrics(request):
+    """Thời gian, số truy vấn và nghi vấn N+1 theo view của process hiện tại."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return JsonResponse(
+        {
+            "since": registry.started_at.isoformat(),
+            "views": registry.snapshot(),
+            "degraded_blocks": registry.block_errors(),
+            "cache": cache_stats(),
+        },
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+def prometheus_metrics(request):
+    token = getattr(settings, "REQUEST_METRICS_TOKEN", "")
+    header = request.headers.get("Authorization", "")
+    allowed = request.user.is_authenticated and request.user.is_staff
+    if token and header.startswith("Bearer "):
+        allowed = allowed or compare_digest(header[len("Bearer "):], token)
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.prometheus() + cache_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+PROFILE_SORTS = {"cumtime": "cumtime_ms", "tottime": "tottime_ms", "calls": "calls"}
+
+
+@login_required
+def request_profiles(request):
+    """Các profile request gần nhất (``apps.common.profiler``)."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    profiles = RequestProfile.objects.select_related("user").defer("data")
+    return render(request, "request_profiles.html", {"profiles": profiles})
+
+
+@login_required
+def request_profile_detail(request, pk):
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    profile = get_object_or_404(RequestProfile.objects.select_related("user"), pk=pk)
+    sort = request.GET.get("sort") if request.GET.get("sort") in PROFILE_SORTS else "cumtime"
+    functions = sorted(profile.data.get("functions", []), key=lambda row: row[PROFILE_SORTS[sort]], reverse=True)
+
+    templates = {}
+    for entry in profile.data.get("templates", []):
+        row = templates.setdefault(entry["name"], {"name": entry["name"], "renders": 0, "ms": 0.0, "self_ms": 0.0})
+        row["renders"] += 1
+        row["ms"] += entry["ms"]
+        row["self_ms"] += entry["self_ms"]
+
+    # Vị trí và độ dài mỗi truy vấn theo % thời gian request, cho timeline
+    duration = profile.duration_ms or 1
+    queries = [
+        {
+            **query,
+            "left": min(query.get("at_ms", 0) / duration * 100, 100),
+            "width": max(query["ms"] / duration * 100, 0.2),
+        }
+        for query in profile.data.get("queries", [])
+    ]
+    return render(
+        request,
+        "request_profile_detail.html",
+        {
+            "profile": profile,
+            "sort": sort,
+            "functions": functions,
+            "template_rows": sorted(templates.values(), key=lambda row: row["self_ms"], reverse=True),
+            "queries": queries,
+            "duplicates": profile.data.get("duplicates", {}),
+        },
+    )
+
+
+@login_required
+def request_profile_export(request, pk):
+    """``?format=collapsed`` cho flamegraph.pl/speedscope, mặc định JSON đầy đủ."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    profile = get_object_or_404(RequestProfile, pk=pk)
+    if request.GET.get("format") == "collapsed":
+        response = HttpResponse("\n".join(profile.data.get("collapsed", [])) + "\n", content_type="text/plain; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="profile-{profile.pk}.folded"'
+        return response
+    response = JsonResponse(
+        {
+            "id": profile.pk,
+            "method": profile.method,
+            "path": profile.path,
+            "view": profile.view,
+            "htmx": profile.htmx,
+            "status": profile.status,
+            "created_at": profile.created_at.isoformat(),
+            "duration_ms": profile.duration_ms,
+            "db_ms": profile.db_ms,
+            "query_count": profile.query_count,
+            **profile.data,
+        },
+        json_dumps_params={"ensure_ascii": False},
+    )
+    response["Content-Disposition"] = f'attachment; filename="profile-{profile.pk}.json"'
+    return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Subject, Module, Lesson, Lecture, Exercise
+from .models import CurriculumImportJob, Subject, Module, Lesson, Lecture, Exercise
 
 
 class LessonInline(admin.TabularInline):
@@ -38,3 +38,10 @@ class LessonAdmin(admin.ModelAdmin):
     list_filter = ("module__subject", "module")
     search_fields = ("title", "module__title", "module__subject__name")
     inlines = [LectureInline, ExerciseInline]
+
+
+@admin.register(CurriculumImportJob)
+class CurriculumImportJobAdmin(admin.ModelAdmin):
+    list_display = ("filename", "status", "created_by", "created_at")
+    list_filter = ("status",)
+    readonly_fields = ("payload", "errors", "stats")
@@ -0,0 +1,580 @@
+"""
+Engine nhập chương trình học từ file Excel nhiều sheet.
+
+- ``parse_workbook`` đọc file thành payload JSON (chạy trong request, nhanh).
+- ``import_curriculum`` tải trước toàn bộ file đính kèm qua thread pool (stream ra
+  file tạm, khử trùng lặp theo SHA-256) rồi mới mở transaction và upsert từng sheet
+  bằng ``bulk_create(update_conflicts=True)`` dựa trên các map code -> id dựng một lần.
+- ``run_import_job`` chạy một ``CurriculumImportJob`` ở nền.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.common.fragments import bump_table_versions
+from apps.common.images import derivative_names, generate_derivatives
+from apps.common.models import PendingFileDeletion
+from apps.common.services import file_in_use, queue_file_deletion
+
+from .models import CurriculumImportJob, Exercise, Lecture, Lesson, Module, Subject
+from .tree import bump_curriculum_version
+
+SHEET_COLUMNS = {
+    "Subjects": ["code", "name", "description", "avatar_url"],
+    "Modules": ["subject_code", "order", "title", "description", "image_url"],
+    "Lessons": ["subject_code", "module_order", "order", "title", "objectives"],
+    "Lectures": ["subject_code", "module_order", "lesson_order", "content", "video_url", "file_url"],
+    "Exercises": ["subject_code", "module_order", "lesson_order", "description", "difficulty", "file_url"],
+}
+
+IMPORT_DOWNLOAD_WORKERS = getattr(settings, "CURRICULUM_IMPORT_DOWNLOAD_WORKERS", 8)
+IMPORT_DOWNLOAD_TIMEOUT = getattr(settings, "CURRICULUM_IMPORT_DOWNLOAD_TIMEOUT", 10)
+IMPORT_DOWNLOAD_MAX_BYTES = getattr(settings, "CURRICULUM_IMPORT_DOWNLOAD_MAX_BYTES", 100 * 1024 * 1024)
+IMPORT_HASH_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+DIFFICULTY_ALIASES = {
+    "dễ": "easy", "de": "easy", "de~": "easy", "easy": "easy",
+    "trung bình": "medium", "trung binh": "medium", "medium": "medium", "": "medium",
+    "khó": "hard", "kho": "hard", "hard": "hard",
+}
+
+CONTENT_TYPE_EXTENSIONS = (
+    ("pdf", ".pdf"),
+    ("ms-powerpoint", ".pptx"),
+    ("presentation", ".pptx"),
+    ("ppt", ".pptx"),
+    ("msword", ".docx"),
+    ("word", ".docx"),
+    ("doc", ".docx"),
+    ("zip", ".zip"),
+    ("png", ".png"),
+    ("jpeg", ".jpg"),
+    ("webp", ".webp"),
+)
+
+
+class CurriculumImportError(Exception):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    return str(value).strip()
+
+
+def parse_workbook(upload) -> dict[str, list[dict]]:
+    """Đọc các sheet đã biết thành list dict chuỗi; mỗi dòng kèm số dòng Excel ``_row``."""
+    import pandas as pd
+
+    upload.seek(0)
+    sheets = pd.read_excel(upload, sheet_name=None, dtype=object)
+    payload = {}
+    for sheet, columns in SHEET_COLUMNS.items():
+        df = sheets.get(sheet)
+        if df is None or df.empty:
+            continue
+        rows = []
+        for idx, record in enumerate(df.to_dict("records")):
+            row = {col: _cell(record.get(col)) for col in columns}
+            row["_row"] = idx + 2
+            rows.append(row)
+        payload[sheet] = rows
+    return payload
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# --- Tải trước file đính kèm ------------------------------------------------
+
+def _guess_filename(url: str, content_type: str, prefix: str) -> str:
+    base = os.path.basename(urlparse(url).path) or prefix
+    name, ext = os.path.splitext(base)
+    if not ext:
+        ct = (content_type or "").lower()
+        ext = next((e for key, e in CONTENT_TYPE_EXTENSIONS if key in ct), "")
+    return f"{slugify(name) or prefix}{ext}"
+
+
+def _download(url: str, prefix: str):
+    """Stream URL ra file tạm, trả về (file tạm, tên file, sha256, số byte)."""
+    import requests
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".import")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with requests.get(url, timeout=IMPORT_DOWNLOAD_TIMEOUT, stream=True) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > IMPORT_DOWNLOAD_MAX_BYTES:
+                    raise ValueError("file quá lớn")
+                digest.update(chunk)
+                tmp.write(chunk)
+            filename = _guess_filename(url, resp.headers.get("Content-Type", ""), prefix)
+    except Exception:
+        tmp.close()
+        raise
+    tmp.seek(0)
+    return tmp, filename, digest.hexdigest(), size
+
+
+class AttachmentPrefetcher:
+    """
+    Tải song song các URL đính kèm và lưu lên storage của field tương ứng.
+    Cùng một nội dung (SHA-256) chỉ được lưu một lần cho mỗi field, kể cả giữa các lần import.
+    """
+
+    def __init__(self, workers: int = IMPORT_DOWNLOAD_WORKERS):
+        self.workers = workers
+        self.results = {}
+        self.uploaded = []
+        self.stats = {"downloads": 0, "download_failures": 0, "bytes": 0, "hash_hits": 0}
+        self._lock = threading.Lock()
+        self._by_hash = {}
+        self._hash_locks = {}
+
+    def _fetch(self, field, url: str):
+        label = f"{field.model._meta.label}.{field.name}"
+        try:
+            tmp, filename, sha, size = _download(url, prefix=field.model._meta.model_name)
+        except Exception:
+            with self._lock:
+                self.stats["download_failures"] += 1
+            return None
+        with self._lock:
+            self.stats["downloads"] += 1
+            self.stats["bytes"] += size
+            # Hai URL cùng nội dung tải xong cùng lúc: chỉ một thread được ghi lên storage
+            key_lock = self._hash_locks.setdefault((label, sha), threading.Lock())
+        cache_key = f"curriculum-import:{label}:{sha}"
+        with tmp, key_lock:
+            known = self._by_hash.get((label, sha)) or self._cached_name(field, label, cache_key)
+            if known:
+                with self._lock:
+                    self.stats["hash_hits"] += 1
+                self._by_hash[(label, sha)] = known
+                return known
+            name = field.storage.save(
+                field.generate_filename(field.model(), filename),
+                File(tmp, name=filename),
+                max_length=field.max_length,
+            )
+            self._by_hash[(label, sha)] = name
+        with self._lock:
+            self.uploaded.append((field, name, cache_key))
+        cache.set(cache_key, name, IMPORT_HASH_CACHE_TIMEOUT)
+        return name
+
+    @staticmethod
+    def _cached_name(field, label, cache_key):
+        """File từ lần import trước, chỉ dùng lại khi vẫn còn và không chờ xóa."""
+        name = cache.get(cache_key)
+        if not name:
+            return None
+        if PendingFileDeletion.objects.filter(field_label=label, name=name).exists() or not field.storage.exists(name):
+            cache.delete(cache_key)
+            return None
+        return name
+
+    def prefetch(self, jobs):
+        """``jobs``: iterable (field, url). Kết quả: ``results[(field, url)]`` = tên file hoặc None."""
+        unique = list(dict.fromkeys((field, url) for field, url in jobs if url))
+        if not unique:
+            return self.results
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(unique)))) as pool:
+            for key, name in zip(unique, pool.map(lambda job: self._fetch(*job), unique)):
+                self.results[key] = name
+        return self.results
+
+    def get(self, field, url):
+        return self.results.get((field, url)) if url else None
+
+    def discard_uploads(self):
+        for field, name, cache_key in self.uploaded:
+            cache.delete(cache_key)
+            queue_file_deletion(field.model(), field.name, name)
+
+
+# --- Upsert -----------------------------------------------------------------
+
+def _field(model, name):
+    return model._meta.get_field(name)
+
+
+def _file_name(file_field):
+    return getattr(file_field, "name", None) or None
+
+
+def _upsert_subjects(rows, prefetcher, errors, replaced):
+    avatar_field = _field(Subject, "avatar")
+    by_code = {}
+    for row in rows:
+        if not row["code"]:
+            errors.append(f"Subjects!Dòng {row['_row']}: Thiếu 'code'.")
+            continue
+        by_code[row["code"]] = row
+    existing = {s.code: s for s in Subject.objects.filter(code__in=by_code)}
+
+    objs = []
+    for code, row in by_code.items():
+        cur = existing.get(code)
+        avatar = _file_name(cur.avatar) if cur else None
+        downloaded = prefetcher.get(avatar_field, row["avatar_url"])
+        if downloaded and downloaded != avatar:
+            if avatar:
+                replaced.append((Subject, "avatar", avatar))
+            avatar = downloaded
+        objs.append(
+            Subject(
+                code=code,
+                name=row["name"] or (cur.name if cur else ""),
+                description=row["description"] or (cur.description if cur else ""),
+                avatar=avatar,
+            )
+        )
+    if objs:
+        Subject.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["code"],
+            update_fields=["name", "description", "avatar", "updated_at"],
+        )
+    return len(objs)
+
+
+def _upsert_modules(rows, subject_ids, prefetcher, errors, replaced):
+    image_field = _field(Module, "image")
+    by_key = {}
+    for row in rows:
+        order = _int(row["order"])
+        if not row["subject_code"] or order is None:
+            errors.append(f"Modules!Dòng {row['_row']}: Thiếu 'subject_code' hoặc 'order'.")
+            continue
+        subject_id = subject_ids.get(row["subject_code"])
+        if not subject_id:
+            errors.append(f"Modules!Dòng {row['_row']}: Subject '{row['subject_code']}' không tồn tại.")
+            continue
+        by_key[(subject_id, order)] = row
+    existing = {
+        (m.subject_id, m.order): m
+        for m in Module.objects.filter(subject_id__in={k[0] for k in by_key})
+    }
+
+    objs = []
+    for (subject_id, order), row in by_key.items():
+        cur = existing.get((subject_id, order))
+        image = _file_name(cur.image) if cur else None
+        downloaded = prefetcher.get(image_field, row["image_url"])
+        if downloaded and downloaded != image:
+            if image:
+                replaced.append((Module, "image", image))
+            image = downloaded
+        objs.append(
+            Module(
+                subject_id=subject_id,
+                order=order,
+                title=row["title"] or (cur.title if cur else ""),
+                description=row["description"] or (cur.description if cur else ""),
+                image=image,
+            )
+        )
+    if objs:
+        Module.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["subject", "order"],
+            update_fields=["title", "description", "image"],
+        )
+    return len(objs)
+
+
+def _upsert_lessons(rows, module_ids, errors):
+    by_key = {}
+    for row in rows:
+        module_order, order = _int(row["module_order"]), _int(row["order"])
+        if not row["subject_code"] or module_order is None or order is None:
+            errors.append(f"Lessons!Dòng {row['_row']}: Thiếu 'subject_code', 'module_order' hoặc 'order'.")
+            continue
+        module_id = module_ids.get((row["subject_code"], module_order))
+        if not module_id:
+            errors.append(f"Lessons!Dòng {row['_row']}: Module ({row['subject_code']}, {module_order}) không tồn tại.")
+            continue
+        by_key[(module_id, order)] = row
+    existing = {
+        (l.module_id, l.order): l
+        for l in Lesson.objects.filter(module_id__in={k[0] for k in by_key})
+    }
+
+    objs = []
+    for (module_id, order), row in by_key.items():
+        cur = existing.get((module_id, order))
+        objs.append(
+            Lesson(
+                module_id=module_id,
+                order=order,
+                title=row["title"] or (cur.title if cur else ""),
+                objectives=row["objectives"] or (cur.objectives if cur else ""),
+            )
+        )
+    if objs:
+        Lesson.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["module", "order"],
+            update_fields=["title", "objectives", "updated_at"],
+        )
+    return len(objs)
+
+
+def _resolve_lessons(sheet, rows, lesson_ids, errors):
+    resolved = {}
+    for row in rows:
+        module_order, lesson_order = _int(row["module_order"]), _int(row["lesson_order"])
+        if not row["subject_code"] or module_order is None or lesson_order is None:
+            errors.append(f"{sheet}!Dòng {row['_row']}: Thiếu 'subject_code', 'module_order' hoặc 'lesson_order'.")
+            continue
+        lesson_id = lesson_ids.get((row["subject_code"], module_order, lesson_order))
+        if not lesson_id:
+            errors.append(
+                f"{sheet}!Dòng {row['_row']}: Lesson ({row['subject_code']}, {module_order}, {lesson_order}) không tồn tại."
+            )
+            continue
+        resolved[lesson_id] = row
+    return resolved
+
+
+def _upsert_lectures(rows, lesson_ids, prefetcher, errors, replaced):
+    file_field = _field(Lecture, "file")
+    by_lesson = _resolve_lessons("Lectures", rows, lesson_ids, errors)
+    existing = {l.lesson_id: l for l in Lecture.objects.filter(lesson_id__in=by_lesson)}
+
+    objs = []
+    for lesson_id, row in by_lesson.items():
+        cur = existing.get(lesson_id)
+        current_file = _file_name(cur.file) if cur else None
+        file_name = current_file
+        video_url = row["video_url"]
+        if row["file_url"]:
+            downloaded = prefetcher.get(file_field, row["file_url"])
+            if downloaded:
+                file_name = downloaded
+            elif not video_url:
+                # Lưu URL để hiển thị dự phòng
+                video_url = row["file_url"]
+        if current_file and file_name != current_file:
+            replaced.append((Lecture, "file", current_file))
+        objs.append(
+            Lecture(
+                lesson_id=lesson_id,
+                content=row["content"] or (cur.content if cur else ""),
+                file=file_name,
+                video_url=video_url,
+            )
+        )
+    if objs:
+        Lecture.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["lesson"],
+            update_fields=["content", "file", "video_url"],
+        )
+    return len(objs)
+
+
+def _upsert_exercises(rows, lesson_ids, prefetcher, errors, replaced):
+    file_field = _field(Exercise, "file")
+    valid_rows = []
+    for row in rows:
+        difficulty = DIFFICULTY_ALIASES.get(row["difficulty"].lower())
+        if difficulty is None:
+            errors.append(f"Exercises!Dòng {row['_row']}: 'difficulty' không hợp lệ: {row['difficulty'].lower()}.")
+            continue
+        valid_rows.append({**row, "difficulty": difficulty})
+    by_lesson = _resolve_lessons("Exercises", valid_rows, lesson_ids, errors)
+    existing = {e.lesson_id: e for e in Exercise.objects.filter(lesson_id__in=by_lesson)}
+
+    objs = []
+    for lesson_id, row in by_lesson.items():
+        cur = existing.get(lesson_id)
+        current_file = _file_name(cur.file) if cur else None
+        file_name = current_file
+        link_url = cur.link_url if cur else None
+        if row["file_url"]:
+            downloaded = prefetcher.get(file_field, row["file_url"])
+            if downloaded:
+                file_name, link_url = downloaded, ""
+            else:
+                link_url = row["file_url"]
+        if current_file and file_name != current_file:
+            replaced.append((Exercise, "file", current_file))
+        objs.append(
+            Exercise(
+                lesson_id=lesson_id,
+                description=row["description"] or (cur.description if cur else ""),
+                difficulty=row["difficulty"],
+                file=file_name,
+                link_url=link_url,
+            )
+        )
+    if objs:
+        Exercise.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["lesson"],
+            update_fields=["description", "difficulty", "file", "link_url"],
+        )
+    return len(objs)
+
+
+def _attachment_jobs(payload):
+    fields = {
+        "Subjects": (_field(Subject, "avatar"), "avatar_url"),
+        "Modules": (_field(Module, "image"), "image_url"),
+        "Lectures": (_field(Lecture, "file"), "file_url"),
+        "Exercises": (_field(Exercise, "file"), "file_url"),
+    }
+    for sheet, (field, column) in fields.items():
+        for row in payload.get(sheet, []):
+            url = row.get(column)
+            if url and urlparse(url).scheme in ("http", "https"):
+                yield field, url
+
+
+def import_curriculum(payload: dict, *, workers: int = IMPORT_DOWNLOAD_WORKERS) -> dict:
+    """
+    Nhập toàn bộ payload; lỗi ở bất kỳ dòng nào sẽ rollback và ném ``CurriculumImportError``.
+    Trả về thống kê số dòng mỗi sheet, lượt tải file và thời gian.
+    """
+    started = time.monotonic()
+    prefetcher = AttachmentPrefetcher(workers=workers)
+    prefetcher.prefetch(_attachment_jobs(payload))
+    download_seconds = time.monotonic() - started
+
+    errors = []
+    replaced = []
+    counts = {}
+    try:
+        with transaction.atomic():
+            counts["Subjects"] = _upsert_subjects(payload.get("Subjects", []), prefetcher, errors, replaced)
+
+            subject_codes = {row["code"] for row in payload.get("Subjects", [])} | {
+                row["subject_code"] for sheet in ("Modules", "Lessons", "Lectures", "Exercises")
+                for row in payload.get(sheet, [])
+            }
+            subject_ids = dict(Subject.objects.filter(code__in=subject_codes).values_list("code", "id"))
+            counts["Modules"] = _upsert_modules(payload.get("Modules", []), subject_ids, prefetcher, errors, replaced)
+
+            code_by_subject = {v: k for k, v in subject_ids.items()}
+            module_ids = {
+                (code_by_subject[subject_id], order): module_id
+                for module_id, subject_id, order in Module.objects.filter(
+                    subject_id__in=code_by_subject
+                ).values_list("id", "subject_id", "order")
+            }
+            counts["Lessons"] = _upsert_lessons(payload.get("Lessons", []), module_ids, errors)
+
+            module_keys = {v: k for k, v in module_ids.items()}
+            lesson_ids = {
+                (*module_keys[module_id], order): lesson_id
+                for lesson_id, module_id, order in Lesson.objects.filter(
+                    module_id__in=module_keys
+                ).values_list("id", "module_id", "order")
+            }
+            counts["Lectures"] = _upsert_lectures(payload.get("Lectures", []), lesson_ids, prefetcher, errors, replaced)
+            counts["Exercises"] = _upsert_exercises(payload.get("Exercises", []), lesson_ids, prefetcher, errors, replaced)
+
+            if errors:
+                raise CurriculumImportError(errors)
+
+            # bulk_create không gửi signal nên tự làm mới cache cây chương trình
+            bump_curriculum_version(*subject_ids.values())
+            bump_table_versions(Subject, Module, Lesson, Lecture, Exercise)
+
+            # bulk_create không chạy signal: tự dọn file bị thay thế nếu không còn bản ghi nào dùng
+            for model, field_name, name in dict.fromkeys(replaced):
+                if file_in_use(name):
+                    continue
+                queue_file_deletion(model(), field_name, name, check_shared=False)
+                if model in (Subject, Module):
+                    for derived in derivative_names(name):
+                        queue_file_deletion(model(), field_name, derived, check_shared=False)
+    except Exception:
+        prefetcher.discard_uploads()
+        raise
+
+    for field, name, _ in prefetcher.uploaded:
+        if field.model in (Subject, Module):
+            try:
+                generate_derivatives(field.storage, name, check_existing=False)
+            except Exception:
+                pass
+
+    return {
+        "rows": counts,
+        **prefetcher.stats,
+        "download_seconds": round(download_seconds, 3),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+# --- Job nền ----------------------------------------------------------------
+
+def run_import_job(job_id: int) -> CurriculumImportJob | None:
+    """Chạy job nếu còn PENDING; an toàn khi gọi đồng thời từ nhiều worker."""
+    # update() không chạy auto_now: đặt updated_at để --requeue-stale tính từ lúc nhận job
+    claimed = CurriculumImportJob.objects.filter(
+        pk=job_id, status=CurriculumImportJob.Status.PENDING
+    ).update(status=CurriculumImportJob.Status.RUNNING, updated_at=timezone.now())
+    if not claimed:
+        return None
+    job = CurriculumImportJob.objects.get(pk=job_id)
+    try:
+        job.stats = import_curriculum(job.payload)
+        job.status = CurriculumImportJob.Status.SUCCEEDED
+    except CurriculumImportError as exc:
+        job.errors = exc.errors
+        job.status = CurriculumImportJob.Status.FAILED
+    except Exception as exc:
+        job.errors = [str(exc)]
+        job.status = CurriculumImportJob.Status.FAILED
+    # Payload không cần giữ lại sau khi chạy xong
+    job.payload = {}
+    job.save(update_fields=["status", "stats", "errors", "payload", "updated_at"])
+    return job
+
+
+def start_import_job_in_background(job_id: int):
+    def run():
+        close_old_connections()
+        try:
+            run_import_job(job_id)
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, daemon=True, name=f"curriculum-import-{job_id}").start()
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.curriculum.importer import run_import_job
+from apps.curriculum.models import CurriculumImportJob
+
+
+class Command(BaseCommand):
+    help = "Run pending curriculum import jobs (e.g. jobs left behind when the web process restarted)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requeue-stale",
+            type=int,
+            default=0,
+            metavar="MINUTES",
+            help="Reset jobs stuck in RUNNING for longer than MINUTES back to PENDING first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_stale"]:
+            cutoff = timezone.now() - timedelta(minutes=options["requeue_stale"])
+            requeued = CurriculumImportJob.objects.filter(
+                status=CurriculumImportJob.Status.RUNNING, updated_at__lt=cutoff
+            ).update(status=CurriculumImportJob.Status.PENDING, updated_at=timezone.now())
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale jobs.")
+
+        pending = CurriculumImportJob.objects.filter(status=CurriculumImportJob.Status.PENDING).order_by("created_at")
+        done = failed = 0
+        for job_id in pending.values_list("id", flat=True):
+            job = run_import_job(job_id)
+            if job is None:
+                continue
+            if job.status == CurriculumImportJob.Status.SUCCEEDED:
+                done += 1
+                self.stdout.write(f"Job {job_id}: {job.stats}")
+            else:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f"Job {job_id} failed: {'; '.join(job.errors)}"))
+        self.stdout.write(self.style.SUCCESS(f"Finished {done} jobs, {failed} failed."))
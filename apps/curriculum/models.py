@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.db import models
-from apps.common.models import NamedModel
+from apps.common.models import FieldTrackerMixin, NamedModel, TimeStampedModel
 from steam_center.storages import MediaStorage
 
 
-class Subject(NamedModel):
+class Subject(FieldTrackerMixin, NamedModel):
+    tracked_fields = ("avatar",)
+
     avatar = models.ImageField(
         upload_to='subjects/avatars/',
         storage=MediaStorage(),
@@ -22,7 +25,9 @@ class Subject(NamedModel):
         return None
 
 
-class Module(models.Model):
+class Module(FieldTrackerMixin, models.Model):
+    tracked_fields = ("image", "subject")
+
     subject = models.ForeignKey(
         Subject, on_delete=models.CASCADE, related_name="modules"
     )
@@ -52,7 +57,9 @@ class Module(models.Model):
         return None
 
 
-class Lesson(models.Model):
+class Lesson(FieldTrackerMixin, TimeStampedModel):
+    tracked_fields = ("module",)
+
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name="lessons")
     order = models.PositiveIntegerField()
     title = models.CharField(max_length=255)
@@ -68,7 +75,9 @@ class Lesson(models.Model):
         return f"{self.module.title} - Bài {self.order}: {self.title}"
 
 
-class Lecture(models.Model):
+class Lecture(FieldTrackerMixin, models.Model):
+    tracked_fields = ("file", "lesson")
+
     lesson = models.OneToOneField(
         Lesson, on_delete=models.CASCADE, related_name="lecture"
     )
@@ -85,7 +94,9 @@ class Lecture(models.Model):
         return f"Bài giảng của {self.lesson.title}"
 
 
-class Exercise(models.Model):
+class Exercise(FieldTrackerMixin, models.Model):
+    tracked_fields = ("file", "lesson")
+
     lesson = models.OneToOneField(
         Lesson, on_delete=models.CASCADE, related_name="exercise"
     )
@@ -105,3 +116,32 @@ class Exercise(models.Model):
 
     def __str__(self):
         return f"Bài tập cho {self.lesson.title}"
+
+
+class CurriculumImportJob(TimeStampedModel):
+    """Một lần nhập chương trình học từ Excel, chạy ở nền."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Đang chờ"
+        RUNNING = "running", "Đang chạy"
+        SUCCEEDED = "succeeded", "Thành công"
+        FAILED = "failed", "Thất bại"
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True)
+    filename = models.CharField(max_length=255, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    stats = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Import {self.filename or self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
@@ -1,60 +1,67 @@
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import Lecture, Exercise
+from apps.common.services import defer_file_deletion, queue_file_deletion
 
-
-def _delete_field_file(file_field):
-    try:
-        if file_field and getattr(file_field, "name", None):
-            # Xóa file khỏi storage mà không tác động lại tới model
-            file_field.delete(save=False)
-    except Exception:
-        # Nuốt lỗi để không chặn các thao tác model
-        pass
+from .models import Exercise, Lecture, Lesson, Module, Subject
+from .tree import bump_curriculum_version, subject_ids_for_lessons, subject_ids_for_modules
 
 
+# File chỉ được đưa vào hàng đợi xóa; worker process_file_deletions xóa trên storage. File bị
+# thay được xếp hàng sau khi save thành công (defer_file_deletion)
 @receiver(post_delete, sender=Lecture)
 def lecture_file_delete_on_model_delete(sender, instance: Lecture, **kwargs):
-    _delete_field_file(getattr(instance, "file", None))
+    queue_file_deletion(instance, "file")
 
 
 @receiver(pre_save, sender=Lecture)
 def lecture_file_delete_on_change(sender, instance: Lecture, **kwargs):
-    if not instance.pk:
-        return
-    try:
-        old = Lecture.objects.get(pk=instance.pk)
-    except Lecture.DoesNotExist:
-        return
-
-    old_file = getattr(old, "file", None)
-    new_file = getattr(instance, "file", None)
     # Khi file bị xóa hoặc thay thế
-    if (old_file and getattr(old_file, "name", None)) and (
-        not new_file or getattr(new_file, "name", None) != getattr(old_file, "name", None)
-    ):
-        _delete_field_file(old_file)
+    if not instance.pk or not instance.has_changed("file"):
+        return
+    defer_file_deletion(instance, "file", instance.previous("file"))
 
 
 @receiver(post_delete, sender=Exercise)
 def exercise_file_delete_on_model_delete(sender, instance: Exercise, **kwargs):
-    _delete_field_file(getattr(instance, "file", None))
+    queue_file_deletion(instance, "file")
 
 
 @receiver(pre_save, sender=Exercise)
 def exercise_file_delete_on_change(sender, instance: Exercise, **kwargs):
-    if not instance.pk:
-        return
-    try:
-        old = Exercise.objects.get(pk=instance.pk)
-    except Exercise.DoesNotExist:
+    if not instance.pk or not instance.has_changed("file"):
         return
+    defer_file_deletion(instance, "file", instance.previous("file"))
+
+
+def _previous(instance, field_name, kwargs):
+    # Bản ghi vừa tạo không có giá trị cũ; tránh previous() phải truy vấn lại
+    return None if kwargs.get("created") else instance.previous(field_name)
 
-    old_file = getattr(old, "file", None)
-    new_file = getattr(instance, "file", None)
-    if (old_file and getattr(old_file, "name", None)) and (
-        not new_file or getattr(new_file, "name", None) != getattr(old_file, "name", None)
-    ):
-        _delete_field_file(old_file)
 
+# Mọi thay đổi trong cây chương trình làm mới cache cây của môn tương ứng
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def subject_tree_changed(sender, instance: Subject, **kwargs):
+    bump_curriculum_version(instance.pk)
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def module_tree_changed(sender, instance: Module, **kwargs):
+    # previous() là giá trị trước lần save này (snapshot chỉ cập nhật sau post_save)
+    bump_curriculum_version(instance.subject_id, _previous(instance, "subject", kwargs))
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_tree_changed(sender, instance: Lesson, **kwargs):
+    bump_curriculum_version(*subject_ids_for_modules({instance.module_id, _previous(instance, "module", kwargs)}))
+
+
+@receiver(post_save, sender=Lecture)
+@receiver(post_delete, sender=Lecture)
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def lesson_content_tree_changed(sender, instance, **kwargs):
+    bump_curriculum_version(*subject_ids_for_lessons({instance.lesson_id, _previous(instance, "lesson", kwargs)}))
@@ -1,3 +1,363 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
+
+import pandas as pd
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.common.factories import UserFactory
+from apps.common.models import PendingFileDeletion
+
+from .importer import CurriculumImportError, import_curriculum, parse_workbook, run_import_job
+from .models import CurriculumImportJob, Exercise, Lecture, Lesson, Module, Subject
+from .tree import get_curriculum_tree
+
+
+class _AttachmentHandler(BaseHTTPRequestHandler):
+	"""Server giả lập nơi chứa file đính kèm: /files/<tên> trả nội dung, còn lại 404."""
+
+	latency = 0.2
+	files = {}
+	# Đếm số lượt tải đang chạy cùng lúc để kiểm tra song song mà không dựa vào thời gian
+	_lock = threading.Lock()
+	in_flight = 0
+	peak = 0
+
+	def do_GET(self):
+		cls = type(self)
+		with cls._lock:
+			cls.in_flight += 1
+			cls.peak = max(cls.peak, cls.in_flight)
+		try:
+			time.sleep(self.latency)
+		finally:
+			with cls._lock:
+				cls.in_flight -= 1
+		body = self.files.get(self.path)
+		if body is None:
+			self.send_response(404)
+			self.end_headers()
+			return
+		self.send_response(200)
+		self.send_header("Content-Type", "application/pdf")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+def _payload(base_url, subject="MATH", modules=2, lessons=2):
+	payload = {
+		"Subjects": [{"code": subject, "name": "Toán", "description": "", "avatar_url": "", "_row": 2}],
+		"Modules": [],
+		"Lessons": [],
+		"Lectures": [],
+		"Exercises": [],
+	}
+	for m in range(1, modules + 1):
+		payload["Modules"].append(
+			{"subject_code": subject, "order": str(m), "title": f"Học phần {m}", "description": "", "image_url": "", "_row": m + 1}
+		)
+		for l in range(1, lessons + 1):
+			payload["Lessons"].append(
+				{"subject_code": subject, "module_order": str(m), "order": str(l), "title": f"Bài {l}", "objectives": "", "_row": 2}
+			)
+			payload["Lectures"].append({
+				"subject_code": subject, "module_order": str(m), "lesson_order": str(l),
+				"content": f"Nội dung {m}.{l}", "video_url": "",
+				"file_url": f"{base_url}/files/lecture-{m}-{l}.pdf", "_row": 2,
+			})
+			payload["Exercises"].append({
+				"subject_code": subject, "module_order": str(m), "lesson_order": str(l),
+				"description": "Bài tập", "difficulty": "Dễ",
+				"file_url": f"{base_url}/missing/{m}-{l}.pdf", "_row": 2,
+			})
+	return payload
+
+
+class CurriculumImportTests(TestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _AttachmentHandler)
+		cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+		threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+		cls.server.server_close()
+		super().tearDownClass()
+
+	def setUp(self):
+		cache.clear()
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		self.storage = FileSystemStorage(location=self.media_root, base_url="/media/")
+		for model, field in ((Subject, "avatar"), (Module, "image"), (Lecture, "file"), (Exercise, "file")):
+			patcher = mock.patch.object(model._meta.get_field(field), "storage", self.storage)
+			patcher.start()
+			self.addCleanup(patcher.stop)
+		# Hai bài giảng dùng chung một nội dung để kiểm tra khử trùng lặp theo hash
+		_AttachmentHandler.files = {
+			f"/files/lecture-{m}-{l}.pdf": b"%PDF shared" if (m, l) in ((1, 1), (1, 2)) else f"%PDF {m}-{l}".encode()
+			for m in range(1, 4)
+			for l in range(1, 4)
+		}
+		_AttachmentHandler.in_flight = _AttachmentHandler.peak = 0
+
+	def test_import_upserts_tree_and_downloads_attachments_concurrently(self):
+		payload = _payload(self.base_url)
+		stats = import_curriculum(payload, workers=8)
+
+		self.assertEqual(stats["rows"], {"Subjects": 1, "Modules": 2, "Lessons": 4, "Lectures": 4, "Exercises": 4})
+		self.assertEqual(stats["downloads"], 4)
+		self.assertEqual(stats["download_failures"], 4)
+		self.assertEqual(stats["hash_hits"], 1)
+		self.assertGreater(_AttachmentHandler.peak, 1)
+		self.assertLessEqual(_AttachmentHandler.peak, 8)
+
+		lectures = Lecture.objects.select_related("lesson__module").order_by("lesson__module__order", "lesson__order")
+		self.assertEqual([l.content for l in lectures], ["Nội dung 1.1", "Nội dung 1.2", "Nội dung 2.1", "Nội dung 2.2"])
+		self.assertEqual(lectures[0].file.name, lectures[1].file.name)
+		for lecture in lectures:
+			self.assertTrue(self.storage.exists(lecture.file.name))
+		# Tải lỗi thì giữ lại URL như trước
+		for exercise in Exercise.objects.all():
+			self.assertFalse(exercise.file)
+			self.assertIn("/missing/", exercise.link_url)
+			self.assertEqual(exercise.difficulty, "easy")
+
+	def test_reimport_updates_rows_in_place(self):
+		import_curriculum(_payload(self.base_url))
+		lesson_ids = set(Lesson.objects.values_list("id", flat=True))
+		files = set(Lecture.objects.values_list("file", flat=True))
+
+		payload = _payload(self.base_url)
+		payload["Lessons"][0]["title"] = "Bài mở đầu"
+		stats = import_curriculum(payload)
+
+		# Nội dung không đổi: dùng lại file cũ, không ghi thêm và không xóa gì
+		self.assertEqual(stats["hash_hits"], 4)
+		self.assertEqual(set(Lecture.objects.values_list("file", flat=True)), files)
+		self.assertFalse(PendingFileDeletion.objects.exists())
+
+		self.assertEqual(set(Lesson.objects.values_list("id", flat=True)), lesson_ids)
+		self.assertEqual(Lecture.objects.count(), 4)
+		self.assertTrue(Lesson.objects.filter(title="Bài mở đầu").exists())
+
+	def test_single_worker_downloads_one_at_a_time(self):
+		stats = import_curriculum(_payload(self.base_url), workers=1)
+
+		self.assertEqual(stats["downloads"], 4)
+		self.assertEqual(_AttachmentHandler.peak, 1)
+
+	def test_shared_attachment_is_kept_while_another_row_uses_it(self):
+		# Bài 1.1, 1.2 và 2.1 dùng chung một file
+		_AttachmentHandler.files["/files/lecture-2-1.pdf"] = b"%PDF shared"
+		import_curriculum(_payload(self.base_url))
+		lectures = Lecture.objects.order_by("lesson__module__order", "lesson__order")
+		shared = lectures[0].file.name
+		self.assertEqual({lecture.file.name for lecture in lectures[:3]}, {shared})
+
+		# Xóa một bài thì file vẫn giữ cho các bài còn lại
+		lectures[2].delete()
+		self.assertFalse(PendingFileDeletion.objects.filter(name=shared).exists())
+
+		# Nhập lại với nội dung mới cho bài 1.1: file cũ bị thay nhưng bài 1.2 vẫn dùng
+		_AttachmentHandler.files["/files/lecture-1-1.pdf"] = b"%PDF new"
+		stats = import_curriculum(_payload(self.base_url))
+		self.assertEqual(stats["rows"]["Lectures"], 4)
+		self.assertNotEqual(lectures[0].file.name, shared)
+		self.assertEqual(lectures[1].file.name, shared)
+		self.assertFalse(PendingFileDeletion.objects.filter(name=shared).exists())
+
+		# Bản ghi cuối cùng thôi dùng file thì file mới vào hàng đợi xóa
+		Lecture.objects.filter(file=shared).delete()
+		self.assertTrue(PendingFileDeletion.objects.filter(field_label="curriculum.Lecture.file", name=shared).exists())
+
+	def test_query_count_does_not_grow_with_rows(self):
+		def count_queries(payload):
+			with mock.patch("apps.curriculum.importer.AttachmentPrefetcher.prefetch"):
+				with CaptureQueriesContext(connection) as ctx:
+					import_curriculum(payload)
+			return len(ctx.captured_queries)
+
+		small = count_queries(_payload(self.base_url, subject="S1", modules=1, lessons=1))
+		large = count_queries(_payload(self.base_url, subject="S2", modules=3, lessons=3))
+		self.assertEqual(small, large)
+
+	def test_errors_roll_back_and_discard_downloaded_files(self):
+		payload = _payload(self.base_url)
+		payload["Lessons"].append(
+			{"subject_code": "NOPE", "module_order": "1", "order": "1", "title": "x", "objectives": "", "_row": 9}
+		)
+		with self.assertRaises(CurriculumImportError) as ctx:
+			import_curriculum(payload)
+
+		self.assertIn("Lessons!Dòng 9: Module (NOPE, 1) không tồn tại.", ctx.exception.errors)
+		self.assertFalse(Subject.objects.exists())
+		self.assertEqual(PendingFileDeletion.objects.filter(field_label="curriculum.Lecture.file").count(), 3)
+
+	def test_view_queues_job_and_status_reports_success(self):
+		user = UserFactory(is_superuser=True, is_staff=True)
+		self.client.force_login(user)
+
+		buffer = BytesIO()
+		with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+			pd.DataFrame([{"code": "ART", "name": "Mỹ thuật", "description": "", "avatar_url": ""}]) \
+				.to_excel(writer, sheet_name="Subjects", index=False)
+			pd.DataFrame([{"subject_code": "ART", "order": 1, "title": "Màu sắc", "description": "", "image_url": ""}]) \
+				.to_excel(writer, sheet_name="Modules", index=False)
+		upload = SimpleUploadedFile("art.xlsx", buffer.getvalue())
+
+		with mock.patch("apps.curriculum.views.start_import_job_in_background") as start:
+			with self.captureOnCommitCallbacks(execute=True):
+				response = self.client.post(reverse("curriculum:curriculum_import"), {"file": upload})
+		self.assertEqual(response.status_code, 202)
+		job = CurriculumImportJob.objects.get()
+		start.assert_called_once_with(job.pk)
+		self.assertEqual(job.payload["Modules"][0]["order"], "1")
+
+		status_url = reverse("curriculum:curriculum_import_status", args=[job.pk])
+		self.assertContains(self.client.get(status_url), 'hx-trigger="every 2s"')
+
+		run_import_job(job.pk)
+		response = self.client.get(status_url)
+		self.assertEqual(response.status_code, 286)
+		self.assertTrue(json.loads(response["HX-Trigger"])["closeSubjectModal"])
+		self.assertTrue(Module.objects.filter(subject__code="ART", title="Màu sắc").exists())
+		self.assertIsNone(run_import_job(job.pk))
+
+	def test_failed_job_status_shows_errors_and_stops_polling(self):
+		self.client.force_login(UserFactory(is_superuser=True, is_staff=True))
+		job = CurriculumImportJob.objects.create(
+			payload={}, status=CurriculumImportJob.Status.FAILED, errors=["Modules dòng 2: thiếu môn học"]
+		)
+
+		response = self.client.get(reverse("curriculum:curriculum_import_status", args=[job.pk]))
+
+		self.assertEqual(response.status_code, 286)
+		self.assertContains(response, "Modules dòng 2: thiếu môn học", status_code=286)
+
+
+class ImportJobRequeueTests(TestCase):
+	def _job(self, status, age):
+		job = CurriculumImportJob.objects.create(payload={"Subjects": []}, status=status)
+		CurriculumImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - age)
+		return job
+
+	def test_long_queued_job_is_not_requeued_while_running(self):
+		job = self._job(CurriculumImportJob.Status.PENDING, timedelta(hours=2))
+		output = StringIO()
+
+		def import_while_worker_requeues(payload):
+			# Lệnh dọn job kẹt chạy đúng lúc job đang import
+			call_command("process_curriculum_imports", "--requeue-stale=30", stdout=output)
+			return {"rows": {}}
+
+		with mock.patch("apps.curriculum.importer.import_curriculum", side_effect=import_while_worker_requeues) as run:
+			run_import_job(job.pk)
+
+		run.assert_called_once()
+		self.assertNotIn("Requeued", output.getvalue())
+		job.refresh_from_db()
+		self.assertEqual(job.status, CurriculumImportJob.Status.SUCCEEDED)
+
+	def test_stale_running_job_is_requeued_and_run(self):
+		job = self._job(CurriculumImportJob.Status.RUNNING, timedelta(hours=2))
+		self._job(CurriculumImportJob.Status.RUNNING, timedelta(minutes=5))
+		output = StringIO()
+
+		with mock.patch("apps.curriculum.importer.import_curriculum", return_value={"rows": {}}) as run:
+			call_command("process_curriculum_imports", "--requeue-stale=30", stdout=output)
+
+		self.assertIn("Requeued 1 stale jobs.", output.getvalue())
+		run.assert_called_once_with({"Subjects": []})
+		job.refresh_from_db()
+		self.assertEqual(job.status, CurriculumImportJob.Status.SUCCEEDED)
+
+
+class ParseWorkbookTests(TestCase):
+	def test_blank_cells_and_integral_floats_are_normalized(self):
+		buffer = BytesIO()
+		with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+			pd.DataFrame([{"subject_code": "A", "order": 2.0, "title": None}]) \
+				.to_excel(writer, sheet_name="Modules", index=False)
+		buffer.name = "x.xlsx"
+		payload = parse_workbook(buffer)
+		self.assertEqual(
+			payload,
+			{"Modules": [{"subject_code": "A", "order": "2", "title": "", "description": "", "image_url": "", "_row": 2}]},
+		)
+
+
+class CurriculumTreeTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.subject = Subject.objects.create(code="SCI", name="Khoa học")
+		self.modules = [Module.objects.create(subject=self.subject, order=o, title=f"HP {o}") for o in (1, 2)]
+		self.lessons = [
+			Lesson.objects.create(module=module, order=o, title=f"{module.title} - Bài {o}")
+			for module in self.modules
+			for o in (1, 2, 3)
+		]
+		Lecture.objects.create(lesson=self.lessons[0], content="Giới thiệu")
+
+	def test_tree_is_built_once_and_answers_lookups_without_queries(self):
+		with self.assertNumQueries(5):
+			tree = get_curriculum_tree(self.subject.pk)
+		with self.assertNumQueries(0):
+			tree = get_curriculum_tree(self.subject.pk)
+			self.assertEqual([l.id for l in tree.lessons], [l.id for l in self.lessons])
+			self.assertEqual(tree.lesson_for_index(4).id, self.lessons[3].id)
+			self.assertIsNone(tree.lesson_for_index(7))
+			self.assertEqual(tree.module_for_lesson(self.lessons[4].id).id, self.modules[1].id)
+			self.assertEqual(tree.module_number_for_index(3), 1)
+			self.assertEqual(tree.module_number_for_index(4), 2)
+			self.assertEqual(tree.module_number_for_index(25, 12), 3)
+			first = tree.lesson(self.lessons[0].id)
+			self.assertEqual(first.lecture.content, "Giới thiệu")
+			self.assertEqual(first.module.subject.code, "SCI")
+			with self.assertRaises(Lesson.exercise.RelatedObjectDoesNotExist):
+				first.exercise
+
+	def test_saving_curriculum_rows_bumps_version(self):
+		get_curriculum_tree(self.subject.pk)
+		lesson = Lesson.objects.get(pk=self.lessons[1].pk)
+		lesson.title = "Đổi tên"
+		with self.captureOnCommitCallbacks(execute=True):
+			lesson.save()
+		self.assertEqual(get_curriculum_tree(self.subject.pk).lesson(lesson.pk).title, "Đổi tên")
+
+		with self.captureOnCommitCallbacks(execute=True):
+			Exercise.objects.create(lesson=lesson, description="Bài tập mới")
+		self.assertEqual(get_curriculum_tree(self.subject.pk).lesson(lesson.pk).exercise.description, "Bài tập mới")
 
-# Viết test tại đây.
+	def test_lessons_page_is_hydrated_from_tree(self):
+		user = UserFactory(is_superuser=True, is_staff=True)
+		self.client.force_login(user)
+		get_curriculum_tree(self.subject.pk)
+		response = self.client.get(reverse("curriculum:lessons_manage"), HTTP_HX_REQUEST="true")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(
+			[l.id for l in response.context["page_obj"].object_list],
+			[l.id for l in sorted(self.lessons, key=lambda l: (l.module.title, l.order))],
+		)
+		self.assertContains(response, "Khoa học (SCI)")
@@ -0,0 +1,220 @@
+"""
+Cây chương trình học (Subject -> Module -> Lesson -> Lecture/Exercise) cache theo môn.
+
+Cây được dựng bằng 5 truy vấn nhỏ, lưu trong bộ nhớ process và cache dùng chung, gắn với
+một version stamp cho mỗi môn. Signal của các model curriculum tăng version sau khi
+transaction commit nên lần đọc tiếp theo sẽ dựng lại cây.
+
+Các instance trong cây được dùng chung giữa các request: chỉ đọc, không sửa hoặc ``save()``.
+"""
+
+import threading
+import uuid
+from bisect import bisect_right
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Exercise, Lecture, Lesson, Module, Subject
+
+CURRICULUM_TREE_CACHE_TIMEOUT = getattr(settings, "CURRICULUM_TREE_CACHE_TIMEOUT", 60 * 60 * 24)
+# Số buổi mỗi học phần khi môn chưa có cây chương trình
+DEFAULT_MODULE_SIZE = 12
+
+# Cache trong process: subject_id -> (version, tree)
+_local_trees = {}
+_local_lock = threading.Lock()
+
+
+class CurriculumTree:
+    def __init__(self, subject, modules, lessons):
+        self.subject = subject
+        self.modules = modules
+        self.lessons = lessons
+        self._lessons_by_id = {lesson.id: lesson for lesson in lessons}
+        self._modules_by_id = {module.id: module for module in modules}
+        self._lessons_by_module = {module.id: [] for module in modules}
+        for lesson in lessons:
+            self._lessons_by_module[lesson.module_id].append(lesson)
+        # Vị trí (1-based) của bài đầu tiên mỗi học phần trong danh sách bài học
+        self._module_starts = []
+        position = 1
+        for module in modules:
+            if self._lessons_by_module[module.id]:
+                self._module_starts.append((position, module))
+                position += len(self._lessons_by_module[module.id])
+
+    def lesson(self, lesson_id):
+        return self._lessons_by_id.get(lesson_id)
+
+    def module(self, module_id):
+        return self._modules_by_id.get(module_id)
+
+    def lessons_of_module(self, module_id):
+        return list(self._lessons_by_module.get(module_id, []))
+
+    def lesson_for_index(self, index):
+        """Bài học gán cho buổi thứ ``index`` (1-based) theo thứ tự học phần rồi bài."""
+        if not index or index < 1 or index > len(self.lessons):
+            return None
+        return self.lessons[index - 1]
+
+    def module_for_lesson(self, lesson_id):
+        lesson = self.lesson(lesson_id)
+        return lesson.module if lesson else None
+
+    def module_for_index(self, index):
+        """Học phần chứa bài học của buổi thứ ``index``."""
+        if not index or index < 1 or not self._module_starts:
+            return None
+        pos = bisect_right([start for start, _ in self._module_starts], index) - 1
+        return self._module_starts[max(pos, 0)][1]
+
+    def module_number_for_index(self, index, fallback_size=DEFAULT_MODULE_SIZE):
+        """Số thứ tự học phần của buổi; ngoài phạm vi bài học thì chia đều theo ``fallback_size``."""
+        if index and 1 <= index <= len(self.lessons):
+            return self._module_position(self.module_for_index(index))
+        if not index:
+            return 1
+        return ceil(index / fallback_size) if fallback_size else 1
+
+    def _module_position(self, module):
+        for position, (_, item) in enumerate(self._module_starts, start=1):
+            if item.id == module.id:
+                return position
+        return 1
+
+
+def _version_key(subject_id):
+    return f"curriculum-tree-version:{subject_id}"
+
+
+def _tree_key(subject_id, version):
+    return f"curriculum-tree:{subject_id}:{version}"
+
+
+def _current_version(subject_id):
+    key = _version_key(subject_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+def build_curriculum_tree(subject_id) -> CurriculumTree | None:
+    subject = Subject.objects.filter(pk=subject_id).first()
+    if subject is None:
+        return None
+    modules = list(Module.objects.filter(subject_id=subject_id).order_by("order"))
+    lessons = list(Lesson.objects.filter(module__subject_id=subject_id).order_by("module__order", "order"))
+    lesson_ids = [lesson.id for lesson in lessons]
+    lectures = {l.lesson_id: l for l in Lecture.objects.filter(lesson_id__in=lesson_ids)}
+    exercises = {e.lesson_id: e for e in Exercise.objects.filter(lesson_id__in=lesson_ids)}
+
+    # Gắn sẵn quan hệ để template truy cập không phát sinh truy vấn
+    modules_by_id = {}
+    for module in modules:
+        Module.subject.field.set_cached_value(module, subject)
+        modules_by_id[module.id] = module
+    for lesson in lessons:
+        Lesson.module.field.set_cached_value(lesson, modules_by_id[lesson.module_id])
+        for descriptor, related in ((Lesson.lecture, lectures), (Lesson.exercise, exercises)):
+            obj = related.get(lesson.id)
+            descriptor.related.set_cached_value(lesson, obj)
+            if obj is not None:
+                descriptor.related.field.set_cached_value(obj, lesson)
+    return CurriculumTree(subject, modules, lessons)
+
+
+def get_curriculum_tree(subject_id) -> CurriculumTree | None:
+    """Cây chương trình của môn, ưu tiên bộ nhớ process rồi tới cache dùng chung."""
+    if not subject_id:
+        return None
+    version = _current_version(subject_id)
+    local = _local_trees.get(subject_id)
+    if local and local[0] == version:
+        return local[1]
+
+    tree = cache.get(_tree_key(subject_id, version))
+    if tree is None:
+        tree = build_curriculum_tree(subject_id)
+        if tree is None:
+            return None
+        cache.set(_tree_key(subject_id, version), tree, CURRICULUM_TREE_CACHE_TIMEOUT)
+    with _local_lock:
+        _local_trees[subject_id] = (version, tree)
+    return tree
+
+
+def module_number(tree, index, fallback_size=DEFAULT_MODULE_SIZE):
+    """Học phần của buổi thứ ``index``; môn chưa có bài học thì chia đều theo ``fallback_size``."""
+    if tree and tree.lessons:
+        return tree.module_number_for_index(index, fallback_size)
+    return ceil(index / fallback_size) if fallback_size else 1
+
+
+def hydrate_lessons(rows):
+    """
+    ``rows``: iterable (lesson_id, subject_id). Trả về Lesson lấy từ cây theo đúng thứ tự;
+    bài chưa có trong cây (cache chưa kịp làm mới) được đọc thẳng từ DB.
+    """
+    rows = list(rows)
+    found = {}
+    trees = {}
+    for lesson_id, subject_id in rows:
+        if subject_id not in trees:
+            trees[subject_id] = get_curriculum_tree(subject_id)
+        lesson = trees[subject_id].lesson(lesson_id) if trees[subject_id] else None
+        if lesson is not None:
+            found[lesson_id] = lesson
+    missing = [lesson_id for lesson_id, _ in rows if lesson_id not in found]
+    if missing:
+        found.update(
+            Lesson.objects.select_related("module", "module__subject", "lecture", "exercise").in_bulk(missing)
+        )
+    return [found[lesson_id] for lesson_id, _ in rows if lesson_id in found]
+
+
+def subject_ids_for_modules(module_ids):
+    module_ids = {mid for mid in module_ids if mid}
+    found = set()
+    for _, tree in list(_local_trees.values()):
+        for module_id in list(module_ids):
+            if tree.module(module_id):
+                found.add(tree.subject.id)
+                module_ids.discard(module_id)
+    if module_ids:
+        found.update(Module.objects.filter(pk__in=module_ids).values_list("subject_id", flat=True))
+    return found
+
+
+def subject_ids_for_lessons(lesson_ids):
+    lesson_ids = {lid for lid in lesson_ids if lid}
+    found = set()
+    # Dùng cây đã nạp trước để khỏi truy vấn khi xóa hàng loạt (cascade)
+    for _, tree in list(_local_trees.values()):
+        for lesson_id in list(lesson_ids):
+            if tree.lesson(lesson_id):
+                found.add(tree.subject.id)
+                lesson_ids.discard(lesson_id)
+    if lesson_ids:
+        found.update(Lesson.objects.filter(pk__in=lesson_ids).values_list("module__subject_id", flat=True))
+    return found
+
+
+def bump_curriculum_version(*subject_ids):
+    """Đánh dấu cây của các môn đã cũ; chạy sau khi transaction commit."""
+    subject_ids = {sid for sid in subject_ids if sid}
+    if not subject_ids:
+        return
+
+    def bump():
+        for subject_id in subject_ids:
+            cache.set(_version_key(subject_id), uuid.uuid4().hex, None)
+            _local_trees.pop(subject_id, None)
+
+    transaction.on_commit(bump)
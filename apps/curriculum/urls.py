@@ -31,5 +31,6 @@ urlpatterns = [
     # Nhập/Xuất chương trình
     path("curriculum/export/", views.export_curriculum_view, name="curriculum_export"),
     path("curriculum/import/", views.import_curriculum_view, name="curriculum_import"),
+    path("curriculum/import/<int:job_id>/status/", views.import_curriculum_status_view, name="curriculum_import_status"),
     path("curriculum/import/template/", views.import_curriculum_template_view, name="curriculum_import_template"),
 ]
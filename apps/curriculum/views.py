@@ -1,25 +1,22 @@
 import json
-import os
 from datetime import date
 from io import BytesIO
-from urllib.parse import urlparse
 
-import pandas as pd
-import requests
 from django import forms
 from django.contrib.auth.decorators import login_required, permission_required
-from django.core.files.base import ContentFile
 from django.core.paginator import EmptyPage, Paginator
 from django.db import transaction
 from django.db.models import Q
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, render
-from django.utils.text import slugify
 
-from .models import Subject, Module, Lesson, Lecture, Exercise
+from .models import CurriculumImportJob, Subject, Module, Lesson, Lecture, Exercise
+from .importer import parse_workbook, start_import_job_in_background
+from .tree import hydrate_lessons
 from apps.students.models import StudentExerciseSubmission
 from apps.class_sessions.models import ClassSession
 from .forms import SubjectForm, ModuleForm, LessonForm, LectureForm, ExerciseForm, ImportCurriculumForm
+from apps.common.db_routing import replica_reads
 from apps.common.utils.forms import form_errors_as_text
 from apps.common.utils.http import is_htmx_request
 from apps.filters.models import SavedFilter
@@ -345,10 +342,7 @@ def module_delete_view(request):
 @login_required
 @permission_required("curriculum.view_lesson", raise_exception=True)
 def lessons_manage(request):
-    lesson_filter = LessonFilter(
-        request.GET,
-        queryset=Lesson.objects.select_related("module", "module__subject", "lecture", "exercise"),
-    )
+    lesson_filter = LessonFilter(request.GET, queryset=Lesson.objects.all())
     qs = lesson_filter.qs.order_by("module__subject__name", "module__title", "order")
 
     try:
@@ -365,6 +359,8 @@ def lessons_manage(request):
         page_obj = paginator.page(page)
     except EmptyPage:
         page_obj = paginator.page(1)
+    # Trang chỉ lấy id; học phần, môn, bài giảng, bài tập lấy từ cây chương trình đã cache
+    page_obj.object_list = hydrate_lessons(page_obj.object_list.values_list("id", "module__subject_id"))
 
     saved_filters = SavedFilter.objects.filter(model_name="Lesson").filter(
         Q(user=request.user) | Q(is_public=True)
@@ -658,7 +654,10 @@ def exercise_delete_view(request, lesson_id: int):
 # Xuất curriculum ra file Excel
 @login_required
 @permission_required("curriculum.view_subject", raise_exception=True)
+@replica_reads()
 def export_curriculum_view(request):
+    import pandas as pd
+
     # Dựng DataFrame cho từng thực thể
     subjects_qs = Subject.objects.all().order_by("code")
     modules_qs = Module.objects.select_related("subject").all().order_by("subject__code", "order")
@@ -767,258 +766,49 @@ def import_curriculum_view(request):
                 status=422,
             )
 
-        # Đọc toàn bộ sheet
+        # Chỉ đọc file trong request; tải file đính kèm và ghi DB chạy ở nền
         try:
-            # Reset con trỏ phòng trường hợp đọc lại
-            upload.seek(0)
-            sheets = pd.read_excel(upload, sheet_name=None)
+            payload = parse_workbook(upload)
         except Exception as e:
             form = ImportCurriculumForm()
             return render(request, "_import_curriculum_form.html", {"form": form, "errors": [f"Không thể đọc file: {str(e)}"]}, status=422)
 
-        errors = []
-
-        def _download_file_to_content(url: str, prefix: str) -> tuple[str, ContentFile] | None:
-            try:
-                r = requests.get(url, timeout=10, stream=True)
-                r.raise_for_status()
-                # Thử suy ra tên file từ URL
-                parsed = urlparse(url)
-                base = os.path.basename(parsed.path) or prefix
-                name, ext = os.path.splitext(base)
-                if not ext:
-                    # Đoán phần mở rộng theo content-type
-                    ct = r.headers.get('Content-Type', '').lower()
-                    if 'pdf' in ct:
-                        ext = '.pdf'
-                    elif 'ms-powerpoint' in ct or 'presentation' in ct or 'ppt' in ct:
-                        ext = '.pptx'
-                    elif 'msword' in ct or 'word' in ct or 'doc' in ct:
-                        ext = '.docx'
-                    elif 'zip' in ct:
-                        ext = '.zip'
-                    else:
-                        ext = ''
-                safe = slugify(name) or prefix
-                filename = f"{safe}{ext}"
-                content = ContentFile(r.content)
-                return filename, content
-            except Exception:
-                return None
-        savepoint = None
-        try:
-            with transaction.atomic():
-                savepoint = transaction.savepoint()
-
-                # 1) Môn học
-                df = sheets.get("Subjects")
-                if df is not None and not df.empty:
-                    for idx, row in df.iterrows():
-                        code = str(row.get("code") or "").strip()
-                        name = str(row.get("name") or "").strip()
-                        description = str(row.get("description") or "").strip()
-                        avatar_url = str(row.get("avatar_url") or "").strip()
-                        if not code:
-                            errors.append(f"Subjects!Dòng {idx+2}: Thiếu 'code'.")
-                            continue
-                        subj, _ = Subject.objects.get_or_create(code=code, defaults={"name": name, "description": description})
-                        # Cập nhật nếu bản ghi đã tồn tại
-                        if (name and subj.name != name) or (description and subj.description != description) or (avatar_url and subj.avatar_url != avatar_url):
-                            if name:
-                                subj.name = name
-                            subj.description = description
-                            subj.avatar_url = avatar_url or None
-                            subj.save()
-
-                # 2) Học phần
-                df = sheets.get("Modules")
-                if df is not None and not df.empty:
-                    for idx, row in df.iterrows():
-                        subject_code = str(row.get("subject_code") or "").strip()
-                        try:
-                            order = int(row.get("order"))
-                        except Exception:
-                            order = None
-                        title = str(row.get("title") or "").strip()
-                        description = str(row.get("description") or "").strip()
-                        image_url = str(row.get("image_url") or "").strip()
-                        if not subject_code or order is None:
-                            errors.append(f"Modules!Dòng {idx+2}: Thiếu 'subject_code' hoặc 'order'.")
-                            continue
-                        try:
-                            subject = Subject.objects.get(code=subject_code)
-                        except Subject.DoesNotExist:
-                            errors.append(f"Modules!Dòng {idx+2}: Subject '{subject_code}' không tồn tại.")
-                            continue
-                        module, _ = Module.objects.get_or_create(subject=subject, order=order, defaults={"title": title, "description": description, "image_url": image_url})
-                        if (title and module.title != title) or (description and module.description != description) or (image_url and (module.image_url or "") != image_url):
-                            if title:
-                                module.title = title
-                            module.description = description
-                            module.image_url = image_url or None
-                            module.save()
-
-                # 3) Bài học
-                df = sheets.get("Lessons")
-                if df is not None and not df.empty:
-                    for idx, row in df.iterrows():
-                        subject_code = str(row.get("subject_code") or "").strip()
-                        try:
-                            module_order = int(row.get("module_order"))
-                        except Exception:
-                            module_order = None
-                        try:
-                            order = int(row.get("order"))
-                        except Exception:
-                            order = None
-                        title = str(row.get("title") or "").strip()
-                        objectives = str(row.get("objectives") or "").strip()
-                        if not subject_code or module_order is None or order is None:
-                            errors.append(f"Lessons!Dòng {idx+2}: Thiếu 'subject_code', 'module_order' hoặc 'order'.")
-                            continue
-                        try:
-                            subject = Subject.objects.get(code=subject_code)
-                            module = Module.objects.get(subject=subject, order=module_order)
-                        except (Subject.DoesNotExist, Module.DoesNotExist):
-                            errors.append(f"Lessons!Dòng {idx+2}: Module ({subject_code}, {module_order}) không tồn tại.")
-                            continue
-                        lesson, _ = Lesson.objects.get_or_create(module=module, order=order, defaults={"title": title, "objectives": objectives})
-                        if (title and lesson.title != title) or (objectives and lesson.objectives != objectives):
-                            if title:
-                                lesson.title = title
-                            lesson.objectives = objectives
-                            lesson.save()
-
-                # 4) Bài giảng
-                df = sheets.get("Lectures")
-                if df is not None and not df.empty:
-                    for idx, row in df.iterrows():
-                        subject_code = str(row.get("subject_code") or "").strip()
-                        try:
-                            module_order = int(row.get("module_order"))
-                            lesson_order = int(row.get("lesson_order"))
-                        except Exception:
-                            module_order = None
-                            lesson_order = None
-                        content = str(row.get("content") or "").strip()
-                        video_url = str(row.get("video_url") or "").strip()
-                        file_url = str(row.get("file_url") or "").strip()
-                        if not subject_code or module_order is None or lesson_order is None:
-                            errors.append(f"Lectures!Dòng {idx+2}: Thiếu 'subject_code', 'module_order' hoặc 'lesson_order'.")
-                            continue
-                        try:
-                            subject = Subject.objects.get(code=subject_code)
-                            module = Module.objects.get(subject=subject, order=module_order)
-                            lesson = Lesson.objects.get(module=module, order=lesson_order)
-                        except (Subject.DoesNotExist, Module.DoesNotExist, Lesson.DoesNotExist):
-                            errors.append(f"Lectures!Dòng {idx+2}: Lesson ({subject_code}, {module_order}, {lesson_order}) không tồn tại.")
-                            continue
-                        lecture, _ = Lecture.objects.get_or_create(lesson=lesson)
-                        if content:
-                            lecture.content = content
-                        # Thử tải file nếu có file_url
-                        if file_url:
-                            dl = _download_file_to_content(file_url, prefix=f"lecture-{lesson.id}")
-                            if dl:
-                                fname, cfile = dl
-                                try:
-                                    lecture.file.save(fname, cfile, save=False)
-                                except Exception:
-                                    # Rớt về lưu lại URL nếu lỗi
-                                    if not video_url:
-                                        video_url = file_url
-                            else:
-                                # Lưu URL để hiển thị dự phòng
-                                if not video_url:
-                                    video_url = file_url
-                        lecture.video_url = video_url
-                        lecture.save()
-
-                # 5) Bài tập
-                df = sheets.get("Exercises")
-                if df is not None and not df.empty:
-                    for idx, row in df.iterrows():
-                        subject_code = str(row.get("subject_code") or "").strip()
-                        try:
-                            module_order = int(row.get("module_order"))
-                            lesson_order = int(row.get("lesson_order"))
-                        except Exception:
-                            module_order = None
-                            lesson_order = None
-                        description = str(row.get("description") or "").strip()
-                        difficulty_raw = str(row.get("difficulty") or "").strip().lower()
-                        file_url = str(row.get("file_url") or "").strip()
-                        if difficulty_raw in {"dễ", "de", "de~", "easy"}:
-                            difficulty = "easy"
-                        elif difficulty_raw in {"trung bình", "trung binh", "medium"}:
-                            difficulty = "medium"
-                        elif difficulty_raw in {"khó", "kho", "hard"}:
-                            difficulty = "hard"
-                        elif not difficulty_raw:
-                            difficulty = "medium"
-                        else:
-                            errors.append(f"Exercises!Dòng {idx+2}: 'difficulty' không hợp lệ: {difficulty_raw}.")
-                            continue
-
-                        if not subject_code or module_order is None or lesson_order is None:
-                            errors.append(f"Exercises!Dòng {idx+2}: Thiếu 'subject_code', 'module_order' hoặc 'lesson_order'.")
-                            continue
-                        try:
-                            subject = Subject.objects.get(code=subject_code)
-                            module = Module.objects.get(subject=subject, order=module_order)
-                            lesson = Lesson.objects.get(module=module, order=lesson_order)
-                        except (Subject.DoesNotExist, Module.DoesNotExist, Lesson.DoesNotExist):
-                            errors.append(f"Exercises!Dòng {idx+2}: Lesson ({subject_code}, {module_order}, {lesson_order}) không tồn tại.")
-                            continue
-                        exercise, _ = Exercise.objects.get_or_create(lesson=lesson)
-                        if description:
-                            exercise.description = description if pd.notna(description) else ""
-                        exercise.difficulty = difficulty
-                        # Thử tải file đính kèm
-                        if file_url:
-                            dl = _download_file_to_content(file_url, prefix=f"exercise-{lesson.id}")
-                            if dl:
-                                fname, cfile = dl
-                                try:
-                                    exercise.file.save(fname, cfile, save=False)
-                                    exercise.link_url = ""
-                                except Exception:
-                                    exercise.link_url = file_url
-                            else:
-                                exercise.link_url = file_url
-                        exercise.save()
-
-                # Nếu có lỗi thì rollback
-                if errors:
-                    transaction.savepoint_rollback(savepoint)
-                else:
-                    transaction.savepoint_commit(savepoint)
-
-        except Exception as e:
-            errors.append(str(e))
-            if savepoint:
-                transaction.savepoint_rollback(savepoint)
-
-        if errors:
-            form = ImportCurriculumForm()
-            return render(request, "_import_curriculum_form.html", {"form": form, "errors": errors}, status=422)
-
-        resp = HttpResponse(status=200)
-        resp["HX-Trigger"] = json.dumps({
-            "reload-subjects-table": True,
-            "show-sweet-alert": {"icon": "success", "title": "Import Chương trình thành công!"},
-            "closeSubjectModal": True,
-        })
-        return resp
+        job = CurriculumImportJob.objects.create(filename=upload.name, payload=payload, created_by=request.user)
+        transaction.on_commit(lambda: start_import_job_in_background(job.pk))
+        return render(request, "_import_curriculum_status.html", {"job": job}, status=202)
 
     # Xử lý GET
     form = ImportCurriculumForm()
     return render(request, "_import_curriculum_form.html", {"form": form})
 
+# Trạng thái job nhập curriculum (modal poll mỗi 2 giây)
+@login_required
+@permission_required("curriculum.add_subject", raise_exception=True)
+def import_curriculum_status_view(request, job_id):
+    job = get_object_or_404(CurriculumImportJob, pk=job_id)
+    if job.status == CurriculumImportJob.Status.FAILED:
+        # 286: htmx thay form báo lỗi và dừng poll
+        form = ImportCurriculumForm()
+        return render(request, "_import_curriculum_form.html", {"form": form, "errors": job.errors}, status=286)
+    if job.status != CurriculumImportJob.Status.SUCCEEDED:
+        return render(request, "_import_curriculum_status.html", {"job": job})
+
+    # 286: htmx dừng poll
+    resp = HttpResponse(status=286)
+    rows = sum(job.stats.get("rows", {}).values())
+    resp["HX-Trigger"] = json.dumps({
+        "reload-subjects-table": True,
+        "show-sweet-alert": {"icon": "success", "title": "Import Chương trình thành công!", "text": f"Đã cập nhật {rows} dòng."},
+        "closeSubjectModal": True,
+    })
+    return resp
+
 # Tải mẫu file nhập curriculum 
 @login_required
 @permission_required("curriculum.view_subject", raise_exception=True)
 def import_curriculum_template_view(request):
+    import pandas as pd
+
     # File template chỉ gồm header trống
     output = BytesIO()
     with pd.ExcelWriter(output, engine="openpyxl") as writer:
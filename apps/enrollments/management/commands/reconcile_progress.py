@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from apps.common.fragments import bump_table_versions
+from apps.enrollments.models import EnrollmentProgress
+from apps.enrollments.progress import PROGRESS_BATCH_SIZE, reconcile_progress
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every enrollment's progress from sessions, attendance and assessments and compare it "
+        "with the incrementally maintained EnrollmentProgress rows. Run nightly; --fix rewrites drifted rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Ghi đè bản ghi sai và tạo bản ghi thiếu")
+        parser.add_argument("--include-archived", action="store_true", help="Kiểm tra cả lớp đã lưu trữ")
+        parser.add_argument("--batch-size", type=int, default=PROGRESS_BATCH_SIZE, help="Số lớp mỗi lô")
+        parser.add_argument("--show", type=int, default=20, help="Số ghi danh lệch in ra")
+
+    def handle(self, *args, **options):
+        result = reconcile_progress(
+            fix=options["fix"], include_archived=options["include_archived"], batch_size=options["batch_size"]
+        )
+        mismatches = result["mismatches"]
+        for pk, diff in list(mismatches.items())[: options["show"]]:
+            changes = ", ".join(f"{field}: {stored} -> {expected}" for field, (stored, expected) in diff.items())
+            self.stdout.write(f"  enrollment {pk}: {changes}")
+
+        summary = (
+            f"Checked {result['checked']} enrollments: {len(mismatches)} drifted, {len(result['missing'])} missing."
+        )
+        if not mismatches and not result["missing"]:
+            self.stdout.write(self.style.SUCCESS(summary))
+        elif options["fix"]:
+            bump_table_versions(EnrollmentProgress)
+            self.stdout.write(self.style.SUCCESS(f"{summary} Fixed."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{summary} Run with --fix to rewrite them."))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enrollments', '0008_enrollment_created_at_enrollment_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', 'klass', 'active'], name='enrollments_student_e917cb_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class_sessions', '0003_classsession_date_klass_indexes'),
+        ('enrollments', '0009_enrollment_student_klass_active_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sessions', models.PositiveIntegerField(default=0)),
+                ('completed_sessions', models.PositiveIntegerField(default=0, help_text='Số buổi DONE hoặc MISSED')),
+                ('current_module', models.PositiveIntegerField(blank=True, help_text='Học phần của buổi sắp tới (trống khi đã học hết)', null=True)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('scored', models.PositiveIntegerField(default=0)),
+                ('score_total', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('last_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('last_remark', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='enrollments.enrollment')),
+                ('last_assessment_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='class_sessions.classsession')),
+            ],
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 
+from apps.common.models import TimeStampedModel
+
 
 class EnrollmentStatus(models.TextChoices):
     NEW = "NEW", "Mới"
@@ -10,7 +12,7 @@ class EnrollmentStatus(models.TextChoices):
     CANCELLED = "CANCELLED", "Nghỉ học"
 
 
-class Enrollment(models.Model):
+class Enrollment(TimeStampedModel):
     klass = models.ForeignKey(
         "classes.Class", on_delete=models.CASCADE, related_name="enrollments"
     )
@@ -52,6 +54,7 @@ class Enrollment(models.Model):
             models.Index(fields=["klass"]),
             models.Index(fields=["student"]),
             models.Index(fields=["status"]),
+            models.Index(fields=["student", "klass", "active"]),
         ]
 
     ACTIVE_STATUSES = {EnrollmentStatus.NEW, EnrollmentStatus.ACTIVE}
@@ -124,3 +127,56 @@ class EnrollmentStatusLog(models.Model):
 
     def __str__(self):
         return f"{self.enrollment_id}: {self.old_status} -> {self.new_status} ({self.reason})"
+
+
+class EnrollmentProgress(models.Model):
+    """
+    Tiến độ học của ghi danh, cập nhật dần khi buổi học đổi trạng thái, khi điểm danh hoặc đánh
+    giá thay đổi (``apps.enrollments.progress``); ``reconcile_progress`` đối soát lại hằng đêm.
+    """
+
+    enrollment = models.OneToOneField(
+        Enrollment, on_delete=models.CASCADE, related_name="progress"
+    )
+    total_sessions = models.PositiveIntegerField(default=0)
+    completed_sessions = models.PositiveIntegerField(
+        default=0, help_text="Số buổi DONE hoặc MISSED"
+    )
+    current_module = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Học phần của buổi sắp tới (trống khi đã học hết)"
+    )
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    # Số đánh giá có điểm và tổng điểm, để tính điểm trung bình không cần truy vấn
+    scored = models.PositiveIntegerField(default=0)
+    score_total = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    last_assessment_session = models.ForeignKey(
+        "class_sessions.ClassSession",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    last_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    last_remark = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Tiến độ ghi danh {self.enrollment_id}: {self.completed_sessions}/{self.total_sessions}"
+
+    @property
+    def progress_percent(self) -> int:
+        if not self.total_sessions:
+            return 0
+        return self.completed_sessions * 100 // self.total_sessions
+
+    @property
+    def average_score(self):
+        if not self.scored:
+            return None
+        return round(self.score_total / self.scored, 2)
+
+    @property
+    def attendance(self) -> dict:
+        return {"P": self.present, "A": self.absent, "L": self.late}
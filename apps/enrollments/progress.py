@@ -0,0 +1,260 @@
+"""
+Tiến độ học theo ghi danh (``EnrollmentProgress``), cập nhật dần thay vì tính lại mỗi lần xem.
+
+- Số buổi, số buổi đã xong và học phần hiện tại là số liệu của lớp: tính lại một lần cho cả lớp
+  khi buổi học được tạo, xóa hoặc đổi trạng thái/ngày/số thứ tự (``refresh_class``).
+- Điểm danh P/A/L cộng trừ theo trạng thái cũ/mới bằng ``F()`` (``attendance_changed``).
+- Điểm và đánh giá gần nhất tính lại cho (lớp, học sinh) khi đánh giá thay đổi (``assessments_changed``).
+
+Như báo cáo học tập, số liệu theo học sinh áp dụng cho mọi ghi danh của học sinh trong lớp. Lớp đã
+lưu trữ đọc từ bản tổng hợp lưu trữ. Ghi danh chưa có bản ghi (dữ liệu seed, nhập snapshot) được
+tính khi đọc (``progress_for``); lệnh ``reconcile_progress`` đối soát bản ghi với dữ liệu gốc.
+"""
+
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.archive.models import ArchivedEnrollment, ClassArchive
+from apps.archive.services import archived_class_ids, archived_records
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.class_sessions.models import ClassSession
+from apps.classes.models import Class
+from apps.curriculum.tree import get_curriculum_tree, module_number
+from apps.enrollments.models import Enrollment, EnrollmentProgress
+
+# Số lớp mỗi lô khi tính lại hàng loạt (đối soát, nhập snapshot)
+PROGRESS_BATCH_SIZE = getattr(settings, "PROGRESS_BATCH_SIZE", 200)
+
+DONE_STATUSES = ("DONE", "MISSED")
+ATTENDANCE_FIELDS = {"P": "present", "A": "absent", "L": "late"}
+CLASS_FIELDS = ("total_sessions", "completed_sessions", "current_module")
+ASSESSMENT_FIELDS = ("scored", "score_total", "last_assessment_session_id", "last_score", "last_remark")
+PROGRESS_FIELDS = CLASS_FIELDS + tuple(ATTENDANCE_FIELDS.values()) + ASSESSMENT_FIELDS
+
+
+def _empty_student() -> dict:
+    return {
+        "present": 0,
+        "absent": 0,
+        "late": 0,
+        "scored": 0,
+        "score_total": Decimal(0),
+        "last_assessment_session_id": None,
+        "last_score": None,
+        "last_remark": "",
+    }
+
+
+def _class_progress(class_ids) -> dict:
+    """klass_id -> số buổi, số buổi đã xong, học phần của buổi sắp tới (như báo cáo học tập)."""
+    subjects = dict(Class.objects.filter(pk__in=class_ids).values_list("pk", "subject_id"))
+    result = {klass_id: {"total_sessions": 0, "completed_sessions": 0, "current_module": None} for klass_id in subjects}
+    upcoming = {}
+    sessions = ClassSession.objects.filter(klass_id__in=subjects).order_by("klass_id", "date", "index")
+    for klass_id, index, status in sessions.values_list("klass_id", "index", "status"):
+        values = result[klass_id]
+        values["total_sessions"] += 1
+        if status in DONE_STATUSES:
+            values["completed_sessions"] += 1
+        else:
+            upcoming.setdefault(klass_id, index)
+    for klass_id, index in upcoming.items():
+        result[klass_id]["current_module"] = module_number(get_curriculum_tree(subjects[klass_id]), index)
+    return result
+
+
+def _assessment_progress(class_ids, student_ids) -> dict:
+    """(lớp, học sinh) -> số đánh giá có điểm, tổng điểm và đánh giá gần nhất."""
+    result = defaultdict(_empty_student)
+    assessments = Assessment.objects.filter(session__klass_id__in=class_ids, student_id__in=student_ids)
+    totals = (
+        assessments.values_list("session__klass_id", "student_id")
+        .annotate(scored=Count("score"), score_total=Sum("score"))
+        .order_by()
+    )
+    for klass_id, student_id, scored, score_total in totals:
+        result[klass_id, student_id].update(scored=scored, score_total=score_total or Decimal(0))
+    # DISTINCT ON: một đánh giá mới nhất cho mỗi (lớp, học sinh), cùng thứ tự với báo cáo
+    latest = assessments.order_by("session__klass_id", "student_id", "-session__date", "-session__index").distinct(
+        "session__klass_id", "student_id"
+    )
+    for klass_id, student_id, session_id, score, remark in latest.values_list(
+        "session__klass_id", "student_id", "session_id", "score", "remark"
+    ):
+        result[klass_id, student_id].update(last_assessment_session_id=session_id, last_score=score, last_remark=remark)
+    return result
+
+
+def _student_progress(class_ids, student_ids) -> dict:
+    """(lớp, học sinh) -> điểm danh và đánh giá của lớp chưa lưu trữ."""
+    result = _assessment_progress(class_ids, student_ids)
+    attendance = (
+        Attendance.objects.filter(session__klass_id__in=class_ids, student_id__in=student_ids)
+        .values_list("session__klass_id", "student_id", "status")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for klass_id, student_id, status, total in attendance:
+        result[klass_id, student_id][ATTENDANCE_FIELDS[status]] = total
+    return result
+
+
+def _archived_progress(class_ids, student_ids) -> dict:
+    """(lớp, học sinh) -> số liệu của lớp đã lưu trữ, cộng từ bản tổng hợp theo ghi danh."""
+    result = defaultdict(_empty_student)
+    summaries = ArchivedEnrollment.objects.filter(
+        enrollment__klass_id__in=class_ids, enrollment__student_id__in=student_ids
+    ).values_list("enrollment__klass_id", "enrollment__student_id", "present", "absent", "late", "assessments", "average_score")
+    for klass_id, student_id, present, absent, late, scored, average in summaries:
+        values = result[klass_id, student_id]
+        values["present"] += present
+        values["absent"] += absent
+        values["late"] += late
+        values["scored"] += scored
+        values["score_total"] += (average or 0) * scored
+    for klass_id in class_ids:
+        records = archived_records(Assessment, klass_id, student__in=student_ids)
+        if not records:
+            continue
+        # NULL đứng đầu khi sắp giảm dần, như ORDER BY -date trên Postgres
+        sessions = {
+            pk: (date is None, date, index)
+            for pk, date, index in ClassSession.objects.filter(klass_id=klass_id).values_list("pk", "date", "index")
+        }
+        latest = {}
+        for record in records:
+            key = sessions.get(record.session_id)
+            current = latest.get(record.student_id)
+            if key is not None and (current is None or key > sessions[current.session_id]):
+                latest[record.student_id] = record
+        for student_id, record in latest.items():
+            result[klass_id, student_id].update(
+                last_assessment_session_id=record.session_id, last_score=record.score, last_remark=record.remark
+            )
+    return result
+
+
+def compute_progress(enrollments) -> dict:
+    """enrollment_id -> giá trị các cột tiến độ, tính từ dữ liệu gốc theo lô lớp."""
+    enrollments = list(enrollments)
+    class_ids = {enrollment.klass_id for enrollment in enrollments}
+    student_ids = {enrollment.student_id for enrollment in enrollments}
+    archived = archived_class_ids(class_ids)
+    by_class = _class_progress(class_ids)
+    by_student = _student_progress(class_ids - archived, student_ids)
+    if archived:
+        by_student.update(_archived_progress(archived, student_ids))
+    return {
+        enrollment.pk: {**by_class[enrollment.klass_id], **by_student[enrollment.klass_id, enrollment.student_id]}
+        for enrollment in enrollments
+    }
+
+
+def _save_progress(values_by_enrollment) -> list[EnrollmentProgress]:
+    rows = [EnrollmentProgress(enrollment_id=pk, **values) for pk, values in values_by_enrollment.items()]
+    if not rows:
+        return []
+    return EnrollmentProgress.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["enrollment"],
+        update_fields=[*PROGRESS_FIELDS, "updated_at"],
+    )
+
+
+def refresh_progress(enrollments) -> list[EnrollmentProgress]:
+    """Tính lại và ghi đè tiến độ của các ghi danh (tạo bản ghi nếu chưa có)."""
+    return _save_progress(compute_progress(enrollments))
+
+
+def progress_for(enrollments) -> dict:
+    """enrollment_id -> ``EnrollmentProgress``; một truy vấn nếu mọi ghi danh đã có bản ghi."""
+    enrollments = list(enrollments)
+    found = {
+        progress.enrollment_id: progress
+        for progress in EnrollmentProgress.objects.filter(enrollment_id__in=[enrollment.pk for enrollment in enrollments])
+    }
+    missing = [enrollment for enrollment in enrollments if enrollment.pk not in found]
+    if missing:
+        found.update((progress.enrollment_id, progress) for progress in refresh_progress(missing))
+    return found
+
+
+def refresh_class(klass_id):
+    """Cập nhật số liệu cấp lớp cho mọi ghi danh của lớp (một UPDATE)."""
+    values = _class_progress({klass_id}).get(klass_id)
+    if values is not None:
+        EnrollmentProgress.objects.filter(enrollment__klass_id=klass_id).update(**values, updated_at=timezone.now())
+
+
+def attendance_changed(klass_id, student_id, old_status=None, new_status=None):
+    """Cộng trừ số điểm danh theo trạng thái cũ/mới (``None``: bản ghi vừa tạo hoặc đã xóa)."""
+    deltas = Counter()
+    if old_status in ATTENDANCE_FIELDS:
+        deltas[ATTENDANCE_FIELDS[old_status]] -= 1
+    if new_status in ATTENDANCE_FIELDS:
+        deltas[ATTENDANCE_FIELDS[new_status]] += 1
+    updates = {field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items() if delta}
+    if updates:
+        EnrollmentProgress.objects.filter(enrollment__klass_id=klass_id, enrollment__student_id=student_id).update(
+            **updates, updated_at=timezone.now()
+        )
+
+
+def assessments_changed(klass_id, student_id):
+    """Tính lại điểm và đánh giá gần nhất của học sinh trong lớp."""
+    if archived_class_ids({klass_id}):
+        # Lớp đã lưu trữ giữ nguyên số liệu lúc lưu trữ
+        return
+    values = _assessment_progress({klass_id}, {student_id})[klass_id, student_id]
+    EnrollmentProgress.objects.filter(enrollment__klass_id=klass_id, enrollment__student_id=student_id).update(
+        **{field: values[field] for field in ASSESSMENT_FIELDS}, updated_at=timezone.now()
+    )
+
+
+def class_batches(enrollments, batch_size=PROGRESS_BATCH_SIZE):
+    """Chia ghi danh thành lô theo lớp để tính hàng loạt với số truy vấn cố định mỗi lô."""
+    class_ids = sorted(set(enrollments.values_list("klass_id", flat=True)))
+    for start in range(0, len(class_ids), batch_size):
+        yield list(enrollments.filter(klass_id__in=class_ids[start : start + batch_size]).order_by("pk"))
+
+
+def reconcile_progress(fix=False, include_archived=False, batch_size=PROGRESS_BATCH_SIZE) -> dict:
+    """
+    So bản ghi tiến độ với giá trị tính lại từ dữ liệu gốc. Trả về số ghi danh đã kiểm tra, số bản
+    ghi thiếu, và ``mismatches``: enrollment_id -> {cột: (đang lưu, đúng)}. ``fix`` ghi đè các
+    bản ghi sai và tạo bản ghi thiếu. Lớp đã lưu trữ không còn thay đổi nên mặc định bỏ qua.
+    """
+    enrollments = Enrollment.objects.all()
+    if not include_archived:
+        enrollments = enrollments.exclude(klass_id__in=ClassArchive.objects.values("klass_id"))
+    checked = 0
+    missing = []
+    mismatches = {}
+    for batch in class_batches(enrollments, batch_size):
+        expected = compute_progress(batch)
+        stored = {
+            row["enrollment_id"]: row
+            for row in EnrollmentProgress.objects.filter(enrollment_id__in=expected).values("enrollment_id", *PROGRESS_FIELDS)
+        }
+        stale = {}
+        for pk, values in expected.items():
+            checked += 1
+            row = stored.get(pk)
+            if row is None:
+                missing.append(pk)
+                stale[pk] = values
+                continue
+            diff = {field: (row[field], value) for field, value in values.items() if row[field] != value}
+            if diff:
+                mismatches[pk] = diff
+                stale[pk] = values
+        if fix:
+            _save_progress(stale)
+    return {"checked": checked, "missing": missing, "mismatches": mismatches}
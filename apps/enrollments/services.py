@@ -2,11 +2,15 @@ from datetime import date, timedelta
 from decimal import Decimal
 
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Floor, Greatest
+from django.utils import timezone
 
+from apps.archive.models import ArchivedBillingDay, ArchivedEnrollment
 from apps.attendance.models import Attendance
 from apps.billing.models import BillingEntry, Discount
 from apps.classes.models import Class
+from apps.common.fragments import bump_table_versions
 from apps.enrollments.models import Enrollment, EnrollmentStatus, EnrollmentStatusLog
 
 ATTENDED_STATUSES = {"P", "L"}  
@@ -23,26 +27,55 @@ def recalc_sessions_consumed(enrollment: Enrollment) -> tuple[int, int]:
     Returns (consumed, delta). Delta = consumed - previous.
     """
     previous = enrollment.sessions_consumed
-    consumed = (
+    attended = (
         Attendance.objects.filter(
-            session__klass=enrollment.klass,
-            student=enrollment.student,
+            session__klass_id=OuterRef("klass_id"),
+            student_id=OuterRef("student_id"),
             status__in=ATTENDED_STATUSES,
         )
-        .distinct()
-        .count()
+        .order_by()
+        .values("student")
+        .annotate(total=Count("session", distinct=True))
+        .values("total")
+    )
+    # Điểm danh của lớp đã lưu trữ chỉ còn trong bản tổng hợp
+    archived = (
+        ArchivedEnrollment.objects.filter(
+            enrollment__klass_id=OuterRef("klass_id"), enrollment__student_id=OuterRef("student_id")
+        )
+        .order_by()
+        .values("archive")
+        .annotate(total=Sum(F("present") + F("late")))
+        .values("total")
+    )
+    consumed = (
+        Enrollment.objects.filter(pk=enrollment.pk)
+        .values_list(
+            Coalesce(Subquery(attended, output_field=IntegerField()), Value(0))
+            + Coalesce(Subquery(archived, output_field=IntegerField()), Value(0)),
+            flat=True,
+        )
+        .first()
+        or 0
     )
     if previous != consumed:
-        Enrollment.objects.filter(pk=enrollment.pk).update(sessions_consumed=consumed)
+        Enrollment.objects.filter(pk=enrollment.pk).update(sessions_consumed=consumed, updated_at=timezone.now())
+        bump_table_versions(Enrollment)
     return consumed, consumed - previous
 
 
 def total_sessions_purchased(enrollment: Enrollment) -> int:
     base = max(enrollment.sessions_purchased, enrollment.sessions_from_payment)
+    live = BillingEntry.objects.filter(enrollment=OuterRef("pk")).order_by().values("enrollment")
+    archived = ArchivedBillingDay.objects.filter(enrollment=OuterRef("pk")).order_by().values("enrollment")
     adj = (
-        BillingEntry.objects.filter(enrollment=enrollment)
-        .aggregate(v=Sum("sessions"))
-        .get("v")
+        Enrollment.objects.filter(pk=enrollment.pk)
+        .values_list(
+            Coalesce(Subquery(live.annotate(v=Sum("sessions")).values("v"), output_field=IntegerField()), Value(0))
+            + Coalesce(Subquery(archived.annotate(v=Sum("sessions")).values("v"), output_field=IntegerField()), Value(0)),
+            flat=True,
+        )
+        .first()
         or 0
     )
     return max(base + adj, 0)
@@ -55,6 +88,43 @@ def sessions_remaining(enrollment: Enrollment) -> int:
     return remaining if remaining > 0 else 0
 
 
+def annotate_session_balance(queryset):
+    """
+    Thêm ``paid_sessions`` và ``remaining_sessions`` tính ngay trong SQL, cùng công thức với
+    ``total_sessions_purchased`` nhưng dùng ``sessions_consumed`` đã lưu (do signal điểm danh
+    cập nhật) để không phải đếm lại điểm danh cho từng ghi danh.
+    """
+    adjustments = (
+        BillingEntry.objects.filter(enrollment=OuterRef("pk"))
+        .order_by()
+        .values("enrollment")
+        .annotate(total=Sum("sessions"))
+        .values("total")
+    )
+    archived_adjustments = (
+        ArchivedBillingDay.objects.filter(enrollment=OuterRef("pk"))
+        .order_by()
+        .values("enrollment")
+        .annotate(total=Sum("sessions"))
+        .values("total")
+    )
+    from_payment = Case(
+        When(fee_per_session__gt=0, then=Cast(Floor(F("amount_paid") / F("fee_per_session")), IntegerField())),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    paid = Greatest(
+        Greatest(Cast("sessions_purchased", IntegerField()), from_payment)
+        + Coalesce(Subquery(adjustments, output_field=IntegerField()), Value(0))
+        + Coalesce(Subquery(archived_adjustments, output_field=IntegerField()), Value(0)),
+        Value(0),
+    )
+    return queryset.annotate(
+        paid_sessions=paid,
+        remaining_sessions=Greatest(paid - F("sessions_consumed"), Value(0)),
+    )
+
+
 def calculate_end_date(start_date: date | None, sessions_total: int, klass: Class | None) -> date | None:
     """
     Estimate end date based on class weekly schedule.
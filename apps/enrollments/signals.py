@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Enrollment
+from .progress import refresh_progress
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_create_progress(sender, instance: Enrollment, created, **kwargs):
+    if created:
+        refresh_progress([instance])
@@ -1,3 +1,108 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from apps.archive.services import archive_class
+from apps.assessments.models import Assessment
+from apps.attendance.models import Attendance
+from apps.common.factories import ClassSessionFactory, KlassFactory, UserFactory
+from apps.reports.views import _student_progress_rows, _student_report_rows
+
+from .models import Enrollment, EnrollmentProgress, EnrollmentStatus
+from .progress import compute_progress, progress_for, reconcile_progress
+
+
+class EnrollmentProgressTests(TestCase):
+	def setUp(self):
+		self.klass = KlassFactory(status="ONGOING")
+		self.student = UserFactory(role="STUDENT")
+		self.enrollment = Enrollment.objects.create(klass=self.klass, student=self.student, status=EnrollmentStatus.ACTIVE)
+		self.sessions = [
+			ClassSessionFactory(
+				klass=self.klass, index=index, date=datetime.date(2024, 1, 1) + datetime.timedelta(days=index), status="PLANNED"
+			)
+			for index in range(1, 15)
+		]
+
+	def _progress(self):
+		return EnrollmentProgress.objects.get(enrollment=self.enrollment)
+
+	def _assert_matches_source(self):
+		expected = compute_progress([self.enrollment])[self.enrollment.pk]
+		self.assertEqual(EnrollmentProgress.objects.filter(enrollment=self.enrollment).values(*expected).get(), expected)
+
+	def test_signals_keep_progress_in_sync(self):
+		progress = self._progress()
+		self.assertEqual((progress.total_sessions, progress.completed_sessions, progress.current_module), (14, 0, 1))
+
+		for session in self.sessions[:12]:
+			session.status = "DONE"
+			session.save()
+		progress = self._progress()
+		self.assertEqual((progress.completed_sessions, progress.progress_percent, progress.current_module), (12, 85, 2))
+
+		present = Attendance.objects.create(session=self.sessions[0], student=self.student, status="P")
+		Attendance.objects.create(session=self.sessions[1], student=self.student, status="A")
+		present.status = "L"
+		present.save()
+		self.assertEqual(self._progress().attendance, {"P": 0, "A": 1, "L": 1})
+		present.delete()
+		self.assertEqual(self._progress().attendance, {"P": 0, "A": 1, "L": 0})
+
+		Assessment.objects.create(session=self.sessions[0], student=self.student, score=6)
+		latest = Assessment.objects.create(session=self.sessions[2], student=self.student, score=9, remark="Tốt")
+		progress = self._progress()
+		self.assertEqual((progress.scored, progress.average_score), (2, 7.5))
+		self.assertEqual((progress.last_assessment_session_id, progress.last_remark), (self.sessions[2].pk, "Tốt"))
+		latest.delete()
+		self.assertEqual(self._progress().last_assessment_session_id, self.sessions[0].pk)
+
+		self.sessions[-1].delete()
+		self.assertEqual(self._progress().total_sessions, 13)
+		self._assert_matches_source()
+
+		# Trang danh sách đọc bản ghi tiến độ, khớp với báo cáo tính đầy đủ
+		summary = _student_progress_rows([self.enrollment])[0]
+		full = _student_report_rows([self.enrollment])[0]
+		for key in ("total_sessions", "completed_sessions", "progress_percent", "attendance"):
+			self.assertEqual(summary[key], full[key])
+
+	def test_progress_for_creates_missing_rows(self):
+		EnrollmentProgress.objects.all().delete()
+		Attendance.objects.create(session=self.sessions[0], student=self.student, status="P")
+
+		progress = progress_for([self.enrollment])[self.enrollment.pk]
+
+		self.assertEqual((progress.total_sessions, progress.present), (14, 1))
+		with self.assertNumQueries(1):
+			progress_for([self.enrollment])
+
+	def test_reconcile_reports_and_fixes_drift(self):
+		EnrollmentProgress.objects.filter(enrollment=self.enrollment).update(total_sessions=3, present=5)
+
+		out = StringIO()
+		call_command("reconcile_progress", stdout=out)
+		self.assertIn("1 drifted", out.getvalue())
+		self.assertIn("total_sessions: 3 -> 14", out.getvalue())
+		self.assertEqual(self._progress().total_sessions, 3)
+
+		call_command("reconcile_progress", "--fix", stdout=StringIO())
+		self.assertEqual((self._progress().total_sessions, self._progress().present), (14, 0))
+		self.assertEqual(reconcile_progress()["mismatches"], {})
+
+	def test_archived_class_keeps_progress(self):
+		for session in self.sessions:
+			session.status = "DONE"
+			session.save()
+		Attendance.objects.create(session=self.sessions[0], student=self.student, status="L")
+		Assessment.objects.create(session=self.sessions[3], student=self.student, score=8)
+		before = EnrollmentProgress.objects.filter(enrollment=self.enrollment).values().get()
+		self.klass.status = "COMPLETED"
+		self.klass.save()
+
+		archive_class(self.klass)
+
+		self.assertEqual(EnrollmentProgress.objects.filter(enrollment=self.enrollment).values().get(), before)
+		self.assertEqual(reconcile_progress(include_archived=True)["mismatches"], {})
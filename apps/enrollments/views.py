@@ -2,7 +2,6 @@ import json
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.core.paginator import EmptyPage, Paginator
 from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
@@ -27,6 +26,8 @@ from apps.filters.utils import (
     determine_active_filter_name,
 )
 from django.utils.dateparse import parse_date
+from apps.common.fragments import conditional_fragment
+from apps.common.pagination import cursor_paginate
 from apps.common.utils.forms import form_errors_as_text
 from apps.common.utils.http import is_htmx_request
 
@@ -66,8 +67,22 @@ def _get_managed_classes(user, flags):
         )
     return Class.objects.none()
 
+# Bảng mà fragment danh sách ghi danh phụ thuộc (ETag, xem apps.common.fragments)
+ENROLLMENT_FRAGMENT_TABLES = (
+    "enrollments.Enrollment",
+    "billing.BillingEntry",
+    "attendance.Attendance",
+    "classes.Class",
+    "centers.Center",
+    "accounts.User",
+    "accounts.ParentStudentRelation",
+    "filters.SavedFilter",
+)
+
+
 # Danh sách ghi danh
 @login_required
+@conditional_fragment(*ENROLLMENT_FRAGMENT_TABLES)
 def enrollment_list(request):
     user = request.user
     flags = _role_flags(user)
@@ -145,36 +160,20 @@ def enrollment_list(request):
 
     enrollments = enrollment_filter.qs
 
+    # Thứ tự luôn kết thúc bằng id để phân trang cursor ổn định
     order_mappings = {
-        "student_asc": ["student__last_name", "student__first_name", "student__username"],
-        "student_desc": ["-student__last_name", "-student__first_name", "-student__username"],
-        "-joined_at": ["-joined_at"],
-        "joined_at": ["joined_at"],
-        "-start_date": ["-start_date"],
-        "start_date": ["start_date"],
+        "student_asc": ["student__last_name", "student__first_name", "student__username", "id"],
+        "student_desc": ["-student__last_name", "-student__first_name", "-student__username", "-id"],
+        "-joined_at": ["-joined_at", "-id"],
+        "joined_at": ["joined_at", "id"],
+        "-start_date": ["-start_date", "-id"],
+        "start_date": ["start_date", "id"],
     }
     order = request.GET.get("order", "student_asc")
     if order not in order_mappings:
         order = "student_asc"
-    enrollments = enrollments.order_by(*order_mappings[order])
-
-    try:
-        per_page = int(request.GET.get("per_page", 10))
-        if per_page <= 0:
-            raise ValueError
-    except (TypeError, ValueError):
-        per_page = 10
 
-    try:
-        page_number = int(request.GET.get("page", 1))
-    except (TypeError, ValueError):
-        page_number = 1
-
-    paginator = Paginator(enrollments, per_page)
-    try:
-        page_obj = paginator.page(page_number)
-    except EmptyPage:
-        page_obj = paginator.page(1)
+    page_obj, per_page, current_query_params = cursor_paginate(request, enrollments, order_mappings[order])
     paginated_enrollments = page_obj.object_list
 
     active_filter_badges = build_filter_badges(enrollment_filter)
@@ -184,15 +183,9 @@ def enrollment_list(request):
     ).distinct()
     active_filter_name = determine_active_filter_name(request, saved_filters)
 
-    query_params_no_page = request.GET.copy()
-    query_params_no_page._mutable = True
-    query_params_no_page.pop("page", None)
-    current_query_params = query_params_no_page.urlencode()
-
     context = {
         "enrollments": paginated_enrollments,
         "page_obj": page_obj,
-        "paginator": paginator,
         "per_page": per_page,
         "current_query_params": current_query_params,
         "filter": enrollment_filter,
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Notification
+from django.utils import timezone
+
+from .models import Notification, OutboxEmail
 
 
 @admin.register(Notification)
@@ -11,3 +13,21 @@ class NotificationAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
     raw_id_fields = ("user",)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "sent_at", "created_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "to")
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    readonly_fields = ("created_at", "updated_at", "sent_at", "locked_at", "last_error")
+    actions = ["retry_now"]
+
+    @admin.action(description="Gửi lại ngay")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboxEmail.Status.SENT).update(
+            status=OutboxEmail.Status.QUEUED, next_attempt_at=timezone.now(), attempts=0
+        )
+        self.message_user(request, f"Đã đưa {updated} email vào hàng đợi.")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.notifications.services import LOW_BALANCE_SESSIONS, notify_low_balance
+
+
+class Command(BaseCommand):
+    help = "Notify students and parents of active enrollments that are running out of sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=int, default=LOW_BALANCE_SESSIONS)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            notifications = notify_low_balance(options["threshold"])
+        self.stdout.write(self.style.SUCCESS(f"Created {len(notifications)} low-balance notifications."))
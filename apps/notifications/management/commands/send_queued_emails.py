@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.outbox import EMAIL_OUTBOX_BATCH_SIZE, outbox_metrics, send_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox emails in batches over a reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=EMAIL_OUTBOX_BATCH_SIZE)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop.")
+        parser.add_argument("--metrics", action="store_true", help="Print queue and throughput metrics and exit.")
+
+    def handle(self, *args, **options):
+        if options["metrics"]:
+            for key, value in outbox_metrics().items():
+                self.stdout.write(f"{key}: {value}")
+            return
+        while True:
+            stats = send_queued_emails(batch_size=options["batch_size"])
+            if stats["batches"] or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Sent {stats['sent']}, retried {stats['retried']}, failed {stats['failed']} "
+                        f"in {stats['batches']} batches / {stats['connections']} connections "
+                        f"({stats['seconds']}s, {stats['per_second']}/s)."
+                    )
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
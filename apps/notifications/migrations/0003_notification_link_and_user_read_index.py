@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_alter_notification_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_user_id_c291d5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_is_read_9edb86_idx',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='link',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.utils import timezone
+
+from apps.common.models import TimeStampedModel
 
 
 class Notification(models.Model):
@@ -7,15 +10,45 @@ class Notification(models.Model):
     )
     title = models.CharField(max_length=200)
     body = models.TextField(blank=True)
+    link = models.CharField(max_length=500, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
 
     class Meta:
         ordering = ["-created_at"]
-        indexes = [models.Index(fields=["user"]), models.Index(fields=["is_read"])]
+        # Phục vụ cả đếm chưa đọc lẫn danh sách mới nhất của một người dùng
+        indexes = [models.Index(fields=["user", "is_read", "-created_at"], name="notif_user_read_created_idx")]
 
 
     def __str__(self):
         return f"{self.user.username}: {self.title}"
-        
\ No newline at end of file
+
+
+class OutboxEmail(TimeStampedModel):
+    """Email chờ gửi; worker gửi theo lô qua một kết nối SMTP dùng lại."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Đang chờ"
+        SENDING = "sending", "Đang gửi"
+        SENT = "sent", "Đã gửi"
+        FAILED = "failed", "Thất bại"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_status_next_idx")]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.get_status_display()})"
@@ -0,0 +1,210 @@
+"""
+Hàng đợi email gửi đi (outbox).
+
+Request chỉ ghi ``OutboxEmail`` rồi trả về ngay; sau khi transaction commit một thread nền
+(hoặc lệnh ``send_queued_emails``) nhận các email đến hạn theo lô và gửi chúng qua một kết
+nối duy nhất của ``get_connection()``. Email lỗi được thử lại với thời gian chờ tăng dần,
+quá số lần cho phép thì chuyển sang FAILED.
+"""
+
+import smtplib
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, connection as db_connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+EMAIL_OUTBOX_BATCH_SIZE = getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 100)
+EMAIL_OUTBOX_MAX_ATTEMPTS = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = getattr(settings, "EMAIL_OUTBOX_RETRY_BASE_SECONDS", 60)
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = getattr(settings, "EMAIL_OUTBOX_RETRY_MAX_SECONDS", 60 * 60)
+# Email kẹt ở SENDING lâu hơn mức này (worker chết giữa chừng) được nhận lại
+EMAIL_OUTBOX_STALE_SECONDS = getattr(settings, "EMAIL_OUTBOX_STALE_SECONDS", 15 * 60)
+EMAIL_OUTBOX_SEND_ON_COMMIT = getattr(settings, "EMAIL_OUTBOX_SEND_ON_COMMIT", True)
+
+# Lỗi chắc chắn không tự hết khi thử lại
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+# Lỗi làm hỏng kết nối: mở lại trước khi gửi email tiếp theo. SMTPException cũng là
+# OSError nên không bắt OSError ở đây; các lỗi SMTP khác chỉ tính cho email đó.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout)
+
+_sender_lock = threading.Lock()
+_sender_state = {"running": False, "again": False}
+
+
+def queue_email(subject, body, to, *, html_body="", from_email=None) -> OutboxEmail:
+    email = OutboxEmail.objects.create(
+        subject=subject[:255],
+        body=body,
+        html_body=html_body,
+        from_email=from_email or "",
+        to=list(to),
+    )
+    if EMAIL_OUTBOX_SEND_ON_COMMIT:
+        transaction.on_commit(kick_sender)
+    return email
+
+
+def retry_delay(attempts: int) -> int:
+    return min(EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), EMAIL_OUTBOX_RETRY_MAX_SECONDS)
+
+
+def _claim(batch_size, now):
+    """Khóa một lô email đến hạn; các worker chạy song song nhận các lô khác nhau."""
+    stale = now - timedelta(seconds=EMAIL_OUTBOX_STALE_SECONDS)
+    with transaction.atomic():
+        ids = list(
+            OutboxEmail.objects.filter(
+                Q(status=OutboxEmail.Status.QUEUED, next_attempt_at__lte=now)
+                | Q(status=OutboxEmail.Status.SENDING, locked_at__lt=stale)
+            )
+            .order_by("next_attempt_at", "id")
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if ids:
+            OutboxEmail.objects.filter(pk__in=ids).update(status=OutboxEmail.Status.SENDING, locked_at=now)
+    return list(OutboxEmail.objects.filter(pk__in=ids).order_by("id")) if ids else []
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=email.to,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def _send_batch(connection, batch, stats):
+    """Gửi cả lô trên một kết nối; trả về {id: lỗi hoặc None}."""
+    results = {}
+    try:
+        connection.open()
+        stats["connections"] += 1
+    except Exception as exc:
+        return {email.id: exc for email in batch}
+    try:
+        for email in batch:
+            try:
+                sent = connection.send_messages([_build_message(email, connection)])
+                results[email.id] = None if sent else RuntimeError("backend không gửi được email")
+            except Exception as exc:
+                results[email.id] = exc
+                if isinstance(exc, CONNECTION_ERRORS):
+                    connection.close()
+                    try:
+                        connection.open()
+                        stats["connections"] += 1
+                    except Exception as reopen_exc:
+                        for rest in batch:
+                            results.setdefault(rest.id, reopen_exc)
+                        break
+    finally:
+        connection.close()
+    return results
+
+
+def _record(batch, results, stats):
+    now = timezone.now()
+    for email in batch:
+        error = results.get(email.id)
+        email.attempts += 1
+        email.locked_at = None
+        # auto_now không áp dụng cho bulk_update
+        email.updated_at = now
+        if error is None:
+            email.status = OutboxEmail.Status.SENT
+            email.sent_at = now
+            email.last_error = ""
+            stats["sent"] += 1
+            continue
+        email.last_error = f"{type(error).__name__}: {error}"[:2000]
+        if isinstance(error, PERMANENT_ERRORS) or email.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = OutboxEmail.Status.FAILED
+            stats["failed"] += 1
+        else:
+            email.status = OutboxEmail.Status.QUEUED
+            email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+            stats["retried"] += 1
+    OutboxEmail.objects.bulk_update(
+        batch, ["status", "attempts", "locked_at", "sent_at", "last_error", "next_attempt_at", "updated_at"]
+    )
+
+
+def send_queued_emails(batch_size: int = EMAIL_OUTBOX_BATCH_SIZE, connection=None) -> dict:
+    """Gửi hết các email đang đến hạn, mỗi lô một kết nối; trả về số liệu của lần chạy."""
+    stats = {"sent": 0, "retried": 0, "failed": 0, "batches": 0, "connections": 0}
+    started = time.monotonic()
+    while True:
+        batch = _claim(batch_size, timezone.now())
+        if not batch:
+            break
+        stats["batches"] += 1
+        _record(batch, _send_batch(connection or get_connection(fail_silently=False), batch, stats), stats)
+        if len(batch) < batch_size:
+            break
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    stats["per_second"] = round(stats["sent"] / stats["seconds"], 1) if stats["seconds"] else float(stats["sent"])
+    return stats
+
+
+def kick_sender():
+    """Chạy worker ở thread nền; nếu đang chạy thì chỉ đánh dấu để nó quét thêm một vòng."""
+    with _sender_lock:
+        if _sender_state["running"]:
+            _sender_state["again"] = True
+            return
+        _sender_state["running"] = True
+        _sender_state["again"] = False
+
+    def run():
+        close_old_connections()
+        try:
+            while True:
+                try:
+                    send_queued_emails()
+                except Exception:
+                    # Email vẫn nằm trong outbox, lệnh send_queued_emails sẽ gửi lại
+                    pass
+                with _sender_lock:
+                    if not _sender_state["again"]:
+                        _sender_state["running"] = False
+                        return
+                    _sender_state["again"] = False
+        finally:
+            db_connection.close()
+
+    threading.Thread(target=run, daemon=True, name="email-outbox").start()
+
+
+def outbox_metrics(window_minutes: int = 60) -> dict:
+    """Tình trạng hàng đợi và thông lượng gửi trong ``window_minutes`` phút gần nhất."""
+    now = timezone.now()
+    since = now - timedelta(minutes=window_minutes)
+    by_status = dict(OutboxEmail.objects.values_list("status").annotate(n=Count("id")).order_by())
+    recent = OutboxEmail.objects.filter(status=OutboxEmail.Status.SENT, sent_at__gte=since)
+    oldest = OutboxEmail.objects.filter(status=OutboxEmail.Status.QUEUED).aggregate(v=Min("created_at"))["v"]
+    sent_recent = recent.count()
+    latencies = [(sent - created).total_seconds() for created, sent in recent.values_list("created_at", "sent_at")[:1000]]
+    return {
+        "queued": by_status.get(OutboxEmail.Status.QUEUED, 0),
+        "sending": by_status.get(OutboxEmail.Status.SENDING, 0),
+        "sent": by_status.get(OutboxEmail.Status.SENT, 0),
+        "failed": by_status.get(OutboxEmail.Status.FAILED, 0),
+        "sent_last_window": sent_recent,
+        "per_minute": round(sent_recent / window_minutes, 2) if window_minutes else 0,
+        "oldest_queued_seconds": round((now - oldest).total_seconds()) if oldest else 0,
+        "avg_latency_seconds": round(sum(latencies) / len(latencies), 2) if latencies else 0,
+    }
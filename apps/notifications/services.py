@@ -0,0 +1,156 @@
+"""
+Gửi thông báo hàng loạt và đếm số thông báo chưa đọc.
+
+Một sự kiện được tỏa ra nhiều người nhận bằng một ``bulk_create``. Số chưa đọc của mỗi
+người dùng được giữ trong cache và cập nhật sau khi transaction commit (tăng khi thêm,
+giảm khi đánh dấu đã đọc); khi key chưa có hoặc đã hết hạn thì đếm lại từ DB. Một thay
+đổi commit giữa lúc đếm và lúc ghi cache sẽ không cộng được vào key chưa tồn tại, nên sau
+khi ghi thì đếm lại một lần và bỏ key nếu hai lần đếm lệch nhau.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+
+from .models import Notification
+
+NOTIFICATION_BATCH_SIZE = getattr(settings, "NOTIFICATION_BATCH_SIZE", 1000)
+# Giới hạn thời gian lệch nếu có thay đổi đi vòng qua service (admin, update thẳng)
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = getattr(settings, "NOTIFICATION_UNREAD_CACHE_TIMEOUT", 60 * 10)
+LOW_BALANCE_SESSIONS = getattr(settings, "LOW_BALANCE_SESSIONS", 2)
+
+
+def _unread_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def unread_count(user_id) -> int:
+    key = _unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        unread = Notification.objects.filter(user_id=user_id, is_read=False)
+        count = unread.count()
+        if cache.add(key, count, NOTIFICATION_UNREAD_CACHE_TIMEOUT):
+            recount = unread.count()
+            if recount != count:
+                # Có thay đổi chen giữa lúc đếm và lúc add: bỏ key để lần sau đếm lại
+                cache.delete(key)
+                count = recount
+    return count
+
+
+def _adjust_unread(user_id, delta):
+    key = _unread_key(user_id)
+    try:
+        value = cache.incr(key, delta) if delta >= 0 else cache.decr(key, -delta)
+    except ValueError:
+        # Key chưa có: lần đọc sau sẽ đếm lại
+        return
+    if value < 0:
+        cache.delete(key)
+
+
+def forget_unread_count(*user_ids):
+    cache.delete_many([_unread_key(user_id) for user_id in user_ids])
+
+
+def notify_users(user_ids, title: str, body: str = "", link: str = "") -> list[Notification]:
+    """Tạo cùng một thông báo cho nhiều người dùng bằng một bulk_create."""
+    user_ids = list(dict.fromkeys(uid for uid in user_ids if uid))
+    if not user_ids:
+        return []
+    notifications = Notification.objects.bulk_create(
+        [Notification(user_id=uid, title=title[:200], body=body, link=link[:500]) for uid in user_ids],
+        batch_size=NOTIFICATION_BATCH_SIZE,
+    )
+    transaction.on_commit(lambda: [_adjust_unread(uid, 1) for uid in user_ids])
+    return notifications
+
+
+def notify_many(items) -> list[Notification]:
+    """``items``: iterable (user_id, title, body, link) với nội dung riêng cho từng người."""
+    notifications = [
+        Notification(user_id=uid, title=title[:200], body=body, link=(link or "")[:500])
+        for uid, title, body, link in items
+        if uid
+    ]
+    if not notifications:
+        return []
+    notifications = Notification.objects.bulk_create(notifications, batch_size=NOTIFICATION_BATCH_SIZE)
+    per_user = {}
+    for notification in notifications:
+        per_user[notification.user_id] = per_user.get(notification.user_id, 0) + 1
+    transaction.on_commit(lambda: [_adjust_unread(uid, n) for uid, n in per_user.items()])
+    return notifications
+
+
+def mark_read(user, ids) -> int:
+    updated = Notification.objects.filter(user=user, pk__in=ids, is_read=False).update(is_read=True)
+    if updated:
+        transaction.on_commit(lambda: _adjust_unread(user.pk, -updated))
+    return updated
+
+
+def mark_all_read(user) -> int:
+    updated = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+    transaction.on_commit(lambda: cache.set(_unread_key(user.pk), 0, NOTIFICATION_UNREAD_CACHE_TIMEOUT))
+    return updated
+
+
+def parent_ids_for_students(student_ids) -> dict:
+    """student_id -> danh sách parent_id."""
+    from apps.accounts.models import ParentStudentRelation
+
+    parents = {}
+    for student_id, parent_id in ParentStudentRelation.objects.filter(student_id__in=student_ids).values_list(
+        "student_id", "parent_id"
+    ):
+        parents.setdefault(student_id, []).append(parent_id)
+    return parents
+
+
+def notify_session_photos(session, count: int) -> list[Notification]:
+    """Báo cho phụ huynh của học sinh đang học lớp khi buổi học có ảnh mới."""
+    from apps.enrollments.models import Enrollment, EnrollmentStatus
+
+    student_ids = Enrollment.objects.filter(
+        klass_id=session.klass_id, status__in=[EnrollmentStatus.NEW, EnrollmentStatus.ACTIVE]
+    ).values_list("student_id", flat=True)
+    parent_ids = [pid for pids in parent_ids_for_students(student_ids).values() for pid in pids]
+    when = f" ngày {session.date:%d/%m/%Y}" if session.date else ""
+    return notify_users(
+        parent_ids,
+        f"Ảnh mới của lớp {session.klass.name}",
+        f"Đã có {count} ảnh mới của buổi học{when}.",
+        reverse("parents:children_overview_photos"),
+    )
+
+
+def low_balance_enrollments(threshold: int = LOW_BALANCE_SESSIONS):
+    """Ghi danh đang học còn không quá ``threshold`` buổi, lọc trong một truy vấn."""
+    from apps.enrollments.models import Enrollment, EnrollmentStatus
+    from apps.enrollments.services import annotate_session_balance
+
+    return list(
+        annotate_session_balance(
+            Enrollment.objects.filter(status__in=[EnrollmentStatus.NEW, EnrollmentStatus.ACTIVE])
+        )
+        .filter(remaining_sessions__lte=threshold)
+        .values("id", "student_id", "klass__name", remaining=F("remaining_sessions"))
+    )
+
+
+def notify_low_balance(threshold: int = LOW_BALANCE_SESSIONS) -> list[Notification]:
+    """Nhắc học sinh và phụ huynh của các ghi danh sắp hết buổi."""
+    rows = low_balance_enrollments(threshold)
+    parents = parent_ids_for_students({row["student_id"] for row in rows})
+    link = reverse("parents:children_overview")
+    items = []
+    for row in rows:
+        title = f"Lớp {row['klass__name']} sắp hết buổi học"
+        body = f"Còn {row['remaining']} buổi. Vui lòng gia hạn để không gián đoạn việc học."
+        items.append((row["student_id"], title, body, ""))
+        items.extend((parent_id, title, body, link) for parent_id in parents.get(row["student_id"], []))
+    return notify_many(items)
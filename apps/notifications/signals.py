@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Notification
+from .services import forget_unread_count
+
+
+# Sửa/xóa từng bản ghi (admin, cascade) đi vòng qua service: bỏ số đếm để đếm lại
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_changed(sender, instance: Notification, **kwargs):
+    transaction.on_commit(lambda: forget_unread_count(instance.user_id))
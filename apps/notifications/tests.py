@@ -1,3 +1,310 @@
-from django.test import TestCase
+import datetime
+import socketserver
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import ParentStudentRelation
+from apps.billing.models import BillingEntry
+from apps.common.factories import ClassSessionFactory, KlassFactory, UserFactory
+from apps.enrollments.models import Enrollment, EnrollmentStatus
+
+from .models import Notification, OutboxEmail
+from .outbox import EMAIL_OUTBOX_MAX_ATTEMPTS, outbox_metrics, queue_email, retry_delay, send_queued_emails
+from .services import (
+	low_balance_enrollments,
+	mark_all_read,
+	mark_read,
+	notify_low_balance,
+	notify_session_photos,
+	notify_users,
+	unread_count,
+)
+
+
+class NotificationFanOutTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.users = [UserFactory() for _ in range(3)]
+
+	def test_fan_out_is_single_insert(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			with self.assertNumQueries(1):
+				notify_users([u.id for u in self.users] + [self.users[0].id], "Tiêu đề", "Nội dung")
+		self.assertEqual(Notification.objects.count(), 3)
+
+	def test_unread_count_is_cached_and_kept_in_sync(self):
+		user = self.users[0]
+		# Lần đầu đếm rồi đếm lại một lần sau khi ghi cache
+		with self.assertNumQueries(2):
+			self.assertEqual(unread_count(user.id), 0)
+		with self.captureOnCommitCallbacks(execute=True):
+			notify_users([user.id], "A")
+			notify_users([user.id], "B")
+		with self.assertNumQueries(0):
+			self.assertEqual(unread_count(user.id), 2)
+
+		first = Notification.objects.filter(user=user).first()
+		with self.captureOnCommitCallbacks(execute=True):
+			self.assertEqual(mark_read(user, [first.pk]), 1)
+			# Đánh dấu lại không trừ thêm
+			self.assertEqual(mark_read(user, [first.pk]), 0)
+		with self.assertNumQueries(0):
+			self.assertEqual(unread_count(user.id), 1)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			mark_all_read(user)
+		with self.assertNumQueries(0):
+			self.assertEqual(unread_count(user.id), 0)
+		self.assertFalse(Notification.objects.filter(user=user, is_read=False).exists())
+
+	def test_single_row_change_resets_counter(self):
+		user = self.users[0]
+		unread_count(user.id)
+		with self.captureOnCommitCallbacks(execute=True):
+			Notification.objects.create(user=user, title="Từ admin")
+		self.assertEqual(unread_count(user.id), 1)
+
+	def test_change_racing_the_first_count_is_not_cached(self):
+		user = self.users[0]
+		real_add = cache.add
+
+		def add_after_commit(key, value, timeout):
+			# Thông báo commit sau lúc đếm nhưng trước lúc add: incr không có key để cộng
+			with self.captureOnCommitCallbacks(execute=True):
+				notify_users([user.id], "Chen giữa")
+			return real_add(key, value, timeout)
+
+		with mock.patch.object(cache, "add", side_effect=add_after_commit):
+			self.assertEqual(unread_count(user.id), 1)
+		self.assertIsNone(cache.get(f"notifications:unread:{user.id}"))
+		self.assertEqual(unread_count(user.id), 1)
+
+	def test_open_marks_read_only_on_post(self):
+		user = self.users[0]
+		with self.captureOnCommitCallbacks(execute=True):
+			notify_users([user.id], "A", link="/parents/")
+		notification = Notification.objects.get(user=user)
+		self.client.force_login(user)
+		url = reverse("notifications:open", args=[notification.pk])
+
+		self.assertEqual(self.client.get(url).status_code, 405)
+		notification.refresh_from_db()
+		self.assertFalse(notification.is_read)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			response = self.client.post(url)
+		self.assertRedirects(response, "/parents/", fetch_redirect_response=False)
+		notification.refresh_from_db()
+		self.assertTrue(notification.is_read)
+
+	def test_badge_does_not_query_notifications(self):
+		user = self.users[0]
+		with self.captureOnCommitCallbacks(execute=True):
+			notify_users([user.id], "A")
+		unread_count(user.id)
+		self.client.force_login(user)
+		with self.assertNumQueries(2) as ctx:
+			response = self.client.get(reverse("notifications:badge"))
+		self.assertContains(response, ">1<")
+		self.assertFalse(any("notifications_notification" in q["sql"] for q in ctx.captured_queries))
+
+	def test_mark_all_read_view(self):
+		user = self.users[0]
+		with self.captureOnCommitCallbacks(execute=True):
+			notify_users([user.id], "A")
+		self.client.force_login(user)
+		with self.captureOnCommitCallbacks(execute=True):
+			response = self.client.post(reverse("notifications:mark_all_read"), HTTP_HX_REQUEST="true")
+		self.assertEqual(response.status_code, 200)
+		self.assertIn("notifications-changed", response["HX-Trigger"])
+		self.assertEqual(unread_count(user.id), 0)
+
+
+class NotificationEventTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.klass = KlassFactory()
+		self.student = UserFactory()
+		self.parents = [UserFactory(role="PARENT") for _ in range(2)]
+		for parent in self.parents:
+			ParentStudentRelation.objects.create(parent=parent, student=self.student)
+		self.enrollment = Enrollment.objects.create(
+			klass=self.klass,
+			student=self.student,
+			status=EnrollmentStatus.ACTIVE,
+			sessions_purchased=10,
+			sessions_consumed=7,
+		)
+
+	def test_session_photos_notify_parents(self):
+		session = ClassSessionFactory(klass=self.klass, date=datetime.date(2024, 5, 1))
+		notify_session_photos(session, 4)
+		self.assertEqual(
+			set(Notification.objects.values_list("user_id", flat=True)), {p.id for p in self.parents}
+		)
+		self.assertIn("01/05/2024", Notification.objects.first().body)
+
+	def test_low_balance_uses_billing_adjustments(self):
+		self.assertEqual(low_balance_enrollments(2), [])
+		BillingEntry.objects.create(enrollment=self.enrollment, entry_type="ADJUST", sessions=-2)
+		with self.assertNumQueries(1):
+			rows = low_balance_enrollments(2)
+		self.assertEqual([(r["id"], r["remaining"]) for r in rows], [(self.enrollment.id, 1)])
+
+		notify_low_balance(2)
+		self.assertEqual(
+			set(Notification.objects.values_list("user_id", flat=True)),
+			{self.student.id, *(p.id for p in self.parents)},
+		)
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+	def reply(self, line):
+		self.wfile.write(f"{line}\r\n".encode())
+
+	def handle(self):
+		server = self.server
+		server.connections += 1
+		self.reply("220 stand-in ESMTP")
+		recipients = []
+		while True:
+			line = self.rfile.readline()
+			if not line:
+				return
+			command = line.decode().strip()
+			verb = command[:4].upper()
+			if verb in ("EHLO", "HELO"):
+				self.reply("250 stand-in")
+			elif verb == "MAIL":
+				recipients = []
+				self.reply("250 OK")
+			elif verb == "RCPT":
+				address = command.split(":", 1)[1].strip(" <>")
+				if address in server.drop:
+					# Đóng kết nối giữa chừng
+					return
+				if address in server.reject:
+					self.reply("550 no such user")
+				else:
+					recipients.append(address)
+					self.reply("250 OK")
+			elif verb == "DATA":
+				self.reply("354 go ahead")
+				data = []
+				while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+					data.append(chunk)
+				if any(address in server.defer for address in recipients):
+					self.reply("451 try again later")
+				else:
+					server.messages.append((recipients, b"".join(data)))
+					self.reply("250 queued")
+			elif verb == "QUIT":
+				self.reply("221 bye")
+				return
+			else:
+				self.reply("250 OK")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+	def __init__(self):
+		super().__init__(("127.0.0.1", 0), _SMTPHandler)
+		self.connections = 0
+		self.messages = []
+		self.reject = set()
+		self.defer = set()
+		self.drop = set()
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OutboxTests(TestCase):
+	def setUp(self):
+		self.server = _SMTPServer()
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		self.addCleanup(self.server.server_close)
+		self.addCleanup(self.server.shutdown)
+
+	def _smtp(self):
+		return get_connection(
+			"django.core.mail.backends.smtp.EmailBackend",
+			host="127.0.0.1",
+			port=self.server.server_address[1],
+			username="",
+			password="",
+			use_tls=False,
+			timeout=5,
+		)
+
+	def test_queue_is_sent_in_batches_on_locmem(self):
+		for i in range(5):
+			queue_email(f"Tiêu đề {i}", "Nội dung", [f"u{i}@example.com"], html_body="<b>Nội dung</b>")
+		self.assertEqual(len(mail.outbox), 0)
+		stats = send_queued_emails(batch_size=2)
+		self.assertEqual((stats["sent"], stats["batches"]), (5, 3))
+		self.assertEqual(len(mail.outbox), 5)
+		self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+		self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.Status.SENT).count(), 5)
+
+	def test_batch_reuses_one_smtp_connection(self):
+		for i in range(4):
+			queue_email("Xin chào", "Nội dung", [f"u{i}@example.com"])
+		stats = send_queued_emails(connection=self._smtp())
+		self.assertEqual(stats["sent"], 4)
+		self.assertEqual(self.server.connections, 1)
+		self.assertEqual(len(self.server.messages), 4)
+
+	def test_failures_retry_with_backoff_or_fail_permanently(self):
+		self.server.reject.add("bad@example.com")
+		self.server.defer.add("later@example.com")
+		ok = queue_email("A", "x", ["ok@example.com"])
+		bad = queue_email("B", "x", ["bad@example.com"])
+		later = queue_email("C", "x", ["later@example.com"])
+		before = timezone.now()
+		stats = send_queued_emails(connection=self._smtp())
+		self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (1, 1, 1))
+		# Lỗi SMTP của từng email không làm mở lại kết nối
+		self.assertEqual(self.server.connections, 1)
+
+		ok.refresh_from_db()
+		bad.refresh_from_db()
+		later.refresh_from_db()
+		self.assertEqual(ok.status, OutboxEmail.Status.SENT)
+		self.assertEqual(bad.status, OutboxEmail.Status.FAILED)
+		self.assertIn("SMTPRecipientsRefused", bad.last_error)
+		self.assertEqual((later.status, later.attempts), (OutboxEmail.Status.QUEUED, 1))
+		self.assertGreaterEqual(later.next_attempt_at, before + timedelta(seconds=retry_delay(1)))
+		self.assertEqual(retry_delay(3), 4 * retry_delay(1))
+
+		# Chưa đến hạn thì không gửi lại; hết lượt thử thì chuyển FAILED
+		self.assertEqual(send_queued_emails(connection=self._smtp())["batches"], 0)
+		OutboxEmail.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now(), attempts=EMAIL_OUTBOX_MAX_ATTEMPTS - 1)
+		self.assertEqual(send_queued_emails(connection=self._smtp())["failed"], 1)
+
+	def test_dropped_connection_is_reopened_for_the_rest_of_the_batch(self):
+		self.server.drop.add("drop@example.com")
+		dropped = queue_email("A", "x", ["drop@example.com"])
+		queue_email("B", "x", ["ok@example.com"])
+		stats = send_queued_emails(connection=self._smtp())
+
+		self.assertEqual((stats["sent"], stats["retried"]), (1, 1))
+		self.assertEqual((stats["connections"], self.server.connections), (2, 2))
+		dropped.refresh_from_db()
+		self.assertIn("SMTPServerDisconnected", dropped.last_error)
+
+	def test_metrics(self):
+		queue_email("A", "x", ["a@example.com"])
+		queue_email("B", "x", ["b@example.com"])
+		send_queued_emails(batch_size=1)
+		queue_email("C", "x", ["c@example.com"])
+		metrics = outbox_metrics()
+		self.assertEqual((metrics["sent"], metrics["queued"], metrics["sent_last_window"]), (2, 1, 2))
@@ -1,3 +1,72 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+
+from apps.common.pagination import cursor_paginate
+from apps.common.utils.http import is_htmx_request
+
+from .models import Notification
+from .services import mark_all_read, mark_read, unread_count
+
+CHANGED_TRIGGER = json.dumps({"notifications-changed": True})
+
+
+# Badge số thông báo chưa đọc trên thanh điều hướng; đọc từ cache
+@login_required
+def notification_badge(request):
+    return render(request, "_notification_badge.html", {"unread_count": unread_count(request.user.pk)})
+
+
+# Danh sách thông báo của người dùng
+@login_required
+def notification_list(request):
+    qs = Notification.objects.filter(user=request.user)
+    page_obj, per_page, current_query_params = cursor_paginate(
+        request, qs, ("-created_at", "-id"), default_per_page=20, estimate_total=False
+    )
+    context = {
+        "page_obj": page_obj,
+        "per_page": per_page,
+        "current_query_params": current_query_params,
+        "unread_count": unread_count(request.user.pk),
+    }
+    if is_htmx_request(request):
+        return render(request, "_notification_list.html", context)
+    return render(request, "notification_list.html", context)
+
+
+# Mở thông báo: đánh dấu đã đọc rồi chuyển tới liên kết đính kèm.
+# Chỉ nhận POST để trình duyệt/ứng dụng chat prefetch liên kết không đánh dấu nhầm.
+@login_required
+@require_POST
+def notification_open(request, pk):
+    notification = get_object_or_404(Notification, pk=pk, user=request.user)
+    mark_read(request.user, [notification.pk])
+    if notification.link and url_has_allowed_host_and_scheme(notification.link, allowed_hosts={request.get_host()}):
+        return redirect(notification.link)
+    return redirect("notifications:list")
+
+
+@login_required
+@require_POST
+def notification_mark_read(request, pk):
+    notification = get_object_or_404(Notification, pk=pk, user=request.user)
+    if mark_read(request.user, [notification.pk]):
+        notification.is_read = True
+    response = render(request, "_notification_item.html", {"n": notification})
+    response["HX-Trigger"] = CHANGED_TRIGGER
+    return response
+
+
+@login_required
+@require_POST
+def notification_mark_all_read(request):
+    mark_all_read(request.user)
+    if not is_htmx_request(request):
+        return redirect("notifications:list")
+    response = notification_list(request)
+    response["HX-Trigger"] = CHANGED_TRIGGER
+    return response
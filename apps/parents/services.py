@@ -2,9 +2,10 @@ from collections import defaultdict
 from datetime import date
 from typing import Dict, List
 
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, F, Q, Sum
 
 from apps.accounts.models import ParentStudentRelation
+from apps.archive.models import ArchivedEnrollment
 from apps.assessments.models import Assessment
 from apps.attendance.models import Attendance
 from apps.class_sessions.models import ClassSessionPhoto
@@ -72,6 +73,30 @@ def build_parent_children_snapshot(parent) -> Dict[str, object]:
                 )
             )
         }
+        # Lớp đã lưu trữ: cộng số liệu từ bản tổng hợp
+        archived_rows = (
+            ArchivedEnrollment.objects.filter(enrollment__student_id__in=child_ids)
+            .values("enrollment__student_id")
+            .annotate(
+                present=Sum("present"),
+                absent=Sum("absent"),
+                late=Sum("late"),
+                scored=Sum("assessments"),
+                score_total=Sum(F("average_score") * F("assessments")),
+            )
+            .order_by()
+        )
+        archived_scores = {}
+        for row in archived_rows:
+            sid = row["enrollment__student_id"]
+            summary = attendance_summary_map.setdefault(
+                sid, {"student_id": sid, "total": 0, "present": 0, "absent": 0, "late": 0}
+            )
+            for key in ("present", "absent", "late"):
+                summary[key] += row[key] or 0
+                summary["total"] += row[key] or 0
+            if row["score_total"] is not None:
+                archived_scores[sid] = (row["score_total"], row["scored"])
 
         latest_attendance_map = {}
         latest_attendance_qs = (
@@ -83,14 +108,16 @@ def build_parent_children_snapshot(parent) -> Dict[str, object]:
             if att.student_id not in latest_attendance_map:
                 latest_attendance_map[att.student_id] = att
 
-        avg_score_map = {
-            row["student_id"]: row["avg_score"]
-            for row in (
-                Assessment.objects.filter(student_id__in=child_ids, score__isnull=False)
-                .values("student_id")
-                .annotate(avg_score=Avg("score"))
-            )
-        }
+        avg_score_map = {}
+        for row in (
+            Assessment.objects.filter(student_id__in=child_ids, score__isnull=False)
+            .values("student_id")
+            .annotate(avg_score=Avg("score"), scored=Count("id"))
+        ):
+            score_total, scored = archived_scores.pop(row["student_id"], (0, 0))
+            avg_score_map[row["student_id"]] = (row["avg_score"] * row["scored"] + score_total) / (row["scored"] + scored)
+        for sid, (score_total, scored) in archived_scores.items():
+            avg_score_map[sid] = score_total / scored
 
         recent_photos_map = defaultdict(list)
         for student_id in child_ids:
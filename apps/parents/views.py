@@ -17,6 +17,7 @@ from apps.class_sessions.models import ClassSession, ClassSessionPhoto
 from apps.class_sessions.forms import ClassSessionPhotoForm
 from apps.attendance.models import Attendance
 from apps.assessments.models import Assessment
+from apps.archive.services import session_record
 from apps.students.models import StudentProduct
 from .services import build_parent_children_snapshot
 
@@ -117,8 +118,8 @@ def children_session_detail(request, enrollment_id: int, session_id: int):
 	enrollment = get_object_or_404(base_enrollments, pk=enrollment_id)
 	session = get_object_or_404(ClassSession, pk=session_id, klass_id=enrollment.klass_id)
 
-	attendance = Attendance.objects.filter(student=enrollment.student, session=session).first()
-	assessment = Assessment.objects.filter(student=enrollment.student, session=session).first()
+	attendance = session_record(Attendance, enrollment.student, session)
+	assessment = session_record(Assessment, enrollment.student, session)
 	products = StudentProduct.objects.filter(student=enrollment.student, session=session).order_by("-created_at")
 
 	flags = _role_flags(request.user)
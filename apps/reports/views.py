@@ -1,7 +1,6 @@
 from datetime import date, datetime, timedelta
 import csv
 import re
-from math import ceil
 from urllib.parse import urlencode
 
 from django.contrib.auth.decorators import login_required
@@ -16,13 +15,24 @@ from django.urls import reverse
 from django.utils.dateparse import parse_date
 
 from apps.accounts.models import ParentStudentRelation, User
+from apps.archive.models import ArchivedBillingDay
+from apps.archive.services import (
+    archived_attendance_counts,
+    archived_class_ids,
+    archived_session_history,
+    session_record,
+)
 from apps.assessments.models import Assessment
 from apps.attendance.models import Attendance
 from apps.class_sessions.models import ClassSession, ClassSessionPhoto
 from apps.class_sessions.forms import ClassSessionPhotoForm
+from apps.common.fragments import conditional_fragment
+from apps.common.pagination import cursor_paginate
 from apps.classes.models import Class
+from apps.curriculum.tree import DEFAULT_MODULE_SIZE, get_curriculum_tree, module_number
 from apps.centers.models import Center
 from apps.enrollments.models import Enrollment, EnrollmentStatus
+from apps.enrollments.progress import progress_for
 from apps.students.models import StudentProduct, StudentExerciseSubmission
 from apps.billing.models import BillingEntry
 from apps.filters.models import SavedFilter
@@ -35,6 +45,26 @@ from apps.reports.filters import (
     TeachingHoursReportFilter,
 )
 from apps.common.utils.http import is_htmx_request
+from apps.common.db_routing import replica_reads
+
+# Bảng mà các fragment báo cáo phụ thuộc (ETag, xem apps.common.fragments)
+REPORT_FRAGMENT_TABLES = (
+    "enrollments.Enrollment",
+    "enrollments.EnrollmentProgress",
+    "billing.BillingEntry",
+    "attendance.Attendance",
+    "assessments.Assessment",
+    "class_sessions.ClassSession",
+    "class_sessions.ClassSessionPhoto",
+    "classes.Class",
+    "centers.Center",
+    "curriculum.Subject",
+    "students.StudentProduct",
+    "students.StudentExerciseSubmission",
+    "accounts.User",
+    "accounts.ParentStudentRelation",
+    "filters.SavedFilter",
+)
 
 # Chuẩn hóa định danh (role, group name) thành dạng in hoa, không dấu cách
 def _normalize_identifier(value) -> str:
@@ -146,11 +176,15 @@ def _build_student_report_context(request, *, paginate=False) -> dict:
         page_obj = None
         enrollments_page = enrollments
 
-    rows = _student_report_rows(
-        enrollments_page,
-        start_date=start_date,
-        end_date=end_date,
-    )
+    if paginate and not start_date and not end_date:
+        # Trang danh sách chỉ hiển thị thanh tiến độ: đọc bản ghi tiến độ, một truy vấn cho cả trang
+        rows = _student_progress_rows(enrollments_page)
+    else:
+        rows = _student_report_rows(
+            enrollments_page,
+            start_date=start_date,
+            end_date=end_date,
+        )
 
     center_ids = base_enrollments.values_list("klass__center_id", flat=True).distinct()
     centers = Center.objects.filter(id__in=center_ids).order_by("name")
@@ -271,31 +305,75 @@ def _attendance_counts(student_id, session_ids):
         stats[row["status"]] = row["total"]
     return stats
 
+# Hàng tóm tắt tiến độ (không lọc theo ngày) đọc từ EnrollmentProgress
+def _student_progress_rows(enrollments):
+    enrollments = list(enrollments)
+    progress = progress_for(enrollments)
+    rows = []
+    for enrollment in enrollments:
+        item = progress[enrollment.pk]
+        rows.append(
+            {
+                "enrollment": enrollment,
+                "progress": item,
+                "total_sessions": item.total_sessions,
+                "completed_sessions": item.completed_sessions,
+                "missed_sessions": item.absent,
+                "attendance": item.attendance,
+                "progress_percent": item.progress_percent,
+                "current_module": item.current_module,
+                "average_score": item.average_score,
+            }
+        )
+    return rows
+
 # Xây dựng các hàng báo cáo học tập của học sinh
 def _student_report_rows(enrollments, start_date=None, end_date=None):
     rows = []
+    enrollments = list(enrollments)
+    archived_ids = archived_class_ids({enrollment.klass_id for enrollment in enrollments})
     for enrollment in enrollments:
         sessions = ClassSession.objects.filter(klass=enrollment.klass)
         if start_date:
             sessions = sessions.filter(date__gte=start_date)
         if end_date:
             sessions = sessions.filter(date__lte=end_date)
-        module_size = getattr(enrollment, "module_size", None) or 12
+        module_size = getattr(enrollment, "module_size", None) or DEFAULT_MODULE_SIZE
+        # Học phần của buổi lấy theo cây chương trình; môn chưa có bài học thì chia đều theo module_size
+        tree = get_curriculum_tree(enrollment.klass.subject_id)
         session_ids = list(sessions.values_list("id", flat=True))
         total_sessions = sessions.count()
         # Tính hoàn thành gồm cả DONE và MISSED để tiến độ phản ánh buổi đã diễn ra.
         completed_sessions = sessions.filter(status__in=["DONE", "MISSED"]).count()
-        attendance = _attendance_counts(enrollment.student_id, session_ids)
+        if enrollment.klass_id in archived_ids:
+            # Lớp đã lưu trữ: điểm danh và đánh giá đọc từ bản lưu trữ
+            archived_attendance, archived_assessments = archived_session_history(enrollment, sessions)
+            attendance = {"P": 0, "A": 0, "L": 0}
+            for record in archived_attendance:
+                attendance[record.status] += 1
+            attendance_by_session = {record.session_id: record.status for record in archived_attendance}
+            assessments_by_session = {record.session_id: record for record in archived_assessments}
+            assessments = sorted(
+                archived_assessments, key=lambda record: (record.session.date, record.session.index), reverse=True
+            )[:3]
+        else:
+            attendance = _attendance_counts(enrollment.student_id, session_ids)
+            assessments_qs = Assessment.objects.filter(
+                student=enrollment.student, session_id__in=session_ids
+            ).select_related("session")
+            assessments = assessments_qs.order_by("-session__date", "-session__index")[:3]
+            assessments_by_session = {a.session_id: a for a in assessments_qs}
+            attendance_by_session = {
+                item["session_id"]: item["status"]
+                for item in Attendance.objects.filter(student=enrollment.student, session_id__in=session_ids).values(
+                    "session_id", "status"
+                )
+            }
         missed_sessions = attendance.get("A", 0)
         sessions_total_from_fee = getattr(enrollment, "sessions_total", 0) or total_sessions
         # Hiển thị % dựa trên tổng buổi thực tế (theo bộ lọc) để tránh sai lệch khi học phí khai báo khác
         progress_denominator = total_sessions or sessions_total_from_fee
         progress_percent = int((completed_sessions / progress_denominator) * 100) if progress_denominator else 0
-        assessments_qs = Assessment.objects.filter(student=enrollment.student, session_id__in=session_ids).select_related(
-            "session"
-        )
-        assessments = assessments_qs.order_by("-session__date", "-session__index")[:3]
-        assessments_by_session = {a.session_id: a for a in assessments_qs}
         products_qs = StudentProduct.objects.filter(student=enrollment.student, session_id__in=session_ids).select_related(
             "session"
         )
@@ -308,12 +386,6 @@ def _student_report_rows(enrollments, start_date=None, end_date=None):
         photos_by_session = {}
         for photo in photos_qs:
             photos_by_session.setdefault(photo.session_id, []).append(photo)
-        attendance_by_session = {
-            item["session_id"]: item["status"]
-            for item in Attendance.objects.filter(student=enrollment.student, session_id__in=session_ids).values(
-                "session_id", "status"
-            )
-        }
         sessions_detail = []
         for s in sessions.order_by("date", "index"):
             sessions_detail.append(
@@ -327,7 +399,7 @@ def _student_report_rows(enrollments, start_date=None, end_date=None):
                     "assessment": assessments_by_session.get(s.id),
                     "products": products_by_session.get(s.id, []),
                     "photos": photos_by_session.get(s.id, []),
-                    "module_number": ceil(s.index / module_size) if module_size else 1,
+                    "module_number": module_number(tree, s.index, module_size),
                 }
             )
         # Xác định học phần đang học / đã học / chưa học dựa trên buổi sắp tới
@@ -335,19 +407,19 @@ def _student_report_rows(enrollments, start_date=None, end_date=None):
         upcoming_session = next((s for s in sessions_detail if s["status"] not in done_statuses), None)
         upcoming_module = upcoming_session["module_number"] if upcoming_session else None
         modules_meta = []
-        for module_number in sorted({s["module_number"] for s in sessions_detail}):
-            module_sessions = [s for s in sessions_detail if s["module_number"] == module_number]
+        for number in sorted({s["module_number"] for s in sessions_detail}):
+            module_sessions = [s for s in sessions_detail if s["module_number"] == number]
             if upcoming_module is None:
                 module_status = "Hoàn thành"
-            elif module_number < upcoming_module:
+            elif number < upcoming_module:
                 module_status = "Hoàn thành"
-            elif module_number == upcoming_module:
+            elif number == upcoming_module:
                 module_status = "Đang học"
             else:
                 module_status = "Chưa học"
             modules_meta.append(
                 {
-                    "module_number": module_number,
+                    "module_number": number,
                     "status": module_status,
                     "status_class": {
                         "Hoàn thành": "success",
@@ -388,6 +460,8 @@ def _student_report_rows(enrollments, start_date=None, end_date=None):
 
 # Tóm tắt đăng ký
 @login_required
+@conditional_fragment(*REPORT_FRAGMENT_TABLES)
+@replica_reads()
 def enrollment_summary(request):
     user = request.user
     is_admin, is_center_manager = _user_is_admin_or_center_manager(user)
@@ -501,6 +575,8 @@ def _ensure_mutable_querydict(params_source):
 
 # Báo cáo học tập của học sinh
 @login_required
+@conditional_fragment(*REPORT_FRAGMENT_TABLES)
+@replica_reads()
 def student_report(request):
     context = _build_student_report_context(request, paginate=True)
     if is_htmx_request(request):
@@ -541,8 +617,8 @@ def student_session_detail(request, enrollment_id, session_id):
     enrollment = get_object_or_404(base_enrollments, pk=enrollment_id)
     session = get_object_or_404(ClassSession, pk=session_id, klass_id=enrollment.klass_id)
 
-    attendance = Attendance.objects.filter(student=enrollment.student, session=session).first()
-    assessment = Assessment.objects.filter(student=enrollment.student, session=session).first()
+    attendance = session_record(Attendance, enrollment.student, session)
+    assessment = session_record(Assessment, enrollment.student, session)
     products = StudentProduct.objects.filter(student=enrollment.student, session=session).order_by("-created_at")
 
     flags = _role_flags(request.user)
@@ -589,6 +665,8 @@ def student_session_detail(request, enrollment_id, session_id):
 
 # Báo cáo doanh thu
 @login_required
+@conditional_fragment(*REPORT_FRAGMENT_TABLES)
+@replica_reads()
 def revenue_report(request):
     flags = _role_flags(request.user)
     allowed = flags["is_admin"] or flags["is_center_manager"] or request.user.has_perm("reports.view_revenue_report")
@@ -631,43 +709,51 @@ def revenue_report(request):
     totals["total_amount"] = totals.get("total_amount") or 0
     totals["total_sessions"] = totals.get("total_sessions") or 0
 
-    by_center = (
+    by_center = list(
         entries.values("enrollment__klass__center__name", "enrollment__klass__center_id")
         .annotate(total_amount=Sum("amount"), total_sessions=Sum("sessions"), entries=Count("id"))
         .order_by("enrollment__klass__center__name")
     )
 
-    ordered_entries = entries.order_by("-created_at", "-id")
-
-    try:
-        per_page = int(request.GET.get("per_page", 10))
-        if per_page <= 0:
-            raise ValueError
-    except (TypeError, ValueError):
-        per_page = 10
-
-    try:
-        page_number = int(request.GET.get("page", 1))
-    except (TypeError, ValueError):
-        page_number = 1
-
-    paginator = Paginator(ordered_entries, per_page)
-    page_obj = paginator.get_page(page_number)
+    # Bút toán của lớp đã lưu trữ chỉ còn tổng theo ngày: cộng vào tổng và theo trung tâm
+    archived = ArchivedBillingDay.objects.all()
+    if flags["is_center_manager"]:
+        archived = archived.filter(enrollment__klass__center_id=request.user.center_id or 0)
+    cleaned = filterset.form.cleaned_data if filterset.is_valid() else {}
+    if cleaned.get("center"):
+        archived = archived.filter(enrollment__klass__center=cleaned["center"])
+    if cleaned.get("enrollment"):
+        archived = archived.filter(enrollment=cleaned["enrollment"])
+    if cleaned.get("start_date"):
+        archived = archived.filter(date__gte=cleaned["start_date"])
+    if cleaned.get("end_date"):
+        archived = archived.filter(date__lte=cleaned["end_date"])
+    archived_by_center = (
+        archived.values("enrollment__klass__center__name", "enrollment__klass__center_id")
+        .annotate(total_amount=Sum("amount"), total_sessions=Sum("sessions"), entries=Sum("entries"))
+        .order_by()
+    )
+    if archived_by_center:
+        centers_by_id = {row["enrollment__klass__center_id"]: row for row in by_center}
+        for row in archived_by_center:
+            current = centers_by_id.setdefault(
+                row["enrollment__klass__center_id"], {**row, "total_amount": 0, "total_sessions": 0, "entries": 0}
+            )
+            for key in ("total_amount", "total_sessions", "entries"):
+                current[key] += row[key] or 0
+                if key != "entries":
+                    totals[key] += row[key] or 0
+        by_center = sorted(centers_by_id.values(), key=lambda row: row["enrollment__klass__center__name"])
 
-    pagination_query_dict = request.GET.copy()
-    if hasattr(pagination_query_dict, "_mutable"):
-        pagination_query_dict._mutable = True
-    pagination_query_dict.pop("page", None)
-    pagination_query_params = pagination_query_dict.urlencode()
+    page_obj, per_page, current_query_params = cursor_paginate(request, entries, ("-created_at", "-id"))
 
     context = {
         "totals": totals,
         "by_center": by_center,
         "recent": page_obj.object_list,
-        "paginator": paginator,
         "page_obj": page_obj,
         "per_page": per_page,
-        "pagination_query_params": pagination_query_params,
+        "current_query_params": current_query_params,
     }
     context.update(
         _build_filter_ui_context(
@@ -684,6 +770,8 @@ def revenue_report(request):
 
 # Báo cáo giờ giảng dạy
 @login_required
+@conditional_fragment(*REPORT_FRAGMENT_TABLES)
+@replica_reads()
 def teaching_hours_report(request):
     flags = _role_flags(request.user)
     allowed = (
@@ -816,6 +904,8 @@ def teaching_hours_report(request):
 
 # Báo cáo hoạt động lớp học
 @login_required
+@conditional_fragment(*REPORT_FRAGMENT_TABLES)
+@replica_reads()
 def class_activity_report(request):
     flags = _role_flags(request.user)
     if not (flags["is_admin"] or flags["is_center_manager"] or request.user.has_perm("reports.view_class_activity_report")):
@@ -902,6 +992,13 @@ def class_activity_report(request):
             status = row["status"]
             attendance_counts.setdefault(klass_id, {"P": 0, "A": 0, "L": 0})
             attendance_counts[klass_id][status] = row["total"]
+    archived_counts = archived_attendance_counts(
+        {klass_id: [s.id for s in klass_sessions] for klass_id, klass_sessions in sessions_by_class.items()}
+    )
+    for klass_id, counts in archived_counts.items():
+        class_counts = attendance_counts.setdefault(klass_id, {"P": 0, "A": 0, "L": 0})
+        for status, total in counts.items():
+            class_counts[status] = class_counts.get(status, 0) + total
 
     submission_counts = {}
     if session_ids:
@@ -968,6 +1065,7 @@ def class_activity_report(request):
 
 # Xuất báo cáo học tập của học sinh ra PDF
 @login_required
+@replica_reads()
 def student_report_pdf(request):
     try:
         from weasyprint import HTML
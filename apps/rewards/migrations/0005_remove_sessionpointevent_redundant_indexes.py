@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0004_rename_rewards_ses_student_02cacb_idx_rewards_ses_student_9c999a_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='sessionpointevent',
+            name='rewards_ses_student_9c999a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='sessionpointevent',
+            name='rewards_ses_event_t_d9af09_idx',
+        ),
+        migrations.AlterField(
+            model_name='sessionpointevent',
+            name='event_type',
+            field=models.CharField(choices=[('ATTENDANCE', 'Điểm danh'), ('PRODUCT', 'Sản phẩm'), ('MANUAL', 'Thủ công')], max_length=20),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models, transaction
 from steam_center.storages import MediaStorage
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
+from apps.common.models import FieldTrackerMixin
 
 
 class PointAccount(models.Model):
@@ -28,7 +29,9 @@ class PointAccount(models.Model):
         return f"{self.student.username}: {self.balance} points"
 
 
-class RewardItem(models.Model):
+class RewardItem(FieldTrackerMixin, models.Model):
+    tracked_fields = ("image",)
+
     name = models.CharField(max_length=200)
     image = models.ImageField(
         upload_to="reward_items/", 
@@ -95,9 +98,7 @@ class SessionPointEvent(models.Model):
         on_delete=models.CASCADE,
         related_name="point_events",
     )
-    event_type = models.CharField(
-        max_length=20, choices=SessionPointEventType.choices, db_index=True
-    )
+    event_type = models.CharField(max_length=20, choices=SessionPointEventType.choices)
     transaction = models.ForeignKey(
         RewardTransaction,
         null=True,
@@ -109,13 +110,10 @@ class SessionPointEvent(models.Model):
     note = models.CharField(max_length=255, blank=True)
 
     class Meta:
+        # Mọi tra cứu theo (student, session, event_type) đã dùng index của unique_together
         unique_together = (("student", "session", "event_type"),)
         ordering = ["-created_at"]
-        indexes = [
-            models.Index(fields=["student"]),
-            models.Index(fields=["session"]),
-            models.Index(fields=["event_type"]),
-        ]
+        indexes = [models.Index(fields=["session"])]
 
     def __str__(self):
         return f"{self.student} - {self.session} - {self.event_type}"
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class StudentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.students"
+
+    def ready(self):
+        from .signals import resanitize_embeds_after_migrate
+
+        post_migrate.connect(resanitize_embeds_after_migrate, sender=self)
@@ -0,0 +1,137 @@
+"""
+Làm sạch mã nhúng (iframe) của sản phẩm học sinh.
+
+Mã nhúng được làm sạch một lần khi lưu ``StudentProduct`` và lưu kèm ``embed_version()``;
+khi danh sách host cho phép hoặc cách render thay đổi thì version đổi theo và
+``resanitize_stale_embeds`` cập nhật lại hàng loạt.
+"""
+
+import hashlib
+import re
+from html import escape
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+DEFAULT_ALLOWED = {
+    "www.youtube.com",
+    "youtube.com",
+    "youtu.be",
+    "player.vimeo.com",
+    "itch.io",
+    "www.itch.io",
+    "itch.zone",
+    "scratch.mit.edu",
+    "itch.io/embed",
+    "codepen.io",
+}
+
+# Tăng khi đổi HTML sinh ra để buộc làm sạch lại toàn bộ
+EMBED_RENDERER_VERSION = 1
+
+IFRAME_FEATURES = [
+    "accelerometer",
+    "autoplay",
+    "clipboard-write",
+    "encrypted-media",
+    "fullscreen",
+    "gamepad",
+    "gyroscope",
+    "picture-in-picture",
+    "xr-spatial-tracking",
+]
+
+EMBED_RESANITIZE_BATCH_SIZE = getattr(settings, "EMBED_RESANITIZE_BATCH_SIZE", 500)
+
+
+def allowed_hosts() -> set[str]:
+    return set(getattr(settings, "ALLOWED_STUDENT_EMBED_HOSTS", DEFAULT_ALLOWED))
+
+
+def embed_version() -> str:
+    """Version của chính sách hiện tại: đổi khi allow-list hoặc renderer thay đổi."""
+    raw = f"{EMBED_RENDERER_VERSION}:" + ",".join(sorted(allowed_hosts()))
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _match_provider(src: str, allowed: set[str]) -> tuple[str, str]:
+    """Trả về (host của src, mục allow-list khớp hoặc "")."""
+    try:
+        host = urlparse(src).netloc.lower()
+    except Exception:
+        return "", ""
+    # Some providers use subdomains; allow suffix match
+    for entry in sorted(allowed, key=len, reverse=True):
+        if host == entry or host.endswith("." + entry):
+            return host, entry
+    return host, ""
+
+
+def _first_iframe_src(embed_code: str) -> str | None:
+    try:
+        from bs4 import BeautifulSoup  # type: ignore
+
+        iframe = BeautifulSoup(embed_code, "html.parser").find("iframe")
+        return iframe.get("src") if iframe and iframe.get("src") else None
+    except Exception:
+        # Fallback: regex the first iframe src
+        m = re.search(r"<iframe[^>]*src=[\"']([^\"']+)[\"'][^>]*>", embed_code, re.I)
+        return m.group(1) if m else None
+
+
+def sanitize_embed(embed_code: str, allowed: set[str] | None = None) -> tuple[str, str, str]:
+    """
+    Chỉ giữ <iframe> đầu tiên từ host được phép, ép kích thước responsive và bật các
+    tính năng cần cho game (fullscreen, gamepad, ...).
+
+    Trả về (html, host, provider); provider rỗng nghĩa là nguồn bị chặn.
+    """
+    if not embed_code:
+        return "", "", ""
+    try:
+        src = _first_iframe_src(embed_code)
+        if not src:
+            return "", "", ""
+        host, provider = _match_provider(src, allowed if allowed is not None else allowed_hosts())
+        if provider:
+            html = (
+                f'<iframe src="{escape(src)}" class="w-100 h-100" '
+                f'allow="{"; ".join(IFRAME_FEATURES)}" allowfullscreen="true" '
+                f'loading="lazy" referrerpolicy="no-referrer-when-downgrade"></iframe>'
+            )
+        else:
+            html = (
+                f'<div class="small text-muted">Nguồn nhúng không được hỗ trợ. '
+                f'<a href="{escape(src)}" target="_blank" rel="noopener">Mở liên kết</a></div>'
+            )
+        return html, host[:255], provider[:255]
+    except Exception:
+        return "", "", ""
+
+
+def resanitize_stale_embeds(batch_size: int = EMBED_RESANITIZE_BATCH_SIZE) -> dict:
+    """Làm sạch lại các sản phẩm có version khác version hiện tại; trả về thống kê."""
+    from .models import StudentProduct
+
+    version = embed_version()
+    allowed = allowed_hosts()
+    stats = {"updated": 0, "batches": 0}
+    while True:
+        # Bản ghi đã cập nhật không còn khớp bộ lọc nên luôn lấy từ đầu
+        batch = list(
+            StudentProduct.objects.exclude(embed_version=version)
+            .only("id", "embed_code")
+            .order_by("id")[:batch_size]
+        )
+        if not batch:
+            return stats
+        for product in batch:
+            product.embed_html, product.embed_host, product.embed_provider = sanitize_embed(product.embed_code, allowed)
+            product.embed_version = version
+        StudentProduct.objects.bulk_update(
+            batch, ["embed_html", "embed_host", "embed_provider", "embed_version"], batch_size=batch_size
+        )
+        stats["updated"] += len(batch)
+        stats["batches"] += 1
+        if len(batch) < batch_size:
+            return stats
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.students.embeds import EMBED_RESANITIZE_BATCH_SIZE, embed_version, resanitize_stale_embeds
+from apps.students.models import StudentProduct
+
+
+class Command(BaseCommand):
+    help = "Backfill/refresh sanitized embed HTML for student products whose embed version is stale."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=EMBED_RESANITIZE_BATCH_SIZE)
+        parser.add_argument("--force", action="store_true", help="Re-sanitize every product, not only stale ones.")
+
+    def handle(self, *args, **options):
+        if options["force"]:
+            StudentProduct.objects.update(embed_version="")
+        stats = resanitize_stale_embeds(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sanitized {stats['updated']} products in {stats['batches']} batches (version {embed_version()})."
+            )
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_create_studentexercisesubmission_if_missing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentproduct',
+            name='embed_host',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='studentproduct',
+            name='embed_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studentproduct',
+            name='embed_provider',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='studentproduct',
+            name='embed_version',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16),
+        ),
+    ]
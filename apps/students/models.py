@@ -4,9 +4,13 @@ from django.db import models
 
 from apps.class_sessions.models import ClassSession
 from apps.curriculum.models import Exercise
+from apps.common.models import FieldTrackerMixin
+from .embeds import embed_version, sanitize_embed
 from steam_center.storages import MediaStorage
 
-class StudentProduct(models.Model):
+class StudentProduct(FieldTrackerMixin, models.Model):
+    tracked_fields = ("image", "embed_code")
+
     session = models.ForeignKey(
             ClassSession,
             on_delete=models.CASCADE,
@@ -30,6 +34,11 @@ class StudentProduct(models.Model):
         blank=True,
     )
     embed_code = models.TextField(blank=True)
+    # Kết quả làm sạch embed_code, tính lại khi lưu (xem apps.students.embeds)
+    embed_html = models.TextField(blank=True, editable=False)
+    embed_host = models.CharField(max_length=255, blank=True, editable=False)
+    embed_provider = models.CharField(max_length=255, blank=True, editable=False)
+    embed_version = models.CharField(max_length=16, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -42,6 +51,17 @@ class StudentProduct(models.Model):
     def __str__(self):
         return f"{self.student.username} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        # Bỏ qua khi embed bị defer (only/defer) để không phát sinh truy vấn
+        embed_loaded = not self.get_deferred_fields() & {"embed_code", "embed_version"}
+        if embed_loaded and (self.embed_version != embed_version() or self.has_changed("embed_code")):
+            self.embed_html, self.embed_host, self.embed_provider = sanitize_embed(self.embed_code)
+            self.embed_version = embed_version()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "embed_html", "embed_host", "embed_provider", "embed_version"}
+        super().save(*args, **kwargs)
+
 
 class StudentExerciseSubmission(models.Model):
     exercise = models.ForeignKey(
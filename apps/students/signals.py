@@ -0,0 +1,6 @@
+from .embeds import resanitize_stale_embeds
+
+
+# Allow-list đổi thì version đổi: làm sạch lại mã nhúng ngay khi deploy chạy migrate
+def resanitize_embeds_after_migrate(sender, **kwargs):
+    resanitize_stale_embeds()
@@ -1,3 +1,52 @@
-from django.test import TestCase
+from django.template import Context, Template
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from apps.common.factories import StudentProductFactory
+
+from .embeds import embed_version, resanitize_stale_embeds
+from .models import StudentProduct
+
+YOUTUBE = '<iframe width="560" src="https://www.youtube.com/embed/abc" onload="alert(1)"></iframe><script>x()</script>'
+
+
+class StudentEmbedTests(TestCase):
+	def test_embed_is_sanitized_on_save(self):
+		product = StudentProductFactory(embed_code=YOUTUBE)
+		product.refresh_from_db()
+		self.assertIn('src="https://www.youtube.com/embed/abc"', product.embed_html)
+		self.assertNotIn("onload", product.embed_html)
+		self.assertNotIn("<script", product.embed_html)
+		self.assertEqual(product.embed_host, "www.youtube.com")
+		self.assertEqual(product.embed_provider, "www.youtube.com")
+		self.assertEqual(product.embed_version, embed_version())
+
+		product.embed_code = '<iframe src="https://evil.example/x"></iframe>'
+		product.save(update_fields=["embed_code"])
+		product.refresh_from_db()
+		self.assertEqual(product.embed_provider, "")
+		self.assertIn("Nguồn nhúng không được hỗ trợ", product.embed_html)
+
+	def test_filter_reads_stored_html_without_parsing(self):
+		product = StudentProductFactory(embed_code=YOUTUBE)
+		template = Template("{% load embed_tags %}{{ p|safe_embed }}")
+		StudentProduct.objects.filter(pk=product.pk).update(embed_html="<iframe src=\"stored\"></iframe>")
+		product.refresh_from_db()
+		self.assertEqual(template.render(Context({"p": product})), '<iframe src="stored"></iframe>')
+
+	def test_allow_list_change_resanitizes_stale_rows(self):
+		products = [StudentProductFactory(embed_code='<iframe src="https://games.example.org/g"></iframe>') for _ in range(3)]
+		self.assertEqual({p.embed_provider for p in products}, {""})
+
+		with override_settings(ALLOWED_STUDENT_EMBED_HOSTS={"example.org"}):
+			template = Template("{% load embed_tags %}{{ p|safe_embed }}")
+			stale = StudentProduct.objects.get(pk=products[0].pk)
+			# Chưa chạy lại: filter tự làm sạch theo allow-list mới
+			self.assertIn("<iframe", template.render(Context({"p": stale})))
+
+			with self.assertNumQueries(4):
+				stats = resanitize_stale_embeds(batch_size=2)
+			self.assertEqual(stats, {"updated": 3, "batches": 2})
+			self.assertEqual(
+				set(StudentProduct.objects.values_list("embed_provider", flat=True)), {"example.org"}
+			)
+			self.assertEqual(resanitize_stale_embeds(), {"updated": 0, "batches": 0})
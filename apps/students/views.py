@@ -13,6 +13,7 @@ from apps.enrollments.models import Enrollment
 from apps.accounts.models import ParentStudentRelation
 from apps.attendance.models import Attendance
 from apps.assessments.models import Assessment
+from apps.archive.services import session_record
 from apps.filters.utils import build_filter_badges
 from .filters import StudentProductFilter
 from .models import StudentProduct, StudentExerciseSubmission
@@ -23,6 +24,7 @@ import json
 from django.http import HttpResponse
 from django.urls import reverse
 from apps.common.utils.http import is_htmx_request
+from apps.common.services import queue_file_deletion
 from apps.reports.views import (
     _build_student_report_context,
     _student_report_accessible_enrollments,
@@ -611,8 +613,8 @@ def learning_session_detail(request, enrollment_id: int, session_id: int):
     enrollment = get_object_or_404(base_enrollments, pk=enrollment_id)
     session = get_object_or_404(ClassSession, pk=session_id, klass_id=enrollment.klass_id)
 
-    attendance = Attendance.objects.filter(student=enrollment.student, session=session).first()
-    assessment = Assessment.objects.filter(student=enrollment.student, session=session).first()
+    attendance = session_record(Attendance, enrollment.student, session)
+    assessment = session_record(Assessment, enrollment.student, session)
     products = StudentProduct.objects.filter(student=enrollment.student, session=session).order_by("-created_at")
 
     flags = _role_flags(request.user)
@@ -804,13 +806,14 @@ def submission_update(request, pk: int):
     )
 
     if request.method == "POST":
+        # Lấy tên file cũ trước khi form gán file mới vào instance
+        old_name = submission.file.name if submission.file else None
         form = StudentExerciseSubmissionForm(request.POST, request.FILES, instance=submission)
         if form.is_valid():
             new_file = form.cleaned_data.get("file")
-            old_file = submission.file
             form.save()
-            if new_file and old_file and old_file.name != new_file.name:
-                old_file.delete(save=False)
+            if new_file and old_name and old_name != submission.file.name:
+                queue_file_deletion(submission, "file", old_name)
 
             class_id = return_class_id
             redirect_to_course = None
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Chạy local: ``uvicorn steam_center.asgi:application --lifespan off --workers 2`` (hoặc
+``daphne steam_center.asgi:application``). View đồng bộ chạy trên thread riêng của từng request;
+kết nối DB được mở/đóng theo ``CONN_MAX_AGE`` ở đầu và cuối request như dưới WSGI.
 """
 
 import os
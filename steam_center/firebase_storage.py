@@ -0,0 +1,55 @@
+import os
+from urllib.parse import quote
+
+from django.core.exceptions import ImproperlyConfigured
+from storages.backends.gcloud import GoogleCloudStorage
+from storages.utils import clean_name
+
+
+class FirebaseMediaStorage(GoogleCloudStorage):
+    """
+    Firebase Cloud Storage backend for media files.
+    The bucket name, ACL, and location can be configured through environment variables.
+    """
+
+    bucket_name = os.getenv("FIREBASE_STORAGE_BUCKET") or os.getenv("GS_BUCKET_NAME")
+    default_acl = os.getenv("FIREBASE_DEFAULT_ACL", os.getenv("GS_DEFAULT_ACL", "publicRead"))
+    file_overwrite = False
+    location = os.getenv("FIREBASE_MEDIA_LOCATION", "media")
+    # Giới hạn số request trong một batch của GCS JSON API
+    delete_batch_size = 100
+
+    def __init__(self, *args, **kwargs):
+        bucket = kwargs.get("bucket_name") or self.bucket_name
+        if not bucket:
+            raise ImproperlyConfigured("FIREBASE_STORAGE_BUCKET must be set when using MediaStorage.")
+        kwargs.setdefault("bucket_name", bucket)
+        super().__init__(*args, **kwargs)
+
+    def url(self, name, *args, **kwargs):
+        normalized_name = self._normalize_name(name)
+        encoded_name = quote(normalized_name, safe="")
+        return f"https://firebasestorage.googleapis.com/v0/b/{self.bucket_name}/o/{encoded_name}?alt=media"
+
+    def delete_many(self, names):
+        """
+        Delete several objects using the GCS batch API.
+        Returns a mapping of name -> error for the objects that could not be deleted;
+        objects that are already missing count as deleted.
+        """
+        errors = {}
+        for start in range(0, len(names), self.delete_batch_size):
+            chunk = names[start:start + self.delete_batch_size]
+            batch = self.client.batch(raise_exception=False)
+            try:
+                with batch:
+                    for name in chunk:
+                        self.bucket.blob(self._normalize_name(clean_name(name))).delete()
+            except Exception as exc:
+                errors.update({name: str(exc) for name in chunk})
+                continue
+            for name, response in zip(chunk, batch._responses):
+                status = getattr(response, "status_code", 500)
+                if not (200 <= status < 300 or status == 404):
+                    errors[name] = f"HTTP {status}"
+        return errors
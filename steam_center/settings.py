@@ -2,7 +2,6 @@ import os
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
-from google.oauth2 import service_account
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -34,6 +33,7 @@ INSTALLED_APPS = [
     "django.contrib.humanize",
     # Thư viện bên thứ 3
     "rest_framework",
+    "rest_framework.authtoken",
     "django_filters",
     "drf_spectacular",
     "widget_tweaks",
@@ -56,6 +56,8 @@ INSTALLED_APPS = [
     "apps.reports",
     "apps.rewards",
     "apps.filters",
+    "apps.api",
+    "apps.archive",
     "storages",
 ]
 INSTALLED_APPS += ["django_seed"]
@@ -63,6 +65,8 @@ INSTALLED_APPS += ["django_seed"]
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "apps.common.instrumentation.RequestMetricsMiddleware",
+    "apps.common.db_routing.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -70,6 +74,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_htmx.middleware.HtmxMiddleware",
+    "apps.common.profiler.RequestProfilerMiddleware",
 ]
 
 ROOT_URLCONF = "steam_center.urls"
@@ -103,9 +108,32 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "postgres"),
         "HOST": os.getenv("POSTGRES_HOST", "127.0.0.1"),
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        # Giữ kết nối giữa các request (giây); 0 là đóng sau mỗi request. Dưới ASGI mỗi request
+        # chạy trên thread riêng nên để 0 trừ khi có pool kết nối (pgbouncer)
+        "CONN_MAX_AGE": int(os.getenv("POSTGRES_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Replica chỉ đọc cho báo cáo/dashboard (apps.common.db_routing), bật khi có POSTGRES_REPLICA_HOST.
+# Alias luôn được khai báo (trỏ về primary khi không có replica) để test dùng được hai alias;
+# khi chạy test, replica là mirror của default.
+DATABASES["replica"] = {
+    **DATABASES["default"],
+    "HOST": os.getenv("POSTGRES_REPLICA_HOST", DATABASES["default"]["HOST"]),
+    "PORT": os.getenv("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+    "USER": os.getenv("POSTGRES_REPLICA_USER", DATABASES["default"]["USER"]),
+    "PASSWORD": os.getenv("POSTGRES_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+    "TEST": {"MIRROR": "default"},
+}
+DATABASE_ROUTERS = ["apps.common.db_routing.ReplicaRouter"]
+READ_REPLICA_ENABLED = bool(os.getenv("POSTGRES_REPLICA_HOST"))
+READ_REPLICA_ALIAS = "replica"
+# Quay về primary khi replica trễ hơn số giây này
+READ_REPLICA_MAX_LAG = float(os.getenv("READ_REPLICA_MAX_LAG", 10))
+# Sau khi ghi, trình duyệt đọc từ primary trong ngần này giây (đọc lại được dữ liệu vừa ghi)
+READ_REPLICA_PIN_SECONDS = int(os.getenv("READ_REPLICA_PIN_SECONDS", 15))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,6 +188,31 @@ else:
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# API chỉ đọc cho ứng dụng di động/kiosk (apps.api)
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.TokenAuthentication",
+    ],
+    "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
+    "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.NamespaceVersioning",
+    "ALLOWED_VERSIONS": ["v1"],
+    "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+}
+SPECTACULAR_SETTINGS = {
+    "TITLE": "STEAM Center API",
+    "VERSION": "1.0.0",
+    "SERVE_INCLUDE_SCHEMA": False,
+    "ENUM_NAME_OVERRIDES": {
+        "ClassStatusEnum": "apps.classes.models.CLASS_STATUS",
+        "SessionStatusEnum": "apps.class_sessions.models.SESSION_STATUS",
+        "AttendanceStatusEnum": "apps.attendance.models.ATTEND_CHOICES",
+        "EnrollmentStatusEnum": "apps.enrollments.models.EnrollmentStatus",
+    },
+}
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", 50))
+
 # Email + password reset configuration
 EMAIL_BACKEND = os.getenv(
     "EMAIL_BACKEND",
@@ -178,6 +231,103 @@ PASSWORD_RESET_TIMEOUT = int(os.getenv("PASSWORD_RESET_TIMEOUT", 3600))
 PASSWORD_RESET_RATE_LIMIT = int(os.getenv("PASSWORD_RESET_RATE_LIMIT", 5))
 PASSWORD_RESET_RATE_WINDOW = int(os.getenv("PASSWORD_RESET_RATE_WINDOW", 300))
 
+# Cache dùng chung giữa các worker: Redis khi có REDIS_URL, ngược lại CACHE_BACKEND là "file"
+# (mặc định, thư mục CACHE_LOCATION), "db" (bảng CACHE_LOCATION, tạo bằng createcachetable) hoặc
+# "locmem" (riêng từng process, chỉ dùng khi chạy một worker)
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "steam"),
+        }
+    }
+elif CACHE_BACKEND == "db":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", "django_cache"),
+            "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 50000))},
+        }
+    }
+elif CACHE_BACKEND == "locmem":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "steam-center",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+            "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 50000))},
+        }
+    }
+
+# Cache hai tầng (apps.common.cache): LRU trong từng process trước cache dùng chung, cho fragment
+# template và danh sách dùng chung
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", 1000))
+CACHE_LOCAL_TIMEOUT = int(os.getenv("CACHE_LOCAL_TIMEOUT", 300))
+CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", 60 * 60))
+
+# ETag cho fragment HTMX theo version từng bảng (apps.common.fragments); fragment lớn hơn
+# FRAGMENT_GZIP_MIN_BYTES được nén gzip
+FRAGMENT_ETAGS_ENABLED = os.getenv("FRAGMENT_ETAGS_ENABLED", "1") == "1"
+FRAGMENT_GZIP_MIN_BYTES = int(os.getenv("FRAGMENT_GZIP_MIN_BYTES", 2048))
+
+# Số liệu request trong bộ nhớ từng process (apps.common.instrumentation): /metrics/requests/
+# cho nhân viên, /metrics/ dạng Prometheus (nhân viên hoặc Bearer REQUEST_METRICS_TOKEN).
+# REQUEST_METRICS_SAMPLE_RATE > 0 ghi kèm toàn bộ truy vấn ra file JSON lines
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "1") == "1"
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv("REQUEST_METRICS_N_PLUS_ONE_THRESHOLD", 5))
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", 0))
+REQUEST_METRICS_SAMPLE_PATH = os.getenv("REQUEST_METRICS_SAMPLE_PATH", "")
+REQUEST_METRICS_TOKEN = os.getenv("REQUEST_METRICS_TOKEN", "")
+
+# Các khối số liệu độc lập của dashboard chạy song song trên thread pool (apps.common.concurrency);
+# khối quá DASHBOARD_BLOCK_TIMEOUT giây được bỏ qua và trang báo thiếu số liệu
+DASHBOARD_CONCURRENCY_ENABLED = os.getenv("DASHBOARD_CONCURRENCY_ENABLED", "1") == "1"
+DASHBOARD_CONCURRENCY_WORKERS = int(os.getenv("DASHBOARD_CONCURRENCY_WORKERS", 8))
+DASHBOARD_BLOCK_TIMEOUT = float(os.getenv("DASHBOARD_BLOCK_TIMEOUT", 3))
+
+# Profile theo yêu cầu cho nhân viên (?_profile=1 hoặc header X-Profile: 1), xem tại
+# /metrics/profiles/. Giữ tối đa PROFILER_MAX_PROFILES profile, tổng PROFILER_MAX_TOTAL_BYTES
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "1") == "1"
+PROFILER_MAX_PROFILES = int(os.getenv("PROFILER_MAX_PROFILES", 200))
+PROFILER_MAX_BYTES = int(os.getenv("PROFILER_MAX_BYTES", 2 * 1024 * 1024))
+PROFILER_MAX_TOTAL_BYTES = int(os.getenv("PROFILER_MAX_TOTAL_BYTES", 50 * 1024 * 1024))
+
+# Giây tối đa cho django.setup() + nạp URLconf (py manage.py profile_imports, test khởi động)
+STARTUP_IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", 2))
+
+# py manage.py index_advisor: ngưỡng số dòng để đánh dấu seq scan/sort và node "lớn" trong EXPLAIN
+INDEX_ADVISOR_MIN_ROWS = int(os.getenv("INDEX_ADVISOR_MIN_ROWS", 1000))
+INDEX_ADVISOR_LARGE_ROWS = int(os.getenv("INDEX_ADVISOR_LARGE_ROWS", 50_000))
+
+# py manage.py archive_classes: lớp COMPLETED/CANCELLED kết thúc trước số tháng này được lưu trữ
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", 12))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 5000))
+
+# py manage.py export_center/import_center: số dòng mỗi lô đọc từ DB và mỗi lô bulk_create khi nhập
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", 2000))
+
+# py manage.py reconcile_progress: số lớp mỗi lô khi tính lại tiến độ học hàng loạt
+PROGRESS_BATCH_SIZE = int(os.getenv("PROGRESS_BATCH_SIZE", 200))
+
+# Cây chương trình học cache theo môn (giây)
+CURRICULUM_TREE_CACHE_TIMEOUT = int(os.getenv("CURRICULUM_TREE_CACHE_TIMEOUT", 60 * 60 * 24))
+
+# Thumbnail sinh cho ảnh upload (cạnh dài tối đa, px) và định dạng xuất
+IMAGE_DERIVATIVE_SIZES = {"sm": 320, "md": 800, "lg": 1600}
+IMAGE_DERIVATIVE_FORMATS = ("webp", "jpeg")
+IMAGE_DERIVATIVE_QUALITY = int(os.getenv("IMAGE_DERIVATIVE_QUALITY", 82))
+# Thread nền sinh thumbnail còn thiếu khi hiển thị ảnh cũ (không chặn lúc render)
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", 2))
+
 # Allowed student embed hosts (for safe iframe rendering)
 # Extend this set per your needs (e.g., 'play.unity.com', 'glitch.me')
 ALLOWED_STUDENT_EMBED_HOSTS = set([
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
+from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 
 urlpatterns = [
@@ -22,6 +23,10 @@ urlpatterns = [
     path("reports/", include("apps.reports.urls")),
     path("billing/", include("apps.billing.urls")),
     path("rewards/", include(("apps.rewards.urls", "rewards"), namespace="rewards")),
+    path("notifications/", include("apps.notifications.urls")),
+    path("api/v1/", include(("apps.api.urls", "api"), namespace="v1")),
+    path("api/schema/", SpectacularAPIView.as_view(api_version="v1"), name="api-schema"),
+    path("api/docs/", SpectacularSwaggerView.as_view(url_name="api-schema"), name="api-docs"),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)